@@ -8,8 +8,19 @@ document.addEventListener('DOMContentLoaded', () => {
     const productsUrlInput = document.getElementById('products-url');
     const pedidosUrlInput = document.getElementById('pedidos-url');
     const facturasUrlInput = document.getElementById('facturas-url');
+    const gatewayUrlInput = document.getElementById('gateway-url');
     const ipDetectSpan = document.querySelector('.ip-detectada-span'); // Usamos una clase por si cambia el HTML
 
+    // Ancho de la imagen en la tarjeta (ver .product-image en estilo.css)
+    const TAMANO_IMAGEN = '(max-width: 600px) 100vw, 260px';
+
+    // Texto del servidor que se inserta en una plantilla HTML
+    function escaparHtml(valor) {
+        return String(valor).replace(/[&<>"']/g, c => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        })[c]);
+    }
+
     let cart = [];
     let apiConfig = {};
 
@@ -62,9 +73,13 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
 
+        // Con gateway todas las llamadas pasan por él y el pedido usa /api/checkout
+        apiConfig.gateway = localStorage.getItem('gatewayUrl') || '';
+
         productsUrlInput.value = apiConfig.products;
         pedidosUrlInput.value = apiConfig.pedidos;
         facturasUrlInput.value = apiConfig.facturas;
+        gatewayUrlInput.value = apiConfig.gateway;
         console.log("URLs configuradas:", apiConfig);
     }
 
@@ -72,64 +87,51 @@ document.addEventListener('DOMContentLoaded', () => {
         localStorage.setItem('productsUrl', productsUrlInput.value);
         localStorage.setItem('pedidosUrl', pedidosUrlInput.value);
         localStorage.setItem('facturasUrl', facturasUrlInput.value);
+        localStorage.setItem('gatewayUrl', gatewayUrlInput.value.trim());
 
         // Actualizar apiConfig con los valores guardados
         apiConfig = {
             products: productsUrlInput.value,
             pedidos: pedidosUrlInput.value,
-            facturas: facturasUrlInput.value
+            facturas: facturasUrlInput.value,
+            gateway: gatewayUrlInput.value.trim()
         };
 
         console.log("URLs guardadas en localStorage:", apiConfig);
         alert('Configuración guardada exitosamente.');
     }
 
+    function apiUrl(servicio) {
+        return apiConfig.gateway || apiConfig[servicio];
+    }
+
     async function loadProducts() {
         productsList.innerHTML = '<p>Cargando productos...</p>';
         try {
-            console.log('DEBUG: Fetching products from:', `${apiConfig.products}/api/products`);
-            const response = await fetch(`${apiConfig.products}/api/products`);
+            console.log('DEBUG: Fetching products from:', `${apiUrl('products')}/api/products`);
+            // JSON en lugar de XML: más ligero y sin DOMParser para el catálogo
+            const response = await fetch(`${apiUrl('products')}/api/products`, {
+                headers: { 'Accept': 'application/json' }
+            });
             console.log('DEBUG: Response status:', response.status);
             if (!response.ok) {
                 throw new Error(`El servidor respondió con el estado: ${response.status}`);
             }
-            const xmlText = await response.text();
-            console.log('DEBUG: Raw XML response:', xmlText);
-
-            const parser = new DOMParser();
-            const xmlDoc = parser.parseFromString(xmlText, "application/xml");
-            console.log('DEBUG: Parsed XML document:', xmlDoc);
-
-            // Check for parser errors
-            const parserError = xmlDoc.querySelector('parsererror');
-            if (parserError) {
-                console.error('DEBUG: XML parsing error:', parserError.textContent);
-                throw new Error('Error al parsear XML: ' + parserError.textContent);
-            }
-
-            const products = xmlDoc.querySelectorAll('product');
-            console.log('DEBUG: Found products elements:', products.length);
+            const products = await response.json();
+            console.log('DEBUG: Found products:', products.length);
             productsList.innerHTML = '';
             if (products.length === 0) {
-                console.log('DEBUG: No products found in XML');
+                console.log('DEBUG: No products found');
                 productsList.innerHTML = '<p>No hay productos disponibles.</p>';
                 return;
             }
 
-            console.log('DEBUG: First product element:', products[0]);
-            console.log('DEBUG: First product innerHTML:', products[0].innerHTML);
-
             products.forEach((product, index) => {
-                console.log(`DEBUG: Processing product ${index + 1}:`, product);
-                const id = product.querySelector('id')?.textContent;
-                const nombre = product.querySelector('nombre')?.textContent;
-                const precio = product.querySelector('precio')?.textContent;
-                const stock = product.querySelector('stock')?.textContent;
-                const descripcion = product.querySelector('descripcion')?.textContent;
+                const { id, nombre, precio, stock, descripcion, miniatura, srcset } = product;
 
                 console.log(`DEBUG: Product ${index + 1} data:`, { id, nombre, precio, stock, descripcion });
 
-                if (!id || !nombre || precio === undefined) {
+                if (!id || !nombre || precio === undefined || precio === null) {
                     console.warn(`DEBUG: Skipping product ${index + 1} due to missing required fields`);
                     return;
                 }
@@ -143,12 +145,27 @@ document.addEventListener('DOMContentLoaded', () => {
                 const card = document.createElement('div');
                 card.className = 'product-card';
                 card.innerHTML = `
-                    <h3>${nombre}</h3>
-                    <p>${descripcion || 'Sin descripción'}</p>
+                    <h3>${escaparHtml(nombre)}</h3>
+                    <p>${escaparHtml(descripcion || 'Sin descripción')}</p>
                     <p class="precio">Precio: $${precioFloat.toFixed(2)}</p>
-                    <p>Stock: ${stock || 'N/A'}</p>
-                    <button class="add-to-cart-btn" data-id="${id}" data-nombre="${nombre}" data-precio="${precioFloat}">Agregar al Carrito</button>
+                    <p>Stock: ${escaparHtml(stock ?? 'N/A')}</p>
+                    <button class="add-to-cart-btn" data-id="${escaparHtml(id)}" data-nombre="${escaparHtml(nombre)}" data-precio="${precioFloat}">Agregar al Carrito</button>
                 `;
+                // Miniaturas en lugar del original: el navegador elige el ancho con srcset.
+                // Se asignan como propiedades, no como HTML
+                if (miniatura) {
+                    const imagen = document.createElement('img');
+                    imagen.className = 'product-image';
+                    imagen.src = miniatura;
+                    if (srcset) {
+                        imagen.srcset = srcset;
+                        imagen.sizes = TAMANO_IMAGEN;
+                    }
+                    imagen.alt = nombre;
+                    imagen.loading = 'lazy';
+                    imagen.decoding = 'async';
+                    card.prepend(imagen);
+                }
                 productsList.appendChild(card);
             });
 
@@ -220,9 +237,16 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             xmlData += '</pedido>';
 
+            if (apiConfig.gateway) {
+                await checkoutViaGateway(xmlData);
+                cart = [];
+                updateCartUI();
+                return;
+            }
+
             const pedidoResponse = await fetch(`${apiConfig.pedidos}/api/pedidos`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/xml' },
+                headers: { 'Content-Type': 'application/xml', 'Accept': 'application/json' },
                 body: xmlData
             });
 
@@ -231,13 +255,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`Error del servidor al crear pedido: ${errorText}`);
             }
 
-            const pedidoXmlText = await pedidoResponse.text();
-            const parser = new DOMParser();
-            const pedidoXml = parser.parseFromString(pedidoXmlText, 'application/xml');
-            const pedidoId = pedidoXml.querySelector('pedido_id').textContent;
+            const { pedido_id: pedidoId, factura_estado: facturaEstado } = await pedidoResponse.json();
             alert(`Pedido creado con éxito. ID: ${pedidoId}.`);
             
-            await handleGenerateInvoice(pedidoId);
+            // Con FACTURAS_ASYNC la factura ya viene encolada; sólo hay que esperarla
+            if (facturaEstado) {
+                await waitForInvoice(pedidoId);
+            } else {
+                await handleGenerateInvoice(pedidoId);
+            }
 
             cart = [];
             updateCartUI();
@@ -248,11 +274,39 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    async function checkoutViaGateway(xmlData) {
+        // Pedido y factura en una sola solicitud al gateway
+        const checkoutResponse = await fetch(`${apiConfig.gateway}/api/checkout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/xml' },
+            body: xmlData
+        });
+
+        if (!checkoutResponse.ok) {
+            const errorText = await checkoutResponse.text();
+            throw new Error(`Error del servidor al crear pedido: ${errorText}`);
+        }
+
+        const checkoutDoc = new DOMParser().parseFromString(await checkoutResponse.text(), 'application/xml');
+        const pedidoId = checkoutDoc.querySelector('checkout > pedido_id').textContent;
+        alert(`Pedido creado con éxito. ID: ${pedidoId}.`);
+
+        const factura = checkoutDoc.querySelector('checkout > factura');
+        if (factura) {
+            await renderInvoice(new XMLSerializer().serializeToString(factura));
+        } else if (checkoutDoc.querySelector('checkout > factura_estado')) {
+            await waitForInvoice(pedidoId);
+        } else {
+            // El pedido quedó creado pero la factura falló; se reintenta directo
+            await handleGenerateInvoice(pedidoId);
+        }
+    }
+
     async function handleGenerateInvoice(pedidoId) {
         invoiceResult.innerHTML = '<p>Generando factura...</p>';
         try {
             const xmlData = `<factura><pedido_id>${pedidoId}</pedido_id></factura>`;
-            const facturaResponse = await fetch(`${apiConfig.facturas}/api/facturas`, {
+            const facturaResponse = await fetch(`${apiUrl('facturas')}/api/facturas`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/xml' },
                 body: xmlData
@@ -263,21 +317,42 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`Error del servidor al generar factura: ${errorText}`);
             }
 
-            const [xmlFactura, xslTemplate] = await Promise.all([
-                facturaResponse.text(),
-                fetch('/factura.xsl').then(res => res.text())
-            ]);
+            await renderInvoice(await facturaResponse.text());
+
+        } catch (error) {
+            console.error("Error al generar factura:", error);
+            invoiceResult.innerHTML = `<p style="color:red;">${error.message}</p>`;
+        }
+    }
 
-            const parser = new DOMParser();
-            const xmlDoc = parser.parseFromString(xmlFactura, 'application/xml');
-            const xslDoc = parser.parseFromString(xslTemplate, 'application/xml');
+    async function waitForInvoice(pedidoId) {
+        invoiceResult.innerHTML = '<p>Generando factura...</p>';
+        try {
+            // Consultar el estado hasta que el trabajador termine la factura
+            let estado = null;
+            for (let intento = 0; intento < 60; intento++) {
+                const estadoResponse = await fetch(`${apiUrl('facturas')}/api/facturas/pedido/${pedidoId}/estado`, {
+                    headers: { 'Accept': 'application/json' }
+                });
+                if (estadoResponse.ok) {
+                    estado = await estadoResponse.json();
+                    if (estado.estado === 'terminado' || estado.estado === 'fallido') {
+                        break;
+                    }
+                }
+                await new Promise(resolve => setTimeout(resolve, 500));
+            }
 
-            const xsltProcessor = new XSLTProcessor();
-            xsltProcessor.importStylesheet(xslDoc);
-            const resultFragment = xsltProcessor.transformToFragment(xmlDoc, document);
+            if (!estado || estado.estado !== 'terminado') {
+                throw new Error(`La factura no se pudo generar: ${estado?.error || 'tiempo de espera agotado'}`);
+            }
 
-            invoiceResult.innerHTML = '';
-            invoiceResult.appendChild(resultFragment);
+            const facturaResponse = await fetch(`${apiUrl('facturas')}/api/facturas/${estado.factura_id}`);
+            if (!facturaResponse.ok) {
+                const errorText = await facturaResponse.text();
+                throw new Error(`Error del servidor al obtener factura: ${errorText}`);
+            }
+            await renderInvoice(await facturaResponse.text());
 
         } catch (error) {
             console.error("Error al generar factura:", error);
@@ -285,6 +360,21 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    async function renderInvoice(xmlFactura) {
+        const xslTemplate = await fetch('/factura.xsl').then(res => res.text());
+
+        const parser = new DOMParser();
+        const xmlDoc = parser.parseFromString(xmlFactura, 'application/xml');
+        const xslDoc = parser.parseFromString(xslTemplate, 'application/xml');
+
+        const xsltProcessor = new XSLTProcessor();
+        xsltProcessor.importStylesheet(xslDoc);
+        const resultFragment = xsltProcessor.transformToFragment(xmlDoc, document);
+
+        invoiceResult.innerHTML = '';
+        invoiceResult.appendChild(resultFragment);
+    }
+
     function addEventListeners() {
         productsList.addEventListener('click', e => {
             if (e.target.classList.contains('add-to-cart-btn')) {
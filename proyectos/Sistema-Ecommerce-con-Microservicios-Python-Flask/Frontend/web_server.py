@@ -1,19 +1,32 @@
-from flask import Flask, send_from_directory
+from flask import Flask, abort, send_from_directory
 from flask_cors import CORS
 import os
+from estaticos import Estaticos
 
 app = Flask(__name__)
 CORS(app)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
+# Modo producción (ver estaticos.py): nombres con hash, gzip/brotli y caché
+# inmutable. Sin él se sirve el directorio tal cual, como en desarrollo
+FRONTEND_PRODUCCION = os.getenv('FRONTEND_PRODUCCION', '0') == '1'
+PORT = int(os.getenv('FRONTEND_PUERTO', '8080'))
+estaticos = None
+if FRONTEND_PRODUCCION:
+    estaticos = Estaticos(base_dir, os.getenv('FRONTEND_DIST', os.path.join(base_dir, 'dist')))
+
 @app.route('/')
 def serve_index():
+    if estaticos is not None:
+        return estaticos.respuesta('index.html')
     return send_from_directory(base_dir, 'index.html')
 
 @app.route('/<path:path>')
 def serve_static_files(path):
+    if estaticos is not None:
+        return estaticos.respuesta(path) or abort(404)
     return send_from_directory(base_dir, path)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, debug=not FRONTEND_PRODUCCION)
@@ -75,6 +75,30 @@ INSERT INTO `facturas` VALUES (1,1,'FAC-20250904-1','2025-09-04 16:23:31',2401.0
 /*!40000 ALTER TABLE `facturas` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `folios_secuencia`
+--
+
+DROP TABLE IF EXISTS `folios_secuencia`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8mb4 */;
+CREATE TABLE `folios_secuencia` (
+  `fecha` date NOT NULL,
+  `ultimo` int(11) NOT NULL,
+  PRIMARY KEY (`fecha`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `folios_secuencia`
+--
+
+LOCK TABLES `folios_secuencia` WRITE;
+/*!40000 ALTER TABLE `folios_secuencia` DISABLE KEYS */;
+INSERT INTO `folios_secuencia` VALUES ('2025-09-04',1);
+/*!40000 ALTER TABLE `folios_secuencia` ENABLE KEYS */;
+UNLOCK TABLES;
+
 --
 -- Table structure for table `pedidos`
 --
@@ -169,6 +193,86 @@ LOCK TABLES `products` WRITE;
 INSERT INTO `products` VALUES (1,'R001','Anillo de Compromiso Solitario','Clásico anillo de oro blanco con un diamante central.',1500.00,10,'Oro Blanco','Tiffany',18,'2025-09-04 16:22:36'),(2,'C002','Collar de Perlas','Elegante collar de perlas cultivadas de agua dulce.',450.50,25,'Perlas','Majorica',NULL,'2025-09-04 16:22:36'),(3,'A003','Aretes de Esmeralda','Aretes de plata con esmeraldas colombianas.',780.00,15,'Plata','Swarovski',NULL,'2025-09-04 16:22:36'),(4,'P004','Pulsera de Oro Amarillo','Pulsera de eslabones cubanos en oro amarillo de 14 kilates.',950.00,20,'Oro Amarillo','Cartier',14,'2025-09-04 16:22:36'),(5,'R005','Anillo de Zafiro y Diamantes','Anillo de oro blanco con zafiro central rodeado de diamantes.',2200.00,8,'Oro Blanco','Tiffany',18,'2025-09-04 16:22:36');
 /*!40000 ALTER TABLE `products` ENABLE KEYS */;
 UNLOCK TABLES;
+
+--
+-- Table structure for table `products_imagenes`
+--
+
+DROP TABLE IF EXISTS `products_imagenes`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8mb4 */;
+CREATE TABLE `products_imagenes` (
+  `producto_id` int(11) NOT NULL,
+  `hash` char(64) DEFAULT NULL,
+  `formato` varchar(10) DEFAULT NULL,
+  `formato_miniatura` varchar(10) DEFAULT NULL,
+  `ancho` int(11) DEFAULT NULL,
+  `alto` int(11) DEFAULT NULL,
+  `estado` varchar(20) NOT NULL,
+  `subida` varchar(100) DEFAULT NULL,
+  `error` varchar(255) DEFAULT NULL,
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`producto_id`),
+  KEY `hash` (`hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `ventas_diarias`
+--
+
+DROP TABLE IF EXISTS `ventas_diarias`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ventas_diarias` (
+  `fecha` date NOT NULL,
+  `producto_id` int(11) NOT NULL,
+  `material` varchar(50) NOT NULL DEFAULT '',
+  `marca` varchar(50) NOT NULL DEFAULT '',
+  `unidades` int(11) NOT NULL,
+  `importe` decimal(14,2) NOT NULL,
+  `pedidos` int(11) NOT NULL,
+  PRIMARY KEY (`fecha`,`producto_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `ventas_diarias`
+--
+
+LOCK TABLES `ventas_diarias` WRITE;
+/*!40000 ALTER TABLE `ventas_diarias` DISABLE KEYS */;
+INSERT INTO `ventas_diarias` VALUES ('2025-09-04',1,'Oro Blanco','Tiffany',1,1500.00,1),('2025-09-04',2,'Perlas','Majorica',2,901.00,1);
+/*!40000 ALTER TABLE `ventas_diarias` ENABLE KEYS */;
+UNLOCK TABLES;
+
+--
+-- Table structure for table `ventas_diarias_totales`
+--
+
+DROP TABLE IF EXISTS `ventas_diarias_totales`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!40101 SET character_set_client = utf8mb4 */;
+CREATE TABLE `ventas_diarias_totales` (
+  `fecha` date NOT NULL,
+  `particion` tinyint(4) NOT NULL,
+  `pedidos` int(11) NOT NULL,
+  `subtotal` decimal(14,2) NOT NULL,
+  `impuestos` decimal(14,2) NOT NULL,
+  `total` decimal(14,2) NOT NULL,
+  PRIMARY KEY (`fecha`,`particion`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `ventas_diarias_totales`
+--
+
+LOCK TABLES `ventas_diarias_totales` WRITE;
+/*!40000 ALTER TABLE `ventas_diarias_totales` DISABLE KEYS */;
+INSERT INTO `ventas_diarias_totales` VALUES ('2025-09-04',1,1,2401.00,384.16,2785.16);
+/*!40000 ALTER TABLE `ventas_diarias_totales` ENABLE KEYS */;
+UNLOCK TABLES;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
 
 /*!40101 SET SQL_MODE=@OLD_SQL_MODE */;
@@ -0,0 +1,300 @@
+"""
+Pool de conexiones a MariaDB compartido por products, pedidos y facturas.
+
+Reemplaza a flask_mysqldb, que abría una conexión nueva en cada solicitud, y
+conserva su interfaz: dentro de una solicitud `mysql.connection` regresa una
+conexión, que ahora se toma del pool la primera vez que se usa y se devuelve al
+terminar la solicitud.
+
+- El pool es por proceso; con gunicorn cada worker tiene el suyo (ver
+  microservicios/gunicorn.conf.py). Las conexiones se abren al primer uso, así
+  que crear el pool antes del fork no comparte sockets entre procesos.
+- Las conexiones trabajan en autocommit. Así una solicitud que sólo lee no deja
+  una transacción abierta (con una foto vieja de los datos) para la siguiente;
+  las escrituras de varias sentencias siguen usando START TRANSACTION/COMMIT.
+  Si una ruta atrapa un error a media transacción, la conexión se devuelve al
+  pool con ROLLBACK; si está rota o el error no se manejó, se descarta.
+- Cada sesión lleva max_statement_time: MariaDB cancela la sentencia que tarde
+  más de MYSQL_TIEMPO_SENTENCIA segundos en lugar de dejar el hilo colgado.
+- Sentencia prepara los SELECT fijos una vez por conexión (PREPARE) y después
+  sólo los ejecuta (EXECUTE ... USING). mysqlclient no tiene sentencias
+  preparadas del protocolo binario; las de SQL de MariaDB evitan que el
+  servidor vuelva a analizar la consulta en cada solicitud.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g
+
+from comun.escritor_xml import Plantilla
+
+# Errores que indican que la conexión ya no sirve y debe descartarse
+ER_SERVIDOR_NO_DISPONIBLE = 2006
+ER_CONEXION_PERDIDA = 2013
+ER_SERVIDOR_PERDIDO = 2055
+ERRORES_CONEXION = (ER_SERVIDOR_NO_DISPONIBLE, ER_CONEXION_PERDIDA, ER_SERVIDOR_PERDIDO)
+
+# MariaDB cancela la sentencia por max_statement_time
+ER_TIEMPO_SENTENCIA = 1969
+
+# XML de estadisticas() para los endpoints de diagnóstico de cada servicio
+PLANTILLA_POOL = Plantilla('pool_mysql', [
+    'proceso', 'tamano', 'abiertas', 'en_uso', 'libres', 'prestamos', 'esperas',
+    'espera_promedio_ms', 'espera_max_ms', 'agotado', 'creadas', 'descartadas',
+    'preparaciones', 'sentencias_canceladas', 'transacciones_deshechas'
+])
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera del pool."""
+
+
+class _CursorPool(MySQLdb.cursors.DictCursor):
+    """
+    DictCursor que marca la conexión como rota si el servidor se perdió y
+    lleva la cuenta de si quedó una transacción abierta
+    """
+
+    def execute(self, query, args=None):
+        inicio = query.lstrip()[:17].upper() if isinstance(query, str) else ''
+        if inicio.startswith(('START TRANSACTION', 'BEGIN')):
+            self.connection._en_transaccion = True
+        elif inicio.startswith(('COMMIT', 'ROLLBACK')) and not inicio.startswith('ROLLBACK TO'):
+            self.connection._en_transaccion = False
+        try:
+            return super().execute(query, args)
+        except MySQLdb.MySQLError as e:
+            codigo = e.args[0] if e.args else None
+            if codigo in ERRORES_CONEXION:
+                self.connection._rota = True
+            elif codigo == ER_TIEMPO_SENTENCIA:
+                self.connection._pool._sumar('sentencias_canceladas')
+            raise
+
+
+class Sentencia:
+    """
+    SELECT fijo que se prepara en el servidor la primera vez que se usa en cada
+    conexión del pool. Los parámetros se escriben con %s, como en cur.execute.
+    """
+
+    def __init__(self, nombre, sql):
+        self.nombre = nombre
+        self.sql = sql
+        parametros = sql.count('%s')
+        self._texto = sql.replace('%s', '?')
+        self._ejecutar = f"EXECUTE {nombre}"
+        if parametros:
+            self._ejecutar += " USING " + ", ".join(['%s'] * parametros)
+
+    def ejecutar(self, cur, args=()):
+        conexion = cur.connection
+        preparadas = getattr(conexion, '_preparadas', None)
+        if preparadas is None:
+            # Conexión fuera del pool o MYSQL_PREPARADAS=0: SQL normal
+            return cur.execute(self.sql, args or None)
+        if self.nombre not in preparadas:
+            cur.execute(f"PREPARE {self.nombre} FROM %s", (self._texto,))
+            preparadas.add(self.nombre)
+            conexion._pool._sumar('preparaciones')
+        return cur.execute(self._ejecutar, args or None)
+
+
+class PoolMySQL:
+    """
+    Pool de conexiones con la misma interfaz que flask_mysqldb.MySQL.
+
+    Lee de app.config MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD y
+    MYSQL_DB, y además:
+
+    - MYSQL_POOL_TAMANO: conexiones máximas del proceso (usar al menos los
+      hilos del worker).
+    - MYSQL_POOL_ESPERA: segundos que una solicitud espera una conexión libre
+      antes de PoolAgotado.
+    - MYSQL_TIEMPO_SENTENCIA: segundos máximos por sentencia (0 = sin límite).
+    - MYSQL_PREPARADAS: False para ejecutar las Sentencia como SQL normal.
+    """
+
+    # Una conexión que estuvo libre más de esto se verifica con ping() antes
+    # de prestarla, por si el servidor la cerró (wait_timeout)
+    VERIFICAR_DESPUES = 30
+
+    def __init__(self, app=None):
+        self._condicion = threading.Condition()
+        self._libres = deque()  # (conexion, libre_desde)
+        self._abiertas = 0
+        self._estadisticas = {
+            'prestamos': 0, 'esperas': 0, 'espera_total': 0.0, 'espera_max': 0.0, 'agotado': 0,
+            'creadas': 0, 'descartadas': 0, 'preparaciones': 0, 'sentencias_canceladas': 0,
+            'transacciones_deshechas': 0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self._parametros = {
+            'host': config.get('MYSQL_HOST', 'localhost'),
+            'port': int(config.get('MYSQL_PORT', 3306)),
+            'user': config.get('MYSQL_USER'),
+            'passwd': config.get('MYSQL_PASSWORD', ''),
+            'db': config.get('MYSQL_DB'),
+            'charset': config.get('MYSQL_CHARSET', 'utf8mb4'),
+            'cursorclass': _CursorPool,
+            'connect_timeout': 10,
+        }
+        self.tamano = int(config.get('MYSQL_POOL_TAMANO', 8))
+        self.espera = float(config.get('MYSQL_POOL_ESPERA', 5))
+        self.preparadas = bool(config.get('MYSQL_PREPARADAS', True))
+
+        tiempo_sentencia = float(config.get('MYSQL_TIEMPO_SENTENCIA', 10))
+        if tiempo_sentencia > 0:
+            self._parametros['init_command'] = f"SET SESSION max_statement_time = {tiempo_sentencia}"
+            # Respaldo del lado del cliente por si el servidor deja de responder
+            self._parametros['read_timeout'] = int(tiempo_sentencia) + 5
+
+        app.teardown_appcontext(self._teardown)
+
+    @property
+    def connection(self):
+        """Conexión de la solicitud actual; se toma del pool al primer uso"""
+        conexion = g.get('_conexion_mysql')
+        if conexion is None:
+            conexion = g._conexion_mysql = self.tomar()
+        return conexion
+
+    def conectar(self):
+        """
+        Abre una conexión propia, fuera del pool, con la misma configuración.
+        Es para hilos de fondo y reservas que no deben ocupar un lugar del pool;
+        quien la abre debe cerrarla.
+        """
+        return self._crear()
+
+    def tomar(self):
+        inicio = time.monotonic()
+        espero = False
+        with self._condicion:
+            while True:
+                if self._libres:
+                    conexion, libre_desde = self._libres.pop()
+                    break
+                if self._abiertas < self.tamano:
+                    self._abiertas += 1
+                    conexion = libre_desde = None
+                    break
+                restante = self.espera - (time.monotonic() - inicio)
+                if restante <= 0:
+                    self._estadisticas['agotado'] += 1
+                    raise PoolAgotado(
+                        f"No hay conexiones libres en el pool ({self.tamano}) después de {self.espera} s"
+                    )
+                espero = True
+                self._condicion.wait(restante)
+
+            self._estadisticas['prestamos'] += 1
+            if espero:
+                esperado = time.monotonic() - inicio
+                self._estadisticas['esperas'] += 1
+                self._estadisticas['espera_total'] += esperado
+                self._estadisticas['espera_max'] = max(self._estadisticas['espera_max'], esperado)
+
+        if conexion is not None and time.monotonic() - libre_desde > self.VERIFICAR_DESPUES:
+            try:
+                conexion.ping()
+            except MySQLdb.MySQLError:
+                # Se reemplaza por una nueva sin soltar su lugar en el pool
+                self._cerrar(conexion)
+                conexion = None
+                self._sumar('descartadas')
+
+        if conexion is None:
+            try:
+                conexion = self._crear()
+            except Exception:
+                with self._condicion:
+                    self._abiertas -= 1
+                    self._condicion.notify()
+                raise
+            if self.preparadas:
+                conexion._preparadas = set()
+        return conexion
+
+    def devolver(self, conexion, descartar=False):
+        if descartar or conexion._rota:
+            self._cerrar(conexion)
+            with self._condicion:
+                self._abiertas -= 1
+                self._estadisticas['descartadas'] += 1
+                self._condicion.notify()
+            return
+        with self._condicion:
+            self._libres.append((conexion, time.monotonic()))
+            self._condicion.notify()
+
+    def cerrar(self):
+        """Cierra las conexiones libres (al detener el proceso)"""
+        with self._condicion:
+            libres = list(self._libres)
+            self._libres.clear()
+            self._abiertas -= len(libres)
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    def estadisticas(self):
+        with self._condicion:
+            datos = dict(self._estadisticas)
+            datos['abiertas'] = self._abiertas
+            datos['libres'] = len(self._libres)
+        esperas = datos['esperas']
+        datos.update({
+            'proceso': os.getpid(),
+            'tamano': self.tamano,
+            'en_uso': datos['abiertas'] - datos['libres'],
+            'espera_promedio_ms': round(datos.pop('espera_total') / esperas * 1000, 2) if esperas else 0,
+            'espera_max_ms': round(datos.pop('espera_max') * 1000, 2),
+        })
+        return datos
+
+    def _crear(self):
+        conexion = MySQLdb.connect(**self._parametros)
+        conexion.autocommit(True)
+        conexion._rota = False
+        conexion._en_transaccion = False
+        conexion._pool = self
+        with self._condicion:
+            self._estadisticas['creadas'] += 1
+        return conexion
+
+    def _cerrar(self, conexion):
+        try:
+            conexion.close()
+        except MySQLdb.MySQLError:
+            pass
+
+    def _sumar(self, contador):
+        with self._condicion:
+            self._estadisticas[contador] += 1
+
+    def _teardown(self, exception):
+        conexion = g.pop('_conexion_mysql', None)
+        if conexion is None:
+            return
+        # Las rutas atrapan sus errores y responden 500, así que exception casi
+        # siempre es None: lo que decide es el estado de la conexión. Si quedó
+        # una transacción abierta (un error entre START TRANSACTION y COMMIT)
+        # se deshace antes de devolverla; si eso también falla, se descarta
+        descartar = exception is not None or conexion._rota
+        if not descartar and conexion._en_transaccion:
+            try:
+                conexion.rollback()
+                conexion._en_transaccion = False
+                self._sumar('transacciones_deshechas')
+            except MySQLdb.MySQLError:
+                descartar = True
+        self.devolver(conexion, descartar=descartar)
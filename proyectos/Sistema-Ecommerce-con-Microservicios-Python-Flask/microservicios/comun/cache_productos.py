@@ -0,0 +1,168 @@
+"""
+Caché de lectura de productos compartida por pedidos y facturas.
+
+Guarda sólo los datos que cambian poco (código, nombre, precio, material y
+marca); el stock nunca se cachea y se sigue leyendo y descontando dentro de la
+transacción del pedido. Hay dos niveles:
+
+1. LRU en memoria de cada proceso, con vencimiento (ttl).
+2. Redis opcional (REDIS_URL), compartido por todos los procesos y servicios.
+
+Las lecturas que no están en ningún nivel se resuelven con una sola consulta
+para todos los ids faltantes (read-through). products_service llama a
+invalidar() en sus rutas de escritura: borra la llave de Redis y publica el id
+para que los demás procesos lo saquen de su LRU. Sin Redis la invalidación sólo
+alcanza al proceso que la hace y el ttl acota cuánto puede durar un precio
+viejo en los demás.
+"""
+
+import decimal
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from comun.escritor_xml import Plantilla
+
+try:
+    import redis
+except ImportError:  # redis es opcional
+    redis = None
+
+CAMPOS = ('id', 'codigo', 'nombre', 'precio', 'material', 'marca')
+
+SQL_CARGAR = "SELECT id, codigo, nombre, precio, material, marca FROM products WHERE id IN ({})"
+
+CANAL_INVALIDACION = 'productos:invalidar'
+
+# XML de estadisticas() para los endpoints de diagnóstico de cada servicio
+PLANTILLA_ESTADISTICAS = Plantilla('cache_productos', [
+    'memoria', 'redis', 'base_datos', 'invalidaciones', 'en_memoria', 'tasa_aciertos'
+])
+
+
+def _llave(producto_id):
+    return f'producto:{producto_id}'
+
+
+class CacheProductos:
+    """LRU en memoria con vencimiento, respaldado opcionalmente por Redis."""
+
+    def __init__(self, ttl=30, capacidad=5000, redis_url=None):
+        self.ttl = ttl
+        self.capacidad = capacidad
+        self._memoria = OrderedDict()  # id -> (vence, producto)
+        self._lock = threading.Lock()
+        self._estadisticas = {'memoria': 0, 'redis': 0, 'base_datos': 0, 'invalidaciones': 0}
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                raise RuntimeError("El paquete redis no está instalado (pip install redis)")
+            self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            threading.Thread(target=self._escuchar_invalidaciones, name='cache-productos', daemon=True).start()
+
+    def obtener_varios(self, cur, ids):
+        """
+        Regresa {id: producto} para los ids que existen; los que no existen no
+        aparecen en el resultado. cur se usa sólo si hay que ir a la base de datos.
+        """
+        encontrados = {}
+        faltantes = []
+        ahora = time.monotonic()
+        with self._lock:
+            for producto_id in set(ids):
+                entrada = self._memoria.get(producto_id)
+                if entrada is not None and entrada[0] > ahora:
+                    self._memoria.move_to_end(producto_id)
+                    encontrados[producto_id] = entrada[1]
+                else:
+                    faltantes.append(producto_id)
+            self._estadisticas['memoria'] += len(encontrados)
+
+        if faltantes and self._redis is not None:
+            try:
+                valores = self._redis.mget([_llave(pid) for pid in faltantes])
+            except redis.RedisError:
+                # Si Redis no responde se sigue con la base de datos
+                valores = [None] * len(faltantes)
+            desde_redis = {}
+            for producto_id, valor in zip(faltantes, valores):
+                if valor is not None:
+                    producto = json.loads(valor)
+                    producto['precio'] = decimal.Decimal(producto['precio'])
+                    desde_redis[producto_id] = producto
+            self._recordar(desde_redis)
+            encontrados.update(desde_redis)
+            faltantes = [pid for pid in faltantes if pid not in desde_redis]
+            with self._lock:
+                self._estadisticas['redis'] += len(desde_redis)
+
+        if faltantes:
+            cur.execute(SQL_CARGAR.format(', '.join(['%s'] * len(faltantes))), faltantes)
+            desde_base = {fila['id']: {campo: fila[campo] for campo in CAMPOS} for fila in cur.fetchall()}
+            self._recordar(desde_base)
+            self._publicar(desde_base)
+            encontrados.update(desde_base)
+            with self._lock:
+                self._estadisticas['base_datos'] += len(faltantes)
+
+        return encontrados
+
+    def invalidar(self, producto_id):
+        """Saca el producto de la caché local, de Redis y de los demás procesos"""
+        self._olvidar(producto_id)
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.delete(_llave(producto_id))
+                pipe.publish(CANAL_INVALIDACION, producto_id)
+                pipe.execute()
+            except redis.RedisError:
+                traceback.print_exc()
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._estadisticas)
+            datos['en_memoria'] = len(self._memoria)
+        lecturas = datos['memoria'] + datos['redis'] + datos['base_datos']
+        datos['tasa_aciertos'] = round((datos['memoria'] + datos['redis']) / lecturas, 4) if lecturas else None
+        return datos
+
+    def _recordar(self, productos):
+        if not productos:
+            return
+        vence = time.monotonic() + self.ttl
+        with self._lock:
+            for producto_id, producto in productos.items():
+                self._memoria[producto_id] = (vence, producto)
+                self._memoria.move_to_end(producto_id)
+            while len(self._memoria) > self.capacidad:
+                self._memoria.popitem(last=False)
+
+    def _olvidar(self, producto_id):
+        with self._lock:
+            if self._memoria.pop(producto_id, None) is not None:
+                self._estadisticas['invalidaciones'] += 1
+
+    def _publicar(self, productos):
+        if self._redis is None or not productos:
+            return
+        try:
+            pipe = self._redis.pipeline()
+            for producto_id, producto in productos.items():
+                pipe.setex(_llave(producto_id), self.ttl, json.dumps(producto, default=str))
+            pipe.execute()
+        except redis.RedisError:
+            traceback.print_exc()
+
+    def _escuchar_invalidaciones(self):
+        while True:
+            try:
+                suscripcion = self._redis.pubsub(ignore_subscribe_messages=True)
+                suscripcion.subscribe(CANAL_INVALIDACION)
+                for mensaje in suscripcion.listen():
+                    self._olvidar(int(mensaje['data']))
+            except redis.RedisError:
+                # Reconectar; mientras tanto el ttl acota los datos viejos
+                time.sleep(1)
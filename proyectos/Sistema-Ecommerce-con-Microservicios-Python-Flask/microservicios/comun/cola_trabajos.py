@@ -0,0 +1,287 @@
+"""
+Cola de trabajos compartida entre servicios.
+
+La usa pedidos_service para pedir facturas sin esperar a que se generen, y
+facturas_service para procesarlas en segundo plano. Cada trabajo se identifica
+por una clave (el id del pedido), así que encolar dos veces el mismo pedido no
+genera trabajo duplicado y su estado se puede consultar con esa misma clave.
+
+Hay dos implementaciones con la misma interfaz:
+- ColaSQLite: un archivo SQLite en un volumen compartido por los contenedores.
+  No necesita servicios adicionales.
+- ColaRedis: una lista de Redis para los pendientes y un hash por trabajo con
+  su estado. Requiere el paquete redis.
+
+abrir_cola() elige una u otra según la URL (redis://... o sqlite:///ruta).
+
+Un trabajo que se reintenta (fallar(reintentar=True, espera=...)) no se puede
+tomar hasta que pasen `espera` segundos, para que un error transitorio no
+consuma todos los intentos en unos milisegundos.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # redis es opcional
+    redis = None
+
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+TERMINADO = 'terminado'
+FALLIDO = 'fallido'
+
+SQL_CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS trabajos (
+        cola TEXT NOT NULL,
+        clave TEXT NOT NULL,
+        datos TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        intentos INTEGER NOT NULL DEFAULT 0,
+        encolado REAL NOT NULL,
+        disponible_en REAL,
+        tomado REAL,
+        terminado REAL,
+        resultado TEXT,
+        error TEXT,
+        PRIMARY KEY (cola, clave)
+    )
+"""
+
+SQL_CREAR_INDICE = """
+    CREATE INDEX IF NOT EXISTS idx_trabajos_pendientes ON trabajos (cola, estado, encolado)
+"""
+
+
+class ColaSQLite:
+    """Cola respaldada por una tabla SQLite; segura entre hilos y procesos."""
+
+    def __init__(self, ruta, nombre):
+        self.ruta = ruta
+        self.nombre = nombre
+        self._local = threading.local()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conexion()
+        conexion.execute(SQL_CREAR_TABLA)
+        conexion.execute(SQL_CREAR_INDICE)
+        # Colas creadas antes de que existieran los reintentos diferidos
+        columnas = [fila['name'] for fila in conexion.execute("PRAGMA table_info(trabajos)")]
+        if 'disponible_en' not in columnas:
+            conexion.execute("ALTER TABLE trabajos ADD COLUMN disponible_en REAL")
+
+    def _conexion(self):
+        # Una conexión por hilo; WAL permite leer el estado mientras otro
+        # proceso escribe
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def encolar(self, clave, datos):
+        """Agrega el trabajo si la clave no existe; regresa True si se encoló"""
+        cur = self._conexion().execute(
+            "INSERT OR IGNORE INTO trabajos (cola, clave, datos, estado, encolado) VALUES (?, ?, ?, ?, ?)",
+            (self.nombre, str(clave), json.dumps(datos), PENDIENTE, time.time())
+        )
+        return cur.rowcount == 1
+
+    def tomar(self, maximo, espera=1.0):
+        """
+        Marca como 'procesando' hasta `maximo` trabajos pendientes y los regresa
+        como lista de (clave, datos). Espera hasta `espera` segundos si no hay.
+        """
+        limite = time.monotonic() + espera
+        conexion = self._conexion()
+        while True:
+            # BEGIN IMMEDIATE toma el candado de escritura antes de leer, así
+            # dos trabajadores no se llevan el mismo trabajo
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                ahora = time.time()
+                filas = conexion.execute(
+                    "SELECT clave, datos FROM trabajos WHERE cola = ? AND estado = ? "
+                    "AND (disponible_en IS NULL OR disponible_en <= ?) ORDER BY encolado LIMIT ?",
+                    (self.nombre, PENDIENTE, ahora, maximo)
+                ).fetchall()
+                if filas:
+                    conexion.executemany(
+                        "UPDATE trabajos SET estado = ?, tomado = ?, intentos = intentos + 1 WHERE cola = ? AND clave = ?",
+                        [(PROCESANDO, ahora, self.nombre, fila['clave']) for fila in filas]
+                    )
+                conexion.execute("COMMIT")
+            except Exception:
+                conexion.execute("ROLLBACK")
+                raise
+            if filas or time.monotonic() >= limite:
+                return [(fila['clave'], json.loads(fila['datos'])) for fila in filas]
+            time.sleep(0.05)
+
+    def completar(self, clave, resultado):
+        self._conexion().execute(
+            "UPDATE trabajos SET estado = ?, terminado = ?, resultado = ?, error = NULL WHERE cola = ? AND clave = ?",
+            (TERMINADO, time.time(), json.dumps(resultado), self.nombre, str(clave))
+        )
+
+    def fallar(self, clave, error, reintentar=False, espera=0):
+        """
+        Registra el error; con reintentar=True el trabajo vuelve a quedar
+        pendiente y no se puede tomar hasta dentro de `espera` segundos.
+        """
+        ahora = time.time()
+        if reintentar:
+            self._conexion().execute(
+                "UPDATE trabajos SET estado = ?, disponible_en = ?, error = ? WHERE cola = ? AND clave = ?",
+                (PENDIENTE, ahora + espera, str(error), self.nombre, str(clave))
+            )
+        else:
+            self._conexion().execute(
+                "UPDATE trabajos SET estado = ?, terminado = ?, error = ? WHERE cola = ? AND clave = ?",
+                (FALLIDO, ahora, str(error), self.nombre, str(clave))
+            )
+
+    def recuperar(self, antiguedad):
+        """Regresa a pendientes los trabajos que llevan más de `antiguedad` segundos en proceso"""
+        cur = self._conexion().execute(
+            "UPDATE trabajos SET estado = ? WHERE cola = ? AND estado = ? AND tomado < ?",
+            (PENDIENTE, self.nombre, PROCESANDO, time.time() - antiguedad)
+        )
+        return cur.rowcount
+
+    def estado(self, clave):
+        """Estado del trabajo como diccionario, o None si la clave no existe"""
+        fila = self._conexion().execute(
+            "SELECT estado, intentos, encolado, tomado, terminado, resultado, error FROM trabajos WHERE cola = ? AND clave = ?",
+            (self.nombre, str(clave))
+        ).fetchone()
+        if fila is None:
+            return None
+        trabajo = dict(fila)
+        trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+        return trabajo
+
+    def pendientes(self):
+        return self._conexion().execute(
+            "SELECT COUNT(*) FROM trabajos WHERE cola = ? AND estado = ?", (self.nombre, PENDIENTE)
+        ).fetchone()[0]
+
+
+class ColaRedis:
+    """Cola respaldada por una lista de Redis y un hash por trabajo."""
+
+    def __init__(self, url, nombre):
+        if redis is None:
+            raise RuntimeError("El paquete redis no está instalado (pip install redis)")
+        self.cliente = redis.Redis.from_url(url, decode_responses=True)
+        self.nombre = nombre
+        self._lista = f"cola:{nombre}:pendientes"
+        # Reintentos en espera: conjunto ordenado por el momento en que vuelven a la lista
+        self._diferidos = f"cola:{nombre}:diferidos"
+
+    def _hash(self, clave):
+        return f"cola:{self.nombre}:{clave}"
+
+    def encolar(self, clave, datos):
+        # HSETNX hace de candado: sólo el primero que registra la clave la encola
+        if not self.cliente.hsetnx(self._hash(clave), 'estado', PENDIENTE):
+            return False
+        pipe = self.cliente.pipeline()
+        pipe.hset(self._hash(clave), mapping={'datos': json.dumps(datos), 'intentos': 0, 'encolado': time.time()})
+        pipe.rpush(self._lista, clave)
+        pipe.execute()
+        return True
+
+    def _mover_diferidos(self):
+        """Pasa a la lista de pendientes los reintentos cuya espera ya terminó"""
+        for clave in self.cliente.zrangebyscore(self._diferidos, 0, time.time()):
+            # ZREM hace de candado: sólo quien lo quita del conjunto lo encola
+            if self.cliente.zrem(self._diferidos, clave):
+                self.cliente.rpush(self._lista, clave)
+
+    def tomar(self, maximo, espera=1.0):
+        self._mover_diferidos()
+        primero = self.cliente.blpop(self._lista, timeout=max(1, int(round(espera))))
+        if primero is None:
+            return []
+        claves = [primero[1]]
+        while len(claves) < maximo:
+            clave = self.cliente.lpop(self._lista)
+            if clave is None:
+                break
+            claves.append(clave)
+
+        ahora = time.time()
+        pipe = self.cliente.pipeline()
+        for clave in claves:
+            pipe.hset(self._hash(clave), mapping={'estado': PROCESANDO, 'tomado': ahora})
+            pipe.hincrby(self._hash(clave), 'intentos', 1)
+            pipe.hget(self._hash(clave), 'datos')
+        respuestas = pipe.execute()
+        return [(clave, json.loads(respuestas[i * 3 + 2])) for i, clave in enumerate(claves)]
+
+    def completar(self, clave, resultado):
+        self.cliente.hset(self._hash(clave), mapping={
+            'estado': TERMINADO, 'terminado': time.time(), 'resultado': json.dumps(resultado), 'error': ''
+        })
+
+    def fallar(self, clave, error, reintentar=False, espera=0):
+        if reintentar:
+            pipe = self.cliente.pipeline()
+            pipe.hset(self._hash(clave), mapping={'estado': PENDIENTE, 'error': str(error)})
+            if espera > 0:
+                pipe.zadd(self._diferidos, {clave: time.time() + espera})
+            else:
+                pipe.rpush(self._lista, clave)
+            pipe.execute()
+        else:
+            self.cliente.hset(self._hash(clave), mapping={
+                'estado': FALLIDO, 'terminado': time.time(), 'error': str(error)
+            })
+
+    def recuperar(self, antiguedad):
+        # Los trabajos en proceso no quedan en ninguna lista; se buscan por sus hashes
+        limite = time.time() - antiguedad
+        recuperados = 0
+        for llave in self.cliente.scan_iter(f"cola:{self.nombre}:*"):
+            if llave in (self._lista, self._diferidos):
+                continue
+            trabajo = self.cliente.hmget(llave, 'estado', 'tomado')
+            if trabajo[0] == PROCESANDO and float(trabajo[1] or 0) < limite:
+                self.fallar(llave.rsplit(':', 1)[1], 'Trabajo recuperado', reintentar=True)
+                recuperados += 1
+        return recuperados
+
+    def estado(self, clave):
+        trabajo = self.cliente.hgetall(self._hash(clave))
+        if not trabajo:
+            return None
+        return {
+            'estado': trabajo['estado'],
+            'intentos': int(trabajo.get('intentos') or 0),
+            'encolado': float(trabajo['encolado']) if trabajo.get('encolado') else None,
+            'tomado': float(trabajo['tomado']) if trabajo.get('tomado') else None,
+            'terminado': float(trabajo['terminado']) if trabajo.get('terminado') else None,
+            'resultado': json.loads(trabajo['resultado']) if trabajo.get('resultado') else None,
+            'error': trabajo.get('error') or None,
+        }
+
+    def pendientes(self):
+        return self.cliente.llen(self._lista) + self.cliente.zcard(self._diferidos)
+
+
+def abrir_cola(url, nombre):
+    """Abre la cola indicada por la URL: redis://host:puerto/db o sqlite:///ruta/archivo.db"""
+    if url.startswith(('redis://', 'rediss://')):
+        return ColaRedis(url, nombre)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return ColaSQLite(url, nombre)
@@ -0,0 +1,125 @@
+"""
+Escritor de XML compartido por los microservicios.
+
+Reemplaza a ElementTree y a la concatenación con += en las respuestas. Los
+valores siempre se escapan, y cada tipo de registro (producto, renglón de
+factura, etc.) se describe con una Plantilla cuyo formato se arma una sola vez
+al importar el servicio. Los fragmentos se acumulan en una lista y se unen al
+final, o se entregan poco a poco con generar_documento() para respuestas
+grandes.
+"""
+
+import datetime
+import decimal
+
+DECLARACION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+# Tipos cuyo texto nunca contiene caracteres especiales de XML
+_TIPOS_NUMERICOS = (int, float, decimal.Decimal)
+
+
+def value_to_str(value):
+    """Convierte un valor de la base de datos a texto para XML"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if value is None:
+        return ''
+    return str(value)
+
+
+def escapar(value):
+    """Convierte el valor a texto y escapa los caracteres especiales de XML"""
+    tipo = type(value)
+    if tipo is not str:
+        if tipo in _TIPOS_NUMERICOS:
+            return str(value)
+        value = value_to_str(value)
+    # Revisar antes de reemplazar es más rápido que str.translate porque la
+    # mayoría de los valores no traen caracteres especiales
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '<' in value:
+        value = value.replace('<', '&lt;')
+    if '>' in value:
+        value = value.replace('>', '&gt;')
+    return value
+
+
+class Plantilla:
+    """
+    Elemento con hijos fijos, p. ej. <product><id>..</id><nombre>..</nombre></product>.
+
+    El formato se precompila en el constructor; render() sólo escapa los
+    valores y llama a str.format una vez por registro.
+    """
+
+    def __init__(self, etiqueta, campos):
+        self.etiqueta = etiqueta
+        self.campos = tuple(campos)
+        hijos = ''.join(f'<{campo}>{{}}</{campo}>' for campo in self.campos)
+        self._formato = f'<{etiqueta}>{hijos}</{etiqueta}>' if etiqueta else hijos
+
+    def render(self, registro):
+        """Genera el XML de un registro (diccionario o secuencia en el orden de campos)"""
+        if isinstance(registro, dict):
+            valores = map(registro.get, self.campos)
+        else:
+            valores = registro
+        return self._formato.format(*map(escapar, valores))
+
+
+class EscritorXML:
+    """Construye un documento XML agregando fragmentos a una lista."""
+
+    def __init__(self, declaracion=True):
+        self._partes = [DECLARACION] if declaracion else []
+
+    def abrir(self, etiqueta):
+        self._partes.append(f'<{etiqueta}>')
+        return self
+
+    def cerrar(self, etiqueta):
+        self._partes.append(f'</{etiqueta}>')
+        return self
+
+    def elemento(self, etiqueta, valor):
+        self._partes.append(f'<{etiqueta}>{escapar(valor)}</{etiqueta}>')
+        return self
+
+    def registro(self, plantilla, registro):
+        self._partes.append(plantilla.render(registro))
+        return self
+
+    def registros(self, plantilla, registros):
+        render = plantilla.render
+        self._partes.extend(render(r) for r in registros)
+        return self
+
+    def valor(self):
+        """Regresa el documento completo como texto"""
+        return ''.join(self._partes)
+
+
+def documento(raiz, plantilla, registros):
+    """Documento <raiz> con un elemento por registro, como texto"""
+    return EscritorXML().abrir(raiz).registros(plantilla, registros).cerrar(raiz).valor()
+
+
+def generar_documento(raiz, plantilla, registros, registros_por_fragmento=200):
+    """
+    Igual que documento(), pero entrega el XML por fragmentos para que Flask
+    pueda enviarlo sin armar primero todo el texto en memoria.
+    """
+    yield f'{DECLARACION}<{raiz}>'
+    render = plantilla.render
+    lote = []
+    for registro in registros:
+        lote.append(render(registro))
+        if len(lote) >= registros_por_fragmento:
+            yield ''.join(lote)
+            lote = []
+    if lote:
+        yield ''.join(lote)
+    yield f'</{raiz}>'
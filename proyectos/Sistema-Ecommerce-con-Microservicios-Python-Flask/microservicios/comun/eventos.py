@@ -0,0 +1,328 @@
+"""
+Eventos entre servicios con outbox transaccional.
+
+Un servicio que cambia sus datos escribe también el evento en su tabla de
+salida (<servicio>_eventos_salida) dentro de la misma transacción, con
+registrar_evento(). Así el evento existe si y sólo si el cambio se confirmó.
+
+El relay (microservicios/relay/relay_eventos.py) lee las tablas de salida en
+orden, publica los eventos en el broker y borra los que ya publicó. Cada
+servicio corre un Consumidor que lee del broker los temas que le interesan y
+actualiza con ellos sus propias tablas (modelos de lectura).
+
+BrokerSQLite es un sustituto local de un broker como Kafka: un registro de
+eventos en un archivo SQLite (en el mismo volumen que la cola de facturas) y
+una posición por grupo de consumidores. Cada grupo tiene un solo consumidor
+activo a la vez (con arrendamiento), así que los eventos de un grupo se
+procesan en orden aunque el servicio corra con varios workers.
+
+La entrega es "al menos una vez": si un consumidor se cae después de confirmar
+su transacción pero antes de avanzar su posición, verá los eventos de nuevo.
+Los manejadores deben ser idempotentes.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+from comun.escritor_xml import Plantilla
+
+# Tabla de salida de un servicio; se crea con SQL_CREAR_SALIDA.format(tabla)
+SQL_CREAR_SALIDA = """
+    CREATE TABLE IF NOT EXISTS {} (
+        id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        tema VARCHAR(50) NOT NULL,
+        clave VARCHAR(50) NOT NULL,
+        datos TEXT NOT NULL,
+        creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+SQL_CREAR_EVENTOS = """
+    CREATE TABLE IF NOT EXISTS eventos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tema TEXT NOT NULL,
+        clave TEXT NOT NULL,
+        datos TEXT NOT NULL,
+        origen TEXT NOT NULL,
+        publicado REAL NOT NULL
+    )
+"""
+
+SQL_CREAR_GRUPOS = """
+    CREATE TABLE IF NOT EXISTS grupos (
+        grupo TEXT PRIMARY KEY,
+        posicion INTEGER NOT NULL DEFAULT 0,
+        dueno TEXT,
+        vence REAL NOT NULL DEFAULT 0,
+        procesados INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+# XML de las estadísticas de eventos de cada servicio
+PLANTILLA_EVENTOS = Plantilla('eventos', ['activo', 'salida_pendiente', 'grupo', 'posicion', 'procesados', 'retraso'])
+
+
+def _json(valor):
+    return str(valor)
+
+
+def registrar_evento(cur, tabla, tema, clave, datos):
+    """Escribe el evento en la tabla de salida; debe llamarse dentro de la transacción del cambio"""
+    cur.execute(
+        f"INSERT INTO {tabla} (tema, clave, datos) VALUES (%s, %s, %s)",
+        (tema, str(clave), json.dumps(datos, default=_json))
+    )
+
+
+def asegurar_salida(conectar, tabla):
+    conexion = conectar()
+    try:
+        cur = conexion.cursor()
+        cur.execute(SQL_CREAR_SALIDA.format(tabla))
+        cur.close()
+    finally:
+        conexion.close()
+
+
+def salida_pendiente(cur, tabla):
+    """Eventos que el relay aún no publica"""
+    cur.execute(f"SELECT COUNT(*) AS pendientes FROM {tabla}")
+    return cur.fetchone()['pendientes']
+
+
+class BrokerSQLite:
+    """Registro de eventos con posiciones por grupo en un archivo SQLite."""
+
+    # Segundos que un consumidor conserva su grupo sin renovarlo
+    ARRENDAMIENTO = 15
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conexion()
+        conexion.execute(SQL_CREAR_EVENTOS)
+        conexion.execute(SQL_CREAR_GRUPOS)
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def publicar(self, eventos, origen):
+        """Agrega [(tema, clave, datos_json)] al registro en una sola transacción"""
+        ahora = time.time()
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            conexion.executemany(
+                "INSERT INTO eventos (tema, clave, datos, origen, publicado) VALUES (?, ?, ?, ?, ?)",
+                [(tema, clave, datos, origen, ahora) for tema, clave, datos in eventos]
+            )
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+
+    def consumir(self, grupo, consumidor, maximo=100):
+        """
+        Toma (o renueva) el grupo para `consumidor` y regresa hasta `maximo`
+        eventos después de su posición como [(id, tema, clave, datos)]. Si otro
+        consumidor tiene el grupo regresa None.
+        """
+        ahora = time.time()
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            conexion.execute("INSERT OR IGNORE INTO grupos (grupo) VALUES (?)", (grupo,))
+            fila = conexion.execute("SELECT posicion, dueno, vence FROM grupos WHERE grupo = ?", (grupo,)).fetchone()
+            if fila['dueno'] not in (None, consumidor) and fila['vence'] > ahora:
+                conexion.execute("COMMIT")
+                return None
+            conexion.execute(
+                "UPDATE grupos SET dueno = ?, vence = ? WHERE grupo = ?",
+                (consumidor, ahora + self.ARRENDAMIENTO, grupo)
+            )
+            eventos = conexion.execute(
+                "SELECT id, tema, clave, datos FROM eventos WHERE id > ? ORDER BY id LIMIT ?",
+                (fila['posicion'], maximo)
+            ).fetchall()
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return [(e['id'], e['tema'], e['clave'], json.loads(e['datos'])) for e in eventos]
+
+    def confirmar(self, grupo, consumidor, posicion, procesados):
+        """Avanza la posición del grupo si `consumidor` todavía lo tiene"""
+        cur = self._conexion().execute(
+            "UPDATE grupos SET posicion = ?, procesados = procesados + ? WHERE grupo = ? AND dueno = ?",
+            (posicion, procesados, grupo, consumidor)
+        )
+        return cur.rowcount == 1
+
+    def estado_grupo(self, grupo):
+        conexion = self._conexion()
+        fila = conexion.execute("SELECT posicion, procesados FROM grupos WHERE grupo = ?", (grupo,)).fetchone()
+        ultimo = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM eventos").fetchone()[0]
+        posicion = fila['posicion'] if fila else 0
+        return {'posicion': posicion, 'procesados': fila['procesados'] if fila else 0, 'retraso': ultimo - posicion}
+
+    def purgar(self, antiguedad):
+        """Borra los eventos publicados hace más de `antiguedad` segundos que ya leyeron todos los grupos"""
+        conexion = self._conexion()
+        minimo = conexion.execute("SELECT MIN(posicion) FROM grupos").fetchone()[0] or 0
+        cur = conexion.execute(
+            "DELETE FROM eventos WHERE id <= ? AND publicado < ?", (minimo, time.time() - antiguedad)
+        )
+        return cur.rowcount
+
+
+def abrir_broker(url):
+    """sqlite:///ruta/al/archivo.db"""
+    if url.startswith('sqlite:///'):
+        return BrokerSQLite(url[len('sqlite:///'):])
+    raise ValueError(f"URL de broker no soportada: {url}")
+
+
+class Relay:
+    """Publica en el broker los eventos de las tablas de salida y los borra."""
+
+    def __init__(self, conectar, broker, tablas, lote=500):
+        self.conectar = conectar
+        self.broker = broker
+        self.tablas = tablas
+        self.lote = lote
+        self._conexion = None
+
+    def ciclo(self):
+        """Publica un lote de cada tabla; regresa cuántos eventos publicó"""
+        if self._conexion is None:
+            self._conexion = self.conectar()
+            self._conexion.autocommit(True)
+        publicados = 0
+        try:
+            cur = self._conexion.cursor()
+            for tabla in self.tablas:
+                cur.execute(f"SELECT id, tema, clave, datos FROM {tabla} ORDER BY id LIMIT %s", (self.lote,))
+                filas = cur.fetchall()
+                if not filas:
+                    continue
+                self.broker.publicar([(f['tema'], f['clave'], f['datos']) for f in filas], tabla)
+                # Se borran sólo los ids publicados: un id menor cuya transacción
+                # aún no confirmaba aparecerá en el siguiente ciclo. Si el relay
+                # se cae aquí los eventos se publican otra vez (al menos una vez)
+                ids = [f['id'] for f in filas]
+                cur.execute(f"DELETE FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+                publicados += len(filas)
+            cur.close()
+        except Exception:
+            self._conexion.close()
+            self._conexion = None
+            raise
+        return publicados
+
+
+class Consumidor:
+    """
+    Hilo que aplica los eventos de un grupo con manejadores {tema: funcion}.
+
+    Cada lote se aplica en una sola transacción de la base de datos; la
+    posición del grupo avanza sólo después del COMMIT. Cada manejador recibe
+    (cur, datos, evento_id); si regresa una función, se llama después del
+    COMMIT (p. ej. para encolar trabajo fuera de la base de datos).
+    """
+
+    def __init__(self, broker, grupo, conectar, manejadores, preparar=None, lote=200, espera=0.05):
+        """
+        Args:
+            preparar: función sin argumentos que se llama una vez al arrancar
+                el hilo (p. ej. para crear las tablas); se reintenta si falla.
+        """
+        self.broker = broker
+        self.grupo = grupo
+        self.conectar = conectar
+        self.manejadores = manejadores
+        self.preparar = preparar
+        self.lote = lote
+        self.espera = espera
+        self.nombre = f"{socket.gethostname()}:{os.getpid()}"
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._ciclo, name=f'eventos-{self.grupo}', daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera=5):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+
+    def estadisticas(self):
+        """Posición, eventos procesados y retraso del grupo en el broker"""
+        return dict(self.broker.estado_grupo(self.grupo), grupo=self.grupo)
+
+    def _ciclo(self):
+        while self.preparar is not None and not self._detener.is_set():
+            try:
+                self.preparar()
+                break
+            except Exception:
+                traceback.print_exc()
+                time.sleep(1)
+
+        conexion = None
+        while not self._detener.is_set():
+            try:
+                eventos = self.broker.consumir(self.grupo, self.nombre, self.lote)
+                if eventos is None:
+                    # Otro proceso tiene el grupo; esperar a que lo suelte
+                    time.sleep(self.broker.ARRENDAMIENTO / 3)
+                    continue
+                if not eventos:
+                    time.sleep(self.espera)
+                    continue
+                if conexion is None:
+                    conexion = self.conectar()
+                    conexion.autocommit(True)
+                self._aplicar(conexion, eventos)
+                self.broker.confirmar(self.grupo, self.nombre, eventos[-1][0], len(eventos))
+            except Exception:
+                traceback.print_exc()
+                if conexion is not None:
+                    conexion.close()
+                    conexion = None
+                time.sleep(1)
+
+    def _aplicar(self, conexion, eventos):
+        despues = []
+        cur = conexion.cursor()
+        cur.execute("START TRANSACTION")
+        try:
+            for evento_id, tema, _, datos in eventos:
+                manejador = self.manejadores.get(tema)
+                if manejador is not None:
+                    accion = manejador(cur, datos, evento_id)
+                    if accion is not None:
+                        despues.append(accion)
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+        for accion in despues:
+            accion()
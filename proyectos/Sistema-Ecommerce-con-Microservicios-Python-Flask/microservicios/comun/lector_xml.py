@@ -0,0 +1,203 @@
+"""
+Lectura segura de los cuerpos XML de las solicitudes.
+
+Antes cada servicio hacía request.data.decode('utf-8') y ET.fromstring() sobre
+el cuerpo completo: el XML quedaba en memoria dos veces y no había límite de
+tamaño ni protección contra entidades. Aquí el cuerpo se lee por bloques desde
+request.stream y se entrega a un XMLPullParser, de modo que:
+
+- El tamaño se limita por Content-Length y también mientras se lee (413).
+- Se limitan la profundidad, el número de elementos y la longitud de cada campo.
+- Se rechaza cualquier <!DOCTYPE> o <!ENTITY>, así que no hay expansión de
+  entidades ni referencias a archivos externos.
+- Cada elemento se descarta en cuanto se procesa; en memoria sólo queda el
+  diccionario resultante.
+
+El resultado se valida contra un Esquema y los valores llegan ya convertidos
+(int, Decimal, str). Los errores se reportan con SolicitudInvalida, que trae el
+código HTTP que debe responder el servicio.
+"""
+
+import codecs
+import decimal
+import xml.etree.ElementTree as ET
+
+LIMITE_BYTES = 64 * 1024
+TAMANO_BLOQUE = 16 * 1024
+
+# Declaraciones que habilitan entidades; una solicitud nunca las necesita
+_PROHIBIDO = ('<!DOCTYPE', '<!ENTITY')
+_TRASLAPE = max(len(p) for p in _PROHIBIDO) - 1
+
+
+class SolicitudInvalida(Exception):
+    """Cuerpo XML rechazado; status es 400 o 413 según el caso."""
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+class Campo:
+    """Elemento hoja del XML con su tipo y sus restricciones."""
+
+    def __init__(self, tipo=str, requerido=False, defecto=None, max_longitud=255, minimo=None):
+        self.tipo = tipo
+        self.requerido = requerido
+        self.defecto = defecto
+        self.max_longitud = max_longitud
+        self.minimo = minimo
+
+    def convertir(self, nombre, texto):
+        if texto:
+            texto = texto.strip()
+        if not texto:
+            if self.requerido:
+                raise SolicitudInvalida(f"El campo {nombre} es requerido")
+            return self.defecto
+        if len(texto) > self.max_longitud:
+            raise SolicitudInvalida(f"El campo {nombre} excede {self.max_longitud} caracteres")
+        try:
+            valor = self.tipo(texto)
+        except (ValueError, decimal.InvalidOperation):
+            raise SolicitudInvalida(f"El campo {nombre} no es un {self.tipo.__name__} válido")
+        if self.tipo is decimal.Decimal and not valor.is_finite():
+            raise SolicitudInvalida(f"El campo {nombre} no es un Decimal válido")
+        if self.minimo is not None and valor < self.minimo:
+            raise SolicitudInvalida(f"El campo {nombre} debe ser mayor o igual a {self.minimo}")
+        return valor
+
+
+class Lista:
+    """Elemento repetido (p. ej. <item>) que se junta en una lista de diccionarios."""
+
+    def __init__(self, clave, campos, maximo=100):
+        self.clave = clave
+        self.campos = campos
+        self.maximo = maximo
+
+
+class Esquema:
+    """
+    Forma esperada del documento: <raiz> con campos hoja y, opcionalmente,
+    listas de elementos con sus propios campos hoja. Las etiquetas que no están
+    en el esquema se ignoran, como hacía el código anterior.
+    """
+
+    def __init__(self, raiz, campos, listas=None, max_elementos=1000):
+        self.raiz = raiz
+        self.campos = campos
+        self.listas = listas or {}
+        self.max_elementos = max_elementos
+        self.profundidad_max = 3 if self.listas else 2
+
+
+def _convertir(campos, elemento, contexto):
+    textos = {}
+    for hijo in elemento:
+        if hijo.tag in campos:
+            if hijo.tag in textos:
+                raise SolicitudInvalida(f"El campo {hijo.tag} está repetido en {contexto}")
+            textos[hijo.tag] = hijo.text
+    return {nombre: campo.convertir(nombre, textos.get(nombre)) for nombre, campo in campos.items()}
+
+
+def _bloques(flujo, longitud, limite_bytes, tamano_bloque):
+    """Lee el flujo por bloques, decodifica UTF-8 y vigila tamaño y DOCTYPE"""
+    if longitud is not None and longitud > limite_bytes:
+        raise SolicitudInvalida(f"El cuerpo excede {limite_bytes} bytes", status=413)
+
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    leidos = 0
+    cola = ''
+    while True:
+        bloque = flujo.read(tamano_bloque)
+        if not bloque:
+            break
+        leidos += len(bloque)
+        if leidos > limite_bytes:
+            raise SolicitudInvalida(f"El cuerpo excede {limite_bytes} bytes", status=413)
+        try:
+            texto = decodificador.decode(bloque)
+        except UnicodeDecodeError:
+            raise SolicitudInvalida("El cuerpo no es UTF-8 válido")
+        # Se revisa junto con el final del bloque anterior por si la
+        # declaración quedó partida entre dos bloques
+        ventana = cola + texto
+        if any(prohibido in ventana for prohibido in _PROHIBIDO):
+            raise SolicitudInvalida("No se permiten DOCTYPE ni entidades")
+        cola = ventana[-_TRASLAPE:]
+        yield texto
+    try:
+        decodificador.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise SolicitudInvalida("El cuerpo no es UTF-8 válido")
+    if not leidos:
+        raise SolicitudInvalida("Datos XML requeridos")
+
+
+def leer_xml(flujo, esquema, longitud=None, limite_bytes=LIMITE_BYTES, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee un documento XML desde un objeto con read() (p. ej. request.stream) y
+    lo regresa como diccionario validado según el esquema.
+
+    longitud es el Content-Length declarado, si lo hay, para rechazar cuerpos
+    grandes sin leerlos.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    datos = {lista.clave: [] for lista in esquema.listas.values()}
+    vistos = set()
+    raiz = None
+    profundidad = 0
+    elementos = 0
+
+    campos = esquema.campos
+    listas = esquema.listas
+    profundidad_max = esquema.profundidad_max
+    max_elementos = esquema.max_elementos
+
+    try:
+        for texto in _bloques(flujo, longitud, limite_bytes, tamano_bloque):
+            parser.feed(texto)
+            for evento, elemento in parser.read_events():
+                if evento == 'start':
+                    profundidad += 1
+                    elementos += 1
+                    if profundidad > profundidad_max:
+                        raise SolicitudInvalida("El XML excede la profundidad permitida")
+                    if elementos > max_elementos:
+                        raise SolicitudInvalida("El XML tiene demasiados elementos")
+                    if profundidad == 1:
+                        if elemento.tag != esquema.raiz:
+                            raise SolicitudInvalida(f"Se esperaba el elemento raíz <{esquema.raiz}>")
+                        raiz = elemento
+                    continue
+
+                profundidad -= 1
+                if profundidad != 1:
+                    continue
+
+                # Hijo directo de la raíz completo: convertirlo y descartarlo
+                etiqueta = elemento.tag
+                campo = campos.get(etiqueta)
+                if campo is not None:
+                    if etiqueta in vistos:
+                        raise SolicitudInvalida(f"El campo {etiqueta} está repetido")
+                    vistos.add(etiqueta)
+                    datos[etiqueta] = campo.convertir(etiqueta, elemento.text)
+                else:
+                    lista = listas.get(etiqueta)
+                    if lista is not None:
+                        renglones = datos[lista.clave]
+                        if len(renglones) >= lista.maximo:
+                            raise SolicitudInvalida(f"Se permiten máximo {lista.maximo} elementos <{etiqueta}>")
+                        renglones.append(_convertir(lista.campos, elemento, etiqueta))
+                raiz.remove(elemento)
+        parser.close()
+    except ET.ParseError as e:
+        raise SolicitudInvalida(f"XML mal formado: {e}")
+
+    for nombre, campo in esquema.campos.items():
+        if nombre not in vistos:
+            datos[nombre] = campo.convertir(nombre, None)
+    return datos
@@ -0,0 +1,81 @@
+"""
+Negociación de contenido para las respuestas de los microservicios.
+
+El formato se elige por solicitud a partir del encabezado Accept:
+- application/xml (o text/xml, */*, sin encabezado): XML, el formato por defecto.
+- application/json: JSON compacto, pensado para el frontend.
+- application/msgpack: MessagePack, para llamadas entre servicios. Sólo se
+  ofrece si el paquete msgpack está instalado.
+
+Los datos se pasan como estructuras de Python (diccionarios y listas); el XML
+lo sigue generando cada servicio con su propia función, que sólo se llama si
+el cliente pidió XML.
+"""
+
+import datetime
+import decimal
+import json
+
+from flask import Response, request
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional
+    msgpack = None
+
+MIMETYPES = {
+    'xml': 'application/xml',
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+}
+
+_FORMATO_POR_MIMETYPE = {
+    'application/xml': 'xml',
+    'text/xml': 'xml',
+    'application/json': 'json',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+}
+
+# El orden importa: con Accept: */* gana el primero (XML)
+_OFRECIDOS = ['application/xml', 'text/xml', 'application/json']
+if msgpack is not None:
+    _OFRECIDOS += ['application/msgpack', 'application/x-msgpack']
+
+
+def a_primitivo(value):
+    """Convierte los tipos de la base de datos que JSON/MessagePack no conocen"""
+    if isinstance(value, decimal.Decimal):
+        # Como texto para no perder precisión, igual que en el XML
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo no serializable: {type(value).__name__}')
+
+
+def formato_solicitado():
+    """Regresa 'xml', 'json' o 'msgpack' según el encabezado Accept de la solicitud"""
+    mejor = request.accept_mimetypes.best_match(_OFRECIDOS, default='application/xml')
+    return _FORMATO_POR_MIMETYPE[mejor]
+
+
+def serializar(datos, generar_xml, formato):
+    """Serializa los datos en el formato indicado; generar_xml() se llama sólo para XML"""
+    if formato == 'json':
+        return json.dumps(datos, default=a_primitivo, separators=(',', ':'), ensure_ascii=False)
+    if formato == 'msgpack':
+        return msgpack.packb(datos, default=a_primitivo, use_bin_type=True)
+    return generar_xml()
+
+
+def respuesta(cuerpo, formato, status=200):
+    """Response con el mimetype del formato y Vary: Accept para los cachés intermedios"""
+    response = Response(cuerpo, mimetype=MIMETYPES[formato], status=status)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def responder(datos, generar_xml, status=200):
+    """Atajo: elige el formato, serializa y arma la respuesta"""
+    formato = formato_solicitado()
+    return respuesta(serializar(datos, generar_xml, formato), formato, status)
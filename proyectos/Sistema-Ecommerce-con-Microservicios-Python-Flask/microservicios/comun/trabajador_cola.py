@@ -0,0 +1,137 @@
+"""
+Pool de hilos que procesa en segundo plano los trabajos de una cola de
+comun/cola_trabajos.py. Lo usan el trabajador de facturas
+(facturas/trabajador_facturas.py) y el de miniaturas
+(products/imagenes_productos.py).
+
+Cada hilo toma un lote de trabajos de la cola, abre una sola conexión a MySQL
+para todo el lote y procesa cada trabajo por separado, de modo que un trabajo
+con error no afecta a los demás. Los errores transitorios se reintentan hasta
+`intentos` veces, con una espera que se duplica en cada intento; los
+definitivos (`errores_definitivos`) marcan el trabajo como fallido de
+inmediato.
+
+Un hilo aparte regresa a la cola, cada `recuperar_cada` segundos, los trabajos
+que se quedaron en proceso porque se cayó el hilo o el proceso que los tomó.
+"""
+
+import threading
+import time
+import traceback
+
+
+class ErrorDefinitivo(Exception):
+    """Error que no se corrige reintentando; el trabajo se marca como fallido."""
+
+
+class TrabajadorCola:
+
+    # Prefijo de los nombres de los hilos y de los mensajes
+    nombre = 'trabajos'
+    # Errores que no se reintentan
+    errores_definitivos = (ErrorDefinitivo,)
+
+    def __init__(self, cola, conectar, procesar, hilos=2, tamano_lote=20, intentos=3,
+                 espera_reintento=1.0, espera_maxima=60.0, recuperar_cada=30.0, antiguedad=60.0):
+        """
+        Args:
+            cola: cola de comun.cola_trabajos.
+            conectar: función que abre una conexión nueva a la base de datos.
+            procesar: función (cursor, datos) -> resultado que hace el trabajo;
+                el resultado se guarda como estado del trabajo.
+            hilos: número de hilos del pool.
+            tamano_lote: trabajos que toma cada hilo por viaje a la cola.
+            intentos: veces que se intenta un trabajo antes de darlo por fallido.
+            espera_reintento: segundos antes del primer reintento; se duplica
+                en cada intento hasta `espera_maxima`.
+            recuperar_cada: segundos entre revisiones de trabajos abandonados.
+            antiguedad: segundos en proceso tras los que un trabajo se da por
+                abandonado y vuelve a la cola.
+        """
+        self.cola = cola
+        self.conectar = conectar
+        self.procesar = procesar
+        self.hilos = hilos
+        self.tamano_lote = tamano_lote
+        self.intentos = intentos
+        self.espera_reintento = espera_reintento
+        self.espera_maxima = espera_maxima
+        self.recuperar_cada = recuperar_cada
+        self.antiguedad = antiguedad
+        self._detener = threading.Event()
+        self._hilos = []
+
+    def iniciar(self):
+        # Lo que quedó en proceso cuando se detuvo el servicio vuelve a la cola
+        self.cola.recuperar(antiguedad=self.antiguedad)
+        for numero in range(self.hilos):
+            hilo = threading.Thread(target=self._ciclo, name=f'{self.nombre}-{numero}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        hilo = threading.Thread(target=self._ciclo_recuperar, name=f'{self.nombre}-recuperar', daemon=True)
+        hilo.start()
+        self._hilos.append(hilo)
+
+    def detener(self, espera=5):
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(espera)
+
+    def preparar(self):
+        """Se llama antes de procesar cada lote"""
+
+    def fallido(self, cur, datos, error):
+        """Se llama cuando un trabajo queda fallido, por error definitivo o por agotar sus intentos"""
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                lote = self.cola.tomar(self.tamano_lote, espera=1.0)
+                if lote:
+                    self.preparar()
+                    self._procesar_lote(lote)
+            except Exception:
+                # Falla de la cola o de la conexión: esperar y volver a intentar
+                traceback.print_exc()
+                time.sleep(1)
+
+    def _ciclo_recuperar(self):
+        while not self._detener.wait(self.recuperar_cada):
+            try:
+                recuperados = self.cola.recuperar(antiguedad=self.antiguedad)
+                if recuperados:
+                    print(f"Cola {self.nombre}: {recuperados} trabajos abandonados regresaron a la cola")
+            except Exception:
+                traceback.print_exc()
+
+    def _espera(self, intentos):
+        """Segundos antes de reintentar un trabajo que ya se intentó `intentos` veces"""
+        return min(self.espera_maxima, self.espera_reintento * 2 ** max(0, intentos - 1))
+
+    def _procesar_lote(self, lote):
+        try:
+            conexion = self.conectar()
+        except Exception as e:
+            # Sin base de datos no se procesa nada: el lote regresa a la cola
+            for clave, _ in lote:
+                self.cola.fallar(clave, e, reintentar=True, espera=self.espera_reintento)
+            raise
+        try:
+            # Autocommit para que cada lectura vea los datos recién confirmados;
+            # las escrituras de varias sentencias usan su propio START TRANSACTION
+            conexion.autocommit(True)
+            cur = conexion.cursor()
+            for clave, datos in lote:
+                try:
+                    resultado = self.procesar(cur, datos)
+                except Exception as e:
+                    intentos = (self.cola.estado(clave) or {}).get('intentos', 0)
+                    reintentar = not isinstance(e, self.errores_definitivos) and intentos < self.intentos
+                    self.cola.fallar(clave, e, reintentar=reintentar, espera=self._espera(intentos))
+                    if not reintentar:
+                        self.fallido(cur, datos, e)
+                else:
+                    self.cola.completar(clave, resultado)
+            cur.close()
+        finally:
+            conexion.close()
@@ -0,0 +1,68 @@
+"""
+Caché de facturas ya renderizadas.
+
+Una factura no cambia después de emitirse, así que su representación (XML,
+JSON o MessagePack) se guarda una sola vez: en memoria (LRU acotado) y en disco
+(un archivo por factura y formato). Las lecturas posteriores se sirven desde la
+caché sin abrir conexión a la base de datos; si el proceso se reinicia, el
+disco repuebla la memoria.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheFacturas:
+    """LRU en memoria respaldado por archivos de sólo escritura única."""
+
+    def __init__(self, directorio, capacidad=1000):
+        self.directorio = directorio
+        self.capacidad = capacidad
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        factura_id, formato = clave
+        return os.path.join(self.directorio, f"factura_{int(factura_id)}.{formato}")
+
+    def _recordar(self, clave, contenido):
+        with self._lock:
+            self._memoria[clave] = contenido
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.capacidad:
+                self._memoria.popitem(last=False)
+
+    def obtener(self, factura_id, formato='xml'):
+        """Regresa la factura serializada (bytes) o None si no está en caché."""
+        clave = (factura_id, formato)
+        with self._lock:
+            contenido = self._memoria.get(clave)
+            if contenido is not None:
+                self._memoria.move_to_end(clave)
+                return contenido
+
+        try:
+            with open(self._ruta(clave), 'rb') as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            return None
+
+        self._recordar(clave, contenido)
+        return contenido
+
+    def guardar(self, factura_id, contenido, formato='xml'):
+        """Guarda la factura serializada; si ya existía en disco no se sobrescribe."""
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        clave = (factura_id, formato)
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            # Escribir en un temporal y renombrar para que un lector nunca vea
+            # un archivo a medias
+            temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, 'wb') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)
+        self._recordar(clave, contenido)
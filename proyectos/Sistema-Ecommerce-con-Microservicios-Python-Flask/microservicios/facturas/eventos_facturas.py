@@ -0,0 +1,129 @@
+"""
+Eventos de facturas_service (modo EVENTOS=1, ver comun/eventos.py).
+
+facturas_pedidos es el modelo de lectura de facturas: cliente, totales y
+renglones de cada pedido tal como llegaron en pedido_creado, más el estado que
+publica products. Las facturas se emiten desde esta tabla sin consultar
+pedidos, pedidos_detalle, clientes ni products, y sólo para pedidos
+confirmados; al llegar pedido_confirmado la factura se encola para el
+trabajador (ver trabajador_facturas.py).
+"""
+
+import json
+from decimal import Decimal
+
+from comun.base_datos import Sentencia
+
+PROCESANDO = 'Procesando'
+CONFIRMADO = 'Confirmado'
+RECHAZADO = 'Rechazado'
+
+SQL_CREAR_PEDIDOS = """
+    CREATE TABLE IF NOT EXISTS facturas_pedidos (
+        pedido_id INT NOT NULL PRIMARY KEY,
+        cliente_nombre VARCHAR(100),
+        cliente_email VARCHAR(100),
+        subtotal DECIMAL(10,2) NOT NULL,
+        impuestos DECIMAL(10,2) NOT NULL,
+        total DECIMAL(10,2) NOT NULL,
+        items TEXT NOT NULL,
+        estado VARCHAR(20) NOT NULL DEFAULT 'Procesando',
+        motivo VARCHAR(255)
+    ) ENGINE=InnoDB
+"""
+
+SQL_PEDIDO = Sentencia('pedido_de_eventos', """
+    SELECT subtotal, impuestos, total, estado, motivo FROM facturas_pedidos WHERE pedido_id = %s
+""")
+
+# Misma forma que SQL_FACTURA del servicio, pero con cliente y renglones del
+# modelo de lectura. items es NULL para facturas de antes de activar EVENTOS
+SQL_FACTURA = Sentencia('factura_de_eventos', """
+    SELECT f.id, f.folio, f.fecha, f.subtotal, f.impuestos, f.total,
+           fp.cliente_nombre, fp.cliente_email, fp.items
+    FROM facturas f
+    LEFT JOIN facturas_pedidos fp ON fp.pedido_id = f.pedido_id
+    WHERE f.id = %s
+""")
+
+
+class PedidoNoConfirmado(Exception):
+    """El pedido sigue esperando a products o fue rechazado."""
+
+    def __init__(self, pedido_id, estado, motivo=None):
+        self.pedido_id = pedido_id
+        self.estado = estado
+        self.motivo = motivo
+        if estado == RECHAZADO:
+            mensaje = f'Pedido con ID {pedido_id} rechazado: {motivo}'
+        else:
+            mensaje = f'Pedido con ID {pedido_id} aún no está confirmado'
+        super().__init__(mensaje)
+
+
+def asegurar_tablas(conectar):
+    conexion = conectar()
+    try:
+        cur = conexion.cursor()
+        cur.execute(SQL_CREAR_PEDIDOS)
+        cur.close()
+    finally:
+        conexion.close()
+
+
+def pedido(cur, pedido_id):
+    """Totales, estado y motivo del pedido en el modelo de lectura, o None"""
+    SQL_PEDIDO.ejecutar(cur, (pedido_id,))
+    return cur.fetchone()
+
+
+def factura(cur, factura_id):
+    """
+    (factura, items) como obtener_factura del servicio, o None si la factura no
+    existe o su pedido no está en el modelo de lectura.
+    """
+    SQL_FACTURA.ejecutar(cur, (factura_id,))
+    fila = cur.fetchone()
+    if not fila or fila['items'] is None:
+        return None
+    items = json.loads(fila.pop('items'))
+    for item in items:
+        item['precio_unitario'] = Decimal(item['precio_unitario'])
+    return fila, items
+
+
+def manejadores(cola):
+    """Manejadores del grupo 'facturas'; `cola` recibe las facturas por generar"""
+
+    def pedido_creado(cur, datos, evento_id):
+        cur.execute(
+            """
+            INSERT IGNORE INTO facturas_pedidos
+                (pedido_id, cliente_nombre, cliente_email, subtotal, impuestos, total, items)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (datos['pedido_id'], datos['cliente_nombre'], datos['cliente_email'], datos['subtotal'],
+             datos['impuestos'], datos['total'], json.dumps(datos['items']))
+        )
+
+    def pedido_confirmado(cur, datos, evento_id):
+        pedido_id = datos['pedido_id']
+        cur.execute(
+            "UPDATE facturas_pedidos SET estado = %s WHERE pedido_id = %s AND estado = %s",
+            (CONFIRMADO, pedido_id, PROCESANDO)
+        )
+        # Se encola después del COMMIT para que el trabajador vea el pedido
+        # confirmado; encolar dos veces el mismo pedido no duplica el trabajo
+        return lambda: cola.encolar(pedido_id, {'pedido_id': pedido_id})
+
+    def pedido_rechazado(cur, datos, evento_id):
+        cur.execute(
+            "UPDATE facturas_pedidos SET estado = %s, motivo = %s WHERE pedido_id = %s AND estado = %s",
+            (RECHAZADO, datos['motivo'][:255], datos['pedido_id'], PROCESANDO)
+        )
+
+    return {
+        'pedido_creado': pedido_creado,
+        'pedido_confirmado': pedido_confirmado,
+        'pedido_rechazado': pedido_rechazado,
+    }
@@ -1,10 +1,24 @@
 from flask import Flask, request, Response
-from flask_mysqldb import MySQL
 from flask_cors import CORS
-import datetime
-import decimal
-import xml.etree.ElementTree as ET
 import os
+import sys
+from folios import GeneradorFolios
+from cache_facturas import CacheFacturas
+
+# Permite importar el paquete compartido 'comun' al ejecutar el servicio fuera de Docker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.base_datos import PLANTILLA_POOL, PoolMySQL, Sentencia
+from comun.cache_productos import PLANTILLA_ESTADISTICAS, CacheProductos
+from comun.cola_trabajos import FALLIDO, PENDIENTE, TERMINADO, abrir_cola
+from comun.escritor_xml import EscritorXML, Plantilla, escapar
+from comun.eventos import PLANTILLA_EVENTOS, Consumidor, abrir_broker
+from comun.lector_xml import Campo, Esquema, SolicitudInvalida, leer_xml
+from comun.negociacion import formato_solicitado, respuesta, responder, serializar
+from comun.trabajador_cola import ErrorDefinitivo
+# Usan 'comun': van después de agregarlo al path
+import eventos_facturas
+from eventos_facturas import RECHAZADO, PedidoNoConfirmado
+from trabajador_facturas import TrabajadorFacturas
 
 app = Flask(__name__)
 CORS(app)
@@ -14,165 +28,331 @@ app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'db')
 app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'raul')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '123')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'joyeria_db')
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+app.config['MYSQL_POOL_TAMANO'] = int(os.getenv('MYSQL_POOL_TAMANO', '8'))
+app.config['MYSQL_POOL_ESPERA'] = float(os.getenv('MYSQL_POOL_ESPERA', '5'))
+app.config['MYSQL_TIEMPO_SENTENCIA'] = float(os.getenv('MYSQL_TIEMPO_SENTENCIA', '10'))
+app.config['MYSQL_PREPARADAS'] = os.getenv('MYSQL_PREPARADAS', '1') == '1'
 
-mysql = MySQL(app)
+# Pool de conexiones por proceso (ver comun/base_datos.py)
+mysql = PoolMySQL(app)
 
-def value_to_str(value):
-    if isinstance(value, (datetime.datetime, datetime.date)):
-        return value.isoformat()
-    if isinstance(value, decimal.Decimal):
-        return str(value)
-    if value is None:
-        return ""
-    return str(value)
+# FOLIO_BLOQUE > 1 reserva folios por bloques para tasas altas de facturación
+folios = GeneradorFolios(mysql.conectar, tamano_bloque=int(os.getenv('FOLIO_BLOQUE', '1')))
 
-@app.route('/api/facturas', methods=['POST'])
-def create_factura():
-    try:
-        xml_data = request.data.decode('utf-8')
-        if not xml_data:
-            return Response('<error>No se recibieron datos XML.</error>', mimetype='application/xml', status=400)
+# Caché de facturas ya serializadas por formato (memoria + disco)
+cache = CacheFacturas(
+    os.getenv('FACTURAS_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_facturas')),
+    capacidad=int(os.getenv('FACTURAS_CACHE_CAPACIDAD', '1000'))
+)
 
-        # Parsear XML
-        root = ET.fromstring(xml_data)
-        pedido_id_elem = root.find('pedido_id')
-        if pedido_id_elem is None or pedido_id_elem.text is None:
-            return Response('<error>El campo pedido_id es requerido.</error>', mimetype='application/xml', status=400)
-        pedido_id = int(pedido_id_elem.text)
+# Caché de código, nombre y precio de los productos (ver comun/cache_productos.py)
+cache_productos = CacheProductos(
+    ttl=int(os.getenv('CACHE_PRODUCTOS_TTL', '30')),
+    redis_url=os.getenv('REDIS_URL') or None
+)
 
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT * FROM pedidos WHERE id = %s", (pedido_id,))
-        pedido = cur.fetchone()
+# Modo asíncrono: pedidos_service encola las facturas y un pool de hilos las
+# genera en segundo plano. La cola se abre siempre para poder consultar estados.
+FACTURAS_ASYNC = os.getenv('FACTURAS_ASYNC', '0') == '1'
+# Fuera de Docker ambos servicios comparten microservicios/cola/trabajos.db
+COLA_FACTURAS_URL = os.getenv('COLA_FACTURAS_URL', 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'trabajos.db'))
+cola = abrir_cola(COLA_FACTURAS_URL, 'facturas')
 
-        if not pedido:
-            return Response(f'<error>Pedido con ID {pedido_id} no encontrado.</error>', mimetype='application/xml', status=404)
+# Eventos entre servicios (ver comun/eventos.py y eventos_facturas.py). Con
+# EVENTOS=1 las facturas salen del modelo de lectura facturas_pedidos y se
+# encolan solas cuando products confirma el pedido
+EVENTOS = os.getenv('EVENTOS', '0') == '1'
+consumidor_eventos = None
+if EVENTOS:
+    consumidor_eventos = Consumidor(
+        abrir_broker(os.getenv('BROKER_EVENTOS_URL', 'sqlite:///' + os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'eventos.db'))),
+        'facturas', mysql.conectar, eventos_facturas.manejadores(cola),
+        preparar=lambda: eventos_facturas.asegurar_tablas(mysql.conectar)
+    )
+
+# Plantillas precompiladas de las secciones de la factura
+PLANTILLA_ENCABEZADO = Plantilla('encabezado', ['id', 'folio', 'fecha'])
+PLANTILLA_CLIENTE = Plantilla('cliente', ['nombre', 'email'])
+PLANTILLA_ITEM = Plantilla('item', ['codigo', 'nombre', 'cantidad', 'precio_unitario', 'importe'])
+PLANTILLA_TOTALES = Plantilla('totales', ['subtotal', 'impuestos', 'total'])
+PLANTILLA_ESTADO = Plantilla('estado_factura', ['pedido_id', 'estado', 'factura_id', 'error'])
+
+# SELECT fijos, preparados una vez por conexión del pool
+SQL_FACTURA = Sentencia('factura_completa', """
+    SELECT f.id, f.folio, f.fecha, f.subtotal, f.impuestos, f.total,
+           c.nombre AS cliente_nombre, c.email AS cliente_email,
+           pd.producto_id, pd.cantidad, pd.precio_unitario
+    FROM facturas f
+    JOIN pedidos pe ON pe.id = f.pedido_id
+    LEFT JOIN clientes c ON c.id = pe.cliente_id
+    LEFT JOIN pedidos_detalle pd ON pd.pedido_id = f.pedido_id
+    WHERE f.id = %s
+    ORDER BY pd.id
+""")
+SQL_TOTALES_PEDIDO = Sentencia('totales_pedido', "SELECT subtotal, impuestos, total FROM pedidos WHERE id = %s")
+SQL_FACTURA_DE_PEDIDO = Sentencia('factura_de_pedido', "SELECT id FROM facturas WHERE pedido_id = %s")
+
+# UNIQUE(pedido_id) de facturas: otra solicitud o el trabajador ganó la carrera
+ER_DUP_ENTRY = 1062
+
+# Cuerpo de create_factura: <factura><pedido_id/></factura>
+ESQUEMA_FACTURA = Esquema('factura', {
+    'pedido_id': Campo(int, requerido=True, max_longitud=10, minimo=1),
+}, max_elementos=10)
+
+def obtener_factura(cur, factura_id):
+    """
+    Obtiene encabezado, cliente y detalle de la factura en una sola consulta;
+    código y nombre de cada producto salen de la caché de productos.
+
+    Regresa (factura, items) o None si la factura no existe. Cada fila del JOIN
+    repite los datos del encabezado; se toman de la primera.
+    """
+    if EVENTOS:
+        resultado = eventos_facturas.factura(cur, factura_id)
+        if resultado is not None:
+            return resultado
+    SQL_FACTURA.ejecutar(cur, (factura_id,))
+    filas = cur.fetchall()
+    if not filas:
+        return None
+    items = [fila for fila in filas if fila['cantidad'] is not None]
+    productos = cache_productos.obtener_varios(cur, [item['producto_id'] for item in items])
+    for item in items:
+        producto = productos.get(item['producto_id'], {})
+        item['codigo'] = producto.get('codigo')
+        item['nombre'] = producto.get('nombre')
+    return filas[0], items
 
-        # Generar folio único con formato FAC-YYYYMMDD-<id>
-        # Nota: factura_id se genera después del INSERT, por lo que usamos un contador temporal
-        from datetime import datetime
-        fecha_actual = datetime.now().strftime('%Y%m%d')
+def datos_factura(factura, items_detalle):
+    """Arma la factura como diccionario a partir del resultado de obtener_factura"""
+    return {
+        'encabezado': {'id': factura['id'], 'folio': factura['folio'], 'fecha': factura['fecha']},
+        'cliente': {'nombre': factura['cliente_nombre'], 'email': factura['cliente_email']},
+        'items': [{
+            'codigo': item['codigo'],
+            'nombre': item['nombre'],
+            'cantidad': item['cantidad'],
+            'precio_unitario': item['precio_unitario'],
+            'importe': item['precio_unitario'] * item['cantidad'],
+        } for item in items_detalle],
+        'totales': {'subtotal': factura['subtotal'], 'impuestos': factura['impuestos'], 'total': factura['total']},
+    }
 
-        # Obtener el último ID de factura para generar el siguiente
-        cur.execute("SELECT COALESCE(MAX(id), 0) + 1 as next_id FROM facturas")
-        next_id_result = cur.fetchone()
-        next_folio_id = next_id_result['next_id']
+def renderizar_factura(datos):
+    """Genera el XML de la factura a partir de datos_factura"""
+    escritor = EscritorXML().abrir('factura')
+    escritor.registro(PLANTILLA_ENCABEZADO, datos['encabezado'])
+    escritor.registro(PLANTILLA_CLIENTE, datos['cliente'])
+    escritor.abrir('items').registros(PLANTILLA_ITEM, datos['items']).cerrar('items')
+    escritor.registro(PLANTILLA_TOTALES, datos['totales'])
+    return escritor.cerrar('factura').valor()
 
-        folio = f"FAC-{fecha_actual}-{next_folio_id}"
+def serializar_factura(datos, formato):
+    return serializar(datos, lambda: renderizar_factura(datos), formato)
+
+def emitir_factura(cur, pedido_id):
+    """
+    Inserta la factura del pedido y regresa su id, o None si el pedido no
+    existe. Si el pedido ya tenía factura regresa la existente, así que se
+    puede llamar más de una vez con el mismo pedido.
+
+    Con EVENTOS los totales salen de facturas_pedidos y lanza
+    PedidoNoConfirmado si products aún no confirma el pedido o lo rechazó.
+    """
+    if EVENTOS:
+        pedido = eventos_facturas.pedido(cur, pedido_id)
+        if pedido and pedido['estado'] != eventos_facturas.CONFIRMADO:
+            raise PedidoNoConfirmado(pedido_id, pedido['estado'], pedido['motivo'])
+    else:
+        SQL_TOTALES_PEDIDO.ejecutar(cur, (pedido_id,))
+        pedido = cur.fetchone()
+    if not pedido:
+        return None
+
+    SQL_FACTURA_DE_PEDIDO.ejecutar(cur, (pedido_id,))
+    existente = cur.fetchone()
+    if existente:
+        return existente['id']
+
+    # Generar folio único con formato FAC-YYYYMMDD-<n> en la misma transacción
+    # que la factura, para que un INSERT fallido no deje huecos
+    cur.execute("START TRANSACTION")
+    try:
+        folio = folios.siguiente_folio(cur)
         cur.execute(
             "INSERT INTO facturas (pedido_id, folio, subtotal, impuestos, total) VALUES (%s, %s, %s, %s, %s)",
             (pedido_id, folio, pedido['subtotal'], pedido['impuestos'], pedido['total'])
         )
         factura_id = cur.lastrowid
-        mysql.connection.commit()
+        cur.execute("COMMIT")
+    except Exception as e:
+        cur.execute("ROLLBACK")
+        # La revisión de arriba va fuera de la transacción: un POST y el
+        # trabajador de la cola (o dos POST) pueden pasarla a la vez. El
+        # segundo INSERT choca con UNIQUE(pedido_id) y se regresa la factura
+        # que insertó el primero
+        if e.args and e.args[0] == ER_DUP_ENTRY:
+            SQL_FACTURA_DE_PEDIDO.ejecutar(cur, (pedido_id,))
+            existente = cur.fetchone()
+            if existente:
+                return existente['id']
+        raise
+    return factura_id
 
-        cur.execute("SELECT * FROM clientes WHERE id = %s", (pedido['cliente_id'],))
-        cliente = cur.fetchone()
-        cur.execute("SELECT p.nombre, p.codigo, pd.cantidad, pd.precio_unitario FROM pedidos_detalle pd JOIN products p ON pd.producto_id = p.id WHERE pd.pedido_id = %s", (pedido_id,))
-        items_detalle = cur.fetchall()
+def procesar_trabajo(cur, datos):
+    """Genera la factura de un trabajo de la cola y deja su XML en caché"""
+    try:
+        factura_id = emitir_factura(cur, datos['pedido_id'])
+    except PedidoNoConfirmado as e:
+        if e.estado == RECHAZADO:
+            raise ErrorDefinitivo(str(e))
+        raise
+    if factura_id is None:
+        raise ErrorDefinitivo(f"Pedido con ID {datos['pedido_id']} no encontrado")
+    if cache.obtener(factura_id) is None:
+        cache.guardar(factura_id, renderizar_factura(datos_factura(*obtener_factura(cur, factura_id))))
+    return {'factura_id': factura_id}
+
+# Cada hilo abre su propia conexión por lote para no ocupar lugares del pool
+# que atiende las solicitudes
+trabajador = TrabajadorFacturas(
+    cola, mysql.conectar, procesar_trabajo,
+    hilos=int(os.getenv('FACTURAS_HILOS', '2')),
+    tamano_lote=int(os.getenv('FACTURAS_LOTE', '20')),
+    intentos=int(os.getenv('FACTURAS_INTENTOS', '5')),
+    espera_reintento=float(os.getenv('FACTURAS_ESPERA_REINTENTO', '1'))
+)
+
+@app.route('/api/facturas', methods=['POST'])
+def create_factura():
+    try:
+        # Leer el XML por bloques con límites de tamaño y sin entidades
+        pedido_id = leer_xml(request.stream, ESQUEMA_FACTURA, request.content_length)['pedido_id']
+
+        cur = mysql.connection.cursor()
+        try:
+            factura_id = emitir_factura(cur, pedido_id)
+        except PedidoNoConfirmado as e:
+            cur.close()
+            return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=409)
+        if factura_id is None:
+            cur.close()
+            return Response(f'<error>Pedido con ID {pedido_id} no encontrado.</error>', mimetype='application/xml', status=404)
+
+        datos = datos_factura(*obtener_factura(cur, factura_id))
         cur.close()
 
-        xml_output = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_output += '<factura>\n'
-        xml_output += f'  <encabezado>\n'
-        xml_output += f'    <id>{factura_id}</id>\n'
-        xml_output += f'    <folio>{folio}</folio>\n'
-        xml_output += f'    <fecha>{value_to_str(pedido["fecha"])}</fecha>\n'
-        xml_output += '  </encabezado>\n'
-        xml_output += f'  <cliente>\n'
-        xml_output += f'    <nombre>{cliente["nombre"]}</nombre>\n'
-        xml_output += f'    <email>{cliente["email"]}</email>\n'
-        xml_output += '  </cliente>\n'
-        xml_output += '  <items>\n'
-        for item in items_detalle:
-            importe = item['precio_unitario'] * item['cantidad']
-            xml_output += '    <item>\n'
-            xml_output += f'      <codigo>{item["codigo"]}</codigo>\n'
-            xml_output += f'      <nombre>{item["nombre"]}</nombre>\n'
-            xml_output += f'      <cantidad>{item["cantidad"]}</cantidad>\n'
-            xml_output += f'      <precio_unitario>{value_to_str(item["precio_unitario"])}</precio_unitario>\n'
-            xml_output += f'      <importe>{value_to_str(importe)}</importe>\n'
-            xml_output += '    </item>\n'
-        xml_output += '  </items>\n'
-        xml_output += '  <totales>\n'
-        xml_output += f'    <subtotal>{value_to_str(pedido["subtotal"])}</subtotal>\n'
-        xml_output += f'    <impuestos>{value_to_str(pedido["impuestos"])}</impuestos>\n'
-        xml_output += f'    <total>{value_to_str(pedido["total"])}</total>\n'
-        xml_output += '  </totales>\n'
-        xml_output += '</factura>'
-
-        return Response(xml_output, mimetype='application/xml')
+        formato = formato_solicitado()
+        cuerpo = serializar_factura(datos, formato)
+        cache.guardar(factura_id, cuerpo, formato)
+
+        return respuesta(cuerpo, formato)
 
+    except SolicitudInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=e.status)
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
 
 @app.route('/api/facturas/<int:factura_id>', methods=['GET'])
 def get_factura_by_id(factura_id):
     try:
+        # Las facturas son inmutables: si ya se renderizó, no se consulta la base de datos
+        formato = formato_solicitado()
+        cuerpo = cache.obtener(factura_id, formato)
+        if cuerpo is not None:
+            return respuesta(cuerpo, formato)
+
         cur = mysql.connection.cursor()
-        cur.execute("SELECT * FROM facturas WHERE id = %s", (factura_id,))
-        factura = cur.fetchone()
+        resultado = obtener_factura(cur, factura_id)
+        cur.close()
 
-        if not factura:
-            cur.close()
+        if not resultado:
             return Response('<error>Factura no encontrada</error>', mimetype='application/xml', status=404)
 
-        # Obtener datos del pedido
-        cur.execute("SELECT * FROM pedidos WHERE id = %s", (factura['pedido_id'],))
-        pedido = cur.fetchone()
+        cuerpo = serializar_factura(datos_factura(*resultado), formato)
+        cache.guardar(factura_id, cuerpo, formato)
+        return respuesta(cuerpo, formato)
 
-        # Obtener datos del cliente
-        cur.execute("SELECT * FROM clientes WHERE id = %s", (pedido['cliente_id'],))
-        cliente = cur.fetchone()
-
-        # Obtener detalles de productos
-        cur.execute("""
-            SELECT p.nombre, p.codigo, pd.cantidad, pd.precio_unitario
-            FROM pedidos_detalle pd
-            JOIN products p ON pd.producto_id = p.id
-            WHERE pd.pedido_id = %s
-        """, (factura['pedido_id'],))
-        items_detalle = cur.fetchall()
-        cur.close()
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+@app.route('/api/facturas/pedido/<int:pedido_id>/estado', methods=['GET'])
+def get_estado_factura(pedido_id):
+    """Estado de la factura de un pedido: pendiente, procesando, terminado o fallido"""
+    try:
+        trabajo = cola.estado(pedido_id)
+        if trabajo is None:
+            # Sin trabajo en la cola: la factura pudo generarse de forma síncrona
+            cur = mysql.connection.cursor()
+            SQL_FACTURA_DE_PEDIDO.ejecutar(cur, (pedido_id,))
+            factura = cur.fetchone()
+            cur.close()
+            if factura:
+                trabajo = {'estado': TERMINADO, 'resultado': {'factura_id': factura['id']}}
+            elif EVENTOS:
+                # El pedido puede seguir esperando a products: aún no hay trabajo
+                cur = mysql.connection.cursor()
+                pedido = eventos_facturas.pedido(cur, pedido_id)
+                cur.close()
+                if not pedido:
+                    return Response('<error>No hay factura para el pedido</error>', mimetype='application/xml', status=404)
+                if pedido['estado'] == RECHAZADO:
+                    trabajo = {'estado': FALLIDO, 'error': pedido['motivo']}
+                else:
+                    trabajo = {'estado': PENDIENTE}
+            else:
+                return Response('<error>No hay factura para el pedido</error>', mimetype='application/xml', status=404)
+
+        datos = {
+            'pedido_id': pedido_id,
+            'estado': trabajo['estado'],
+            'factura_id': (trabajo.get('resultado') or {}).get('factura_id'),
+            'error': trabajo.get('error'),
+            'encolado': trabajo.get('encolado'),
+            'tomado': trabajo.get('tomado'),
+            'terminado': trabajo.get('terminado'),
+        }
+        return responder(datos, lambda: EscritorXML().registro(PLANTILLA_ESTADO, datos).valor())
+
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+@app.route('/api/facturas/cache/productos', methods=['GET'])
+def get_estadisticas_cache():
+    """Aciertos y fallos de la caché de productos de este proceso"""
+    datos = cache_productos.estadisticas()
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_ESTADISTICAS, datos).valor())
 
-        # Respuesta XML usando ET
-        root = ET.Element('factura')
-
-        # Encabezado
-        encabezado = ET.SubElement(root, 'encabezado')
-        ET.SubElement(encabezado, 'id').text = str(factura['id'])
-        ET.SubElement(encabezado, 'folio').text = factura['folio']
-        ET.SubElement(encabezado, 'fecha').text = value_to_str(factura['fecha'])
-
-        # Cliente
-        cliente_elem = ET.SubElement(root, 'cliente')
-        ET.SubElement(cliente_elem, 'nombre').text = cliente['nombre']
-        ET.SubElement(cliente_elem, 'email').text = cliente['email']
-
-        # Items
-        items_elem = ET.SubElement(root, 'items')
-        for item in items_detalle:
-            item_elem = ET.SubElement(items_elem, 'item')
-            importe = item['precio_unitario'] * item['cantidad']
-            ET.SubElement(item_elem, 'codigo').text = item['codigo']
-            ET.SubElement(item_elem, 'nombre').text = item['nombre']
-            ET.SubElement(item_elem, 'cantidad').text = str(item['cantidad'])
-            ET.SubElement(item_elem, 'precio_unitario').text = value_to_str(item['precio_unitario'])
-            ET.SubElement(item_elem, 'importe').text = value_to_str(importe)
-
-        # Totales
-        totales = ET.SubElement(root, 'totales')
-        ET.SubElement(totales, 'subtotal').text = value_to_str(factura['subtotal'])
-        ET.SubElement(totales, 'impuestos').text = value_to_str(factura['impuestos'])
-        ET.SubElement(totales, 'total').text = value_to_str(factura['total'])
-
-        xml_str = ET.tostring(root, encoding='utf-8', method='xml').decode('utf-8')
-        xml_output = f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_str}'
-        return Response(xml_output, mimetype='application/xml')
+@app.route('/api/facturas/eventos', methods=['GET'])
+def get_estadisticas_eventos():
+    """Avance del consumidor de eventos de facturas"""
+    try:
+        datos = {'activo': EVENTOS}
+        if EVENTOS:
+            datos.update(consumidor_eventos.estadisticas())
+        return responder(datos, lambda: EscritorXML().registro(PLANTILLA_EVENTOS, datos).valor())
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
 
+# Con el recargador de Flask el módulo se importa en dos procesos; el pool sólo
+# arranca en el que atiende solicitudes (o cuando lo importa gunicorn). Con
+# EVENTOS el trabajador genera las facturas de los pedidos confirmados
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    if FACTURAS_ASYNC or EVENTOS:
+        trabajador.iniciar()
+    if EVENTOS:
+        consumidor_eventos.iniciar()
+
+@app.route('/api/facturas/db/pool', methods=['GET'])
+def get_estadisticas_pool():
+    """Uso del pool de conexiones de este proceso"""
+    datos = mysql.estadisticas()
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_POOL, datos).valor())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
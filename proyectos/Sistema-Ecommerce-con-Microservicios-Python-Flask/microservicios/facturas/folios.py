@@ -0,0 +1,118 @@
+"""
+Generación de folios de factura con un contador por día.
+
+El folio tiene el formato FAC-YYYYMMDD-<n>, donde <n> sale de la tabla
+folios_secuencia (una fila por día). El contador se incrementa con un solo
+INSERT ... ON DUPLICATE KEY UPDATE, sin escanear la tabla de facturas.
+
+Hay dos modos:
+- Sin huecos (tamano_bloque=1): el incremento ocurre dentro de la misma
+  transacción que inserta la factura, así que si la factura falla el número
+  también se revierte.
+- Por bloques (tamano_bloque>1): se reservan N números de una vez en una
+  conexión aparte y se reparten desde memoria. Reduce la contención cuando se
+  emiten muchas facturas por segundo, a cambio de que los números no usados de
+  un bloque se pierdan si el proceso se reinicia.
+"""
+
+import threading
+from datetime import date
+
+SQL_CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS folios_secuencia (
+        fecha DATE NOT NULL PRIMARY KEY,
+        ultimo INT NOT NULL
+    ) ENGINE=InnoDB
+"""
+
+# Los folios anteriores usaban MAX(id) + 1; se siembra el contador de cada día
+# con ese valor para que los nuevos números no choquen con los ya emitidos
+SQL_SEMBRAR_CONTADORES = """
+    INSERT IGNORE INTO folios_secuencia (fecha, ultimo)
+    SELECT DATE(fecha), MAX(id) FROM facturas GROUP BY DATE(fecha)
+"""
+
+SQL_INCREMENTAR = """
+    INSERT INTO folios_secuencia (fecha, ultimo) VALUES (%s, LAST_INSERT_ID(%s))
+    ON DUPLICATE KEY UPDATE ultimo = LAST_INSERT_ID(ultimo + %s)
+"""
+
+
+def formatear_folio(fecha, numero):
+    return f"FAC-{fecha.strftime('%Y%m%d')}-{numero}"
+
+
+class GeneradorFolios:
+    """Entrega folios únicos por día a partir de la tabla folios_secuencia."""
+
+    def __init__(self, conectar, tamano_bloque=1):
+        """
+        Args:
+            conectar: función que abre una conexión nueva a la base de datos;
+                se usa para preparar la tabla y para reservar bloques.
+            tamano_bloque: números que se reservan por viaje a la base de datos.
+        """
+        self.conectar = conectar
+        self.tamano_bloque = max(1, int(tamano_bloque))
+        self._lock = threading.Lock()
+        self._bloques = {}  # fecha -> [siguiente, ultimo_reservado]
+        self._tabla_lista = False
+
+    def asegurar_tabla(self):
+        """Crea y siembra la tabla de contadores si aún no existe."""
+        if self._tabla_lista:
+            return
+        with self._lock:
+            if self._tabla_lista:
+                return
+            conexion = self.conectar()
+            try:
+                cur = conexion.cursor()
+                cur.execute(SQL_CREAR_TABLA)
+                cur.execute(SQL_SEMBRAR_CONTADORES)
+                conexion.commit()
+                cur.close()
+            finally:
+                conexion.close()
+            self._tabla_lista = True
+
+    def siguiente_folio(self, cur, fecha=None):
+        """
+        Regresa el siguiente folio para la fecha indicada (hoy por defecto).
+
+        En modo sin huecos debe llamarse dentro de la transacción que inserta la
+        factura, usando el mismo cursor.
+        """
+        fecha = fecha or date.today()
+        self.asegurar_tabla()
+
+        if self.tamano_bloque == 1:
+            return formatear_folio(fecha, self._incrementar(cur, fecha, 1))
+
+        with self._lock:
+            bloque = self._bloques.get(fecha)
+            if bloque is None or bloque[0] > bloque[1]:
+                bloque = self._reservar_bloque(fecha)
+                # Los bloques de días anteriores ya no se van a usar
+                self._bloques = {fecha: bloque}
+            numero = bloque[0]
+            bloque[0] += 1
+        return formatear_folio(fecha, numero)
+
+    def _incrementar(self, cur, fecha, cantidad):
+        cur.execute(SQL_INCREMENTAR, (fecha, cantidad, cantidad))
+        cur.execute("SELECT LAST_INSERT_ID() AS ultimo")
+        return int(cur.fetchone()['ultimo'])
+
+    def _reservar_bloque(self, fecha):
+        # La reserva se confirma en su propia conexión para que el candado sobre
+        # el contador se libere de inmediato y no dependa de la factura en curso
+        conexion = self.conectar()
+        try:
+            cur = conexion.cursor()
+            ultimo = self._incrementar(cur, fecha, self.tamano_bloque)
+            conexion.commit()
+            cur.close()
+        finally:
+            conexion.close()
+        return [ultimo - self.tamano_bloque + 1, ultimo]
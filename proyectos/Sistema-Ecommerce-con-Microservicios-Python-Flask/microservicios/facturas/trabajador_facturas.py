@@ -0,0 +1,19 @@
+"""
+Pool de hilos que genera en segundo plano las facturas encoladas por
+pedidos_service.
+
+Usa la mecánica de comun/trabajador_cola.py: cada pedido se procesa en su
+propia transacción dentro de un lote con una sola conexión, de modo que un
+pedido con error no revierte a los demás. Los errores transitorios se
+reintentan con una espera que se duplica en cada intento (p. ej. un pedido
+que products aún no confirma); los definitivos (ErrorDefinitivo, p. ej. el
+pedido no existe) marcan el trabajo como fallido. Los trabajos abandonados
+regresan a la cola cada `recuperar_cada` segundos.
+"""
+
+from comun.trabajador_cola import TrabajadorCola
+
+
+class TrabajadorFacturas(TrabajadorCola):
+
+    nombre = 'facturas'
@@ -0,0 +1,60 @@
+"""
+Agrupación de solicitudes idénticas simultáneas (request coalescing).
+
+Cuando llegan varias lecturas iguales del catálogo al mismo tiempo, sólo la
+primera va al servicio de productos; las demás esperan y reciben la misma
+respuesta. No es una caché: en cuanto la primera termina, la siguiente lectura
+vuelve a consultar al servicio.
+"""
+
+import threading
+
+
+class _Llamada:
+    __slots__ = ('evento', 'resultado', 'error')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class Coalescedor:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self.ejecutadas = 0
+        self.agrupadas = 0
+
+    def ejecutar(self, clave, funcion):
+        """
+        Ejecuta funcion() una sola vez por clave entre las llamadas simultáneas.
+        El resultado se comparte, así que debe ser inmutable.
+        """
+        with self._lock:
+            llamada = self._en_curso.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = _Llamada()
+                self._en_curso[clave] = llamada
+                self.ejecutadas += 1
+            else:
+                self.agrupadas += 1
+
+        if not lider:
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = funcion()
+            return llamada.resultado
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+            llamada.evento.set()
@@ -0,0 +1,164 @@
+from flask import Flask, Response, request
+from flask_cors import CORS
+import gzip
+import json
+import os
+import sys
+import requests
+from coalescedor import Coalescedor
+
+# Permite importar el paquete compartido 'comun' al ejecutar el servicio fuera de Docker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.escritor_xml import DECLARACION, EscritorXML, Plantilla, escapar
+from comun.lector_xml import LIMITE_BYTES
+from comun.negociacion import formato_solicitado, respuesta, responder, serializar
+
+app = Flask(__name__)
+# max_age permite al navegador reutilizar el preflight de CORS por 10 minutos
+CORS(app, max_age=600)
+app.config['MAX_CONTENT_LENGTH'] = LIMITE_BYTES
+
+# Servicios detrás del gateway; en Docker se usan los nombres de servicio
+SERVICIOS = {
+    'products': os.getenv('PRODUCTS_URL', 'http://products:5000'),
+    'pedidos': os.getenv('PEDIDOS_URL', 'http://pedidos:5000'),
+    'facturas': os.getenv('FACTURAS_URL', 'http://facturas:5000'),
+}
+TIMEOUT = float(os.getenv('GATEWAY_TIMEOUT', '30'))
+
+# Una sesión con pool de conexiones keep-alive para todos los servicios
+sesion = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=len(SERVICIOS),
+    pool_maxsize=int(os.getenv('GATEWAY_POOL', '32'))
+)
+sesion.mount('http://', _adapter)
+sesion.mount('https://', _adapter)
+
+coalescedor = Coalescedor()
+
+# Sólo se comprimen respuestas de texto de al menos este tamaño
+COMPRESION_MINIMA = int(os.getenv('GATEWAY_COMPRESION_MINIMA', '1024'))
+MIMETYPES_COMPRIMIBLES = ('application/xml', 'text/xml', 'application/json', 'text/html', 'text/plain')
+
+# Encabezados que se copian de la solicitud al servicio y de vuelta
+ENCABEZADOS_SOLICITUD = ('Content-Type', 'Accept')
+ENCABEZADOS_RESPUESTA = ('Content-Type', 'Vary')
+
+PLANTILLA_ESTADISTICAS = Plantilla('gateway', ['ejecutadas', 'agrupadas'])
+
+def llamar(servicio, metodo, ruta, cuerpo=None, encabezados=None, query=b''):
+    """Llama al servicio y regresa (status, encabezados, cuerpo) para poder compartirla"""
+    url = f"{SERVICIOS[servicio]}{ruta}"
+    if query:
+        url = f"{url}?{query.decode('latin-1')}"
+    upstream = sesion.request(metodo, url, data=cuerpo, headers=encabezados, timeout=TIMEOUT)
+    copiados = tuple((k, upstream.headers[k]) for k in ENCABEZADOS_RESPUESTA if k in upstream.headers)
+    return upstream.status_code, copiados, upstream.content
+
+def error_upstream(servicio, e):
+    return Response(f'<error>El servicio {servicio} no respondió: {escapar(str(e))}</error>', mimetype='application/xml', status=502)
+
+@app.route('/api/<servicio>', defaults={'resto': ''}, methods=['GET', 'POST', 'PUT', 'DELETE'])
+@app.route('/api/<servicio>/<path:resto>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+def proxy(servicio, resto):
+    if servicio not in SERVICIOS:
+        return Response('<error>Servicio no encontrado</error>', mimetype='application/xml', status=404)
+
+    ruta = f"/api/{servicio}/{resto}" if resto else f"/api/{servicio}"
+    encabezados = {k: request.headers[k] for k in ENCABEZADOS_SOLICITUD if k in request.headers}
+    try:
+        if request.method == 'GET' and servicio == 'products':
+            # Lecturas del catálogo idénticas y simultáneas comparten una sola llamada
+            clave = (ruta, request.query_string, encabezados.get('Accept'))
+            status, copiados, cuerpo = coalescedor.ejecutar(
+                clave, lambda: llamar(servicio, 'GET', ruta, encabezados=encabezados, query=request.query_string)
+            )
+        else:
+            status, copiados, cuerpo = llamar(
+                servicio, request.method, ruta, request.get_data(), encabezados, request.query_string
+            )
+    except requests.exceptions.RequestException as e:
+        return error_upstream(servicio, e)
+
+    return Response(cuerpo, status=status, headers=list(copiados))
+
+@app.route('/api/checkout', methods=['POST'])
+def checkout():
+    """
+    Crea el pedido y su factura en una sola solicitud del cliente.
+
+    Recibe el mismo XML que POST /api/pedidos. En XML responde
+    <checkout><pedido_id/><total/><factura>...</factura></checkout>; en JSON,
+    {"pedido": {...}, "factura": {...}}. Si facturas_service trabaja en modo
+    asíncrono la respuesta trae factura_estado en lugar de la factura, y si la
+    factura falla trae factura_error para que el cliente la pida después.
+    """
+    formato = formato_solicitado()
+    try:
+        status, copiados, cuerpo = llamar(
+            'pedidos', 'POST', '/api/pedidos', request.get_data(),
+            {'Content-Type': 'application/xml', 'Accept': 'application/json'}
+        )
+    except requests.exceptions.RequestException as e:
+        return error_upstream('pedidos', e)
+    if status != 200:
+        return Response(cuerpo, status=status, headers=list(copiados))
+
+    pedido = json.loads(cuerpo)
+    factura = None
+    if not pedido.get('factura_estado'):
+        aceptar = 'application/xml' if formato == 'xml' else 'application/json'
+        try:
+            status, _, cuerpo = llamar(
+                'facturas', 'POST', '/api/facturas',
+                f"<factura><pedido_id>{pedido['pedido_id']}</pedido_id></factura>",
+                {'Content-Type': 'application/xml', 'Accept': aceptar}
+            )
+            if status == 200:
+                factura = cuerpo
+            else:
+                pedido['factura_error'] = cuerpo.decode('utf-8', 'replace')
+        except requests.exceptions.RequestException as e:
+            pedido['factura_error'] = str(e)
+
+    if formato != 'xml':
+        datos = {'pedido': pedido, 'factura': json.loads(factura) if factura else None}
+        return respuesta(serializar(datos, None, formato), formato)
+
+    escritor = EscritorXML().abrir('checkout')
+    for campo in ('pedido_id', 'total', 'factura_estado', 'factura_error'):
+        if campo in pedido:
+            escritor.elemento(campo, pedido[campo])
+    xml = escritor.valor()
+    if factura:
+        # La factura ya viene como documento XML; se inserta sin su declaración
+        xml += factura.decode('utf-8').replace(DECLARACION, '', 1)
+    return respuesta(xml + '</checkout>', 'xml')
+
+@app.route('/gateway/estadisticas', methods=['GET'])
+def get_estadisticas():
+    datos = {'ejecutadas': coalescedor.ejecutadas, 'agrupadas': coalescedor.agrupadas}
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_ESTADISTICAS, datos).valor())
+
+@app.after_request
+def comprimir(response):
+    """Comprime con gzip las respuestas de texto si el cliente lo acepta"""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in MIMETYPES_COMPRIMIBLES
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')):
+        return response
+
+    cuerpo = response.get_data()
+    if len(cuerpo) < COMPRESION_MINIMA:
+        return response
+
+    response.set_data(gzip.compress(cuerpo, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, threaded=True)
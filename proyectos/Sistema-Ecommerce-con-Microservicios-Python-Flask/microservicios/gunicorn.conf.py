@@ -0,0 +1,47 @@
+"""
+Configuración de gunicorn compartida por products, pedidos, facturas y el
+gateway.
+
+Cada servicio corre GUNICORN_WORKERS procesos con GUNICORN_THREADS hilos cada
+uno (worker gthread). Las solicitudes pasan casi todo su tiempo esperando a
+MariaDB, así que los hilos rinden más que agregar procesos; los procesos sirven
+para usar más de un núcleo en la serialización de XML/JSON.
+
+Cada proceso tiene su propio pool de conexiones (MYSQL_POOL_TAMANO). El pool
+debe tener al menos tantas conexiones como hilos, o los hilos de más esperan
+una conexión libre. El total de conexiones a la base de datos es la suma por
+servicio de workers x MYSQL_POOL_TAMANO, más los hilos de FACTURAS_HILOS en
+facturas; debe quedar por debajo de max_connections de MariaDB (151).
+
+Con los valores por defecto (2 workers x 8 hilos, pool de 8) los tres servicios
+usan 48 conexiones. pruebas/benchmark_workers.py compara combinaciones en la
+máquina donde se despliega; ver la sección "Servidor de Producción" del Readme.
+
+El gateway no usa la base de datos: cada proceso tiene su propia sesión HTTP
+(GATEWAY_POOL) y su propio coalescedor.
+"""
+
+import os
+import secrets
+
+bind = '0.0.0.0:5000'
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# El gateway y los clientes reutilizan conexiones keep-alive
+keepalive = 5
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 10
+
+# Sin preload: cada worker importa el servicio después del fork y crea su
+# propio pool, sus cachés y (en facturas) sus hilos de la cola de trabajos
+preload_app = False
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+
+# Llave de las URLs firmadas de medios en products: sin MEDIOS_SECRETO se
+# genera una al arrancar, antes del fork, para que todos los workers firmen y
+# verifiquen con la misma
+os.environ['MEDIOS_SECRETO'] = os.getenv('MEDIOS_SECRETO') or secrets.token_hex(32)
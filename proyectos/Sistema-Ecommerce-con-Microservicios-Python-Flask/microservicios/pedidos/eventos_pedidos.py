@@ -0,0 +1,139 @@
+"""
+Eventos de pedidos_service (modo EVENTOS=1, ver comun/eventos.py).
+
+Con eventos un pedido ya no descuenta el stock en su transacción: inserta el
+pedido en estado Procesando y, en la misma transacción, el evento
+pedido_creado en pedidos_eventos_salida. products lo consume, reserva el stock
+y responde con pedido_confirmado o pedido_rechazado, que este módulo aplica
+al pedido (y, al confirmarse, a los resúmenes de ventas).
+
+pedidos_stock es el modelo de lectura del stock que publica products con
+stock_cambiado. Sólo sirve para rechazar de inmediato los pedidos que
+claramente no alcanzan; la decisión final la toma products.
+"""
+
+from comun.eventos import asegurar_salida, registrar_evento
+from reservas_stock import StockInsuficiente
+
+TABLA_SALIDA = 'pedidos_eventos_salida'
+
+PROCESANDO = 'Procesando'
+CONFIRMADO = 'Confirmado'
+RECHAZADO = 'Rechazado'
+
+SQL_CREAR_STOCK = """
+    CREATE TABLE IF NOT EXISTS pedidos_stock (
+        producto_id INT NOT NULL PRIMARY KEY,
+        stock INT NOT NULL,
+        evento_id BIGINT NOT NULL
+    ) ENGINE=InnoDB
+"""
+
+# Los eventos de un producto pueden llegar repetidos; sólo se aplica el más nuevo.
+# MariaDB asigna de izquierda a derecha: stock se compara con el evento_id anterior
+SQL_ACTUALIZAR_STOCK = """
+    INSERT INTO pedidos_stock (producto_id, stock, evento_id) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE stock = IF(VALUES(evento_id) > evento_id, VALUES(stock), stock),
+                            evento_id = GREATEST(evento_id, VALUES(evento_id))
+"""
+
+SQL_DETALLE = """
+    SELECT producto_id, SUM(cantidad) AS cantidad, MAX(precio_unitario) AS precio
+    FROM pedidos_detalle
+    WHERE pedido_id = %s
+    GROUP BY producto_id
+    ORDER BY producto_id
+"""
+
+
+def asegurar_tablas(conectar):
+    asegurar_salida(conectar, TABLA_SALIDA)
+    conexion = conectar()
+    try:
+        cur = conexion.cursor()
+        cur.execute(SQL_CREAR_STOCK)
+        cur.close()
+    finally:
+        conexion.close()
+
+
+def revisar_stock(cur, items_agrupados):
+    """Lanza StockInsuficiente si el último stock conocido no alcanza para el pedido"""
+    ids = [producto_id for producto_id, _ in items_agrupados]
+    cur.execute(
+        f"SELECT producto_id, stock FROM pedidos_stock WHERE producto_id IN ({', '.join(['%s'] * len(ids))})",
+        ids
+    )
+    conocido = {fila['producto_id']: fila['stock'] for fila in cur.fetchall()}
+    for producto_id, cantidad in items_agrupados:
+        if producto_id in conocido and conocido[producto_id] < cantidad:
+            raise StockInsuficiente(producto_id, conocido[producto_id], cantidad)
+
+
+def publicar_pedido_creado(cur, pedido_id, cliente_id, items, productos, subtotal, impuestos, total):
+    """
+    Registra pedido_creado dentro de la transacción del pedido. Lleva el cliente
+    y código, nombre y precio de cada renglón para que facturas no tenga que
+    consultarlos después.
+    """
+    cur.execute("SELECT nombre, email FROM clientes WHERE id = %s", (cliente_id,))
+    cliente = cur.fetchone() or {}
+    registrar_evento(cur, TABLA_SALIDA, 'pedido_creado', pedido_id, {
+        'pedido_id': pedido_id,
+        'cliente_id': cliente_id,
+        'cliente_nombre': cliente.get('nombre'),
+        'cliente_email': cliente.get('email'),
+        'items': [{
+            'producto_id': item['id'],
+            'codigo': productos[item['id']]['codigo'],
+            'nombre': productos[item['id']]['nombre'],
+            'cantidad': item['cantidad'],
+            'precio_unitario': productos[item['id']]['precio'],
+        } for item in items],
+        'subtotal': subtotal,
+        'impuestos': impuestos,
+        'total': total,
+    })
+
+
+def manejadores(resumen_ventas, cache_productos, registrar_resumen):
+    """Manejadores del grupo 'pedidos'"""
+
+    def stock_cambiado(cur, datos, evento_id):
+        cur.execute(SQL_ACTUALIZAR_STOCK, (datos['producto_id'], datos['stock'], evento_id))
+
+    def pedido_confirmado(cur, datos, evento_id):
+        pedido_id = datos['pedido_id']
+        cur.execute(
+            "UPDATE pedidos SET estado = %s WHERE id = %s AND estado = %s",
+            (CONFIRMADO, pedido_id, PROCESANDO)
+        )
+        # rowcount 0: evento repetido; el pedido ya se sumó a los resúmenes
+        if cur.rowcount == 0 or not registrar_resumen:
+            return
+        cur.execute("SELECT DATE(fecha) AS dia, subtotal, impuestos, total FROM pedidos WHERE id = %s", (pedido_id,))
+        pedido = cur.fetchone()
+        cur.execute(SQL_DETALLE, (pedido_id,))
+        detalle = cur.fetchall()
+        # Precio del pedido; material y marca actuales, como en la ruta síncrona
+        productos = cache_productos.obtener_varios(cur, [fila['producto_id'] for fila in detalle])
+        productos = {
+            fila['producto_id']: dict(productos.get(fila['producto_id'], {}), precio=fila['precio'])
+            for fila in detalle
+        }
+        resumen_ventas.registrar(
+            cur, pedido_id, [(fila['producto_id'], int(fila['cantidad'])) for fila in detalle], productos,
+            pedido['subtotal'], pedido['impuestos'], pedido['total'], fecha=pedido['dia']
+        )
+
+    def pedido_rechazado(cur, datos, evento_id):
+        cur.execute(
+            "UPDATE pedidos SET estado = %s WHERE id = %s AND estado = %s",
+            (RECHAZADO, datos['pedido_id'], PROCESANDO)
+        )
+
+    return {
+        'stock_cambiado': stock_cambiado,
+        'pedido_confirmado': pedido_confirmado,
+        'pedido_rechazado': pedido_rechazado,
+    }
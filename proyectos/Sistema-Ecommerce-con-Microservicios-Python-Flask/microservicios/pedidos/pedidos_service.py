@@ -1,9 +1,23 @@
 from flask import Flask, request, Response
-from flask_mysqldb import MySQL
 from flask_cors import CORS
+from datetime import date, timedelta
 from decimal import Decimal, InvalidOperation
 import os
-import xml.etree.ElementTree as ET
+import sys
+from reservas_stock import StockInsuficiente, agrupar_items, reservar_stock, ejecutar_con_reintentos
+from resumen_ventas import CAMPOS_REPORTE, ResumenVentas
+
+# Permite importar el paquete compartido 'comun' al ejecutar el servicio fuera de Docker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.base_datos import PLANTILLA_POOL, PoolMySQL
+from comun.cache_productos import PLANTILLA_ESTADISTICAS, CacheProductos
+from comun.cola_trabajos import PENDIENTE, abrir_cola
+from comun.escritor_xml import EscritorXML, Plantilla, escapar
+from comun.eventos import PLANTILLA_EVENTOS, Consumidor, abrir_broker, salida_pendiente
+from comun.lector_xml import Campo, Esquema, Lista, SolicitudInvalida, leer_xml
+from comun.negociacion import responder
+# Usan 'comun': van después de agregarlo al path
+import eventos_pedidos
 
 app = Flask(__name__)
 CORS(app)
@@ -13,102 +27,242 @@ app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'db')
 app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'raul')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '123')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'joyeria_db')
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+app.config['MYSQL_POOL_TAMANO'] = int(os.getenv('MYSQL_POOL_TAMANO', '8'))
+app.config['MYSQL_POOL_ESPERA'] = float(os.getenv('MYSQL_POOL_ESPERA', '5'))
+app.config['MYSQL_TIEMPO_SENTENCIA'] = float(os.getenv('MYSQL_TIEMPO_SENTENCIA', '10'))
+app.config['MYSQL_PREPARADAS'] = os.getenv('MYSQL_PREPARADAS', '1') == '1'
+
+# Pool de conexiones por proceso (ver comun/base_datos.py)
+mysql = PoolMySQL(app)
+
+# Caché de código, nombre, precio, material y marca de los productos (ver comun/cache_productos.py)
+cache_productos = CacheProductos(
+    ttl=int(os.getenv('CACHE_PRODUCTOS_TTL', '30')),
+    redis_url=os.getenv('REDIS_URL') or None
+)
+
+# Resúmenes diarios de ventas, actualizados en la transacción de cada pedido
+# (ver resumen_ventas.py). RESUMEN_VENTAS=0 los desactiva.
+RESUMEN_VENTAS = os.getenv('RESUMEN_VENTAS', '1') == '1'
+resumen_ventas = ResumenVentas(mysql.conectar, particiones=int(os.getenv('RESUMEN_PARTICIONES', '16')))
+PLANTILLAS_REPORTE = {por: Plantilla('renglon', campos) for por, campos in CAMPOS_REPORTE.items()}
+
+# Modo asíncrono: en lugar de que el cliente pida la factura, se encola y
+# facturas_service la genera en segundo plano (ver facturas/trabajador_facturas.py)
+FACTURAS_ASYNC = os.getenv('FACTURAS_ASYNC', '0') == '1'
+cola_facturas = None
+if FACTURAS_ASYNC:
+    cola_facturas = abrir_cola(os.getenv('COLA_FACTURAS_URL', 'sqlite:///' + os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'trabajos.db')), 'facturas')
+
+# Eventos entre servicios (ver comun/eventos.py y eventos_pedidos.py). Con
+# EVENTOS=1 el pedido no descuenta stock: publica pedido_creado y products lo
+# confirma o lo rechaza después; facturas genera sola la factura al confirmarse
+EVENTOS = os.getenv('EVENTOS', '0') == '1'
+consumidor_eventos = None
+if EVENTOS:
+    consumidor_eventos = Consumidor(
+        abrir_broker(os.getenv('BROKER_EVENTOS_URL', 'sqlite:///' + os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'eventos.db'))),
+        'pedidos', mysql.conectar, eventos_pedidos.manejadores(resumen_ventas, cache_productos, RESUMEN_VENTAS),
+        preparar=lambda: eventos_pedidos.asegurar_tablas(mysql.conectar)
+    )
 
-mysql = MySQL(app)
+# Cuerpo de create_pedido: <pedido><cliente_id/><item><id/><cantidad/></item>...</pedido>
+ESQUEMA_PEDIDO = Esquema('pedido', {
+    'cliente_id': Campo(int, requerido=True, max_longitud=10, minimo=1),
+}, listas={
+    'item': Lista('items', {
+        'id': Campo(int, requerido=True, max_longitud=10, minimo=1),
+        'cantidad': Campo(int, requerido=True, max_longitud=6, minimo=1),
+    }, maximo=200),
+})
 
 @app.route('/api/pedidos', methods=['POST'])
 def create_pedido():
     try:
-        xml_data = request.data.decode('utf-8')
-        if not xml_data:
-            return Response('<response><error>Datos XML requeridos</error></response>', mimetype='application/xml', status=400)
-
-        # Parsear XML
-        root = ET.fromstring(xml_data)
-        cliente_id = int(root.find('cliente_id').text)
-        items = []
-        for item_elem in root.findall('item'):
-            item = {
-                'id': int(item_elem.find('id').text),
-                'cantidad': int(item_elem.find('cantidad').text)
-            }
-            items.append(item)
+        # Leer el XML por bloques con límites de tamaño y sin entidades
+        data = leer_xml(request.stream, ESQUEMA_PEDIDO, request.content_length)
+        cliente_id = data['cliente_id']
+        items = data['items']
 
         if not items:
             return Response('<response><error>El carrito está vacío</error></response>', mimetype='application/xml', status=400)
 
-        subtotal = Decimal('0.0')
-        product_cache = {}  # Cache para evitar queries redundantes
-
+        items_agrupados = agrupar_items(items)
         cur = mysql.connection.cursor()
 
-        # Validar stock disponible y calcular subtotal
+        # Precios desde la caché de productos. El stock no se consulta aquí: se
+        # valida y descuenta dentro de la transacción con un UPDATE condicional
+        product_cache = cache_productos.obtener_varios(cur, [item['id'] for item in items])
+        subtotal = Decimal('0.0')
         for item in items:
-            if item['id'] not in product_cache:
-                cur.execute("SELECT precio, stock FROM products WHERE id = %s", (item['id'],))
-                product = cur.fetchone()
-                if not product:
-                    cur.close()
-                    return Response(f'<response><error>Producto con ID {item["id"]} no encontrado</error></response>', mimetype='application/xml', status=404)
-                product_cache[item['id']] = product
-
-            product = product_cache[item['id']]
-            cantidad_solicitada = Decimal(item['cantidad'])
-            stock_disponible = Decimal(product['stock'])
-
-            if cantidad_solicitada > stock_disponible:
+            product = product_cache.get(item['id'])
+            if not product:
                 cur.close()
-                return Response(f'<response><error>Stock insuficiente para producto ID {item["id"]}. Disponible: {stock_disponible}, solicitado: {cantidad_solicitada}</error></response>', mimetype='application/xml', status=400)
-
-            precio_unitario = product['precio']
-            subtotal += precio_unitario * cantidad_solicitada
+                return Response(f'<response><error>Producto con ID {item["id"]} no encontrado</error></response>', mimetype='application/xml', status=404)
+            subtotal += product['precio'] * Decimal(item['cantidad'])
 
         impuestos = subtotal * Decimal('0.16')
         total = subtotal + impuestos
 
-        # Usar transacción para atomicidad
-        cur.execute("START TRANSACTION")
+        if EVENTOS:
+            try:
+                eventos_pedidos.revisar_stock(cur, items_agrupados)
+            except StockInsuficiente as e:
+                cur.close()
+                return Response(f'<response><error>{e}</error></response>', mimetype='application/xml', status=400)
 
-        try:
-            cur.execute(
-                "INSERT INTO pedidos (cliente_id, subtotal, impuestos, total) VALUES (%s, %s, %s, %s)",
-                (cliente_id, subtotal, impuestos, total)
-            )
-            pedido_id = cur.lastrowid
-
-            # Insertar detalles del pedido y descontar stock
-            for item in items:
-                product = product_cache[item['id']]
-                precio_unitario = product['precio']
-
-                # Insertar detalle del pedido
+        def registrar_pedido():
+            # Usar transacción para atomicidad
+            cur.execute("START TRANSACTION")
+            try:
                 cur.execute(
-                    "INSERT INTO pedidos_detalle (pedido_id, producto_id, cantidad, precio_unitario) VALUES (%s, %s, %s, %s)",
-                    (pedido_id, item['id'], item['cantidad'], precio_unitario)
+                    "INSERT INTO pedidos (cliente_id, subtotal, impuestos, total) VALUES (%s, %s, %s, %s)",
+                    (cliente_id, subtotal, impuestos, total)
                 )
+                pedido_id = cur.lastrowid
 
-                # Descontar stock del producto
-                cur.execute(
-                    "UPDATE products SET stock = stock - %s WHERE id = %s",
-                    (item['cantidad'], item['id'])
-                )
+                # Insertar detalles del pedido
+                for item in items:
+                    precio_unitario = product_cache[item['id']]['precio']
+                    cur.execute(
+                        "INSERT INTO pedidos_detalle (pedido_id, producto_id, cantidad, precio_unitario) VALUES (%s, %s, %s, %s)",
+                        (pedido_id, item['id'], item['cantidad'], precio_unitario)
+                    )
 
-            cur.execute("COMMIT")
-            cur.close()
+                if EVENTOS:
+                    # products reserva el stock al consumir el evento; el pedido
+                    # se suma a los resúmenes cuando llega pedido_confirmado
+                    eventos_pedidos.publicar_pedido_creado(
+                        cur, pedido_id, cliente_id, items, product_cache, subtotal, impuestos, total
+                    )
+                    cur.execute("COMMIT")
+                    return pedido_id
+
+                # Descontar stock al final para mantener los candados de fila de
+                # los productos el menor tiempo posible antes del COMMIT
+                reservar_stock(cur, items_agrupados)
 
-            xml_response = f'<response><status>success</status><pedido_id>{pedido_id}</pedido_id><total>{float(total)}</total></response>'
-            return Response(xml_response, mimetype='application/xml')
+                if RESUMEN_VENTAS:
+                    resumen_ventas.registrar(
+                        cur, pedido_id, items_agrupados, product_cache, subtotal, impuestos, total
+                    )
 
-        except Exception as e:
-            cur.execute("ROLLBACK")
+                cur.execute("COMMIT")
+                return pedido_id
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+        try:
+            pedido_id = ejecutar_con_reintentos(registrar_pedido)
+        except StockInsuficiente as e:
+            return Response(f'<response><error>{e}</error></response>', mimetype='application/xml', status=400)
+        finally:
             cur.close()
-            raise e
 
+        datos = {'status': 'success', 'pedido_id': pedido_id, 'total': float(total)}
+        if EVENTOS:
+            # facturas encola la factura cuando products confirma el pedido
+            datos['estado'] = eventos_pedidos.PROCESANDO
+            datos['factura_estado'] = PENDIENTE
+        elif cola_facturas is not None:
+            try:
+                cola_facturas.encolar(pedido_id, {'pedido_id': pedido_id})
+                datos['factura_estado'] = PENDIENTE
+            except Exception as e:
+                # El pedido ya está confirmado; sin factura_estado el cliente
+                # la solicita directamente a facturas_service
+                print(f"No se pudo encolar la factura del pedido {pedido_id}: {e}")
+
+        def generar_xml():
+            escritor = (EscritorXML(declaracion=False).abrir('response')
+                        .elemento('status', datos['status'])
+                        .elemento('pedido_id', datos['pedido_id'])
+                        .elemento('total', datos['total']))
+            if 'estado' in datos:
+                escritor.elemento('estado', datos['estado'])
+            if 'factura_estado' in datos:
+                escritor.elemento('factura_estado', datos['factura_estado'])
+            return escritor.cerrar('response').valor()
+
+        return responder(datos, generar_xml)
+
+    except SolicitudInvalida as e:
+        return Response(f'<response><error>{escapar(str(e))}</error></response>', mimetype='application/xml', status=e.status)
     except (InvalidOperation, TypeError) as e:
         return Response(f'<response><error>Error de tipo de dato: {e}</error></response>', mimetype='application/xml', status=400)
     except Exception as e:
         return Response(f'<response><error>Error interno del servidor: {e}</error></response>', mimetype='application/xml', status=500)
 
+@app.route('/api/pedidos/reportes/ventas', methods=['GET'])
+def get_reporte_ventas():
+    """
+    Ventas de ?desde= a ?hasta= (YYYY-MM-DD, ambos incluidos; por defecto los
+    últimos 30 días) agrupadas por ?por=dia|producto|material|marca. Se leen de
+    los resúmenes diarios, no de los pedidos.
+    """
+    try:
+        por = request.args.get('por', 'dia')
+        if por not in CAMPOS_REPORTE:
+            return Response('<response><error>por debe ser dia, producto, material o marca</error></response>', mimetype='application/xml', status=400)
+        try:
+            hasta = date.fromisoformat(request.args['hasta']) if 'hasta' in request.args else date.today()
+            desde = date.fromisoformat(request.args['desde']) if 'desde' in request.args else hasta - timedelta(days=29)
+        except ValueError:
+            return Response('<response><error>Las fechas deben tener el formato YYYY-MM-DD</error></response>', mimetype='application/xml', status=400)
+        if desde > hasta:
+            return Response('<response><error>desde no puede ser posterior a hasta</error></response>', mimetype='application/xml', status=400)
+
+        cur = mysql.connection.cursor()
+        renglones = resumen_ventas.consultar(cur, por, desde, hasta)
+        cur.close()
+
+        datos = {'por': por, 'desde': desde, 'hasta': hasta, 'renglones': renglones}
+
+        def generar_xml():
+            return (EscritorXML().abrir('reporte_ventas')
+                    .elemento('por', por).elemento('desde', desde).elemento('hasta', hasta)
+                    .abrir('renglones').registros(PLANTILLAS_REPORTE[por], renglones).cerrar('renglones')
+                    .cerrar('reporte_ventas').valor())
+
+        return responder(datos, generar_xml)
+
+    except Exception as e:
+        return Response(f'<response><error>Error interno del servidor: {e}</error></response>', mimetype='application/xml', status=500)
+
+@app.route('/api/pedidos/cache/productos', methods=['GET'])
+def get_estadisticas_cache():
+    """Aciertos y fallos de la caché de productos de este proceso"""
+    datos = cache_productos.estadisticas()
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_ESTADISTICAS, datos).valor())
+
+@app.route('/api/pedidos/db/pool', methods=['GET'])
+def get_estadisticas_pool():
+    """Uso del pool de conexiones de este proceso"""
+    datos = mysql.estadisticas()
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_POOL, datos).valor())
+
+@app.route('/api/pedidos/eventos', methods=['GET'])
+def get_estadisticas_eventos():
+    """Eventos sin publicar en la tabla de salida y avance del consumidor de pedidos"""
+    try:
+        datos = {'activo': EVENTOS}
+        if EVENTOS:
+            cur = mysql.connection.cursor()
+            datos['salida_pendiente'] = salida_pendiente(cur, eventos_pedidos.TABLA_SALIDA)
+            cur.close()
+            datos.update(consumidor_eventos.estadisticas())
+        return responder(datos, lambda: EscritorXML().registro(PLANTILLA_EVENTOS, datos).valor())
+
+    except Exception as e:
+        return Response(f'<response><error>Error interno del servidor: {e}</error></response>', mimetype='application/xml', status=500)
+
+# Con el recargador de Flask el consumidor sólo arranca en el proceso que
+# atiende solicitudes (o cuando lo importa gunicorn)
+if EVENTOS and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    consumidor_eventos.iniciar()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,88 @@
+"""
+Reserva de stock segura ante concurrencia para el servicio de pedidos.
+
+En lugar de validar con un SELECT y descontar después, cada renglón se descuenta
+con un UPDATE condicional (stock >= cantidad). El UPDATE toma el candado de la
+fila del producto e InnoDB lo mantiene hasta el COMMIT (o ROLLBACK) de toda la
+transacción del pedido, no sólo mientras dura la sentencia. Así dos pedidos del
+mismo producto nunca pueden dejar el stock en negativo: el segundo espera a que
+el primero termine. Los pedidos de productos distintos no se bloquean entre sí,
+y mientras más corta sea la transacción del pedido, menos esperan los que
+compiten por el mismo producto.
+"""
+
+import random
+import time
+
+# Códigos de error de MySQL/MariaDB que indican que la transacción puede reintentarse
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+ERRORES_REINTENTABLES = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+
+class StockInsuficiente(Exception):
+    """Se lanza cuando un producto no tiene stock suficiente para el pedido."""
+
+    def __init__(self, producto_id, disponible, solicitado):
+        self.producto_id = producto_id
+        self.disponible = disponible
+        self.solicitado = solicitado
+        super().__init__(
+            f'Stock insuficiente para producto ID {producto_id}. '
+            f'Disponible: {disponible}, solicitado: {solicitado}'
+        )
+
+
+def agrupar_items(items):
+    """
+    Suma las cantidades por producto y las ordena por ID.
+
+    Ordenar por ID hace que todas las transacciones tomen los candados de fila
+    en el mismo orden, lo que evita la mayoría de los deadlocks entre pedidos
+    con varios productos en común.
+    """
+    cantidades = {}
+    for item in items:
+        cantidades[item['id']] = cantidades.get(item['id'], 0) + item['cantidad']
+    return sorted(cantidades.items())
+
+
+def reservar_stock(cur, items_agrupados):
+    """
+    Descuenta el stock de cada producto dentro de la transacción activa.
+
+    Si algún producto no alcanza, lanza StockInsuficiente; quien llama debe
+    hacer ROLLBACK para liberar lo que ya se haya descontado.
+    """
+    for producto_id, cantidad in items_agrupados:
+        cur.execute(
+            "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s",
+            (cantidad, producto_id, cantidad)
+        )
+        if cur.rowcount == 0:
+            cur.execute("SELECT stock FROM products WHERE id = %s", (producto_id,))
+            fila = cur.fetchone()
+            disponible = fila['stock'] if fila else 0
+            raise StockInsuficiente(producto_id, disponible, cantidad)
+
+
+def es_reintentable(error):
+    """Indica si el error de la base de datos fue un deadlock o un timeout de candado."""
+    args = getattr(error, 'args', ())
+    return bool(args) and args[0] in ERRORES_REINTENTABLES
+
+
+def ejecutar_con_reintentos(operacion, intentos=3, espera_base=0.02):
+    """
+    Ejecuta operacion() y la repite si la base de datos reporta un deadlock.
+
+    La espera crece exponencialmente con un poco de aleatoriedad para que las
+    transacciones que chocaron no vuelvan a intentar exactamente al mismo tiempo.
+    """
+    for intento in range(intentos):
+        try:
+            return operacion()
+        except Exception as e:
+            if not es_reintentable(e) or intento == intentos - 1:
+                raise
+            time.sleep(espera_base * (2 ** intento) * (1 + random.random()))
@@ -0,0 +1,210 @@
+"""
+Resúmenes diarios de ventas que se actualizan con cada pedido.
+
+En lugar de recorrer pedidos y pedidos_detalle para cada reporte, pedidos_service
+suma cada pedido a dos tablas de agregados dentro de la misma transacción que lo
+inserta, así que los resúmenes nunca quedan a medias ni adelantados:
+
+- ventas_diarias: una fila por día y producto con unidades, importe (sin
+  impuestos) y número de pedidos. Guarda el material y la marca que tenía el
+  producto en la primera venta del día para agrupar sin consultar products.
+- ventas_diarias_totales: pedidos, subtotal, impuestos y total por día. Todos
+  los pedidos de un día suman en el mismo día, así que la fila se reparte en
+  `particiones` filas (pedido_id % particiones) para que los pedidos simultáneos
+  no se formen detrás de un solo candado.
+
+Un reporte lee a lo más (días del rango) x (productos vendidos) filas sin
+importar cuántos pedidos haya.
+"""
+
+import threading
+
+SQL_CREAR_TABLAS = (
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias (
+        fecha DATE NOT NULL,
+        producto_id INT NOT NULL,
+        material VARCHAR(50) NOT NULL DEFAULT '',
+        marca VARCHAR(50) NOT NULL DEFAULT '',
+        unidades INT NOT NULL,
+        importe DECIMAL(14,2) NOT NULL,
+        pedidos INT NOT NULL,
+        PRIMARY KEY (fecha, producto_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ventas_diarias_totales (
+        fecha DATE NOT NULL,
+        particion TINYINT NOT NULL,
+        pedidos INT NOT NULL,
+        subtotal DECIMAL(14,2) NOT NULL,
+        impuestos DECIMAL(14,2) NOT NULL,
+        total DECIMAL(14,2) NOT NULL,
+        PRIMARY KEY (fecha, particion)
+    ) ENGINE=InnoDB
+    """,
+)
+
+SQL_SUMAR_PRODUCTOS = """
+    INSERT INTO ventas_diarias (fecha, producto_id, material, marca, unidades, importe, pedidos)
+    VALUES {}
+    ON DUPLICATE KEY UPDATE unidades = unidades + VALUES(unidades),
+                            importe = importe + VALUES(importe),
+                            pedidos = pedidos + VALUES(pedidos)
+"""
+
+SQL_SUMAR_TOTALES = """
+    INSERT INTO ventas_diarias_totales (fecha, particion, pedidos, subtotal, impuestos, total)
+    VALUES ({}, %s, 1, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE pedidos = pedidos + 1,
+                            subtotal = subtotal + VALUES(subtotal),
+                            impuestos = impuestos + VALUES(impuestos),
+                            total = total + VALUES(total)
+"""
+
+# Suma a los resúmenes los pedidos con id en un rango; sirve para sembrar las
+# tablas con los pedidos que ya existían y para cargas masivas de datos
+SQL_ACUMULAR_PRODUCTOS = """
+    INSERT INTO ventas_diarias (fecha, producto_id, material, marca, unidades, importe, pedidos)
+    SELECT DATE(p.fecha), d.producto_id, COALESCE(pr.material, ''), COALESCE(pr.marca, ''),
+           SUM(d.cantidad), SUM(d.cantidad * d.precio_unitario), COUNT(DISTINCT d.pedido_id)
+    FROM pedidos p
+    JOIN pedidos_detalle d ON d.pedido_id = p.id
+    LEFT JOIN products pr ON pr.id = d.producto_id
+    WHERE p.id BETWEEN %s AND %s
+    GROUP BY DATE(p.fecha), d.producto_id
+    ON DUPLICATE KEY UPDATE unidades = unidades + VALUES(unidades),
+                            importe = importe + VALUES(importe),
+                            pedidos = pedidos + VALUES(pedidos)
+"""
+
+SQL_ACUMULAR_TOTALES = """
+    INSERT INTO ventas_diarias_totales (fecha, particion, pedidos, subtotal, impuestos, total)
+    SELECT DATE(fecha), id %% %s, COUNT(*), SUM(subtotal), SUM(impuestos), SUM(total)
+    FROM pedidos
+    WHERE id BETWEEN %s AND %s
+    GROUP BY DATE(fecha), id %% %s
+    ON DUPLICATE KEY UPDATE pedidos = pedidos + VALUES(pedidos),
+                            subtotal = subtotal + VALUES(subtotal),
+                            impuestos = impuestos + VALUES(impuestos),
+                            total = total + VALUES(total)
+"""
+
+# Consultas de los reportes; todas reciben (desde, hasta)
+CONSULTAS = {
+    'dia': """
+        SELECT fecha, SUM(pedidos) AS pedidos, SUM(subtotal) AS subtotal,
+               SUM(impuestos) AS impuestos, SUM(total) AS total
+        FROM ventas_diarias_totales
+        WHERE fecha BETWEEN %s AND %s
+        GROUP BY fecha
+        ORDER BY fecha
+    """,
+    'producto': """
+        SELECT producto_id, SUM(unidades) AS unidades, SUM(importe) AS importe, SUM(pedidos) AS pedidos
+        FROM ventas_diarias
+        WHERE fecha BETWEEN %s AND %s
+        GROUP BY producto_id
+        ORDER BY importe DESC
+    """,
+    'material': """
+        SELECT material, SUM(unidades) AS unidades, SUM(importe) AS importe, SUM(pedidos) AS pedidos
+        FROM ventas_diarias
+        WHERE fecha BETWEEN %s AND %s
+        GROUP BY material
+        ORDER BY importe DESC
+    """,
+    'marca': """
+        SELECT marca, SUM(unidades) AS unidades, SUM(importe) AS importe, SUM(pedidos) AS pedidos
+        FROM ventas_diarias
+        WHERE fecha BETWEEN %s AND %s
+        GROUP BY marca
+        ORDER BY importe DESC
+    """,
+}
+
+# Campos de cada renglón del reporte según la agrupación
+CAMPOS_REPORTE = {
+    'dia': ['fecha', 'pedidos', 'subtotal', 'impuestos', 'total'],
+    'producto': ['producto_id', 'unidades', 'importe', 'pedidos'],
+    'material': ['material', 'unidades', 'importe', 'pedidos'],
+    'marca': ['marca', 'unidades', 'importe', 'pedidos'],
+}
+
+
+class ResumenVentas:
+    """Mantiene y consulta las tablas ventas_diarias y ventas_diarias_totales."""
+
+    def __init__(self, conectar, particiones=16):
+        """
+        Args:
+            conectar: función que abre una conexión nueva a la base de datos;
+                se usa para crear y sembrar las tablas la primera vez.
+            particiones: filas por día en ventas_diarias_totales.
+        """
+        self.conectar = conectar
+        self.particiones = particiones
+        self._lock = threading.Lock()
+        self._tablas_listas = False
+
+    def asegurar_tablas(self):
+        """Crea las tablas si no existen y, si las creó, suma los pedidos previos."""
+        if self._tablas_listas:
+            return
+        with self._lock:
+            if self._tablas_listas:
+                return
+            conexion = self.conectar()
+            try:
+                cur = conexion.cursor()
+                cur.execute("SHOW TABLES LIKE 'ventas_diarias_totales'")
+                existian = cur.fetchone() is not None
+                for sql in SQL_CREAR_TABLAS:
+                    cur.execute(sql)
+                if not existian:
+                    cur.execute("SELECT COALESCE(MAX(id), 0) AS ultimo FROM pedidos")
+                    self.acumular(cur, 1, cur.fetchone()['ultimo'])
+                conexion.commit()
+                cur.close()
+            finally:
+                conexion.close()
+            self._tablas_listas = True
+
+    def registrar(self, cur, pedido_id, items_agrupados, productos, subtotal, impuestos, total, fecha=None):
+        """
+        Suma un pedido a los resúmenes del día. Debe llamarse dentro de la
+        transacción del pedido, después de reservar el stock.
+
+        Args:
+            items_agrupados: [(producto_id, cantidad)] ordenados por producto
+                (ver reservas_stock.agrupar_items), para tomar los candados de
+                las filas en el mismo orden en todas las transacciones.
+            productos: {producto_id: producto} con precio, material y marca.
+            fecha: día al que se suma el pedido; por defecto el día actual de
+                la base de datos.
+        """
+        self.asegurar_tablas()
+        dia = 'CURDATE()' if fecha is None else '%s'
+        inicio = [] if fecha is None else [fecha]
+        valores = []
+        for producto_id, cantidad in items_agrupados:
+            producto = productos[producto_id]
+            valores.extend(inicio)
+            valores.extend((
+                producto_id, producto.get('material') or '', producto.get('marca') or '',
+                cantidad, producto['precio'] * cantidad
+            ))
+        renglones = ', '.join([f'({dia}, %s, %s, %s, %s, %s, 1)'] * len(items_agrupados))
+        cur.execute(SQL_SUMAR_PRODUCTOS.format(renglones), valores)
+        cur.execute(SQL_SUMAR_TOTALES.format(dia), inicio + [pedido_id % self.particiones, subtotal, impuestos, total])
+
+    def acumular(self, cur, desde_id, hasta_id):
+        """Suma a los resúmenes los pedidos con id entre desde_id y hasta_id."""
+        cur.execute(SQL_ACUMULAR_PRODUCTOS, (desde_id, hasta_id))
+        cur.execute(SQL_ACUMULAR_TOTALES, (self.particiones, desde_id, hasta_id, self.particiones))
+
+    def consultar(self, cur, por, desde, hasta):
+        """Renglones del reporte agrupado por dia, producto, material o marca."""
+        self.asegurar_tablas()
+        cur.execute(CONSULTAS[por], (desde, hasta))
+        return cur.fetchall()
@@ -0,0 +1,173 @@
+"""
+Almacenamiento de las imágenes de productos.
+
+Los archivos se suben directo al almacén con URLs firmadas, como en
+bucket-tarea: el servicio sólo entrega la URL y el navegador hace el PUT, así
+que products no recibe los originales en sus workers.
+
+- AlmacenS3: bucket de S3 con generate_presigned_url (put_object por 5
+  minutos, get_object por una hora). Necesita boto3.
+- AlmacenLocal: directorio local que hace las veces del bucket en desarrollo y
+  en docker-compose. Las URLs de subida apuntan a products
+  (PUT /api/products/medios/<clave>) y llevan expiración y firma HMAC, así que
+  valen lo mismo que una URL prefirmada de S3.
+
+abrir_almacen elige según MEDIOS_URL: s3://bucket/prefijo o file:///ruta.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from urllib.parse import quote, urlencode, urlparse
+
+try:
+    import boto3
+except ImportError:  # boto3 sólo hace falta con MEDIOS_URL=s3://...
+    boto3 = None
+
+EXPIRA_SUBIDA = 300
+EXPIRA_LECTURA = 3600
+
+
+class FirmaInvalida(Exception):
+    """URL de subida vencida o con firma que no corresponde."""
+
+
+def _escribir(ruta, contenido):
+    """Escribe de forma atómica: otro hilo o worker pudo generar el mismo archivo"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+class AlmacenLocal:
+
+    def __init__(self, directorio, url_publica, secreto):
+        """
+        Args:
+            directorio: raíz de los archivos.
+            url_publica: URL con la que el navegador llega a
+                /api/products/medios (p. ej. http://localhost:5001/api/products/medios).
+            secreto: llave de las firmas; debe ser la misma en todos los workers.
+        """
+        self.directorio = os.path.abspath(directorio)
+        self.url_publica = url_publica.rstrip('/')
+        self.secreto = secreto.encode('utf-8')
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def ruta(self, clave):
+        """Ruta del archivo; None si la clave intenta salir del directorio"""
+        ruta = os.path.abspath(os.path.join(self.directorio, clave))
+        if not ruta.startswith(self.directorio + os.sep):
+            return None
+        return ruta
+
+    def _firma(self, metodo, clave, expira):
+        mensaje = f'{metodo}\n{clave}\n{expira}'.encode('utf-8')
+        return hmac.new(self.secreto, mensaje, hashlib.sha256).hexdigest()
+
+    def url_subida(self, clave, tipo):
+        expira = int(time.time()) + EXPIRA_SUBIDA
+        consulta = urlencode({'expira': expira, 'firma': self._firma('PUT', clave, expira)})
+        return f'{self.url_publica}/{quote(clave)}?{consulta}'
+
+    def verificar_subida(self, clave, expira, firma):
+        try:
+            expira = int(expira)
+        except (TypeError, ValueError):
+            raise FirmaInvalida('URL de subida inválida')
+        if expira < time.time():
+            raise FirmaInvalida('La URL de subida ya venció')
+        if not hmac.compare_digest(self._firma('PUT', clave, expira), firma or ''):
+            raise FirmaInvalida('Firma inválida')
+
+    def url_lectura(self, clave):
+        # products entrega el archivo; las claves con hash no cambian nunca
+        return f'{self.url_publica}/{quote(clave)}'
+
+    def existe(self, clave):
+        ruta = self.ruta(clave)
+        return ruta is not None and os.path.isfile(ruta)
+
+    def leer(self, clave):
+        with open(self.ruta(clave), 'rb') as f:
+            return f.read()
+
+    def guardar(self, clave, contenido, tipo):
+        _escribir(self.ruta(clave), contenido)
+
+    def borrar(self, clave):
+        try:
+            os.remove(self.ruta(clave))
+        except FileNotFoundError:
+            pass
+
+
+class AlmacenS3:
+
+    def __init__(self, bucket, prefijo='', url_publica=''):
+        """
+        Args:
+            bucket: nombre del bucket.
+            prefijo: carpeta dentro del bucket.
+            url_publica: base pública (CloudFront o bucket público). Sin ella
+                las lecturas usan URLs prefirmadas de una hora.
+        """
+        if boto3 is None:
+            raise RuntimeError('MEDIOS_URL=s3://... requiere el paquete boto3')
+        self.bucket = bucket
+        self.prefijo = prefijo.strip('/')
+        self.url_publica = url_publica.rstrip('/')
+        # Credenciales de AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, como en bucket-tarea
+        self.s3 = boto3.client('s3')
+
+    def _llave(self, clave):
+        return f'{self.prefijo}/{clave}' if self.prefijo else clave
+
+    def url_subida(self, clave, tipo):
+        return self.s3.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket, 'Key': self._llave(clave), 'ContentType': tipo},
+            ExpiresIn=EXPIRA_SUBIDA
+        )
+
+    def url_lectura(self, clave):
+        if self.url_publica:
+            return f'{self.url_publica}/{quote(self._llave(clave))}'
+        return self.s3.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._llave(clave)}, ExpiresIn=EXPIRA_LECTURA
+        )
+
+    def existe(self, clave):
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=self._llave(clave))
+            return True
+        except self.s3.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def leer(self, clave):
+        return self.s3.get_object(Bucket=self.bucket, Key=self._llave(clave))['Body'].read()
+
+    def guardar(self, clave, contenido, tipo):
+        # Contenido direccionado por hash: se puede guardar en caché para siempre
+        self.s3.put_object(Bucket=self.bucket, Key=self._llave(clave), Body=contenido, ContentType=tipo,
+                           CacheControl='public, max-age=31536000, immutable')
+
+    def borrar(self, clave):
+        self.s3.delete_object(Bucket=self.bucket, Key=self._llave(clave))
+
+
+def abrir_almacen(url, url_publica, secreto):
+    """AlmacenS3 para s3://bucket/prefijo; AlmacenLocal para file:///ruta"""
+    partes = urlparse(url)
+    if partes.scheme == 's3':
+        return AlmacenS3(partes.netloc, partes.path, url_publica)
+    if partes.scheme == 'file':
+        return AlmacenLocal(partes.path, url_publica, secreto)
+    raise ValueError(f'MEDIOS_URL no soportada: {url}')
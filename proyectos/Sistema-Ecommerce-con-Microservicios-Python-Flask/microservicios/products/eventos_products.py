@@ -0,0 +1,85 @@
+"""
+Eventos de products_service (modo EVENTOS=1, ver comun/eventos.py).
+
+products es el único servicio que escribe el stock. Consume pedido_creado,
+descuenta el stock de los productos del pedido y publica, en la misma
+transacción, stock_cambiado por cada producto y pedido_confirmado o
+pedido_rechazado. Como un solo consumidor aplica los pedidos uno tras otro,
+los pedidos simultáneos ya no se forman detrás de los candados de las filas
+de products: pedidos_service sólo inserta en sus propias tablas.
+"""
+
+from comun.eventos import asegurar_salida, registrar_evento
+
+TABLA_SALIDA = 'products_eventos_salida'
+
+# Pedidos ya aplicados; hace idempotente la reserva si el evento llega dos veces
+SQL_CREAR_RESERVAS = """
+    CREATE TABLE IF NOT EXISTS products_reservas (
+        pedido_id INT NOT NULL PRIMARY KEY,
+        aceptada TINYINT(1) NOT NULL DEFAULT 0,
+        procesada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+
+def asegurar_tablas(conectar):
+    asegurar_salida(conectar, TABLA_SALIDA)
+    conexion = conectar()
+    try:
+        cur = conexion.cursor()
+        cur.execute(SQL_CREAR_RESERVAS)
+        cur.close()
+    finally:
+        conexion.close()
+
+
+def publicar_stock(cur, ids):
+    """Registra stock_cambiado con el stock actual de cada producto"""
+    if not ids:
+        return
+    cur.execute(
+        f"SELECT id, stock FROM products WHERE id IN ({', '.join(['%s'] * len(ids))}) ORDER BY id",
+        list(ids)
+    )
+    for fila in cur.fetchall():
+        registrar_evento(cur, TABLA_SALIDA, 'stock_cambiado', fila['id'],
+                         {'producto_id': fila['id'], 'stock': fila['stock']})
+
+
+def reservar_pedido(cur, datos, evento_id):
+    """Manejador de pedido_creado: descuenta el stock o rechaza el pedido completo"""
+    pedido_id = datos['pedido_id']
+    cur.execute("INSERT IGNORE INTO products_reservas (pedido_id) VALUES (%s)", (pedido_id,))
+    if cur.rowcount == 0:
+        return  # evento repetido
+
+    cantidades = {}
+    for item in datos['items']:
+        cantidades[item['producto_id']] = cantidades.get(item['producto_id'], 0) + item['cantidad']
+
+    # El savepoint deshace sólo este pedido; los demás eventos del lote siguen
+    cur.execute("SAVEPOINT reserva")
+    for producto_id, cantidad in sorted(cantidades.items()):
+        cur.execute(
+            "UPDATE products SET stock = stock - %s WHERE id = %s AND stock >= %s",
+            (cantidad, producto_id, cantidad)
+        )
+        if cur.rowcount == 0:
+            cur.execute("ROLLBACK TO SAVEPOINT reserva")
+            cur.execute("SELECT stock FROM products WHERE id = %s", (producto_id,))
+            fila = cur.fetchone()
+            disponible = fila['stock'] if fila else 0
+            registrar_evento(cur, TABLA_SALIDA, 'pedido_rechazado', pedido_id, {
+                'pedido_id': pedido_id,
+                'motivo': (f'Stock insuficiente para producto ID {producto_id}. '
+                           f'Disponible: {disponible}, solicitado: {cantidad}'),
+            })
+            return
+
+    cur.execute("UPDATE products_reservas SET aceptada = 1 WHERE pedido_id = %s", (pedido_id,))
+    publicar_stock(cur, sorted(cantidades))
+    registrar_evento(cur, TABLA_SALIDA, 'pedido_confirmado', pedido_id, {'pedido_id': pedido_id})
+
+
+MANEJADORES = {'pedido_creado': reservar_pedido}
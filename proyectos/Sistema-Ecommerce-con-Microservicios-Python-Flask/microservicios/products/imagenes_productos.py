@@ -0,0 +1,312 @@
+"""
+Imágenes de productos y sus miniaturas.
+
+Flujo de una imagen:
+
+1. POST /api/products/<id>/imagen/subida regresa una URL firmada (ver
+   almacen_medios.py) para subir el original a subidas/<uuid>.
+2. El navegador hace el PUT directo al almacén.
+3. POST /api/products/<id>/imagen con la clave de la subida deja la imagen
+   del producto en estado 'pendiente' y encola el trabajo en la cola
+   'miniaturas' (comun/cola_trabajos.py).
+4. TrabajadorMiniaturas, un pool de hilos, lee la subida, calcula su sha256,
+   guarda el original y una miniatura por cada ancho de ANCHOS, y marca la
+   imagen como 'lista'.
+
+Caché direccionada por contenido: el original queda en
+originales/<hash>.<ext> y las miniaturas en miniaturas/<hash>/<ancho>.<ext>.
+La misma imagen subida dos veces (o usada en varios productos) se procesa una
+sola vez, y como una clave nunca cambia de contenido se sirve con caché
+inmutable. Cambiar la imagen de un producto cambia su hash y, con él, las URLs.
+
+El XML y el JSON de productos llevan imagen (original), miniatura (el ancho
+más chico) y srcset con todos los anchos para <img srcset>. La imagen
+anterior del producto se sigue mostrando mientras la nueva está pendiente.
+
+Las miniaturas se generan con Pillow; redimensionar y codificar sueltan el GIL,
+así que los hilos del pool sí trabajan en paralelo.
+"""
+
+import hashlib
+import io
+import json
+import threading
+import uuid
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow sólo hace falta para generar miniaturas
+    Image = None
+
+from comun.trabajador_cola import TrabajadorCola
+
+# Anchos de las miniaturas; cubren la tarjeta del catálogo en pantallas 1x a 3x
+ANCHOS = (160, 320, 640)
+CALIDAD = 80
+# Límite contra imágenes que se descomprimen a gigabytes
+MAX_PIXELES = 40_000_000
+ORIENTACION = 0x0112
+
+# Formatos aceptados para el original: formato de Pillow -> (extensión, tipo)
+FORMATOS = {
+    'JPEG': ('jpg', 'image/jpeg'),
+    'PNG': ('png', 'image/png'),
+    'WEBP': ('webp', 'image/webp'),
+}
+TIPOS_SUBIDA = {tipo for _, tipo in FORMATOS.values()}
+
+PENDIENTE = 'pendiente'
+LISTA = 'lista'
+FALLIDA = 'fallida'
+
+SQL_CREAR_TABLA = """
+    CREATE TABLE IF NOT EXISTS products_imagenes (
+        producto_id INT NOT NULL PRIMARY KEY,
+        hash CHAR(64) DEFAULT NULL,
+        formato VARCHAR(10) DEFAULT NULL,
+        formato_miniatura VARCHAR(10) DEFAULT NULL,
+        ancho INT DEFAULT NULL,
+        alto INT DEFAULT NULL,
+        estado VARCHAR(20) NOT NULL,
+        subida VARCHAR(100) DEFAULT NULL,
+        error VARCHAR(255) DEFAULT NULL,
+        actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        KEY hash (hash)
+    ) ENGINE=InnoDB
+"""
+
+# Columnas que se agregan a los SELECT de productos (LEFT JOIN products_imagenes i)
+COLUMNAS_IMAGEN = (
+    "i.hash AS imagen_hash, i.formato AS imagen_formato, "
+    "i.formato_miniatura AS imagen_miniatura, i.ancho AS imagen_ancho"
+)
+CAMPOS_IMAGEN = ['imagen', 'miniatura', 'srcset']
+
+CAMPOS_ESTADO = ['producto_id', 'estado', 'hash', 'ancho', 'alto', 'error'] + CAMPOS_IMAGEN
+
+
+class ImagenInvalida(Exception):
+    """El archivo no es una imagen aceptada; reintentar no lo corrige."""
+
+
+def clave_original(huella, formato):
+    return f'originales/{huella[:2]}/{huella}.{formato}'
+
+
+def clave_miniatura(huella, ancho, formato):
+    return f'miniaturas/{huella[:2]}/{huella}/{ancho}.{formato}'
+
+
+def anchos_de(ancho_original):
+    """Anchos que se generan: nunca más anchos que el original"""
+    return [ancho for ancho in ANCHOS if ancho <= ancho_original] or [ancho_original]
+
+
+def formato_miniaturas():
+    """WebP pesa ~30% menos que JPEG a igual calidad; JPEG si Pillow no trae libwebp"""
+    if features.check('webp'):
+        return 'webp', 'WEBP', 'image/webp'
+    return 'jpg', 'JPEG', 'image/jpeg'
+
+
+def generar_miniaturas(contenido):
+    """
+    Decodifica el original y genera sus miniaturas.
+
+    Returns:
+        dict con formato y tipo del original, ancho, alto, formato_miniatura,
+        tipo_miniatura y miniaturas {ancho: bytes}.
+
+    Raises:
+        ImagenInvalida: si no es JPEG, PNG o WebP o si es demasiado grande.
+    """
+    if Image is None:
+        raise RuntimeError('Generar miniaturas requiere el paquete Pillow')
+    try:
+        imagen = Image.open(io.BytesIO(contenido))
+        if imagen.format not in FORMATOS:
+            raise ImagenInvalida(f'Formato no soportado: {imagen.format}')
+        if imagen.width * imagen.height > MAX_PIXELES:
+            raise ImagenInvalida(f'Imagen demasiado grande: {imagen.width}x{imagen.height}')
+        formato, tipo = FORMATOS[imagen.format]
+        # Tamaño ya con la orientación de EXIF: 5 a 8 giran la imagen 90 grados
+        ancho, alto = imagen.size
+        if imagen.getexif().get(ORIENTACION, 1) in (5, 6, 7, 8):
+            ancho, alto = alto, ancho
+        # JPEG puede decodificarse directo a 1/2, 1/4 u 1/8 del tamaño sin
+        # bajar del ancho mayor: mucho más rápido que decodificarlo completo
+        if imagen.format == 'JPEG':
+            imagen.draft('RGB', (max(ANCHOS), max(ANCHOS)))
+        imagen = ImageOps.exif_transpose(imagen)
+    except ImagenInvalida:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ImagenInvalida(f'Imagen inválida: {e}')
+
+    extension, formato_pillow, tipo_miniatura = formato_miniaturas()
+    modo = 'RGBA' if formato_pillow == 'WEBP' and imagen.mode in ('RGBA', 'LA', 'P') else 'RGB'
+    imagen = imagen.convert(modo)
+
+    miniaturas = {}
+    for destino in sorted(anchos_de(ancho), reverse=True):
+        # Cada miniatura sale de la anterior, ya más chica que el original
+        reducida = imagen.resize((destino, max(1, round(alto * destino / ancho))), Image.LANCZOS, reducing_gap=3.0)
+        salida = io.BytesIO()
+        if formato_pillow == 'WEBP':
+            reducida.save(salida, 'WEBP', quality=CALIDAD, method=4)
+        else:
+            reducida.save(salida, 'JPEG', quality=CALIDAD, optimize=True, progressive=True)
+        miniaturas[destino] = salida.getvalue()
+        imagen = reducida
+    return {
+        'formato': formato,
+        'tipo': tipo,
+        'ancho': ancho,
+        'alto': alto,
+        'formato_miniatura': extension,
+        'tipo_miniatura': tipo_miniatura,
+        'miniaturas': miniaturas,
+    }
+
+
+class ImagenesProductos:
+    """Tabla products_imagenes, URLs de las imágenes y procesamiento de subidas."""
+
+    def __init__(self, almacen, conectar):
+        """
+        Args:
+            almacen: AlmacenLocal o AlmacenS3 (ver almacen_medios.py).
+            conectar: función que abre una conexión nueva a la base de datos;
+                se usa para crear la tabla la primera vez.
+        """
+        self.almacen = almacen
+        self.conectar = conectar
+        self._lock = threading.Lock()
+        self._tablas_listas = False
+
+    def asegurar_tablas(self):
+        if self._tablas_listas:
+            return
+        with self._lock:
+            if self._tablas_listas:
+                return
+            conexion = self.conectar()
+            try:
+                cur = conexion.cursor()
+                cur.execute(SQL_CREAR_TABLA)
+                cur.close()
+            finally:
+                conexion.close()
+            self._tablas_listas = True
+
+    def urls(self, huella, formato, formato_miniatura, ancho):
+        if not huella:
+            return dict.fromkeys(CAMPOS_IMAGEN)
+        anchos = anchos_de(ancho)
+        miniaturas = [(a, self.almacen.url_lectura(clave_miniatura(huella, a, formato_miniatura))) for a in anchos]
+        return {
+            'imagen': self.almacen.url_lectura(clave_original(huella, formato)),
+            'miniatura': miniaturas[0][1],
+            'srcset': ', '.join(f'{url} {a}w' for a, url in miniaturas),
+        }
+
+    def agregar_urls(self, productos):
+        """Cambia las columnas COLUMNAS_IMAGEN de cada producto por CAMPOS_IMAGEN"""
+        for producto in [productos] if isinstance(productos, dict) else productos:
+            producto.update(self.urls(
+                producto.pop('imagen_hash'), producto.pop('imagen_formato'),
+                producto.pop('imagen_miniatura'), producto.pop('imagen_ancho')
+            ))
+        return productos
+
+    def nueva_subida(self, producto_id, tipo):
+        """Clave y URL firmada para que el navegador suba el original"""
+        clave = f'subidas/{producto_id}/{uuid.uuid4().hex}'
+        return {'clave': clave, 'tipo': tipo, 'url': self.almacen.url_subida(clave, tipo)}
+
+    def registrar(self, cur, producto_id, subida):
+        """Deja la imagen en estado pendiente; False si la subida no es de este producto o no existe"""
+        if not subida.startswith(f'subidas/{producto_id}/') or not self.almacen.existe(subida):
+            return False
+        cur.execute("""
+            INSERT INTO products_imagenes (producto_id, estado, subida) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE estado = VALUES(estado), subida = VALUES(subida), error = NULL
+        """, (producto_id, PENDIENTE, subida))
+        return True
+
+    def estado(self, cur, producto_id):
+        cur.execute("""
+            SELECT producto_id, estado, hash, formato, formato_miniatura, ancho, alto, error
+            FROM products_imagenes WHERE producto_id = %s
+        """, (producto_id,))
+        fila = cur.fetchone()
+        if fila is None:
+            return None
+        fila.update(self.urls(fila['hash'], fila.pop('formato'), fila.pop('formato_miniatura'), fila['ancho']))
+        return fila
+
+    def procesar(self, cur, datos):
+        """Trabajo de la cola 'miniaturas': {'producto_id', 'subida'}"""
+        if not self.almacen.existe(datos['subida']):
+            raise ImagenInvalida('La subida ya no existe')
+        contenido = self.almacen.leer(datos['subida'])
+        huella = hashlib.sha256(contenido).hexdigest()
+
+        # imagen.json se escribe al final: si existe, el original y todas las
+        # miniaturas de este contenido ya están en el almacén
+        clave_datos = f'miniaturas/{huella[:2]}/{huella}/imagen.json'
+        reutilizada = self.almacen.existe(clave_datos)
+        if reutilizada:
+            imagen = json.loads(self.almacen.leer(clave_datos))
+        else:
+            generada = generar_miniaturas(contenido)
+            self.almacen.guardar(clave_original(huella, generada['formato']), contenido, generada['tipo'])
+            for ancho, miniatura in generada['miniaturas'].items():
+                self.almacen.guardar(clave_miniatura(huella, ancho, generada['formato_miniatura']),
+                                     miniatura, generada['tipo_miniatura'])
+            imagen = {campo: generada[campo] for campo in ('formato', 'ancho', 'alto', 'formato_miniatura')}
+            self.almacen.guardar(clave_datos, json.dumps(imagen).encode('utf-8'), 'application/json')
+
+        # Si mientras tanto se registró otra subida, ésta ya no es la imagen del producto
+        cur.execute("""
+            UPDATE products_imagenes
+            SET hash = %s, formato = %s, formato_miniatura = %s, ancho = %s, alto = %s,
+                estado = %s, subida = NULL, error = NULL
+            WHERE producto_id = %s AND subida = %s
+        """, (huella, imagen['formato'], imagen['formato_miniatura'], imagen['ancho'], imagen['alto'],
+              LISTA, datos['producto_id'], datos['subida']))
+        self.almacen.borrar(datos['subida'])
+        return {'hash': huella, 'reutilizada': reutilizada}
+
+    def marcar_fallida(self, cur, datos, error):
+        cur.execute(
+            "UPDATE products_imagenes SET estado = %s, error = %s WHERE producto_id = %s AND subida = %s",
+            (FALLIDA, str(error)[:255], datos['producto_id'], datos['subida'])
+        )
+
+
+class TrabajadorMiniaturas(TrabajadorCola):
+    """
+    Pool de hilos que procesa la cola 'miniaturas' con la mecánica de
+    comun/trabajador_cola.py, la misma del trabajador de facturas: una
+    conexión por lote, reintentos con espera creciente para errores
+    transitorios (la base o el almacén que no responden unos segundos),
+    ImagenInvalida como error definitivo y recuperación periódica de los
+    trabajos abandonados. Una imagen que no se pudo procesar queda 'fallida'.
+    """
+
+    nombre = 'miniaturas'
+    errores_definitivos = (ImagenInvalida,)
+
+    def __init__(self, cola, conectar, imagenes, hilos=2, tamano_lote=2, intentos=5,
+                 espera_reintento=2.0, antiguedad=120.0, **opciones):
+        super().__init__(cola, conectar, imagenes.procesar, hilos=hilos, tamano_lote=tamano_lote,
+                         intentos=intentos, espera_reintento=espera_reintento, antiguedad=antiguedad,
+                         **opciones)
+        self.imagenes = imagenes
+
+    def preparar(self):
+        self.imagenes.asegurar_tablas()
+
+    def fallido(self, cur, datos, error):
+        self.imagenes.marcar_fallida(cur, datos, error)
@@ -1,11 +1,26 @@
-from flask import Flask, Response, request
-from flask_mysqldb import MySQL
+from flask import Flask, Response, abort, request, send_file
 from flask_cors import CORS
-import decimal
-import datetime
-import xml.etree.ElementTree as ET
+from decimal import Decimal
+import mimetypes
 import os
+import secrets
 import sys
+from almacen_medios import AlmacenLocal, FirmaInvalida, abrir_almacen
+
+# Permite importar el paquete compartido 'comun' al ejecutar el servicio fuera de Docker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.base_datos import PLANTILLA_POOL, PoolMySQL, Sentencia
+from comun.cache_productos import CacheProductos
+from comun.cola_trabajos import abrir_cola
+from comun.escritor_xml import EscritorXML, Plantilla, escapar, generar_documento
+from comun.eventos import PLANTILLA_EVENTOS, Consumidor, abrir_broker, salida_pendiente
+from comun.lector_xml import Campo, Esquema, SolicitudInvalida, leer_xml
+from comun.negociacion import responder
+# Usan 'comun': van después de agregarlo al path
+from eventos_products import MANEJADORES, TABLA_SALIDA, asegurar_tablas, publicar_stock
+from imagenes_productos import (
+    CAMPOS_ESTADO, CAMPOS_IMAGEN, COLUMNAS_IMAGEN, TIPOS_SUBIDA, ImagenesProductos, TrabajadorMiniaturas
+)
 
 app = Flask(__name__)
 CORS(app)
@@ -15,87 +30,112 @@ app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'db')
 app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'raul')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '123')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'joyeria_db')
-app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
-
-mysql = MySQL(app)
-
-def value_to_str(value):
-    if isinstance(value, decimal.Decimal):
-        return str(value)
-    if isinstance(value, datetime.datetime):
-        return value.isoformat()
-    if value is None:
-        return ''
-    # Escapar caracteres especiales para XML
-    return str(value).replace('&', '&').replace('<', '<').replace('>', '>').replace('"', '"').replace("'", "'")
+app.config['MYSQL_POOL_TAMANO'] = int(os.getenv('MYSQL_POOL_TAMANO', '8'))
+app.config['MYSQL_POOL_ESPERA'] = float(os.getenv('MYSQL_POOL_ESPERA', '5'))
+app.config['MYSQL_TIEMPO_SENTENCIA'] = float(os.getenv('MYSQL_TIEMPO_SENTENCIA', '10'))
+app.config['MYSQL_PREPARADAS'] = os.getenv('MYSQL_PREPARADAS', '1') == '1'
+
+# Pool de conexiones por proceso (ver comun/base_datos.py)
+mysql = PoolMySQL(app)
+
+# Sólo se usa para invalidar: pedidos y facturas leen de esta caché, y con
+# REDIS_URL la invalidación les llega a todos sus procesos
+cache_productos = CacheProductos(redis_url=os.getenv('REDIS_URL') or None)
+
+# Eventos entre servicios (ver comun/eventos.py y eventos_products.py). Con
+# EVENTOS=1 el stock de los pedidos se descuenta al consumir pedido_creado
+EVENTOS = os.getenv('EVENTOS', '0') == '1'
+consumidor_eventos = None
+if EVENTOS:
+    consumidor_eventos = Consumidor(
+        abrir_broker(os.getenv('BROKER_EVENTOS_URL', 'sqlite:///' + os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'eventos.db'))),
+        'products', mysql.conectar, MANEJADORES, preparar=lambda: asegurar_tablas(mysql.conectar)
+    )
+
+# Imágenes de productos (ver almacen_medios.py e imagenes_productos.py). Sin
+# MEDIOS_URL los archivos quedan en microservicios/medios y los sirve este servicio
+MEDIOS_URL = os.getenv('MEDIOS_URL', 'file://' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'medios'))
+MEDIOS_URL_PUBLICA = os.getenv('MEDIOS_URL_PUBLICA') or (
+    '' if MEDIOS_URL.startswith('s3://') else 'http://localhost:5001/api/products/medios'
+)
+MEDIOS_MAX_BYTES = int(os.getenv('MEDIOS_MAX_BYTES', str(10 * 1024 * 1024)))
+# Sin MEDIOS_SECRETO la llave es aleatoria: nadie puede falsificar URLs de
+# subida con una llave conocida. gunicorn.conf.py genera una para todos los
+# workers del contenedor; con 'python products_service.py' es la del proceso
+MEDIOS_SECRETO = os.getenv('MEDIOS_SECRETO') or secrets.token_hex(32)
+almacen = abrir_almacen(MEDIOS_URL, MEDIOS_URL_PUBLICA, MEDIOS_SECRETO)
+imagenes = ImagenesProductos(almacen, mysql.conectar)
+trabajador_miniaturas = TrabajadorMiniaturas(
+    abrir_cola(os.getenv('COLA_MEDIOS_URL', 'sqlite:///' + os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'trabajos.db')), 'miniaturas'),
+    mysql.conectar, imagenes, hilos=int(os.getenv('MEDIOS_HILOS', '2'))
+)
+mimetypes.add_type('image/webp', '.webp')
+
+CAMPOS_PRODUCTO = ['id', 'codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates'] + CAMPOS_IMAGEN
+
+# SELECT fijos, preparados una vez por conexión del pool
+SELECT_PRODUCTOS = (
+    "SELECT p.id, p.codigo, p.nombre, p.descripcion, p.precio, p.stock, p.material, p.marca, p.kilates, "
+    + COLUMNAS_IMAGEN + " FROM products p LEFT JOIN products_imagenes i ON i.producto_id = p.id"
+)
+SQL_PRODUCTOS = Sentencia('productos', SELECT_PRODUCTOS)
+SQL_PRODUCTO = Sentencia('producto_por_id', SELECT_PRODUCTOS + " WHERE p.id = %s")
+SQL_POR_KILATES = Sentencia('productos_por_kilates', SELECT_PRODUCTOS + " WHERE p.kilates = %s")
+SQL_POR_MARCA = Sentencia('productos_por_marca', SELECT_PRODUCTOS + " WHERE p.marca = %s")
+SQL_POR_MATERIAL = Sentencia('productos_por_material', SELECT_PRODUCTOS + " WHERE p.material = %s")
+SQL_EXISTE = Sentencia('producto_existe', "SELECT id FROM products WHERE id = %s")
+SQL_EXISTE_CODIGO = Sentencia('producto_existe_codigo', "SELECT id FROM products WHERE codigo = %s")
+
+# Plantillas precompiladas: <product> dentro de una lista y los campos sueltos
+# cuando la respuesta es un solo producto
+PLANTILLA_PRODUCTO = Plantilla('product', CAMPOS_PRODUCTO)
+PLANTILLA_CAMPOS_PRODUCTO = Plantilla(None, CAMPOS_PRODUCTO)
+PLANTILLA_SUBIDA = Plantilla('subida', ['clave', 'tipo', 'url'])
+PLANTILLA_IMAGEN = Plantilla('imagen', CAMPOS_ESTADO)
+
+# Cuerpo de create_product y update_product; longitudes según la tabla products
+ESQUEMA_PRODUCTO = Esquema('product', {
+    'codigo': Campo(requerido=True, max_longitud=50),
+    'nombre': Campo(requerido=True, max_longitud=100),
+    'descripcion': Campo(defecto='', max_longitud=10000),
+    'precio': Campo(Decimal, requerido=True, max_longitud=13, minimo=0),
+    'stock': Campo(int, defecto=0, max_longitud=10, minimo=0),
+    'material': Campo(max_longitud=50),
+    'marca': Campo(max_longitud=50),
+    'kilates': Campo(int, max_longitud=3, minimo=0),
+}, max_elementos=50)
+
+ESQUEMA_SUBIDA = Esquema('imagen', {'tipo': Campo(requerido=True, max_longitud=20)})
+ESQUEMA_IMAGEN = Esquema('imagen', {'subida': Campo(requerido=True, max_longitud=100)})
 
 def generate_xml_response(data, root_tag):
-    """Genera respuesta XML usando xml.etree.ElementTree"""
-    print(f"DEBUG: generate_xml_response called with data type: {type(data)}", file=sys.stderr)
-    print(f"DEBUG: data = {data}", file=sys.stderr)
-    if isinstance(data, list) and data:
-        print(f"DEBUG: First item in list type: {type(data[0])}", file=sys.stderr)
-    elif not isinstance(data, list):
-        print(f"DEBUG: Single item type: {type(data)}", file=sys.stderr)
-
-    root = ET.Element(root_tag)
-
-    if isinstance(data, (list, tuple)):
-        for item in data:
-            item_elem = ET.SubElement(root, 'product')  # Use consistent 'product' tag
-            if isinstance(item, dict):
-                for key, val in item.items():
-                    safe_value = value_to_str(val)
-                    ET.SubElement(item_elem, key).text = safe_value
-            elif isinstance(item, tuple):
-                # Assume tuple order matches SELECT order: id, codigo, nombre, descripcion, precio, stock, material, marca, kilates
-                keys = ['id', 'codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates']
-                for i, val in enumerate(item):
-                    if i < len(keys):
-                        safe_value = value_to_str(val)
-                        ET.SubElement(item_elem, keys[i]).text = safe_value
-            else:
-                print(f"DEBUG: Unsupported item type: {type(item)}", file=sys.stderr)
-                # Fallback: treat as dict if possible
-                if hasattr(item, 'items'):
-                    for key, val in item.items():
-                        safe_value = value_to_str(val)
-                        ET.SubElement(item_elem, key).text = safe_value
-    else:
-        # Single item
-        if isinstance(data, dict):
-            for key, val in data.items():
-                safe_value = value_to_str(val)
-                ET.SubElement(root, key).text = safe_value
-        elif isinstance(data, tuple):
-            keys = ['id', 'codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates']
-            for i, val in enumerate(data):
-                if i < len(keys):
-                    safe_value = value_to_str(val)
-                    ET.SubElement(root, keys[i]).text = safe_value
-        else:
-            print(f"DEBUG: Unsupported single item type: {type(data)}", file=sys.stderr)
-
-    xml_str = ET.tostring(root, encoding='utf-8', method='xml').decode('utf-8')
-    print(f"DEBUG: Generated XML: {xml_str}", file=sys.stderr)
-    return f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_str}'
+    """
+    Genera respuesta XML con el escritor compartido (valores escapados).
+
+    Las listas se entregan por fragmentos (generar_documento): Flask envía el
+    catálogo conforme se escribe, sin armar antes todo el texto en memoria.
+    """
+    es_lista = isinstance(data, (list, tuple)) and (not data or isinstance(data[0], (dict, tuple)))
+    if es_lista:
+        return generar_documento(root_tag, PLANTILLA_PRODUCTO, data)
+    return EscritorXML().abrir(root_tag).registro(PLANTILLA_CAMPOS_PRODUCTO, data).cerrar(root_tag).valor()
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
     try:
         print("DEBUG: Intentando conectar a la base de datos...")
+        imagenes.asegurar_tablas()
         cur = mysql.connection.cursor()
         print("DEBUG: Cursor creado, ejecutando query...")
-        cur.execute("SELECT id, codigo, nombre, descripcion, precio, stock, material, marca, kilates FROM products")
-        products = cur.fetchall()
+        SQL_PRODUCTOS.ejecutar(cur)
+        products = imagenes.agregar_urls(cur.fetchall())
         print(f"DEBUG: Query ejecutada, {len(products)} productos encontrados")
         cur.close()
 
-        print("DEBUG: Generando respuesta XML...")
-        xml_output = generate_xml_response(products, 'products')
-        print("DEBUG: Respuesta XML generada correctamente")
-        print(f"DEBUG: XML output length: {len(xml_output)}")
-        return Response(xml_output, mimetype='application/xml')
+        return responder(products, lambda: generate_xml_response(products, 'products'))
 
     except Exception as e:
         print(f"DEBUG: Error en get_products: {str(e)}")
@@ -106,16 +146,17 @@ def get_products():
 @app.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product_by_id(product_id):
     try:
+        imagenes.asegurar_tablas()
         cur = mysql.connection.cursor()
-        cur.execute("SELECT id, codigo, nombre, descripcion, precio, stock, material, marca, kilates FROM products WHERE id = %s", (product_id,))
+        SQL_PRODUCTO.ejecutar(cur, (product_id,))
         product = cur.fetchone()
         cur.close()
 
         if not product:
             return Response('<error>Producto no encontrado</error>', mimetype='application/xml', status=404)
 
-        xml_output = generate_xml_response(product, 'product')
-        return Response(xml_output, mimetype='application/xml')
+        imagenes.agregar_urls(product)
+        return responder(product, lambda: generate_xml_response(product, 'product'))
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
@@ -123,13 +164,13 @@ def get_product_by_id(product_id):
 @app.route('/api/products/kilates/<int:kilates>', methods=['GET'])
 def get_products_by_kilates(kilates):
     try:
+        imagenes.asegurar_tablas()
         cur = mysql.connection.cursor()
-        cur.execute("SELECT id, codigo, nombre, descripcion, precio, stock, material, marca, kilates FROM products WHERE kilates = %s", (kilates,))
-        products = cur.fetchall()
+        SQL_POR_KILATES.ejecutar(cur, (kilates,))
+        products = imagenes.agregar_urls(cur.fetchall())
         cur.close()
 
-        xml_output = generate_xml_response(products, 'products')
-        return Response(xml_output, mimetype='application/xml')
+        return responder(products, lambda: generate_xml_response(products, 'products'))
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
@@ -137,13 +178,13 @@ def get_products_by_kilates(kilates):
 @app.route('/api/products/marca/<marca>', methods=['GET'])
 def get_products_by_marca(marca):
     try:
+        imagenes.asegurar_tablas()
         cur = mysql.connection.cursor()
-        cur.execute("SELECT id, codigo, nombre, descripcion, precio, stock, material, marca, kilates FROM products WHERE marca = %s", (marca,))
-        products = cur.fetchall()
+        SQL_POR_MARCA.ejecutar(cur, (marca,))
+        products = imagenes.agregar_urls(cur.fetchall())
         cur.close()
 
-        xml_output = generate_xml_response(products, 'products')
-        return Response(xml_output, mimetype='application/xml')
+        return responder(products, lambda: generate_xml_response(products, 'products'))
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
@@ -151,13 +192,13 @@ def get_products_by_marca(marca):
 @app.route('/api/products/material/<material>', methods=['GET'])
 def get_products_by_material(material):
     try:
+        imagenes.asegurar_tablas()
         cur = mysql.connection.cursor()
-        cur.execute("SELECT id, codigo, nombre, descripcion, precio, stock, material, marca, kilates FROM products WHERE material = %s", (material,))
-        products = cur.fetchall()
+        SQL_POR_MATERIAL.ejecutar(cur, (material,))
+        products = imagenes.agregar_urls(cur.fetchall())
         cur.close()
 
-        xml_output = generate_xml_response(products, 'products')
-        return Response(xml_output, mimetype='application/xml')
+        return responder(products, lambda: generate_xml_response(products, 'products'))
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
@@ -165,19 +206,12 @@ def get_products_by_material(material):
 @app.route('/api/products/create', methods=['POST'])
 def create_product():
     try:
-        xml_data = request.data.decode('utf-8')
-        if not xml_data:
-            return Response('<error>Datos XML requeridos</error>', mimetype='application/xml', status=400)
-
-        # Parsear XML
-        root = ET.fromstring(xml_data)
-        data = {}
-        for child in root:
-            data[child.tag] = child.text
+        # Leer el XML por bloques con límites de tamaño y sin entidades
+        data = leer_xml(request.stream, ESQUEMA_PRODUCTO, request.content_length)
 
         # Validar código único
         cur = mysql.connection.cursor()
-        cur.execute("SELECT id FROM products WHERE codigo = %s", (data.get('codigo'),))
+        SQL_EXISTE_CODIGO.ejecutar(cur, (data.get('codigo'),))
         if cur.fetchone():
             cur.close()
             return Response('<error>Código de producto ya existe</error>', mimetype='application/xml', status=400)
@@ -187,7 +221,7 @@ def create_product():
             INSERT INTO products (codigo, nombre, descripcion, precio, stock, material, marca, kilates)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, (
-            data.get('codigo'), data.get('nombre'), data.get('descripcion', ''),
+            data.get('codigo'), data.get('nombre'), data.get('descripcion'),
             data.get('precio'), data.get('stock'), data.get('material'), data.get('marca'), data.get('kilates')
         ))
         mysql.connection.commit()
@@ -196,45 +230,51 @@ def create_product():
 
         return Response(f'<success>Producto creado con ID {product_id}</success>', mimetype='application/xml', status=201)
 
+    except SolicitudInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=e.status)
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
 
 @app.route('/api/products/update/<int:product_id>', methods=['PUT'])
 def update_product(product_id):
     try:
-        xml_data = request.data.decode('utf-8')
-        if not xml_data:
-            return Response('<error>Datos XML requeridos</error>', mimetype='application/xml', status=400)
-
-        # Parsear XML
-        root = ET.fromstring(xml_data)
-        data = {}
-        for child in root:
-            data[child.tag] = child.text
+        # Leer el XML por bloques con límites de tamaño y sin entidades
+        data = leer_xml(request.stream, ESQUEMA_PRODUCTO, request.content_length)
 
         cur = mysql.connection.cursor()
 
         # Verificar que el producto existe
-        cur.execute("SELECT id FROM products WHERE id = %s", (product_id,))
+        SQL_EXISTE.ejecutar(cur, (product_id,))
         if not cur.fetchone():
             cur.close()
             return Response('<error>Producto no encontrado</error>', mimetype='application/xml', status=404)
 
-        # Actualizar producto
-        cur.execute("""
-            UPDATE products SET
-                codigo = %s, nombre = %s, descripcion = %s, precio = %s,
-                stock = %s, material = %s, marca = %s, kilates = %s
-            WHERE id = %s
-        """, (
-            data.get('codigo'), data.get('nombre'), data.get('descripcion', ''),
-            data.get('precio'), data.get('stock'), data.get('material'), data.get('marca'), data.get('kilates'), product_id
-        ))
-        mysql.connection.commit()
-        cur.close()
+        # Actualizar producto; con EVENTOS el stock nuevo se publica en la misma transacción
+        cur.execute("START TRANSACTION")
+        try:
+            cur.execute("""
+                UPDATE products SET
+                    codigo = %s, nombre = %s, descripcion = %s, precio = %s,
+                    stock = %s, material = %s, marca = %s, kilates = %s
+                WHERE id = %s
+            """, (
+                data.get('codigo'), data.get('nombre'), data.get('descripcion'),
+                data.get('precio'), data.get('stock'), data.get('material'), data.get('marca'), data.get('kilates'), product_id
+            ))
+            if EVENTOS:
+                publicar_stock(cur, [product_id])
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+        cache_productos.invalidar(product_id)
 
         return Response('<success>Producto actualizado</success>', mimetype='application/xml', status=200)
 
+    except SolicitudInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=e.status)
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
 
@@ -244,20 +284,152 @@ def delete_product(product_id):
         cur = mysql.connection.cursor()
 
         # Verificar que el producto existe
-        cur.execute("SELECT id FROM products WHERE id = %s", (product_id,))
+        SQL_EXISTE.ejecutar(cur, (product_id,))
         if not cur.fetchone():
             cur.close()
             return Response('<error>Producto no encontrado</error>', mimetype='application/xml', status=404)
 
-        # Eliminar producto
-        cur.execute("DELETE FROM products WHERE id = %s", (product_id,))
+        # Eliminar producto; los archivos de la imagen pueden ser de otros productos y se quedan
+        imagenes.asegurar_tablas()
+        cur.execute("START TRANSACTION")
+        try:
+            cur.execute("DELETE FROM products_imagenes WHERE producto_id = %s", (product_id,))
+            cur.execute("DELETE FROM products WHERE id = %s", (product_id,))
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+        cache_productos.invalidar(product_id)
+
+        return Response('<success>Producto eliminado</success>', mimetype='application/xml', status=200)
+
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+@app.route('/api/products/<int:product_id>/imagen/subida', methods=['POST'])
+def crear_subida_imagen(product_id):
+    """URL firmada para subir el original directo al almacén (PUT con el mismo Content-Type)"""
+    try:
+        data = leer_xml(request.stream, ESQUEMA_SUBIDA, request.content_length)
+        if data['tipo'] not in TIPOS_SUBIDA:
+            return Response('<error>Tipo de imagen no soportado</error>', mimetype='application/xml', status=400)
+
+        cur = mysql.connection.cursor()
+        SQL_EXISTE.ejecutar(cur, (product_id,))
+        existe = cur.fetchone()
+        cur.close()
+        if not existe:
+            return Response('<error>Producto no encontrado</error>', mimetype='application/xml', status=404)
+
+        subida = imagenes.nueva_subida(product_id, data['tipo'])
+        return responder(subida, lambda: EscritorXML().registro(PLANTILLA_SUBIDA, subida).valor())
+
+    except SolicitudInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=e.status)
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+@app.route('/api/products/<int:product_id>/imagen', methods=['POST'])
+def registrar_imagen(product_id):
+    """Asigna la imagen ya subida al producto y encola sus miniaturas"""
+    try:
+        data = leer_xml(request.stream, ESQUEMA_IMAGEN, request.content_length)
+
+        imagenes.asegurar_tablas()
+        cur = mysql.connection.cursor()
+        SQL_EXISTE.ejecutar(cur, (product_id,))
+        if not cur.fetchone():
+            cur.close()
+            return Response('<error>Producto no encontrado</error>', mimetype='application/xml', status=404)
+        if not imagenes.registrar(cur, product_id, data['subida']):
+            cur.close()
+            return Response('<error>La subida no existe</error>', mimetype='application/xml', status=400)
         mysql.connection.commit()
+        trabajador_miniaturas.cola.encolar(data['subida'], {'producto_id': product_id, 'subida': data['subida']})
+        estado = imagenes.estado(cur, product_id)
         cur.close()
 
-        return Response('<success>Producto eliminado</success>', mimetype='application/xml', status=200)
+        return responder(estado, lambda: EscritorXML().registro(PLANTILLA_IMAGEN, estado).valor(), status=202)
+
+    except SolicitudInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=e.status)
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+@app.route('/api/products/<int:product_id>/imagen', methods=['GET'])
+def get_imagen(product_id):
+    """Estado de la imagen del producto: pendiente, lista o fallida"""
+    try:
+        imagenes.asegurar_tablas()
+        cur = mysql.connection.cursor()
+        estado = imagenes.estado(cur, product_id)
+        cur.close()
+        if estado is None:
+            return Response('<error>El producto no tiene imagen</error>', mimetype='application/xml', status=404)
+
+        return responder(estado, lambda: EscritorXML().registro(PLANTILLA_IMAGEN, estado).valor())
 
     except Exception as e:
         return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
 
+@app.route('/api/products/medios/<path:clave>', methods=['PUT'])
+def subir_medio(clave):
+    """Destino de las URLs firmadas de AlmacenLocal; con S3 el navegador sube al bucket"""
+    if not isinstance(almacen, AlmacenLocal) or not clave.startswith('subidas/') or almacen.ruta(clave) is None:
+        abort(404)
+    try:
+        almacen.verificar_subida(clave, request.args.get('expira'), request.args.get('firma'))
+    except FirmaInvalida as e:
+        return Response(f'<error>{escapar(str(e))}</error>', mimetype='application/xml', status=403)
+    if request.mimetype not in TIPOS_SUBIDA:
+        return Response('<error>Tipo de imagen no soportado</error>', mimetype='application/xml', status=400)
+    if request.content_length is None or request.content_length > MEDIOS_MAX_BYTES:
+        return Response('<error>La imagen excede el tamaño máximo</error>', mimetype='application/xml', status=413)
+
+    almacen.guardar(clave, request.stream.read(MEDIOS_MAX_BYTES), request.mimetype)
+    return Response(status=200)
+
+@app.route('/api/products/medios/<path:clave>', methods=['GET'])
+def get_medio(clave):
+    """Originales y miniaturas de AlmacenLocal; su clave lleva el hash del contenido"""
+    if not isinstance(almacen, AlmacenLocal) or not clave.startswith(('originales/', 'miniaturas/')):
+        abort(404)
+    ruta = almacen.ruta(clave)
+    if ruta is None or not os.path.isfile(ruta):
+        abort(404)
+    respuesta = send_file(ruta, mimetype=mimetypes.guess_type(ruta)[0], max_age=31536000)
+    respuesta.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return respuesta
+
+@app.route('/api/products/db/pool', methods=['GET'])
+def get_estadisticas_pool():
+    """Uso del pool de conexiones de este proceso"""
+    datos = mysql.estadisticas()
+    return responder(datos, lambda: EscritorXML().registro(PLANTILLA_POOL, datos).valor())
+
+@app.route('/api/products/eventos', methods=['GET'])
+def get_estadisticas_eventos():
+    """Eventos sin publicar en la tabla de salida y avance del consumidor de products"""
+    try:
+        datos = {'activo': EVENTOS}
+        if EVENTOS:
+            cur = mysql.connection.cursor()
+            datos['salida_pendiente'] = salida_pendiente(cur, TABLA_SALIDA)
+            cur.close()
+            datos.update(consumidor_eventos.estadisticas())
+        return responder(datos, lambda: EscritorXML().registro(PLANTILLA_EVENTOS, datos).valor())
+
+    except Exception as e:
+        return Response(f'<error>Error interno del servidor: {str(e)}</error>', mimetype='application/xml', status=500)
+
+# Igual que el trabajador de facturas: no se inician en el proceso que vigila
+# los cambios del recargador de Flask
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    trabajador_miniaturas.iniciar()
+    if EVENTOS:
+        consumidor_eventos.iniciar()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
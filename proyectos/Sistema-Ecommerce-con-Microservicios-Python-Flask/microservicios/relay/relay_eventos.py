@@ -0,0 +1,75 @@
+"""
+Relay de eventos: publica en el broker los eventos de las tablas de salida de
+pedidos y products (ver comun/eventos.py).
+
+Corre como un proceso aparte (el servicio relay de docker-compose, con el
+perfil eventos). Si se detiene, los servicios siguen aceptando cambios: los
+eventos se acumulan en sus tablas de salida y se publican al volver.
+
+Uso:
+    python relay_eventos.py
+"""
+
+import os
+import sys
+import time
+import traceback
+
+import MySQLdb
+import MySQLdb.cursors
+
+# Permite importar el paquete compartido 'comun' al ejecutar el relay fuera de Docker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.eventos import Relay, abrir_broker, asegurar_salida
+
+TABLAS_SALIDA = os.getenv('TABLAS_SALIDA', 'pedidos_eventos_salida,products_eventos_salida').split(',')
+BROKER_EVENTOS_URL = os.getenv('BROKER_EVENTOS_URL', 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cola', 'eventos.db'))
+# Segundos de espera cuando no hubo eventos que publicar
+ESPERA = float(os.getenv('RELAY_ESPERA', '0.05'))
+LOTE = int(os.getenv('RELAY_LOTE', '500'))
+# Los eventos que ya leyeron todos los grupos se borran del broker después de este tiempo
+RETENCION = int(os.getenv('BROKER_RETENCION', '86400'))
+
+
+def conectar():
+    return MySQLdb.connect(
+        host=os.getenv('MYSQL_HOST', 'db'),
+        user=os.getenv('MYSQL_USER', 'raul'),
+        passwd=os.getenv('MYSQL_PASSWORD', '123'),
+        db=os.getenv('MYSQL_DB', 'joyeria_db'),
+        charset='utf8mb4',
+        cursorclass=MySQLdb.cursors.DictCursor
+    )
+
+
+def main():
+    broker = abrir_broker(BROKER_EVENTOS_URL)
+    relay = Relay(conectar, broker, TABLAS_SALIDA, lote=LOTE)
+
+    # La base de datos puede tardar en aceptar conexiones al levantar docker-compose
+    while True:
+        try:
+            for tabla in TABLAS_SALIDA:
+                asegurar_salida(conectar, tabla)
+            break
+        except MySQLdb.MySQLError as e:
+            print(f"Esperando a la base de datos: {e}")
+            time.sleep(2)
+
+    print(f"Relay publicando {', '.join(TABLAS_SALIDA)} en {BROKER_EVENTOS_URL}")
+    siguiente_purga = time.monotonic()
+    while True:
+        try:
+            if relay.ciclo() == 0:
+                time.sleep(ESPERA)
+            if time.monotonic() >= siguiente_purga:
+                broker.purgar(RETENCION)
+                siguiente_purga = time.monotonic() + 60
+        except Exception:
+            traceback.print_exc()
+            time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
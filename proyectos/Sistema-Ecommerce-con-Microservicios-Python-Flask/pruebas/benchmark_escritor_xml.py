@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark del escritor de XML compartido contra ElementTree y la
+concatenación con += que usaban antes los servicios.
+
+No necesita los servicios levantados: genera catálogos sintéticos de distintos
+tamaños y mide cuántos productos por segundo serializa cada método.
+
+Uso:
+    python benchmark_escritor_xml.py --tamanos 100 1000 10000 50000
+"""
+
+import argparse
+import decimal
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'microservicios'))
+from comun.escritor_xml import Plantilla, documento, value_to_str
+
+CAMPOS = ['id', 'codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates']
+PLANTILLA = Plantilla('product', CAMPOS)
+
+
+def catalogo(n):
+    return [{
+        'id': i,
+        'codigo': f'R{i:05d}',
+        'nombre': f'Anillo "Solitario" #{i}',
+        'descripcion': 'Oro blanco & diamante <1ct> con certificado.',
+        'precio': decimal.Decimal('1500.00') + i,
+        'stock': i % 40,
+        'material': 'Oro Blanco',
+        'marca': 'Tiffany',
+        'kilates': 18 if i % 2 else None,
+    } for i in range(n)]
+
+
+def con_elementtree(productos):
+    root = ET.Element('products')
+    for producto in productos:
+        item = ET.SubElement(root, 'product')
+        for key, val in producto.items():
+            ET.SubElement(item, key).text = value_to_str(val)
+    xml_str = ET.tostring(root, encoding='utf-8', method='xml').decode('utf-8')
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_str}'
+
+
+def con_concatenacion(productos):
+    xml_output = '<?xml version="1.0" encoding="UTF-8"?>\n<products>\n'
+    for producto in productos:
+        xml_output += '  <product>\n'
+        for key, val in producto.items():
+            xml_output += f'    <{key}>{value_to_str(val)}</{key}>\n'
+        xml_output += '  </product>\n'
+    xml_output += '</products>'
+    return xml_output
+
+
+def con_escritor(productos):
+    return documento('products', PLANTILLA, productos)
+
+
+METODOS = [
+    ('ElementTree', con_elementtree),
+    ('Concatenación +=', con_concatenacion),
+    ('EscritorXML', con_escritor),
+]
+
+
+def medir(funcion, productos, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(productos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput de serialización XML')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    # El escritor debe producir XML válido aun con caracteres especiales
+    ET.fromstring(con_escritor(catalogo(10)))
+
+    print("🚀 Benchmark de serialización XML (productos/segundo, mejor de "
+          f"{args.repeticiones})\n")
+    print(f"   {'Productos':>10} " + ''.join(f"{nombre:>20}" for nombre, _ in METODOS))
+    for n in args.tamanos:
+        productos = catalogo(n)
+        fila = []
+        for _, funcion in METODOS:
+            segundos = medir(funcion, productos, args.repeticiones)
+            fila.append(f"{n / segundos:>20,.0f}")
+        print(f"   {n:>10} " + ''.join(fila))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark del servidor de archivos estáticos del frontend.
+
+Compara el servidor como estaba (python web_server.py: servidor de desarrollo
+de Flask con send_from_directory) contra el modo producción (gunicorn con
+FRONTEND_PRODUCCION=1, ver Frontend/estaticos.py). Sin --actual ni
+--produccion levanta ambos servidores en puertos locales.
+
+Cada cliente simula cargas de la página: index.html más los archivos a los
+que apunta (hoja de estilos, script y la plantilla XSL que pide el script).
+
+- primera visita: sin caché del navegador; pide todo con
+  Accept-Encoding: gzip, br.
+- visita repetida: con caché. Los archivos sin encabezados de caché se
+  revalidan uno por uno (If-None-Match); los immutable no se piden.
+
+Reporta páginas/segundo, solicitudes/segundo, p50/p95 por página y bytes
+transferidos por página.
+
+Uso:
+    python benchmark_estaticos.py --hilos 8,32 --duracion 10
+    python benchmark_estaticos.py --actual http://localhost:8080 --produccion http://localhost:8090
+"""
+
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from clientes_api import crear_sesion
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Frontend')
+
+ENCABEZADOS = {'Accept-Encoding': 'gzip, br'}
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def levantar(comando, entorno, url):
+    """Inicia un servidor en FRONTEND_DIR y espera a que responda"""
+    # Sesión propia para detener también al proceso hijo del recargador de Flask
+    proceso = subprocess.Popen(comando, cwd=FRONTEND_DIR, env=dict(os.environ, **entorno),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return proceso
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    detener(proceso)
+    raise SystemExit(f"❌ El servidor {' '.join(comando)} no respondió en {url}")
+
+
+def detener(proceso):
+    os.killpg(proceso.pid, signal.SIGTERM)
+    proceso.wait()
+
+
+def recursos(url):
+    """Rutas a las que apunta index.html, más las .xsl que piden sus scripts"""
+    index = requests.get(url, timeout=10).text
+    rutas = re.findall(r'(?:src|href)="([^":]+)"', index)
+    for script in [r for r in rutas if r.endswith('.js')]:
+        codigo = requests.get(f"{url}/{script.lstrip('/')}", timeout=10).text
+        rutas.extend(re.findall(r"fetch\('(/?[^']+\.xsl)'\)", codigo))
+    return ['/'] + ['/' + r.lstrip('/') for r in rutas]
+
+
+def cargar_pagina(sesion, url, rutas, cache):
+    """Una carga de la página; regresa (solicitudes, bytes). cache guarda ETag e immutable por ruta"""
+    solicitudes = transferidos = 0
+    for ruta in rutas:
+        guardado = cache.get(ruta)
+        if guardado is not None and guardado['inmutable']:
+            continue
+        encabezados = dict(ENCABEZADOS)
+        if guardado is not None and guardado['etag']:
+            encabezados['If-None-Match'] = guardado['etag']
+        response = sesion.get(url + ruta, headers=encabezados, timeout=30, stream=True)
+        cuerpo = response.raw.read()  # bytes como viajan, sin descomprimir
+        solicitudes += 1
+        transferidos += len(cuerpo)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{ruta}: HTTP {response.status_code}")
+        if response.status_code == 200:
+            cache[ruta] = {
+                'etag': response.headers.get('ETag'),
+                'inmutable': 'immutable' in response.headers.get('Cache-Control', ''),
+            }
+    return solicitudes, transferidos
+
+
+def medir(nombre, url, hilos, duracion, repetida):
+    rutas = recursos(url)
+    sesion = crear_sesion(hilos)
+    tiempos, totales, errores = [], [0, 0], []
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+
+    def cliente():
+        cache = {}
+        if repetida:
+            cargar_pagina(sesion, url, rutas, cache)
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            try:
+                solicitudes, transferidos = cargar_pagina(sesion, url, rutas, cache if repetida else {})
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                errores.append(e)
+                continue
+            with lock:
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                totales[0] += solicitudes
+                totales[1] += transferidos
+
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for _ in range(hilos):
+            executor.submit(cliente)
+
+    if not tiempos:
+        print(f"   {nombre:<11} sin cargas exitosas ({len(errores)} errores)")
+        return
+    print(f"   {nombre:<11} {len(tiempos) / duracion:8.1f} páginas/s   {totales[0] / duracion:8.1f} sol/s   "
+          f"p50 {statistics.median(tiempos):7.2f} ms   p95 {percentil(tiempos, 0.95):7.2f} ms   "
+          f"{totales[1] / len(tiempos) / 1024:7.1f} KiB/página   errores {len(errores)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de estáticos actual contra el modo producción')
+    parser.add_argument('--actual', default='', help='URL de un servidor ya levantado sin FRONTEND_PRODUCCION')
+    parser.add_argument('--produccion', default='', help='URL de un servidor ya levantado con FRONTEND_PRODUCCION=1')
+    parser.add_argument('--hilos', default='8,32', help='Clientes simultáneos a probar, separados por coma')
+    parser.add_argument('--duracion', type=float, default=10, help='Segundos por medición')
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn del modo producción')
+    args = parser.parse_args()
+
+    procesos = []
+    try:
+        servidores = {'actual': args.actual, 'producción': args.produccion}
+        if not args.actual:
+            servidores['actual'] = 'http://127.0.0.1:8181'
+            procesos.append(levantar([sys.executable, 'web_server.py'], {'FRONTEND_PUERTO': '8181'},
+                                     servidores['actual']))
+        if not args.produccion:
+            servidores['producción'] = 'http://127.0.0.1:8182'
+            procesos.append(levantar(
+                ['gunicorn', '-b', '127.0.0.1:8182', '-w', str(args.workers), '-k', 'gthread',
+                 '--threads', '8', 'web_server:app'],
+                {'FRONTEND_PRODUCCION': '1', 'FRONTEND_DIST': tempfile.mkdtemp(prefix='frontend_dist_')},
+                servidores['producción']
+            ))
+
+        for repetida in (False, True):
+            print(f"\n🚀 {'Visita repetida (con caché del navegador)' if repetida else 'Primera visita'}")
+            for hilos in (int(h) for h in args.hilos.split(',')):
+                print(f"  {hilos} clientes")
+                for nombre, url in servidores.items():
+                    medir(nombre, url, hilos, args.duracion, repetida)
+    finally:
+        for proceso in procesos:
+            detener(proceso)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline de facturación asíncrona.
+
+Requiere los servicios levantados con FACTURAS_ASYNC=1. Crea pedidos en
+paralelo (pedidos_service encola la factura de cada uno) y consulta el estado
+de las facturas hasta que todas terminan. Reporta:
+
+- Latencia del checkout: lo que espera el cliente al crear el pedido.
+- Rezago de la cola: tiempo entre encolar la factura y que un hilo la toma.
+- Latencia de punta a punta: de encolar a factura generada.
+- Facturas/segundo entre la primera factura encolada y la última terminada.
+
+Con --sincrono mide lo mismo con el flujo anterior (pedido + POST /api/facturas
+en la misma solicitud del cliente) para comparar.
+
+Uso:
+    FACTURAS_ASYNC=1 docker-compose up -d
+    python benchmark_facturas_async.py --pedidos 1000 --hilos 32
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clientes_api import crear_factura, crear_pedido, crear_sesion, estado_factura, fijar_stock, texto
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def resumen(nombre, segundos):
+    ms = [s * 1000 for s in segundos]
+    print(f"   {nombre:<28} p50 {statistics.median(ms):8.1f} ms   "
+          f"p95 {percentil(ms, 0.95):8.1f} ms   max {max(ms):8.1f} ms")
+
+
+def checkout(sesion, args, sincrono):
+    inicio = time.perf_counter()
+    response = crear_pedido(sesion, args.cliente, args.producto, 1)
+    if response is None or response.status_code != 200:
+        return None, None
+    pedido_id = texto(response, 'pedido_id')
+    if sincrono:
+        factura = crear_factura(sesion, pedido_id)
+        if factura is None or factura.status_code != 200:
+            return None, None
+    elif texto(response, 'factura_estado') is None:
+        raise SystemExit("❌ pedidos_service no encoló la factura; ¿se levantó con FACTURAS_ASYNC=1?")
+    return pedido_id, time.perf_counter() - inicio
+
+
+def esperar_facturas(sesion, pedido_ids, hilos, limite):
+    """Consulta los estados hasta que todos terminan; regresa {pedido_id: estado}"""
+    estados = {}
+    pendientes = list(pedido_ids)
+    fin = time.monotonic() + limite
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        while pendientes and time.monotonic() < fin:
+            for pedido_id, estado in zip(pendientes, executor.map(lambda pid: estado_factura(sesion, pid), pendientes)):
+                if estado and estado['estado'] in ('terminado', 'fallido'):
+                    estados[pedido_id] = estado
+            pendientes = [pid for pid in pendientes if pid not in estados]
+            if pendientes:
+                time.sleep(0.2)
+    return estados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput y rezago de la facturación asíncrona')
+    parser.add_argument('--producto', type=int, default=1, help='ID del producto de los pedidos')
+    parser.add_argument('--cliente', type=int, default=1, help='ID del cliente de los pedidos')
+    parser.add_argument('--pedidos', type=int, default=1000, help='Número de pedidos a crear')
+    parser.add_argument('--hilos', type=int, default=32, help='Clientes simultáneos')
+    parser.add_argument('--sincrono', action='store_true', help='Medir el flujo síncrono anterior')
+    parser.add_argument('--limite', type=float, default=300, help='Segundos máximos de espera por las facturas')
+    args = parser.parse_args()
+
+    modo = 'síncrono' if args.sincrono else 'asíncrono'
+    print(f"🚀 Benchmark de facturación ({modo}): {args.pedidos} pedidos, {args.hilos} hilos")
+    sesion = crear_sesion(args.hilos)
+    fijar_stock(args.producto, args.pedidos)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        resultados = list(executor.map(lambda _: checkout(sesion, args, args.sincrono), range(args.pedidos)))
+    fin_checkout = time.perf_counter()
+
+    exitosos = [(pid, seg) for pid, seg in resultados if pid is not None]
+    if not exitosos:
+        print("❌ Ningún pedido se completó")
+        sys.exit(1)
+
+    print("")
+    print(f"   Pedidos completados:         {len(exitosos)} de {args.pedidos}")
+    resumen('Latencia del checkout', [seg for _, seg in exitosos])
+
+    if args.sincrono:
+        duracion = fin_checkout - inicio
+        print(f"   Facturas/segundo:            {len(exitosos) / duracion:.1f}")
+        return
+
+    estados = esperar_facturas(sesion, [pid for pid, _ in exitosos], args.hilos, args.limite)
+    terminadas = [e for e in estados.values() if e['estado'] == 'terminado']
+    fallidas = [e for e in estados.values() if e['estado'] == 'fallido']
+
+    print(f"   Facturas terminadas:         {len(terminadas)}")
+    print(f"   Facturas fallidas:           {len(fallidas)}")
+    print(f"   Sin terminar:                {len(exitosos) - len(estados)}")
+    if terminadas:
+        resumen('Rezago de la cola', [e['tomado'] - e['encolado'] for e in terminadas])
+        resumen('Punta a punta', [e['terminado'] - e['encolado'] for e in terminadas])
+        # Con los tiempos del servidor, sin contar el intervalo de consulta
+        duracion = max(e['terminado'] for e in terminadas) - min(e['encolado'] for e in terminadas)
+        print(f"   Facturas/segundo:            {len(terminadas) / max(duracion, 1e-6):.1f}")
+
+    if fallidas or len(estados) != len(exitosos):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia de GET /api/facturas/<id> en frío y en caliente.
+
+La primera pasada sobre las facturas mide la lectura en frío (consulta a la
+base de datos y renderizado); las siguientes pasadas se sirven desde la caché
+de facturas renderizadas. Para una medición en frío real, vaciar la caché y
+reiniciar el servicio antes de correr el script:
+
+    docker-compose exec facturas sh -c 'rm -f /app/cache_facturas/*'
+    docker-compose restart facturas
+
+Uso:
+    python benchmark_facturas_lectura.py --desde 1 --hasta 500 --pasadas 5
+"""
+
+import argparse
+import statistics
+import time
+
+from clientes_api import FACTURAS_URL, crear_sesion
+
+
+def medir(sesion, ids):
+    """Lee cada factura una vez y regresa las latencias en milisegundos"""
+    latencias = []
+    for factura_id in ids:
+        inicio = time.perf_counter()
+        response = sesion.get(f"{FACTURAS_URL}/api/facturas/{factura_id}", timeout=10)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"Factura {factura_id}: código {response.status_code}")
+    return latencias
+
+
+def resumen(nombre, latencias):
+    ordenadas = sorted(latencias)
+    p95 = ordenadas[int(len(ordenadas) * 0.95) - 1] if len(ordenadas) > 1 else ordenadas[0]
+    print(f"   {nombre:<10} n={len(latencias):<6} media={statistics.mean(latencias):7.2f} ms  "
+          f"p50={statistics.median(latencias):7.2f} ms  p95={p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de lectura de facturas en frío y en caliente')
+    parser.add_argument('--desde', type=int, default=1, help='Primer ID de factura')
+    parser.add_argument('--hasta', type=int, default=200, help='Último ID de factura')
+    parser.add_argument('--pasadas', type=int, default=5, help='Pasadas en caliente')
+    args = parser.parse_args()
+
+    ids = list(range(args.desde, args.hasta + 1))
+    sesion = crear_sesion(1)
+
+    print(f"🚀 Benchmark de lectura de facturas ({len(ids)} facturas)")
+    frio = medir(sesion, ids)
+    caliente = []
+    for _ in range(args.pasadas):
+        caliente.extend(medir(sesion, ids))
+
+    print("")
+    resumen('Frío', frio)
+    resumen('Caliente', caliente)
+    print(f"\n   Mejora en la mediana: {statistics.median(frio) / statistics.median(caliente):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los formatos de respuesta: XML, JSON y MessagePack.
+
+No necesita los servicios levantados: serializa catálogos sintéticos con las
+mismas opciones que comun/negociacion.py y mide el tamaño de la respuesta y el
+tiempo de codificar (servidor) y decodificar (cliente) cada formato.
+
+Uso:
+    python benchmark_formatos.py --tamanos 100 1000 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'microservicios'))
+from comun.escritor_xml import Plantilla, documento
+
+from benchmark_escritor_xml import CAMPOS, catalogo
+
+PLANTILLA = Plantilla('product', CAMPOS)
+
+
+def a_primitivo(value):
+    # Mismo criterio que comun/negociacion.py: Decimal como texto
+    return str(value)
+
+
+def xml_codificar(productos):
+    return documento('products', PLANTILLA, productos).encode('utf-8')
+
+
+def xml_decodificar(cuerpo):
+    # Lo mismo que hace el frontend: recorrer cada <product> y leer sus campos
+    return [{hijo.tag: hijo.text for hijo in producto} for producto in ET.fromstring(cuerpo)]
+
+
+def json_codificar(productos):
+    return json.dumps(productos, default=a_primitivo, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def msgpack_codificar(productos):
+    return msgpack.packb(productos, default=a_primitivo, use_bin_type=True)
+
+
+FORMATOS = [
+    ('XML', xml_codificar, xml_decodificar),
+    ('JSON', json_codificar, json.loads),
+]
+if msgpack is not None:
+    FORMATOS.append(('MessagePack', msgpack_codificar, msgpack.unpackb))
+
+
+def medir(funcion, argumento, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(argumento)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tamaño y velocidad de XML, JSON y MessagePack')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    if msgpack is None:
+        print("⚠️  msgpack no está instalado (pip install msgpack); se omite MessagePack\n")
+
+    print(f"🚀 Benchmark de formatos de respuesta (mejor de {args.repeticiones})\n")
+    print(f"   {'Productos':>10} {'Formato':>12} {'Bytes':>12} {'Codificar ms':>14} {'Decodificar ms':>16}")
+    for n in args.tamanos:
+        productos = catalogo(n)
+        for nombre, codificar, decodificar in FORMATOS:
+            cuerpo = codificar(productos)
+            assert len(decodificar(cuerpo)) == n
+            codificado = medir(codificar, productos, args.repeticiones)
+            decodificado = medir(decodificar, cuerpo, args.repeticiones)
+            print(f"   {n:>10} {nombre:>12} {len(cuerpo):>12,} "
+                  f"{codificado * 1000:>14.2f} {decodificado * 1000:>16.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
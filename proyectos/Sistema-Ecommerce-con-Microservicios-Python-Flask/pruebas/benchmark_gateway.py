@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia directo a los servicios contra el gateway.
+
+Mide dos flujos del frontend, cada uno directo y a través del gateway:
+
+- Catálogo: GET /api/products con varios clientes simultáneos. A través del
+  gateway las lecturas idénticas que coinciden se agrupan en una sola llamada
+  y la respuesta viaja comprimida con gzip.
+- Checkout: directo son dos viajes (POST /api/pedidos y POST /api/facturas);
+  con el gateway es uno solo (POST /api/checkout).
+
+Reporta p50/p95, solicitudes por segundo y bytes recibidos, y al final las
+estadísticas de agrupación del gateway. Sube el stock del producto antes de
+empezar para que los pedidos no fallen por falta de existencias.
+
+Uso:
+    python benchmark_gateway.py --lecturas 2000 --checkouts 200 --hilos 32
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clientes_api import FACTURAS_URL, GATEWAY_URL, PEDIDOS_URL, PRODUCTS_URL, crear_sesion, fijar_stock, texto
+
+XML = {'Content-Type': 'application/xml'}
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def recibidos(response):
+    """Bytes que viajaron por la red (comprimidos si el servidor usó gzip)"""
+    return int(response.headers.get('Content-Length', len(response.content)))
+
+
+def leer_catalogo(sesion, base, accept):
+    inicio = time.perf_counter()
+    response = sesion.get(f"{base}/api/products", headers={'Accept': accept}, timeout=30)
+    response.raise_for_status()
+    return time.perf_counter() - inicio, recibidos(response)
+
+
+def checkout_directo(sesion, pedido_xml):
+    inicio = time.perf_counter()
+    response = sesion.post(f"{PEDIDOS_URL}/api/pedidos", data=pedido_xml, headers=XML, timeout=30)
+    response.raise_for_status()
+    total = recibidos(response)
+    factura_xml = f"<factura><pedido_id>{texto(response, 'pedido_id')}</pedido_id></factura>"
+    response = sesion.post(f"{FACTURAS_URL}/api/facturas", data=factura_xml, headers=XML, timeout=30)
+    response.raise_for_status()
+    return time.perf_counter() - inicio, total + recibidos(response)
+
+
+def checkout_gateway(sesion, pedido_xml):
+    inicio = time.perf_counter()
+    response = sesion.post(f"{GATEWAY_URL}/api/checkout", data=pedido_xml, headers=XML, timeout=30)
+    response.raise_for_status()
+    if texto(response, 'factura_error'):
+        raise RuntimeError(f"El gateway no generó la factura: {texto(response, 'factura_error')}")
+    return time.perf_counter() - inicio, recibidos(response)
+
+
+def correr(nombre, funcion, repeticiones, hilos):
+    sesion = crear_sesion(hilos)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        resultados = list(executor.map(lambda _: funcion(sesion), range(repeticiones)))
+    duracion = time.perf_counter() - inicio
+
+    ms = [segundos * 1000 for segundos, _ in resultados]
+    kb = sum(bytes_ for _, bytes_ in resultados) / repeticiones / 1024
+    print(f"   {nombre:<20} p50 {statistics.median(ms):8.1f} ms   p95 {percentil(ms, 0.95):8.1f} ms   "
+          f"{repeticiones / duracion:8.1f} sol/s   {kb:8.1f} KB/sol")
+    return statistics.median(ms)
+
+
+def estadisticas_gateway():
+    sesion = crear_sesion(1)
+    response = sesion.get(f"{GATEWAY_URL}/gateway/estadisticas", headers={'Accept': 'application/json'}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia directa contra el gateway')
+    parser.add_argument('--producto', type=int, default=1, help='ID del producto de los pedidos')
+    parser.add_argument('--cliente', type=int, default=1, help='ID del cliente de los pedidos')
+    parser.add_argument('--lecturas', type=int, default=2000, help='Lecturas del catálogo por variante')
+    parser.add_argument('--checkouts', type=int, default=200, help='Checkouts por variante')
+    parser.add_argument('--hilos', type=int, default=32, help='Clientes simultáneos')
+    parser.add_argument('--accept', default='application/json', help='Formato pedido para el catálogo')
+    args = parser.parse_args()
+
+    print(f"🚀 Benchmark del gateway ({args.hilos} clientes simultáneos)")
+    print(f"   Directo: {PRODUCTS_URL}, {PEDIDOS_URL}, {FACTURAS_URL}")
+    print(f"   Gateway: {GATEWAY_URL}")
+
+    antes = estadisticas_gateway()
+
+    print(f"\n📖 Catálogo ({args.lecturas} lecturas, {args.accept})")
+    directo = correr('Directo', lambda s: leer_catalogo(s, PRODUCTS_URL, args.accept), args.lecturas, args.hilos)
+    gateway = correr('Gateway', lambda s: leer_catalogo(s, GATEWAY_URL, args.accept), args.lecturas, args.hilos)
+    print(f"   Gateway/directo en la mediana: {gateway / directo:.2f}x")
+
+    fijar_stock(args.producto, (args.checkouts + 10) * 2)
+    pedido_xml = (
+        f'<pedido><cliente_id>{args.cliente}</cliente_id>'
+        f'<item><id>{args.producto}</id><cantidad>1</cantidad></item></pedido>'
+    )
+    print(f"\n🛒 Checkout ({args.checkouts} pedidos con factura)")
+    directo = correr('Directo (2 viajes)', lambda s: checkout_directo(s, pedido_xml), args.checkouts, args.hilos)
+    gateway = correr('Gateway (1 viaje)', lambda s: checkout_gateway(s, pedido_xml), args.checkouts, args.hilos)
+    print(f"   Gateway/directo en la mediana: {gateway / directo:.2f}x")
+
+    despues = estadisticas_gateway()
+    ejecutadas = despues['ejecutadas'] - antes['ejecutadas']
+    agrupadas = despues['agrupadas'] - antes['agrupadas']
+    print(f"\n🔗 Agrupación del gateway: {ejecutadas} llamadas a products_service, "
+          f"{agrupadas} lecturas resueltas con una llamada en curso")
+    if ejecutadas + agrupadas:
+        print(f"   {agrupadas / (ejecutadas + agrupadas):.1%} de las lecturas no llegaron al servicio")
+
+
+if __name__ == "__main__":
+    main()
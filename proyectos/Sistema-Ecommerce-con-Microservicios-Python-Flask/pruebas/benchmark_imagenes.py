@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las imágenes de productos (ver microservicios/products/imagenes_productos.py).
+
+1. Miniaturas (no requiere servicios): genera originales JPEG sintéticos del
+   tamaño de una foto de cámara y mide imágenes/segundo de generar_miniaturas
+   con distintos números de hilos, como los del pool de TrabajadorMiniaturas.
+   Requiere pip install Pillow.
+
+2. Catálogo (--catalogo): con los servicios levantados sube una imagen
+   sintética a cada producto por el flujo completo (URL firmada, PUT,
+   registro), mide cuánto tarda el pool en dejarlas todas listas y compara el
+   peso de una página del catálogo con los originales contra el de las
+   miniaturas que elige el navegador con srcset.
+
+Uso:
+    python benchmark_imagenes.py --hilos 1,2,4 --imagenes 40
+    python benchmark_imagenes.py --catalogo --densidad 2
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from clientes_api import PRODUCTS_URL, crear_sesion
+
+MICROSERVICIOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'microservicios')
+sys.path.extend([MICROSERVICIOS, os.path.join(MICROSERVICIOS, 'products')])
+from imagenes_productos import ANCHOS, Image, generar_miniaturas
+
+# Ancho en CSS de la imagen en la tarjeta del catálogo (TAMANO_IMAGEN en Frontend/factura.js)
+ANCHO_TARJETA = 260
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def imagen_sintetica(ancho, alto, semilla):
+    """JPEG con degradados y ruido: se comprime como una foto, no como un color plano"""
+    ruido = Image.effect_noise((ancho, alto), 40 + semilla % 20)
+    horizontal = Image.linear_gradient('L').resize((ancho, alto))
+    vertical = Image.linear_gradient('L').rotate(90).resize((ancho, alto))
+    imagen = Image.merge('RGB', (horizontal, ruido, vertical))
+    salida = io.BytesIO()
+    imagen.save(salida, 'JPEG', quality=90)
+    return salida.getvalue()
+
+
+def medir_miniaturas(originales, hilos):
+    tiempos = []
+
+    def generar(contenido):
+        inicio = time.perf_counter()
+        resultado = generar_miniaturas(contenido)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        return sum(len(m) for m in resultado['miniaturas'].values())
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        pesos = list(executor.map(generar, originales))
+    duracion = time.perf_counter() - inicio
+    entrada = sum(len(o) for o in originales) / 1024 / 1024
+    print(f"   {hilos:>3} hilos: {len(originales) / duracion:7.1f} imágenes/s   "
+          f"{len(originales) * len(ANCHOS) / duracion:7.1f} miniaturas/s   {entrada / duracion:6.1f} MiB/s   "
+          f"p50 {statistics.median(tiempos):7.1f} ms   p95 {percentil(tiempos, 0.95):7.1f} ms   "
+          f"{sum(pesos) / len(pesos) / 1024:6.1f} KiB de miniaturas por imagen")
+
+
+def subir_imagen(sesion, producto_id, contenido):
+    """Flujo del navegador: pedir la URL firmada, subir el original y registrarlo"""
+    response = sesion.post(f"{PRODUCTS_URL}/api/products/{producto_id}/imagen/subida",
+                           data='<imagen><tipo>image/jpeg</tipo></imagen>',
+                           headers={'Content-Type': 'application/xml'}, timeout=10)
+    response.raise_for_status()
+    subida = ET.fromstring(response.content)
+    response = sesion.put(subida.findtext('url'), data=contenido, headers={'Content-Type': 'image/jpeg'}, timeout=60)
+    response.raise_for_status()
+    response = sesion.post(f"{PRODUCTS_URL}/api/products/{producto_id}/imagen",
+                           data=f"<imagen><subida>{subida.findtext('clave')}</subida></imagen>",
+                           headers={'Content-Type': 'application/xml'}, timeout=10)
+    response.raise_for_status()
+
+
+def esperar_listas(sesion, productos, limite):
+    """Segundos hasta que todas las imágenes salen de 'pendiente', y cuántas fallaron"""
+    inicio = time.perf_counter()
+    pendientes = set(productos)
+    fallidas = 0
+    while pendientes and time.perf_counter() - inicio < limite:
+        for producto_id in list(pendientes):
+            estado = sesion.get(f"{PRODUCTS_URL}/api/products/{producto_id}/imagen",
+                                headers={'Accept': 'application/json'}, timeout=10).json()['estado']
+            if estado != 'pendiente':
+                pendientes.discard(producto_id)
+                fallidas += estado == 'fallida'
+        time.sleep(0.2)
+    return (None if pendientes else time.perf_counter() - inicio), fallidas
+
+
+def elegir_de_srcset(srcset, ancho):
+    """La candidata que elige el navegador: la más chica que cubre el ancho en píxeles"""
+    candidatas = sorted((int(w.rstrip('w')), url) for url, w in (c.strip().rsplit(' ', 1) for c in srcset.split(',')))
+    return next((url for w, url in candidatas if w >= ancho), candidatas[-1][1])
+
+
+def peso(sesion, url):
+    response = sesion.get(url, timeout=30)
+    response.raise_for_status()
+    return len(response.content)
+
+
+def medir_catalogo(args, ancho, alto):
+    sesion = crear_sesion(args.subidas)
+    productos = sesion.get(f"{PRODUCTS_URL}/api/products", headers={'Accept': 'application/json'}, timeout=30).json()
+    ids = [p['id'] for p in productos][:args.productos]
+    print(f"\n📤 Subiendo {len(ids)} imágenes con {args.subidas} clientes")
+    originales = [imagen_sintetica(ancho, alto, semilla) for semilla in range(len(ids))]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.subidas) as executor:
+        list(executor.map(lambda i: subir_imagen(sesion, ids[i], originales[i]), range(len(ids))))
+    subida = time.perf_counter() - inicio
+    listas, fallidas = esperar_listas(sesion, ids, args.espera)
+    if listas is None:
+        print(f"   ⚠️ Quedaron imágenes pendientes después de {args.espera:.0f} s")
+        return
+    print(f"   subida {subida:.2f} s; miniaturas listas {listas:.2f} s después "
+          f"({len(ids) / (subida + listas):.1f} imágenes/s de punta a punta, {fallidas} fallidas)")
+
+    productos = sesion.get(f"{PRODUCTS_URL}/api/products", headers={'Accept': 'application/json'}, timeout=30).json()
+    con_imagen = [p for p in productos if p.get('srcset')]
+    originales_kib = sum(peso(sesion, p['imagen']) for p in con_imagen) / 1024
+    miniaturas_kib = sum(
+        peso(sesion, elegir_de_srcset(p['srcset'], ANCHO_TARJETA * args.densidad)) for p in con_imagen
+    ) / 1024
+    print(f"\n📄 Página del catálogo con {len(con_imagen)} imágenes a {ANCHO_TARJETA} px CSS y densidad {args.densidad}x")
+    print(f"   originales  {originales_kib:10.1f} KiB")
+    print(f"   miniaturas  {miniaturas_kib:10.1f} KiB   ({originales_kib / max(miniaturas_kib, 0.001):.0f} veces menos)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Miniaturas/segundo y peso del catálogo con y sin miniaturas')
+    parser.add_argument('--hilos', default='1,2,4', help='Hilos del pool a probar, separados por coma')
+    parser.add_argument('--imagenes', type=int, default=40, help='Originales por medición')
+    parser.add_argument('--tamano', default='4000x3000', help='Tamaño de los originales sintéticos')
+    parser.add_argument('--catalogo', action='store_true', help='Subir imágenes a los servicios y medir el catálogo')
+    parser.add_argument('--productos', type=int, default=50, help='Productos a los que se sube imagen con --catalogo')
+    parser.add_argument('--subidas', type=int, default=8, help='Clientes que suben imágenes en paralelo')
+    parser.add_argument('--densidad', type=int, default=2, help='Densidad de píxeles de la pantalla simulada')
+    parser.add_argument('--espera', type=float, default=300, help='Segundos máximos para que las miniaturas estén listas')
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit("❌ Se requiere Pillow: pip install Pillow")
+    ancho, alto = (int(n) for n in args.tamano.split('x'))
+    # Originales distintos: iguales se procesarían una sola vez en la caché por hash
+    originales = [imagen_sintetica(ancho, alto, semilla) for semilla in range(args.imagenes)]
+    print(f"🖼️  {len(originales)} originales de {args.tamano}, "
+          f"{sum(len(o) for o in originales) / len(originales) / 1024:.0f} KiB en promedio; miniaturas de {ANCHOS} px")
+    for hilos in (int(h) for h in args.hilos.split(',')):
+        medir_miniaturas(originales, hilos)
+
+    if args.catalogo:
+        try:
+            medir_catalogo(args, ancho, alto)
+        except requests.exceptions.RequestException as e:
+            raise SystemExit(f"❌ Error con {PRODUCTS_URL}: {e}")
+
+
+if __name__ == "__main__":
+    main()
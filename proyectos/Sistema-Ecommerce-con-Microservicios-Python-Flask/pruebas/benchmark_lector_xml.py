@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark del lector de XML compartido contra el parseo anterior
+(request.data.decode('utf-8') + ET.fromstring).
+
+No necesita los servicios levantados: arma pedidos sintéticos con distinto
+número de renglones y mide pedidos por segundo y el pico de memoria
+(tracemalloc) de cada método, incluida la copia del cuerpo en memoria.
+
+Uso:
+    python benchmark_lector_xml.py --items 10 100 1000 10000
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'microservicios'))
+from comun.lector_xml import Campo, Esquema, Lista, leer_xml
+
+# Mismo esquema que pedidos_service, sin el límite de renglones para poder
+# medir pedidos grandes
+ESQUEMA = Esquema('pedido', {
+    'cliente_id': Campo(int, requerido=True, minimo=1),
+}, listas={
+    'item': Lista('items', {
+        'id': Campo(int, requerido=True, minimo=1),
+        'cantidad': Campo(int, requerido=True, minimo=1),
+    }, maximo=10 ** 9),
+}, max_elementos=10 ** 9)
+
+
+def pedido(items):
+    renglones = ''.join(f'<item><id>{i % 50 + 1}</id><cantidad>{i % 3 + 1}</cantidad></item>' for i in range(items))
+    return f'<pedido><cliente_id>1</cliente_id>{renglones}</pedido>'.encode('utf-8')
+
+
+def con_fromstring(cuerpo):
+    # Código anterior de create_pedido; request.data ya es una copia del cuerpo
+    root = ET.fromstring(bytes(cuerpo).decode('utf-8'))
+    return {
+        'cliente_id': int(root.find('cliente_id').text),
+        'items': [{
+            'id': int(item.find('id').text),
+            'cantidad': int(item.find('cantidad').text),
+        } for item in root.findall('item')],
+    }
+
+
+def con_lector(cuerpo):
+    return leer_xml(io.BytesIO(cuerpo), ESQUEMA, len(cuerpo), limite_bytes=len(cuerpo))
+
+
+METODOS = [
+    ('ET.fromstring', con_fromstring),
+    ('leer_xml', con_lector),
+]
+
+
+def medir(funcion, cuerpo, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(cuerpo)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def pico_memoria(funcion, cuerpo):
+    tracemalloc.start()
+    funcion(cuerpo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput y memoria al parsear pedidos XML')
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    # Ambos métodos deben producir el mismo resultado
+    muestra = pedido(25)
+    assert con_fromstring(muestra) == con_lector(muestra)
+
+    print(f"🚀 Benchmark de lectura de pedidos XML (mejor de {args.repeticiones})\n")
+    print(f"   {'Renglones':>10} {'Bytes':>10} {'Método':>15} {'Pedidos/s':>12} {'Pico KiB':>10}")
+    for items in args.items:
+        cuerpo = pedido(items)
+        for nombre, funcion in METODOS:
+            segundos = medir(funcion, cuerpo, args.repeticiones)
+            pico = pico_memoria(funcion, cuerpo)
+            print(f"   {items:>10} {len(cuerpo):>10,} {nombre:>15} {1 / segundos:>12,.0f} {pico / 1024:>10,.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escritura de pedidos con y sin eventos (outbox transaccional).
+
+Lanza pedidos en paralelo sobre unos pocos productos "calientes" y reporta
+pedidos/segundo, p50/p95 y errores. Sin eventos cada pedido descuenta el stock
+en su transacción y los pedidos simultáneos se forman detrás del candado de
+la fila del producto; con EVENTOS=1 el pedido sólo inserta en las tablas de
+pedidos y products descuenta el stock después, uno tras otro.
+
+Con eventos también mide cuánto tardan el relay y los consumidores en vaciar
+las tablas de salida y alcanzar al último evento, y verifica que no haya
+sobreventa. El modo se lee de GET /api/pedidos/eventos; para comparar, correr
+una vez con cada valor:
+
+    docker-compose up -d
+    python benchmark_outbox.py --hilos 16,64
+    EVENTOS=1 docker-compose --profile eventos up -d
+    python benchmark_outbox.py --hilos 16,64
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from clientes_api import FACTURAS_URL, PEDIDOS_URL, PRODUCTS_URL, crear_pedido, crear_sesion, fijar_stock, obtener_producto
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def estadisticas_eventos(sesion, url):
+    return sesion.get(url, headers={'Accept': 'application/json'}, timeout=10).json()
+
+
+def esperar_consumidores(sesion, limite):
+    """Segundos hasta que no quedan eventos por publicar ni por consumir"""
+    urls = [f"{PEDIDOS_URL}/api/pedidos/eventos", f"{PRODUCTS_URL}/api/products/eventos",
+            f"{FACTURAS_URL}/api/facturas/eventos"]
+    inicio = time.perf_counter()
+    seguidos = 0
+    while time.perf_counter() - inicio < limite:
+        estados = [estadisticas_eventos(sesion, url) for url in urls]
+        pendientes = sum(e.get('salida_pendiente') or 0 for e in estados)
+        retraso = sum(e.get('retraso') or 0 for e in estados)
+        # Dos lecturas seguidas en cero: products pudo publicar la respuesta
+        # a un pedido entre la lectura de una tabla y la de otra
+        seguidos = seguidos + 1 if pendientes == 0 and retraso == 0 else 0
+        if seguidos == 2:
+            return time.perf_counter() - inicio
+        time.sleep(0.1)
+    return None
+
+
+def pedido_medido(sesion, args, productos, latencias):
+    inicio = time.perf_counter()
+    response = crear_pedido(sesion, args.cliente, random.choice(productos), args.cantidad)
+    if response is not None and response.status_code == 200:
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return response.status_code if response is not None else None
+
+
+def medir(args, productos, hilos, eventos):
+    for producto_id in productos:
+        fijar_stock(producto_id, args.stock)
+    sesion = crear_sesion(hilos)
+    if eventos:
+        # El stock nuevo tiene que llegar al modelo de lectura de pedidos
+        esperar_consumidores(sesion, args.espera)
+
+    latencias = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        resultados = list(executor.map(
+            lambda _: pedido_medido(sesion, args, productos, latencias), range(args.pedidos)
+        ))
+    duracion = time.perf_counter() - inicio
+
+    aceptados = resultados.count(200)
+    rechazados = resultados.count(400)
+    errores = len(resultados) - aceptados - rechazados
+    print(f"   {hilos:>4} clientes: {aceptados / duracion:8.1f} pedidos/s   "
+          f"p50 {statistics.median(latencias) if latencias else 0:7.1f} ms   "
+          f"p95 {percentil(latencias, 0.95) if latencias else 0:7.1f} ms   "
+          f"rechazados {rechazados:>4}   errores {errores:>4}")
+
+    if eventos:
+        drenado = esperar_consumidores(sesion, args.espera)
+        if drenado is None:
+            print(f"        ⚠️ Los consumidores no alcanzaron al último evento en {args.espera:.0f} s")
+            return False
+        print(f"        consumidores al día {drenado:.2f} s después del último pedido")
+
+    vendido = sum(args.stock - int(obtener_producto(p)['stock']) for p in productos)
+    # Con eventos un pedido aceptado todavía puede ser rechazado por products
+    if vendido < 0 or vendido > aceptados * args.cantidad or (not eventos and vendido != aceptados * args.cantidad):
+        print(f"        ❌ Stock inconsistente: se vendieron {vendido} unidades con {aceptados} pedidos aceptados")
+        return False
+    return errores == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pedidos/segundo sobre productos calientes con y sin eventos')
+    parser.add_argument('--productos', default='1,2', help='IDs de los productos calientes, separados por coma')
+    parser.add_argument('--cliente', type=int, default=1, help='ID del cliente de los pedidos')
+    parser.add_argument('--stock', type=int, default=100000, help='Stock inicial de cada producto')
+    parser.add_argument('--pedidos', type=int, default=2000, help='Pedidos por medición')
+    parser.add_argument('--cantidad', type=int, default=1, help='Unidades por pedido')
+    parser.add_argument('--hilos', default='16,64', help='Clientes simultáneos a probar, separados por coma')
+    parser.add_argument('--espera', type=float, default=120, help='Segundos máximos para que los consumidores se pongan al día')
+    args = parser.parse_args()
+
+    productos = [int(p) for p in args.productos.split(',')]
+    try:
+        eventos = bool(estadisticas_eventos(requests.Session(), f"{PEDIDOS_URL}/api/pedidos/eventos")['activo'])
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        raise SystemExit(f"❌ No se pudo leer {PEDIDOS_URL}/api/pedidos/eventos")
+
+    print(f"🚀 Pedidos sobre los productos {args.productos} con "
+          f"{'eventos (EVENTOS=1)' if eventos else 'reserva de stock en la transacción (EVENTOS=0)'}")
+    correcto = True
+    for hilos in (int(h) for h in args.hilos.split(',')):
+        correcto = medir(args, productos, hilos, eventos) and correcto
+
+    if not correcto:
+        sys.exit(1)
+    print("\n✅ Sin sobreventa ni errores")
+
+
+if __name__ == "__main__":
+    main()
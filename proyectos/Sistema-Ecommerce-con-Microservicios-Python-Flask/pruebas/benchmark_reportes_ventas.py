@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Generador de pedidos y benchmark de los reportes de ventas.
+
+Con --generar inserta pedidos sintéticos directamente en MariaDB (repartidos en
+los últimos --dias días, de 1 a 3 productos cada uno) y los suma a los
+resúmenes diarios con resumen_ventas.ResumenVentas.acumular, lote por lote.
+Los pedidos generados no descuentan stock.
+
+Después mide, para varios rangos de fechas y cada agrupación, la consulta sobre
+los resúmenes (la que usa GET /api/pedidos/reportes/ventas) contra la consulta
+directa sobre pedidos y pedidos_detalle, y verifica que ambas sumen lo mismo.
+Al final mide el endpoint por HTTP.
+
+Requiere `pip install mysqlclient requests` y el puerto 3306 de la base de datos.
+
+Uso:
+    python benchmark_reportes_ventas.py --generar 1000000 --dias 730
+    python benchmark_reportes_ventas.py --rangos 7,30,365 --repeticiones 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import requests
+
+from clientes_api import PEDIDOS_URL, conectar_bd
+
+# resumen_ventas no depende de Flask; se importa directo del servicio
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'microservicios', 'pedidos'))
+from resumen_ventas import CONSULTAS, ResumenVentas
+
+# Las mismas preguntas respondidas recorriendo los pedidos
+CONSULTAS_DIRECTAS = {
+    'dia': """
+        SELECT DATE(fecha) AS fecha, COUNT(*) AS pedidos, SUM(subtotal) AS subtotal,
+               SUM(impuestos) AS impuestos, SUM(total) AS total
+        FROM pedidos
+        WHERE fecha >= %s AND fecha < %s + INTERVAL 1 DAY
+        GROUP BY DATE(fecha)
+    """,
+    'producto': """
+        SELECT d.producto_id, SUM(d.cantidad) AS unidades, SUM(d.cantidad * d.precio_unitario) AS importe,
+               COUNT(DISTINCT d.pedido_id) AS pedidos
+        FROM pedidos p JOIN pedidos_detalle d ON d.pedido_id = p.id
+        WHERE p.fecha >= %s AND p.fecha < %s + INTERVAL 1 DAY
+        GROUP BY d.producto_id
+    """,
+    'material': """
+        SELECT COALESCE(pr.material, '') AS material, SUM(d.cantidad) AS unidades,
+               SUM(d.cantidad * d.precio_unitario) AS importe, COUNT(DISTINCT d.pedido_id) AS pedidos
+        FROM pedidos p JOIN pedidos_detalle d ON d.pedido_id = p.id
+        LEFT JOIN products pr ON pr.id = d.producto_id
+        WHERE p.fecha >= %s AND p.fecha < %s + INTERVAL 1 DAY
+        GROUP BY COALESCE(pr.material, '')
+    """,
+    'marca': """
+        SELECT COALESCE(pr.marca, '') AS marca, SUM(d.cantidad) AS unidades,
+               SUM(d.cantidad * d.precio_unitario) AS importe, COUNT(DISTINCT d.pedido_id) AS pedidos
+        FROM pedidos p JOIN pedidos_detalle d ON d.pedido_id = p.id
+        LEFT JOIN products pr ON pr.id = d.producto_id
+        WHERE p.fecha >= %s AND p.fecha < %s + INTERVAL 1 DAY
+        GROUP BY COALESCE(pr.marca, '')
+    """,
+}
+
+
+def generar(conexion, resumen, cantidad, dias, lote):
+    cur = conexion.cursor()
+    cur.execute("SELECT id, precio FROM products")
+    productos = [(fila['id'], fila['precio']) for fila in cur.fetchall()]
+    cur.execute("SELECT id FROM clientes")
+    clientes = [fila['id'] for fila in cur.fetchall()]
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS ultimo FROM pedidos")
+    siguiente = cur.fetchone()['ultimo'] + 1
+    if not productos or not clientes:
+        raise SystemExit("❌ Se necesitan productos y clientes en la base de datos")
+
+    ahora = datetime.now()
+    inicio = time.perf_counter()
+    generados = 0
+    while generados < cantidad:
+        n = min(lote, cantidad - generados)
+        pedidos, detalle = [], []
+        for pedido_id in range(siguiente, siguiente + n):
+            fecha = ahora - timedelta(seconds=random.randint(0, dias * 86400 - 1))
+            subtotal = Decimal('0')
+            for producto_id, precio in random.sample(productos, random.randint(1, min(3, len(productos)))):
+                cantidad_item = random.randint(1, 3)
+                subtotal += precio * cantidad_item
+                detalle.append((pedido_id, producto_id, cantidad_item, precio))
+            impuestos = (subtotal * Decimal('0.16')).quantize(Decimal('0.01'))
+            pedidos.append((pedido_id, random.choice(clientes), fecha, subtotal, impuestos, subtotal + impuestos))
+
+        cur.execute("START TRANSACTION")
+        cur.executemany(
+            "INSERT INTO pedidos (id, cliente_id, fecha, subtotal, impuestos, total) VALUES (%s, %s, %s, %s, %s, %s)",
+            pedidos
+        )
+        cur.executemany(
+            "INSERT INTO pedidos_detalle (pedido_id, producto_id, cantidad, precio_unitario) VALUES (%s, %s, %s, %s)",
+            detalle
+        )
+        resumen.acumular(cur, siguiente, siguiente + n - 1)
+        cur.execute("COMMIT")
+
+        siguiente += n
+        generados += n
+        transcurrido = time.perf_counter() - inicio
+        print(f"\r   {generados:>9} pedidos ({generados / transcurrido:,.0f} pedidos/s)", end='', flush=True)
+    print("")
+    cur.close()
+
+
+def cronometrar(cur, sql, args, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cur.execute(sql, args)
+        filas = cur.fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), filas
+
+
+def suma(filas, campo):
+    return sum(fila[campo] or 0 for fila in filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera pedidos y compara reportes con resúmenes contra consultas directas')
+    parser.add_argument('--generar', type=int, default=0, help='Pedidos sintéticos a insertar antes de medir')
+    parser.add_argument('--dias', type=int, default=730, help='Días hacia atrás en los que se reparten los pedidos')
+    parser.add_argument('--lote', type=int, default=5000, help='Pedidos por transacción al generar')
+    parser.add_argument('--rangos', default='7,30,365', help='Rangos de días a consultar, separados por coma')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones por consulta (se reporta la mediana)')
+    args = parser.parse_args()
+
+    conexion = conectar_bd()
+    resumen = ResumenVentas(conectar_bd)
+    resumen.asegurar_tablas()
+
+    if args.generar:
+        print(f"🧪 Generando {args.generar} pedidos en {args.dias} días")
+        generar(conexion, resumen, args.generar, args.dias, args.lote)
+
+    cur = conexion.cursor()
+    cur.execute("SELECT COUNT(*) AS pedidos FROM pedidos")
+    print(f"\n🚀 Reportes de ventas sobre {cur.fetchone()['pedidos']:,} pedidos")
+
+    hasta = date.today()
+    for dias in (int(d) for d in args.rangos.split(',')):
+        desde = hasta - timedelta(days=dias - 1)
+        print(f"\n📅 Últimos {dias} días ({desde} a {hasta})")
+        for por in CONSULTAS:
+            ms_resumen, filas_resumen = cronometrar(cur, CONSULTAS[por], (desde, hasta), args.repeticiones)
+            ms_directa, filas_directa = cronometrar(cur, CONSULTAS_DIRECTAS[por], (desde, hasta), args.repeticiones)
+            campo = 'total' if por == 'dia' else 'importe'
+            coincide = '✅' if suma(filas_resumen, campo) == suma(filas_directa, campo) else '⚠️ no coincide'
+            print(f"   {por:<9} resúmenes {ms_resumen:9.2f} ms   directa {ms_directa:10.2f} ms   "
+                  f"{ms_directa / max(ms_resumen, 0.001):8.1f}x   {coincide}")
+    cur.close()
+
+    print(f"\n🌐 GET {PEDIDOS_URL}/api/pedidos/reportes/ventas (último rango)")
+    sesion = requests.Session()
+    for por in CONSULTAS:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            response = sesion.get(f"{PEDIDOS_URL}/api/pedidos/reportes/ventas",
+                                  params={'por': por, 'desde': desde.isoformat(), 'hasta': hasta.isoformat()},
+                                  headers={'Accept': 'application/json'}, timeout=30)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            response.raise_for_status()
+        print(f"   {por:<9} {statistics.median(tiempos):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
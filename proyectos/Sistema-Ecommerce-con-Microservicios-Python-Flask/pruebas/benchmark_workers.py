@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark de workers e hilos de gunicorn y del pool de conexiones.
+
+Genera carga de lectura contra products_service (GET /api/products/<id> y, en
+la proporción indicada, el catálogo completo) y reporta solicitudes/segundo,
+p50/p95 y errores. Al final de cada corrida lee GET /api/products/db/pool de
+todos los workers: si hay esperas o PoolAgotado, el pool es más chico que los
+hilos o la base de datos ya no da más.
+
+Sin --configuraciones mide el servicio como está levantado. Con
+--configuraciones recrea el contenedor de products con cada combinación
+WORKERSxHILOS (el pool se ajusta al número de hilos) antes de medir; con
+--preparadas 1,0 repite cada combinación con y sin sentencias preparadas.
+
+Uso:
+    python benchmark_workers.py --hilos 16,64 --duracion 20
+    python benchmark_workers.py --configuraciones 1x8,2x8,4x8,2x16 --preparadas 1,0
+"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from clientes_api import PRODUCTS_URL, crear_sesion
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def recrear_servicio(workers, hilos, preparadas):
+    """Levanta de nuevo products con la configuración indicada y espera a que responda"""
+    entorno = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(hilos),
+                   MYSQL_POOL_TAMANO=str(hilos), MYSQL_PREPARADAS=preparadas)
+    subprocess.run(['docker-compose', 'up', '-d', '--no-deps', '--force-recreate', 'products'],
+                   cwd=RAIZ_PROYECTO, env=entorno, check=True, capture_output=True)
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        try:
+            if requests.get(f"{PRODUCTS_URL}/api/products/db/pool", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise SystemExit("❌ products_service no respondió después de recrearlo")
+
+
+def cargar(sesion, args, fin, latencias, errores):
+    while time.monotonic() < fin:
+        if random.random() < args.catalogo:
+            url = f"{PRODUCTS_URL}/api/products"
+        else:
+            url = f"{PRODUCTS_URL}/api/products/{random.randint(1, args.productos)}"
+        inicio = time.perf_counter()
+        try:
+            response = sesion.get(url, headers={'Accept': 'application/json'}, timeout=30)
+            ok = response.status_code in (200, 404)
+        except requests.exceptions.RequestException:
+            ok = False
+        if ok:
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        else:
+            errores.append(1)
+
+
+def estadisticas_pool(sesion, intentos=20):
+    """Lee el pool de cada worker; cada lectura cae en un worker al azar"""
+    por_proceso = {}
+    for _ in range(intentos):
+        datos = sesion.get(f"{PRODUCTS_URL}/api/products/db/pool",
+                           headers={'Accept': 'application/json'}, timeout=10).json()
+        por_proceso[datos['proceso']] = datos
+    return por_proceso
+
+
+def medir(args, hilos):
+    sesion = crear_sesion(hilos)
+    antes = estadisticas_pool(sesion)
+    latencias, errores = [], []
+    fin = time.monotonic() + args.duracion
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for _ in range(hilos):
+            executor.submit(cargar, sesion, args, fin, latencias, errores)
+    despues = estadisticas_pool(sesion)
+
+    esperas = sum(d['esperas'] - antes.get(p, {}).get('esperas', 0) for p, d in despues.items())
+    agotado = sum(d['agotado'] - antes.get(p, {}).get('agotado', 0) for p, d in despues.items())
+    if not latencias:
+        print(f"   {hilos:>4} clientes: sin respuestas exitosas ({len(errores)} errores)")
+        return
+    print(f"   {hilos:>4} clientes: {len(latencias) / args.duracion:8.1f} sol/s   "
+          f"p50 {statistics.median(latencias):7.1f} ms   p95 {percentil(latencias, 0.95):7.1f} ms   "
+          f"errores {len(errores):>4}   esperas del pool {esperas:>5}   agotado {agotado:>3}   "
+          f"workers vistos {len(despues)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solicitudes/segundo por combinación de workers, hilos y pool')
+    parser.add_argument('--configuraciones', default='', help='Combinaciones WORKERSxHILOS separadas por coma, p. ej. 1x8,2x8')
+    parser.add_argument('--preparadas', default='1', help='Valores de MYSQL_PREPARADAS a probar, p. ej. 1,0')
+    parser.add_argument('--hilos', default='16,64', help='Clientes simultáneos a probar, separados por coma')
+    parser.add_argument('--duracion', type=float, default=20, help='Segundos por medición')
+    parser.add_argument('--productos', type=int, default=50, help='IDs de producto entre 1 y este valor')
+    parser.add_argument('--catalogo', type=float, default=0.1, help='Proporción de lecturas del catálogo completo')
+    args = parser.parse_args()
+
+    clientes = [int(h) for h in args.hilos.split(',')]
+    configuraciones = [tuple(int(n) for n in c.split('x')) for c in args.configuraciones.split(',') if c]
+
+    print(f"🚀 Benchmark de workers contra {PRODUCTS_URL} ({args.duracion:.0f} s por medición)")
+    if not configuraciones:
+        print("\n⚙️  Configuración actual del servicio")
+        for hilos in clientes:
+            medir(args, hilos)
+        return
+
+    for workers, hilos_worker in configuraciones:
+        for preparadas in args.preparadas.split(','):
+            print(f"\n⚙️  {workers} workers x {hilos_worker} hilos, pool {hilos_worker}, preparadas={preparadas}")
+            recrear_servicio(workers, hilos_worker, preparadas)
+            for hilos in clientes:
+                medir(args, hilos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Funciones de apoyo compartidas por los scripts de prueba para llamar a los
+microservicios de la joyería.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+
+import requests
+
+PRODUCTS_URL = os.getenv('PRODUCTS_URL', 'http://localhost:5001')
+PEDIDOS_URL = os.getenv('PEDIDOS_URL', 'http://localhost:5002')
+FACTURAS_URL = os.getenv('FACTURAS_URL', 'http://localhost:5003')
+GATEWAY_URL = os.getenv('GATEWAY_URL', 'http://localhost:5004')
+
+# Conexión directa a MariaDB (puerto expuesto por docker-compose) para los
+# scripts que cargan datos masivos
+MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
+MYSQL_PORT = int(os.getenv('MYSQL_PORT', '3306'))
+MYSQL_USER = os.getenv('MYSQL_USER', 'raul')
+MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '123')
+MYSQL_DB = os.getenv('MYSQL_DB', 'joyeria_db')
+
+CAMPOS_PRODUCTO = ['codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates']
+
+
+def crear_sesion(conexiones):
+    """Sesión HTTP con un pool del tamaño del número de hilos de la prueba"""
+    sesion = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones)
+    sesion.mount('http://', adapter)
+    return sesion
+
+
+def conectar_bd():
+    """Conexión directa a la base de datos con cursores de diccionario (pip install mysqlclient)"""
+    import MySQLdb
+    import MySQLdb.cursors
+    return MySQLdb.connect(
+        host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER, passwd=MYSQL_PASSWORD, db=MYSQL_DB,
+        charset='utf8mb4', cursorclass=MySQLdb.cursors.DictCursor, autocommit=True
+    )
+
+
+def obtener_producto(producto_id):
+    """Obtiene el producto como diccionario desde el servicio de productos"""
+    response = requests.get(f"{PRODUCTS_URL}/api/products/{producto_id}", timeout=10)
+    response.raise_for_status()
+    root = ET.fromstring(response.content)
+    return {child.tag: child.text for child in root}
+
+
+def fijar_stock(producto_id, stock):
+    """Actualiza el stock del producto para iniciar la prueba desde un valor conocido"""
+    producto = obtener_producto(producto_id)
+    producto['stock'] = str(stock)
+    root = ET.Element('product')
+    for campo in CAMPOS_PRODUCTO:
+        if producto.get(campo) not in (None, ''):
+            ET.SubElement(root, campo).text = producto[campo]
+    response = requests.put(
+        f"{PRODUCTS_URL}/api/products/update/{producto_id}",
+        data=ET.tostring(root),
+        headers={'Content-Type': 'application/xml'},
+        timeout=10
+    )
+    response.raise_for_status()
+
+
+def crear_pedido(sesion, cliente_id, producto_id, cantidad):
+    """Envía un pedido y regresa la respuesta (None si hubo error de red)"""
+    xml_data = (
+        f'<pedido><cliente_id>{cliente_id}</cliente_id>'
+        f'<item><id>{producto_id}</id><cantidad>{cantidad}</cantidad></item></pedido>'
+    )
+    try:
+        return sesion.post(
+            f"{PEDIDOS_URL}/api/pedidos",
+            data=xml_data,
+            headers={'Content-Type': 'application/xml'},
+            timeout=30
+        )
+    except requests.exceptions.RequestException:
+        return None
+
+
+def crear_factura(sesion, pedido_id):
+    """Solicita la factura de un pedido y regresa la respuesta (None si hubo error de red)"""
+    try:
+        return sesion.post(
+            f"{FACTURAS_URL}/api/facturas",
+            data=f'<factura><pedido_id>{pedido_id}</pedido_id></factura>',
+            headers={'Content-Type': 'application/xml'},
+            timeout=30
+        )
+    except requests.exceptions.RequestException:
+        return None
+
+
+def estado_factura(sesion, pedido_id):
+    """Estado de la factura de un pedido como diccionario (None si aún no existe o hubo error)"""
+    try:
+        response = sesion.get(
+            f"{FACTURAS_URL}/api/facturas/pedido/{pedido_id}/estado",
+            headers={'Accept': 'application/json'},
+            timeout=10
+        )
+    except requests.exceptions.RequestException:
+        return None
+    return response.json() if response.status_code == 200 else None
+
+
+def texto(response, etiqueta):
+    """Extrae el texto de la primera etiqueta encontrada en una respuesta XML"""
+    elem = ET.fromstring(response.content).find(f'.//{etiqueta}')
+    return elem.text if elem is not None else None
+
@@ -0,0 +1,141 @@
+# locust_escritura_intensiva.py
+"""
+Prueba de Escritura Intensiva (Write-Heavy Test) de la joyería:
+- Objetivo: Medir la caché de productos mientras los precios cambian y se
+  crean pedidos y facturas sin parar.
+- Carga: Moderada; cada usuario compra, factura y de vez en cuando un
+  administrador cambia el precio de un producto (lo que invalida la caché).
+- Tareas: 'write' (pedidos, facturas y cambios de precio) y 'read' (catálogo
+  y consulta de facturas).
+- Al terminar imprime la tasa de aciertos de la caché de productos en pedidos y
+  facturas, restando lo que ya tenían contado al iniciar la prueba.
+"""
+
+import os
+import random
+from xml.sax.saxutils import escape
+
+import requests
+from locust import HttpUser, between, events, tag, task
+
+from clientes_api import CAMPOS_PRODUCTO, FACTURAS_URL, PEDIDOS_URL, PRODUCTS_URL, fijar_stock, obtener_producto
+
+PRODUCTOS = [int(p) for p in os.getenv('PRODUCTOS', '1,2,3,4,5').split(',')]
+CLIENTE_ID = int(os.getenv('CLIENTE_ID', '1'))
+
+ENDPOINTS_CACHE = {
+    'pedidos': f"{PEDIDOS_URL}/api/pedidos/cache/productos",
+    'facturas': f"{FACTURAS_URL}/api/facturas/cache/productos",
+}
+
+# --- Comandos para Ejecutar esta Prueba ---
+#
+# Windows (PowerShell):
+# $env:PRODUCTOS="1,2,3,4,5"; locust -f locust_escritura_intensiva.py --headless -u 40 -r 4 --run-time 5m -T write
+#
+# Linux / macOS / Git Bash:
+# PRODUCTOS=1,2,3,4,5 locust -f locust_escritura_intensiva.py --headless -u 40 -r 4 --run-time 5m -T write
+
+_inicio_cache = {}
+
+
+def leer_estadisticas():
+    estadisticas = {}
+    for servicio, url in ENDPOINTS_CACHE.items():
+        try:
+            response = requests.get(url, headers={'Accept': 'application/json'}, timeout=10)
+            estadisticas[servicio] = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            estadisticas[servicio] = None
+    return estadisticas
+
+
+@events.test_start.add_listener
+def preparar(environment, **kwargs):
+    # Stock de sobra para que los pedidos no fallen por inventario
+    for producto_id in PRODUCTOS:
+        fijar_stock(producto_id, 1_000_000)
+    _inicio_cache.update(leer_estadisticas())
+
+
+@events.test_stop.add_listener
+def reportar_cache(environment, **kwargs):
+    print("\n📊 Caché de productos durante la prueba")
+    for servicio, final in leer_estadisticas().items():
+        inicial = _inicio_cache.get(servicio)
+        if not final or not inicial:
+            print(f"   {servicio:<10} sin estadísticas")
+            continue
+        delta = {clave: final[clave] - inicial[clave] for clave in ('memoria', 'redis', 'base_datos', 'invalidaciones')}
+        lecturas = delta['memoria'] + delta['redis'] + delta['base_datos']
+        tasa = (delta['memoria'] + delta['redis']) / lecturas if lecturas else 0
+        print(f"   {servicio:<10} aciertos {tasa:6.1%}   memoria {delta['memoria']:>7}   redis {delta['redis']:>7}   "
+              f"base de datos {delta['base_datos']:>7}   invalidaciones {delta['invalidaciones']:>5}")
+
+
+class ClienteJoyeria(HttpUser):
+    host = PRODUCTS_URL
+    wait_time = between(0.1, 0.5)
+
+    def on_start(self):
+        self.facturas = []
+
+    @tag('write')
+    @task(6)
+    def comprar(self):
+        productos = random.sample(PRODUCTOS, k=random.randint(1, min(3, len(PRODUCTOS))))
+        renglones = ''.join(f'<item><id>{pid}</id><cantidad>1</cantidad></item>' for pid in productos)
+        with self.client.post(
+            f"{PEDIDOS_URL}/api/pedidos",
+            data=f'<pedido><cliente_id>{CLIENTE_ID}</cliente_id>{renglones}</pedido>',
+            headers={'Content-Type': 'application/xml', 'Accept': 'application/json'},
+            name='POST /api/pedidos',
+            catch_response=True
+        ) as response:
+            if response.status_code != 200:
+                response.failure(response.text)
+                return
+            pedido = response.json()
+
+        if pedido.get('factura_estado'):
+            # Modo asíncrono: la factura la genera facturas_service en segundo plano
+            return
+        response = self.client.post(
+            f"{FACTURAS_URL}/api/facturas",
+            data=f"<factura><pedido_id>{pedido['pedido_id']}</pedido_id></factura>",
+            headers={'Content-Type': 'application/xml', 'Accept': 'application/json'},
+            name='POST /api/facturas'
+        )
+        if response.status_code == 200:
+            self.facturas.append(response.json()['encabezado']['id'])
+
+    @tag('write')
+    @task(3)
+    def cambiar_precio(self):
+        producto_id = random.choice(PRODUCTOS)
+        producto = obtener_producto(producto_id)
+        producto['precio'] = f"{random.uniform(100, 5000):.2f}"
+        campos = ''.join(
+            f'<{campo}>{escape(producto[campo])}</{campo}>' for campo in CAMPOS_PRODUCTO
+            if producto.get(campo) not in (None, '')
+        )
+        self.client.put(
+            f"/api/products/update/{producto_id}",
+            data=f'<product>{campos}</product>',
+            headers={'Content-Type': 'application/xml'},
+            name='PUT /api/products/update/[id]'
+        )
+
+    @tag('read')
+    @task(1)
+    def ver_catalogo(self):
+        self.client.get("/api/products", headers={'Accept': 'application/json'}, name='GET /api/products')
+
+    @tag('read', 'write')
+    @task(2)
+    def ver_factura(self):
+        if self.facturas:
+            self.client.get(
+                f"{FACTURAS_URL}/api/facturas/{random.choice(self.facturas[-20:])}",
+                name='GET /api/facturas/[id]'
+            )
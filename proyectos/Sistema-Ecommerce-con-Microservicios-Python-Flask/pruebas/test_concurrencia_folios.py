@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Prueba de concurrencia de folios de factura.
+
+Crea miles de pedidos y luego solicita sus facturas en paralelo. Verifica que
+todas las facturas se generen sin errores, que ningún folio se repita y, en el
+modo sin huecos (FOLIO_BLOQUE=1), que los números del día sean consecutivos.
+
+Uso:
+    python test_concurrencia_folios.py --facturas 2000 --hilos 64
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clientes_api import crear_factura, crear_pedido, crear_sesion, fijar_stock, texto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Facturas concurrentes sin folios repetidos')
+    parser.add_argument('--producto', type=int, default=1, help='ID del producto de los pedidos')
+    parser.add_argument('--cliente', type=int, default=1, help='ID del cliente de los pedidos')
+    parser.add_argument('--facturas', type=int, default=2000, help='Número de facturas a generar')
+    parser.add_argument('--hilos', type=int, default=64, help='Solicitudes simultáneas')
+    parser.add_argument('--bloques', action='store_true',
+                        help='El servicio usa FOLIO_BLOQUE>1; no se exige que los números sean consecutivos')
+    args = parser.parse_args()
+
+    print("🚀 Prueba de concurrencia de folios")
+    sesion = crear_sesion(args.hilos)
+
+    # 1. Preparar un pedido por factura (pedido_id es único en facturas)
+    print(f"   Creando {args.facturas} pedidos...")
+    fijar_stock(args.producto, args.facturas)
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        pedidos = list(executor.map(
+            lambda _: crear_pedido(sesion, args.cliente, args.producto, 1),
+            range(args.facturas)
+        ))
+    pedido_ids = [texto(r, 'pedido_id') for r in pedidos if r is not None and r.status_code == 200]
+    if len(pedido_ids) != args.facturas:
+        print(f"❌ Sólo se crearon {len(pedido_ids)} de {args.facturas} pedidos")
+        sys.exit(1)
+
+    # 2. Facturar todos los pedidos en paralelo
+    print(f"   Generando {args.facturas} facturas con {args.hilos} hilos...")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        facturas = list(executor.map(lambda pid: crear_factura(sesion, pid), pedido_ids))
+    duracion = time.perf_counter() - inicio
+
+    fallidas = [r for r in facturas if r is None or r.status_code != 200]
+    folios = [texto(r, 'folio') for r in facturas if r is not None and r.status_code == 200]
+    repetidos = len(folios) - len(set(folios))
+
+    print("")
+    print(f"   Facturas generadas:  {len(folios)}")
+    print(f"   Facturas fallidas:   {len(fallidas)}")
+    print(f"   Folios repetidos:    {repetidos}")
+    print(f"   Duración:            {duracion:.2f} s")
+    print(f"   Facturas/segundo:    {len(folios) / duracion:.1f}")
+    print("")
+
+    try:
+        assert not fallidas, f"{len(fallidas)} facturas fallaron"
+        assert repetidos == 0, f"{repetidos} folios repetidos"
+        if not args.bloques:
+            por_dia = {}
+            for folio in folios:
+                _, fecha, numero = folio.split('-')
+                por_dia.setdefault(fecha, []).append(int(numero))
+            for fecha, numeros in por_dia.items():
+                numeros.sort()
+                assert numeros[-1] - numeros[0] + 1 == len(numeros), f"Hay huecos en los folios del {fecha}"
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("✅ Todos los folios son únicos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga concurrente sobre un mismo producto (SKU "caliente").
+
+Lanza muchos pedidos en paralelo contra el servicio de pedidos para el mismo
+producto y verifica que nunca se venda más de lo que había en stock. Al final
+reporta los pedidos por segundo alcanzados.
+
+Uso:
+    python test_concurrencia_stock.py --producto 1 --stock 50 --pedidos 300 --hilos 32
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clientes_api import crear_pedido, crear_sesion, fijar_stock, obtener_producto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de sobreventa con pedidos concurrentes')
+    parser.add_argument('--producto', type=int, default=1, help='ID del producto a estresar')
+    parser.add_argument('--cliente', type=int, default=1, help='ID del cliente de los pedidos')
+    parser.add_argument('--stock', type=int, default=50, help='Stock inicial del producto')
+    parser.add_argument('--pedidos', type=int, default=300, help='Número total de pedidos')
+    parser.add_argument('--cantidad', type=int, default=1, help='Unidades por pedido')
+    parser.add_argument('--hilos', type=int, default=32, help='Pedidos simultáneos')
+    args = parser.parse_args()
+
+    print("🚀 Prueba de concurrencia de stock")
+    print(f"   Producto {args.producto}, stock inicial {args.stock}, "
+          f"{args.pedidos} pedidos de {args.cantidad} unidad(es) con {args.hilos} hilos")
+
+    fijar_stock(args.producto, args.stock)
+
+    sesion = crear_sesion(args.hilos)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        respuestas = list(executor.map(
+            lambda _: crear_pedido(sesion, args.cliente, args.producto, args.cantidad),
+            range(args.pedidos)
+        ))
+    duracion = time.perf_counter() - inicio
+    resultados = [r.status_code if r is not None else None for r in respuestas]
+
+    exitosos = resultados.count(200)
+    rechazados = resultados.count(400)
+    errores = len(resultados) - exitosos - rechazados
+    stock_final = int(obtener_producto(args.producto)['stock'])
+    vendido = exitosos * args.cantidad
+
+    print("")
+    print(f"   Pedidos exitosos:          {exitosos}")
+    print(f"   Rechazados por stock:      {rechazados}")
+    print(f"   Errores:                   {errores}")
+    print(f"   Stock final:               {stock_final}")
+    print(f"   Duración:                  {duracion:.2f} s")
+    print(f"   Pedidos/segundo:           {len(resultados) / duracion:.1f}")
+    print(f"   Pedidos exitosos/segundo:  {exitosos / duracion:.1f}")
+    print("")
+
+    try:
+        assert stock_final >= 0, f"Stock negativo: {stock_final}"
+        assert vendido <= args.stock, f"Sobreventa: se vendieron {vendido} de {args.stock}"
+        assert stock_final == args.stock - vendido, (
+            f"Stock inconsistente: esperado {args.stock - vendido}, obtenido {stock_final}"
+        )
+        assert errores == 0, f"{errores} pedidos terminaron con error"
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("✅ Sin sobreventa: el stock vendido coincide con los pedidos aceptados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Verifica que las copias de template/parcial_1 sigan iguales a sus originales.
+
+template/parcial_1 se despliega como una carpeta plana (ver su start.sh), así
+que no puede importar módulos de este proyecto y lleva copias de algunos. El
+original es el de este proyecto: un cambio se hace aquí y se copia con
+--sincronizar. La prueba falla si alguna copia quedó distinta.
+
+Uso:
+    python test_copias_plantilla.py
+    python test_copias_plantilla.py --sincronizar
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLANTILLA = os.path.join(os.path.dirname(os.path.dirname(PROYECTO)), 'template', 'parcial_1', 'Servicios')
+
+# (original en este proyecto, copia en template/parcial_1/Servicios)
+COPIAS = [
+    (os.path.join(PROYECTO, 'microservicios', 'comun', 'escritor_xml.py'), os.path.join(PLANTILLA, 'escritor_xml.py')),
+    (os.path.join(PROYECTO, 'Frontend', 'estaticos.py'), os.path.join(PLANTILLA, 'estaticos.py')),
+]
+
+
+def leer(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copias de template/parcial_1 iguales a sus originales')
+    parser.add_argument('--sincronizar', action='store_true', help='Copia cada original sobre su copia')
+    args = parser.parse_args()
+
+    print("🔍 Copias de template/parcial_1")
+    distintas = []
+    for original, copia in COPIAS:
+        nombre = os.path.relpath(copia, PLANTILLA)
+        if os.path.exists(copia) and leer(original) == leer(copia):
+            print(f"   {nombre:<16} igual")
+            continue
+        if args.sincronizar:
+            shutil.copyfile(original, copia)
+            print(f"   {nombre:<16} sincronizada con {os.path.relpath(original, PROYECTO)}")
+        else:
+            print(f"   {nombre:<16} DISTINTA de {os.path.relpath(original, PROYECTO)}")
+            distintas.append(nombre)
+
+    if distintas:
+        print(f"❌ {len(distintas)} copias distintas; usar --sincronizar después de cambiar el original")
+        sys.exit(1)
+    print("✅ Las copias están al día")
+
+
+if __name__ == "__main__":
+    main()
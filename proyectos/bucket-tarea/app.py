@@ -1,11 +1,21 @@
 import os
-import boto3
+import hmac
 import jwt
+import threading
 import datetime
 from flask import Flask, request, jsonify, render_template
 from functools import wraps
 from dotenv import load_dotenv
+from urllib.parse import unquote_plus
 from botocore.exceptions import ClientError
+from image_pipeline import ImagePipeline, is_variant
+from multipart_upload import MultipartUploads
+from presign_cache import PresignedURLCache
+from profile_store import CachedProfileStore, migrate_json, open_profile_store
+from s3_access import S3Config, create_client, ensure_cors
+from token_cache import VerifiedTokenCache
+from upload_index import PAGE_SIZE, PeriodicReconciler, SQLiteUploadIndex
+from user_store import open_user_store, seed_users, verify_password
 
 # Load environment variables
 load_dotenv()
@@ -17,41 +27,116 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 BUCKET_NAME = os.getenv('BUCKET_NAME')
+# Optional S3-compatible endpoint (MinIO, moto server) for local runs and benchmarks
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
+READ_URL_EXPIRES = 3600  # 1 hour
+READ_URLS_MAX_KEYS = 100
+# Preferred part size of multipart uploads (see multipart_upload.py)
+MULTIPART_PART_SIZE = int(os.getenv('MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))
+# Shared secret of /api/s3-events; the route is off while it is empty
+S3_EVENTS_TOKEN = os.getenv('S3_EVENTS_TOKEN', '')
+# Origins allowed by the bucket CORS policy (comma separated)
+S3_CORS_ORIGINS = os.getenv('S3_CORS_ORIGINS', 'http://127.0.0.1:5000').split(',')
+# Apply the CORS policy in the background when running `python app.py`;
+# deployments run `flask --app app s3-cors` once instead
+S3_CORS_ON_STARTUP = os.getenv('S3_CORS_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
 
-# Initialize S3 Client
-s3_client = boto3.client(
-    's3',
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Profile store (see profile_store.py): SQLite in WAL mode behind a read cache.
+# The legacy user_profiles.json is imported once on startup.
+PROFILE_STORE_URL = os.getenv('PROFILE_STORE_URL', 'sqlite:///' + os.path.join(BASE_DIR, 'profiles.db'))
+profiles = CachedProfileStore(
+    open_profile_store(PROFILE_STORE_URL),
+    max_entries=int(os.getenv('PROFILE_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('PROFILE_CACHE_TTL', '5'))
+)
+migrate_json(profiles, os.path.join(BASE_DIR, 'user_profiles.json'))
+
+# User store (see user_store.py), with the same kind of read cache: every
+# authenticated request checks that its user still exists and is active
+USER_STORE_URL = os.getenv('USER_STORE_URL', 'sqlite:///' + os.path.join(BASE_DIR, 'users.db'))
+users = CachedProfileStore(
+    open_user_store(USER_STORE_URL),
+    max_entries=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '30'))
+)
+
+# Tokens that passed jwt.decode, reused until they expire (see token_cache.py)
+verified_tokens = VerifiedTokenCache(max_entries=int(os.getenv('TOKEN_CACHE_SIZE', '10000')))
+
+# Shared S3 client (see s3_access.py): one connection pool for the request
+# threads, the image pipeline and the reconciler. Pool size, retries and
+# timeouts come from S3_MAX_POOL_CONNECTIONS, S3_RETRY_MODE, S3_MAX_ATTEMPTS,
+# S3_CONNECT_TIMEOUT and S3_READ_TIMEOUT
+s3_client = create_client(
+    S3Config.from_env(),
     aws_access_key_id=AWS_ACCESS_KEY_ID,
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY
 )
 
+# Read URLs are reused until 5 minutes before they expire (see presign_cache.py)
+read_urls = PresignedURLCache(
+    s3_client, BUCKET_NAME,
+    max_entries=int(os.getenv('PRESIGN_CACHE_SIZE', '10000')),
+    margin=int(os.getenv('PRESIGN_CACHE_MARGIN', '300'))
+)
+
+# Multipart uploads: the browser PUTs parts in parallel and resumes after failures
+multipart = MultipartUploads(s3_client, BUCKET_NAME, part_size=MULTIPART_PART_SIZE)
+
+# Resized WebP/AVIF variants of profile photos, made in worker processes (see image_pipeline.py)
+images = ImagePipeline(
+    s3_client, BUCKET_NAME, profiles,
+    processes=int(os.getenv('IMAGE_WORKERS', '2')),
+    threads=int(os.getenv('IMAGE_IO_THREADS', '4'))
+)
+
+# Listing of each user's files from a local index (see upload_index.py),
+# reconciled with the bucket every UPLOAD_INDEX_RECONCILE_SECONDS (0 = never)
+uploads = SQLiteUploadIndex(
+    os.getenv('UPLOAD_INDEX_PATH', os.path.join(BASE_DIR, 'uploads.db')),
+    skip=is_variant
+)
+uploads_reconciler = PeriodicReconciler(
+    uploads, s3_client, BUCKET_NAME, 'user-profile-images/',
+    interval=float(os.getenv('UPLOAD_INDEX_RECONCILE_SECONDS', '3600'))
+)
+
 # --- CORS Configuration ---
+CORS_RULES = [{
+    'AllowedHeaders': ['*'],
+    'AllowedMethods': ['GET', 'PUT', 'POST', 'DELETE', 'HEAD'],
+    'AllowedOrigins': S3_CORS_ORIGINS,
+    'ExposeHeaders': ['ETag'],
+    'MaxAgeSeconds': 3000
+}]
+
 def apply_s3_cors():
     """
     Applies CORS policy to the S3 bucket to allow localhost access.
-    Run this once on application startup.
+    Only writes it when the bucket's current policy differs.
     """
     print(f"Configuring CORS for bucket: {BUCKET_NAME}...")
     try:
-        cors_configuration = {
-            'CORSRules': [{
-                'AllowedHeaders': ['*'],
-                'AllowedMethods': ['GET', 'PUT', 'POST', 'DELETE', 'HEAD'],
-                'AllowedOrigins': ['http://127.0.0.1:5000'], # Adjust for production
-                'ExposeHeaders': ['ETag'],
-                'MaxAgeSeconds': 3000
-            }]
-        }
-        s3_client.put_bucket_cors(Bucket=BUCKET_NAME, CORSConfiguration=cors_configuration)
-        print("✅ CORS configuration applied successfully.")
+        if ensure_cors(s3_client, BUCKET_NAME, CORS_RULES):
+            print("✅ CORS configuration applied successfully.")
+        else:
+            print("✅ CORS configuration already up to date.")
     except Exception as e:
         print(f"❌ Failed to configure CORS: {e}")
 
-# Hardcoded Users (for demonstration)
-USERS = {
+@app.cli.command('s3-cors')
+def s3_cors_command():
+    """Apply the bucket CORS policy; run once per deploy"""
+    apply_s3_cors()
+
+# Demo accounts, created in the user store if missing
+DEMO_USERS = {
     "admin": "password123",
     "user": "userpass"
 }
+seed_users(users, DEMO_USERS)
 
 # --- Middleware / Decorators ---
 
@@ -68,19 +153,38 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
 
+        current_user, error = authenticate(token)
+        if error:
+            return jsonify({'message': error}), 401
+
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+def authenticate(token):
+    """(username, None) for a valid token of an active user, else (None, error message)"""
+    data = verified_tokens.get(token)
+    if data is None:
         try:
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = data['user']
         except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
+            return None, 'Token has expired!'
         except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token!'}), 401
+            return None, 'Invalid token!'
+        verified_tokens.put(token, data)
 
-        return f(current_user, *args, **kwargs)
-    return decorated
+    # A deleted or disabled account loses access within USER_CACHE_TTL seconds
+    user = users.get(data['user'])
+    if user is None or not user.get('active', True):
+        return None, 'User not found!'
+    return data['user'], None
 
 # --- Routes ---
 
+@app.before_request
+def start_background_jobs():
+    # Only processes that serve requests reconcile, not the image workers
+    uploads_reconciler.start()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -94,7 +198,7 @@ def login():
     user = auth.get('username')
     password = auth.get('password')
 
-    if user in USERS and USERS[user] == password:
+    if verify_password(users.get(user), password):
         token = jwt.encode({
             'user': user,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
@@ -116,7 +220,7 @@ def create_upload_url(current_user):
         return jsonify({'message': 'Filename is required'}), 400
 
     # Create a unique key for the file
-    key = f"user-profile-images/{current_user}/{filename}"
+    key = user_key(current_user, filename)
 
     try:
         url = s3_client.generate_presigned_url(
@@ -132,6 +236,118 @@ def create_upload_url(current_user):
     except ClientError as e:
         return jsonify({'message': str(e)}), 500
 
+def user_key(current_user, filename):
+    return f"user-profile-images/{current_user}/{filename}"
+
+def multipart_target(current_user, data):
+    """(fileKey, uploadId, None) of a multipart request, or (None, None, error response)"""
+    key = data.get('fileKey')
+    upload_id = data.get('uploadId')
+    if not key or not upload_id:
+        return None, None, (jsonify({'message': 'fileKey and uploadId are required'}), 400)
+    # The upload id alone would let any user write into another user's folder
+    if not key.startswith(user_key(current_user, '')):
+        return None, None, (jsonify({'message': 'Not your file'}), 403)
+    return key, upload_id, None
+
+def s3_error(e):
+    """JSON error for a ClientError: 404 for an unknown or finished upload, 400 for rejected parts"""
+    code = e.response.get('Error', {}).get('Code')
+    if code == 'NoSuchUpload':
+        return jsonify({'message': 'Upload not found'}), 404
+    if code in ('InvalidPart', 'InvalidPartOrder', 'EntityTooSmall'):
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'message': str(e)}), 500
+
+@app.route('/api/multipart/create', methods=['POST'])
+@token_required
+def create_multipart_upload(current_user):
+    """Starts a multipart upload; the client splits the file in partCount parts of partSize bytes"""
+    data = request.json or {}
+    filename = data.get('filename')
+    size = data.get('size')
+
+    if not filename:
+        return jsonify({'message': 'Filename is required'}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({'message': 'size must be a positive number of bytes'}), 400
+
+    key = user_key(current_user, filename)
+    try:
+        upload = multipart.create(key, data.get('fileType'), size)
+        return jsonify(dict(upload, fileKey=key))
+    except ClientError as e:
+        return s3_error(e)
+
+@app.route('/api/multipart/part-urls', methods=['POST'])
+@token_required
+def create_part_urls(current_user):
+    """Presigned PUT URLs for many parts in one call: {partNumbers: [1, 2, ...]}"""
+    data = request.json or {}
+    key, upload_id, error = multipart_target(current_user, data)
+    if error:
+        return error
+    part_numbers = data.get('partNumbers')
+    if not isinstance(part_numbers, list) or not part_numbers:
+        return jsonify({'message': 'partNumbers must be a non-empty list'}), 400
+
+    try:
+        urls = multipart.part_urls(key, upload_id, part_numbers)
+        return jsonify({'urls': {str(n): url for n, url in urls.items()}})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except ClientError as e:
+        return s3_error(e)
+
+@app.route('/api/multipart/parts', methods=['GET'])
+@token_required
+def list_uploaded_parts(current_user):
+    """Parts S3 already has, so an interrupted upload only sends the missing ones"""
+    key, upload_id, error = multipart_target(current_user, request.args)
+    if error:
+        return error
+
+    try:
+        return jsonify({'parts': multipart.list_parts(key, upload_id)})
+    except ClientError as e:
+        return s3_error(e)
+
+@app.route('/api/multipart/complete', methods=['POST'])
+@token_required
+def complete_multipart_upload(current_user):
+    """Joins the parts, {parts: [{partNumber, etag}]}, into the final file"""
+    data = request.json or {}
+    key, upload_id, error = multipart_target(current_user, data)
+    if error:
+        return error
+    parts = data.get('parts')
+    if not isinstance(parts, list) or not parts or not all(
+            isinstance(p, dict) and isinstance(p.get('partNumber'), int) and p.get('etag') for p in parts):
+        return jsonify({'message': 'parts must be a non-empty list of {partNumber, etag}'}), 400
+
+    try:
+        etag = multipart.complete(key, upload_id, parts)
+        # The object under this key changed: stop handing out cached read URLs of the old one
+        read_urls.invalidate(key)
+        index_upload(key)
+        return jsonify({'fileKey': key, 'etag': etag})
+    except ClientError as e:
+        return s3_error(e)
+
+@app.route('/api/multipart/abort', methods=['POST'])
+@token_required
+def abort_multipart_upload(current_user):
+    """Cancels an upload and deletes the parts already sent"""
+    key, upload_id, error = multipart_target(current_user, request.json or {})
+    if error:
+        return error
+
+    try:
+        multipart.abort(key, upload_id)
+        return jsonify({'message': 'Upload aborted'})
+    except ClientError as e:
+        return s3_error(e)
+
 @app.route('/api/read-url', methods=['GET'])
 @token_required
 def create_read_url(current_user):
@@ -142,69 +358,161 @@ def create_read_url(current_user):
         return jsonify({'message': 'File key is required'}), 400
 
     try:
-        url = s3_client.generate_presigned_url(
-            ClientMethod='get_object',
-            Params={
-                'Bucket': BUCKET_NAME,
-                'Key': key
-            },
-            ExpiresIn=3600  # 1 hour
-        )
-        return jsonify({'readUrl': url})
+        url, expires_at = read_urls.url('get_object', key, READ_URL_EXPIRES)
+        return jsonify({'readUrl': url, 'expiresAt': expires_at})
+    except ClientError as e:
+        return jsonify({'message': str(e)}), 500
+
+@app.route('/api/read-urls', methods=['POST'])
+@token_required
+def create_read_urls(current_user):
+    """Presigned GET URLs for several keys in one call (e.g. a gallery page)"""
+    data = request.json or {}
+    keys = data.get('keys')
+
+    if not isinstance(keys, list) or not keys or not all(isinstance(k, str) and k for k in keys):
+        return jsonify({'message': 'keys must be a non-empty list of file keys'}), 400
+    if len(keys) > READ_URLS_MAX_KEYS:
+        return jsonify({'message': f'At most {READ_URLS_MAX_KEYS} keys per request'}), 400
+
+    try:
+        urls = {}
+        for key in dict.fromkeys(keys):
+            url, expires_at = read_urls.url('get_object', key, READ_URL_EXPIRES)
+            urls[key] = {'readUrl': url, 'expiresAt': expires_at}
+        return jsonify({'urls': urls})
     except ClientError as e:
         return jsonify({'message': str(e)}), 500
 
 @app.route('/api/save-profile', methods=['POST'])
 @token_required
 def save_profile(current_user):
-    """Save user's profile image key to JSON file"""
+    """Save user's profile image key in the profile store"""
     data = request.json
     file_key = data.get('fileKey')
     
     if not file_key:
         return jsonify({'message': 'fileKey is required'}), 400
     
+    # Only the user's own uploads are processed
+    own_photo = file_key.startswith(user_key(current_user, '')) and not is_variant(file_key)
+
     try:
-        import json
-        store_path = 'user_profiles.json'
-        profiles = {}
-        
-        # Load existing profiles if file exists
-        if os.path.exists(store_path):
-            with open(store_path) as f:
-                profiles = json.load(f)
-        
-        # Update current user's profile
-        profiles[current_user] = file_key
-        
-        # Save back to file
-        with open(store_path, 'w') as f:
-            json.dump(profiles, f, indent=2)
-        
+        # Atomic update of this user's row only
+        profiles.update(current_user, {
+            'fileKey': file_key,
+            'photo': {'source': file_key, 'status': 'processing'} if own_photo else None
+        })
+        # Same filename uploaded again: a new URL keeps browsers from showing the old image
+        read_urls.invalidate(file_key)
+        # The upload is complete: index it and make the variants in the background
+        if own_photo:
+            index_upload(file_key)
+            images.submit(current_user, file_key)
         return jsonify({'message': 'Profile saved successfully'}), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@app.route('/api/s3-events', methods=['POST'])
+def s3_events():
+    """
+    Bucket event stand-in: S3 event notifications, forwarded e.g. by SNS
+    or a Lambda with the X-Events-Token header. Objects created or removed
+    under user-profile-images/<user>/ update the upload index, and new ones
+    go to the image pipeline.
+    """
+    if not S3_EVENTS_TOKEN:
+        return jsonify({'message': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Events-Token', ''), S3_EVENTS_TOKEN):
+        return jsonify({'message': 'Invalid token!'}), 401
+
+    queued = 0
+    for record in (request.json or {}).get('Records', []):
+        event = record.get('eventName', '')
+        s3_object = record.get('s3', {}).get('object', {})
+        # Keys in event notifications are URL-encoded
+        key = unquote_plus(s3_object.get('key', ''))
+        parts = key.split('/')
+        # The variants the pipeline writes raise events too
+        if len(parts) < 3 or parts[0] != 'user-profile-images' or is_variant(key):
+            continue
+        if event.startswith('ObjectRemoved:'):
+            uploads.remove(key)
+        elif event.startswith('ObjectCreated:'):
+            uploads.record(key, s3_object.get('size', 0), s3_object.get('eTag', ''), event_time(record))
+            images.submit(parts[1], key)
+            queued += 1
+    return jsonify({'queued': queued}), 202
+
+def event_time(record):
+    try:
+        return datetime.datetime.fromisoformat(record['eventTime']).timestamp()
+    except (KeyError, ValueError):
+        return datetime.datetime.now().timestamp()
+
+def index_upload(key):
+    """Add a finished upload to the upload index; if this fails the next reconcile adds it"""
+    try:
+        head = s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+        uploads.record(key, head['ContentLength'], head['ETag'], head['LastModified'].timestamp())
+    except ClientError as e:
+        print(f"❌ Could not index {key}: {e}")
+
+@app.route('/api/uploads', methods=['GET'])
+@token_required
+def list_uploads(current_user):
+    """One page of the user's files: ?limit=50&cursor=<nextCursor of the previous page>"""
+    prefix = user_key(current_user, '')
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+        items, next_cursor = uploads.page(prefix, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    for item in items:
+        item['name'] = item['key'][len(prefix):]
+    return jsonify({'items': items, 'nextCursor': next_cursor})
+
 @app.route('/api/me', methods=['GET'])
 @token_required
 def get_me(current_user):
     """Get current user profile info"""
-    file_key = None
+    profile = None
     try:
-        import json
-        store_path = 'user_profiles.json'
-        if os.path.exists(store_path):
-            with open(store_path) as f:
-                profiles = json.load(f)
-            file_key = profiles.get(current_user)
+        profile = profiles.get(current_user)
     except Exception:
         pass
-    
+
+    file_key = (profile or {}).get('fileKey')
     return jsonify({
         'username': current_user,
-        'fileKey': file_key
+        'fileKey': file_key,
+        'photo': photo_info((profile or {}).get('photo'), file_key)
     })
 
+def photo_info(photo, file_key):
+    """Status of the current photo's variants, with read URLs once they are ready"""
+    if not photo or photo.get('source') != file_key:
+        return None
+    if photo.get('status') != 'ready':
+        return {'status': photo.get('status')}
+    variants = [
+        dict(
+            name=v['name'], width=v['width'], height=v['height'], format=v['format'], bytes=v['bytes'],
+            # Variant keys change with the content: the cached URL is always current
+            url=read_urls.url('get_object', v['key'], READ_URL_EXPIRES)[0]
+        )
+        for v in photo['variants']
+    ]
+    return {
+        'status': 'ready',
+        'originalBytes': photo['originalBytes'],
+        'processingMs': photo['processingMs'],
+        'variants': variants,
+    }
+
 if __name__ == '__main__':
-    apply_s3_cors()
+    if S3_CORS_ON_STARTUP:
+        # Off the startup path: the app serves while S3 answers
+        threading.Thread(target=apply_s3_cors, name='s3-cors', daemon=True).start()
     app.run(debug=True)
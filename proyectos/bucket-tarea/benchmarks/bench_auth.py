@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Authentication hot path benchmark (see token_cache.py and user_store.py).
+
+Every authenticated route runs token_required: verify the JWT, then look up
+the user in the user store. This script times that step alone and the two
+routes the page calls most, /api/read-url and /api/me, through the Flask
+test client, in three configurations:
+
+    - no caches:   jwt.decode and a SQLite user lookup on every request
+    - token cache: verified tokens reused until they expire
+    - both caches: plus the bounded user-record cache
+
+Requests use --tokens tokens spread over --users accounts. No AWS needed:
+presigning is local and S3 is never contacted.
+
+Requires: pip install boto3 flask pyjwt python-dotenv
+
+Usage:
+    python benchmarks/bench_auth.py --users 1000 --tokens 200 --requests 20000
+"""
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = 'bench-secret-key-of-at-least-32-bytes'
+
+
+def configure_env(directory):
+    # Must be set before app.py is imported
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'BUCKET_NAME': 'bench-profile-images',
+        'SECRET_KEY': SECRET,
+        'PROFILE_STORE_URL': 'sqlite:///' + os.path.join(directory, 'profiles.db'),
+        'USER_STORE_URL': 'sqlite:///' + os.path.join(directory, 'users.db'),
+    })
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def make_tokens(jwt, users, count):
+    now = datetime.datetime.utcnow()
+    return [
+        jwt.encode({'user': f'user{i % users}', 'exp': now + datetime.timedelta(minutes=30, seconds=i)},
+                   SECRET, algorithm='HS256')
+        for i in range(count)
+    ]
+
+
+def time_calls(call, count):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - begin) * 1e6)
+    return count / (time.perf_counter() - start), latencies
+
+
+def run(name, app_module, tokens, requests):
+    client = app_module.app.test_client()
+    key = 'user-profile-images/user0/photo.png'
+
+    def auth(i):
+        username, error = app_module.authenticate(tokens[i % len(tokens)])
+        assert error is None, error
+
+    def read_url(i):
+        response = client.get('/api/read-url', query_string={'key': key},
+                              headers={'Authorization': f'Bearer {tokens[i % len(tokens)]}'})
+        assert response.status_code == 200, response.get_json()
+
+    def me(i):
+        response = client.get('/api/me', headers={'Authorization': f'Bearer {tokens[i % len(tokens)]}'})
+        assert response.status_code == 200, response.get_json()
+
+    print(f"\n{name}")
+    for label, call, count, unit in (('token_required step', auth, requests * 5, 'µs'),
+                                     ('GET /api/read-url', read_url, requests, 'µs'),
+                                     ('GET /api/me', me, requests, 'µs')):
+        call(0)  # warm up caches and lazy imports
+        rate, latencies = time_calls(call, count)
+        print(f"   {label:<20} {rate:10.0f} /s   p50 {statistics.median(latencies):8.1f} {unit}   "
+              f"p95 {percentile(latencies, 0.95):8.1f} {unit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Token verification and user lookup cost on the hot routes')
+    parser.add_argument('--users', type=int, default=1000, help='Accounts in the user store')
+    parser.add_argument('--tokens', type=int, default=200, help='Distinct tokens in use')
+    parser.add_argument('--requests', type=int, default=20000, help='Requests per route and configuration')
+    args = parser.parse_args()
+
+    configure_env(tempfile.mkdtemp(prefix='auth_bench_'))
+    sys.path.insert(0, ROOT)
+    import jwt
+    import app as app_module
+    from token_cache import VerifiedTokenCache
+    from werkzeug.security import generate_password_hash
+
+    # One hash for every account: hashing is deliberately slow and not what is measured here
+    password_hash = generate_password_hash('benchmark')
+    backend = app_module.users.store
+    backend.import_missing({f'user{i}': {'passwordHash': password_hash, 'active': True}
+                            for i in range(args.users)})
+    tokens = make_tokens(jwt, args.users, args.tokens)
+    print(f"{args.users} users, {len(tokens)} tokens, {args.requests} requests per route")
+
+    cached_users = app_module.users
+    for name, token_cache, user_cache in (('no caches', False, False),
+                                          ('token cache', True, False),
+                                          ('token + user cache', True, True)):
+        app_module.verified_tokens = VerifiedTokenCache(max_entries=10000 if token_cache else 0)
+        app_module.users = cached_users if user_cache else backend
+        run(name, app_module, tokens, args.requests)
+    app_module.users = cached_users
+
+
+if __name__ == '__main__':
+    main()
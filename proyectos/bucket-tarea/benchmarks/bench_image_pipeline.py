@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Profile photo pipeline benchmark (see image_pipeline.py).
+
+1. Variants: synthetic camera-sized JPEGs with EXIF (camera, GPS) go through
+   make_variants in a process pool of each --processes size. Reports
+   photos/s, per-photo processing time, and the bytes of every variant
+   against the original. Also checks that no metadata survived. No AWS
+   needed.
+2. End to end (--s3): starts a moto S3 server, uploads the photos and runs
+   ImagePipeline as the app does. It measures how long until every profile
+   has its variants, then submits the same photos again, as a bucket event
+   arriving after the client's notification would.
+
+Requires: pip install Pillow (and "moto[server]" boto3 for --s3)
+
+Usage:
+    python benchmarks/bench_image_pipeline.py --photos 24 --processes 1,2,4
+    python benchmarks/bench_image_pipeline.py --photos 24 --s3
+"""
+
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_pipeline import Image, ImagePipeline, make_variants  # noqa: E402
+from profile_store import MemoryProfileStore  # noqa: E402
+
+BUCKET = 'bench-profile-images'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def synthetic_photo(width, height, seed):
+    """JPEG with gradients and noise (compresses like a photo) and camera EXIF with GPS"""
+    noise = Image.effect_noise((width, height), 40 + seed % 20)
+    horizontal = Image.linear_gradient('L').resize((width, height))
+    vertical = Image.linear_gradient('L').rotate(90).resize((width, height))
+    image = Image.merge('RGB', (horizontal, noise, vertical))
+    exif = Image.Exif()
+    exif[0x010F] = 'BenchCam'        # Make
+    exif[0x0110] = f'Model {seed}'   # Model
+    exif[0x0112] = 6                 # Orientation: rotated 90 degrees
+    exif[0x8825] = {1: 'N', 2: (25.0, 40.0, 12.0), 3: 'W', 4: (100.0, 18.0, 36.0)}  # GPS
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90, exif=exif)
+    return output.getvalue()
+
+
+def has_metadata(data):
+    image = Image.open(io.BytesIO(data))
+    return bool(image.getexif()) or any(k in image.info for k in ('exif', 'icc_profile', 'xmp'))
+
+
+def bench_variants(photos, processes):
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as executor:
+        results = list(executor.map(make_variants, photos))
+    elapsed = time.perf_counter() - start
+    times = [r['processingMs'] for r in results]
+    print(f"   {processes:>2} processes: {len(photos) / elapsed:6.1f} photos/s   "
+          f"per photo p50 {statistics.median(times):7.1f} ms   p95 {percentile(times, 0.95):7.1f} ms")
+    return results
+
+
+def report_sizes(photos, results):
+    original = sum(len(p) for p in photos) / len(photos)
+    print(f"\nBytes per photo (original {original / 1024:.0f} KiB)")
+    first = results[0]['variants']
+    for i, variant in enumerate(first):
+        size = sum(len(r['variants'][i]['data']) for r in results) / len(results)
+        print(f"   {variant['name']:<11} {variant['format']:<5} {variant['width']:>5}x{variant['height']:<5} "
+              f"{size / 1024:8.1f} KiB   {100 - 100 * size / original:6.2f}% saved   {original / size:6.0f}x smaller")
+    leaked = sum(has_metadata(v['data']) for r in results for v in r['variants'])
+    rotated = all(r['height'] > r['width'] for r in results)
+    print(f"   variants with metadata left: {leaked}   EXIF rotation applied: {'yes' if rotated else 'no'}")
+
+
+def bench_end_to_end(photos, processes, port):
+    import boto3
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    try:
+        s3_client = boto3.client(
+            's3', endpoint_url=f'http://127.0.0.1:{port}', region_name='us-east-1',
+            aws_access_key_id='testing', aws_secret_access_key='testing'
+        )
+        s3_client.create_bucket(Bucket=BUCKET)
+        profiles = MemoryProfileStore()
+        keys = {}
+        for i, photo in enumerate(photos):
+            keys[f'user{i}'] = f'user-profile-images/user{i}/photo.jpg'
+            s3_client.put_object(Bucket=BUCKET, Key=keys[f'user{i}'], Body=photo, ContentType='image/jpeg')
+            profiles.update(f'user{i}', {'fileKey': keys[f'user{i}']})
+
+        pipeline = ImagePipeline(s3_client, BUCKET, profiles, processes=processes)
+        # Starting the worker processes is a one-time cost, not part of the measurement
+        pipeline.warm_up()
+
+        print(f"\nEnd to end against moto, {len(photos)} photos, {processes} processes")
+        for run in ('first upload', 'same photos again'):
+            start = time.perf_counter()
+            for username, key in keys.items():
+                pipeline.submit(username, key)
+            wait_ready(profiles, keys)
+            elapsed = time.perf_counter() - start
+            print(f"   {run:<18} {elapsed:6.2f} s   {len(photos) / elapsed:6.1f} photos/s   "
+                  f"processed {pipeline.processed}   reused {pipeline.reused}   failed {pipeline.failed}")
+            if run == 'first upload':
+                # A new upload of the same file resets the status, as /api/save-profile does
+                for username, key in keys.items():
+                    profiles.update(username, {'photo': {'source': key, 'status': 'processing'}})
+        pipeline.shutdown()
+    finally:
+        server.stop()
+
+
+def wait_ready(profiles, keys):
+    while True:
+        statuses = [(profiles.get(username).get('photo') or {}).get('status') for username in keys]
+        if all(status in ('ready', 'failed') for status in statuses):
+            return
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile photo variants: time per photo and bytes saved')
+    parser.add_argument('--photos', type=int, default=24, help='Synthetic photos')
+    parser.add_argument('--size', default='4000x3000', help='Size of the synthetic photos')
+    parser.add_argument('--processes', default='1,2,4', help='Process pool sizes to test, comma separated')
+    parser.add_argument('--s3', action='store_true', help='Also run the pipeline end to end against moto')
+    parser.add_argument('--port', type=int, default=5058, help='Port of the moto S3 server')
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit('Pillow is required: pip install Pillow')
+    width, height = (int(n) for n in args.size.split('x'))
+    # Distinct photos: identical ones would be processed only once with --s3
+    photos = [synthetic_photo(width, height, seed) for seed in range(args.photos)]
+    print(f"{len(photos)} photos of {args.size}, {sum(map(len, photos)) / len(photos) / 1024:.0f} KiB on average")
+
+    processes = [int(p) for p in args.processes.split(',')]
+    for count in processes:
+        results = bench_variants(photos, count)
+    report_sizes(photos, results)
+
+    if args.s3:
+        bench_end_to_end(photos, max(processes), args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Upload throughput benchmark: one presigned PUT against multipart uploads
+(see multipart_upload.py), against a local S3 stand-in.
+
+Starts a moto S3 server and drives the Flask app in-process with its test
+client, doing what static/script.js does:
+
+1. single PUT: /api/upload-url, then the whole file in one request
+2. multipart: /api/multipart/create, part URLs in batches from
+   /api/multipart/part-urls, --parallel parts in flight at once, then
+   /api/multipart/complete
+3. resume: a multipart upload interrupted halfway. The client asks
+   /api/multipart/parts which parts S3 has and sends only the rest. A
+   single PUT would have to send the whole file again.
+
+On localhost one connection is as fast as several. --link caps each
+connection to N MiB/s, like a single TCP stream over a long-distance link,
+which is the case parallel parts are for.
+
+Requires: pip install "moto[server]" boto3 flask pyjwt python-dotenv requests
+moto keeps objects and parts in memory: a run peaks at about 6 times the
+largest --sizes entry in RAM (around 6 GiB for 1024).
+
+Usage:
+    python benchmarks/bench_multipart_upload.py --sizes 100,1024 --parallel 1,4,8
+    python benchmarks/bench_multipart_upload.py --sizes 100 --link 10
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = 'bench-profile-images'
+MiB = 1024 * 1024
+
+
+def start_s3_stand_in(port):
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server
+
+
+def configure_env(port, part_size):
+    # Must be set before app.py is imported
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'BUCKET_NAME': BUCKET,
+        'SECRET_KEY': 'bench-secret-key-of-at-least-32-bytes',
+        'S3_ENDPOINT_URL': f'http://127.0.0.1:{port}',
+        'PROFILE_STORE_URL': 'memory://',
+        'MULTIPART_PART_SIZE': str(part_size),
+    })
+
+
+def login(client):
+    response = client.post('/login', json={'username': 'admin', 'password': 'password123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def api(client, headers, method, path, **kwargs):
+    response = client.open(path, method=method, headers=headers, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path}: {response.status_code} {response.get_json()}")
+    return response.get_json()
+
+
+class ThrottledBody:
+    """Request body read at most `rate` bytes/s: one connection over a slow link"""
+
+    def __init__(self, data, rate):
+        self.data = data
+        self.rate = rate
+        self.offset = 0
+        self.start = time.perf_counter()
+
+    def __len__(self):
+        return len(self.data) - self.offset
+
+    def read(self, size=-1):
+        size = len(self) if size < 0 else min(size, len(self))
+        ahead = self.start + (self.offset + size) / self.rate - time.perf_counter()
+        if ahead > 0:
+            time.sleep(ahead)
+        chunk = bytes(self.data[self.offset:self.offset + size])
+        self.offset += size
+        return chunk
+
+
+class Uploader:
+    """Client side of the upload flow, one requests.Session per thread as a browser would pool connections"""
+
+    def __init__(self, client, headers, link=0):
+        self.client = client
+        self.headers = headers
+        self.link = link
+        self._local = threading.local()
+
+    def body(self, data):
+        return ThrottledBody(data, self.link) if self.link else data
+
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def single(self, filename, payload):
+        upload = api(self.client, self.headers, 'POST', '/api/upload-url',
+                     json={'filename': filename, 'fileType': 'application/octet-stream'})
+        response = self.session().put(upload['uploadUrl'], data=self.body(payload),
+                                      headers={'Content-Type': 'application/octet-stream'}, timeout=600)
+        response.raise_for_status()
+        return upload['fileKey']
+
+    def create(self, filename, size):
+        return api(self.client, self.headers, 'POST', '/api/multipart/create',
+                   json={'filename': filename, 'fileType': 'application/octet-stream', 'size': size})
+
+    def send_parts(self, upload, payload, part_numbers, parallel):
+        """PUT `part_numbers`, `parallel` at a time; returns {part number: etag}"""
+        target = {'fileKey': upload['fileKey'], 'uploadId': upload['uploadId']}
+        urls = {}
+        for i in range(0, len(part_numbers), 1000):
+            urls.update(api(self.client, self.headers, 'POST', '/api/multipart/part-urls',
+                            json=dict(target, partNumbers=part_numbers[i:i + 1000]))['urls'])
+        view = memoryview(payload)
+        part_size = upload['partSize']
+
+        def send(n):
+            response = self.session().put(urls[str(n)], data=self.body(view[(n - 1) * part_size:n * part_size]),
+                                          timeout=600)
+            response.raise_for_status()
+            return n, response.headers['ETag']
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            return dict(executor.map(send, part_numbers))
+
+    def uploaded_parts(self, upload):
+        return api(self.client, self.headers, 'GET', '/api/multipart/parts',
+                   query_string={'fileKey': upload['fileKey'], 'uploadId': upload['uploadId']})['parts']
+
+    def complete(self, upload, etags):
+        api(self.client, self.headers, 'POST', '/api/multipart/complete', json={
+            'fileKey': upload['fileKey'], 'uploadId': upload['uploadId'],
+            'parts': [{'partNumber': n, 'etag': etag} for n, etag in etags.items()]
+        })
+        return upload['fileKey']
+
+    def multipart(self, filename, payload, parallel):
+        upload = self.create(filename, len(payload))
+        etags = self.send_parts(upload, payload, list(range(1, upload['partCount'] + 1)), parallel)
+        return self.complete(upload, etags)
+
+
+def check(s3_client, key, size):
+    stored = s3_client.head_object(Bucket=BUCKET, Key=key)['ContentLength']
+    if stored != size:
+        raise RuntimeError(f'{key}: stored {stored} bytes, expected {size}')
+    # Frees moto's copy before the next run
+    s3_client.delete_object(Bucket=BUCKET, Key=key)
+
+
+def report(name, size, elapsed, sent=None):
+    sent = size if sent is None else sent
+    print(f"   {name:<22} {elapsed:8.2f} s   {size / MiB / elapsed:8.1f} MiB/s   "
+          f"sent {sent / MiB:8.1f} MiB")
+
+
+def bench_size(app_module, uploader, size_mib, parallel, part_size):
+    size = size_mib * MiB
+    payload = os.urandom(size)
+    parts = -(-size // part_size)
+    print(f"\n{size_mib} MiB file, {parts} parts of {part_size // MiB} MiB (MiB/s = file size / time)")
+
+    start = time.perf_counter()
+    key = uploader.single('single.bin', payload)
+    report('single PUT', size, time.perf_counter() - start)
+    check(app_module.s3_client, key, size)
+
+    for threads in parallel:
+        start = time.perf_counter()
+        key = uploader.multipart('multipart.bin', payload, threads)
+        report(f'multipart x{threads}', size, time.perf_counter() - start)
+        check(app_module.s3_client, key, size)
+
+    # Interrupted after the first half of the parts; the resume is timed on its own
+    threads = max(parallel)
+    upload = uploader.create('resumed.bin', size)
+    uploader.send_parts(upload, payload, list(range(1, parts // 2 + 1)), threads)
+    start = time.perf_counter()
+    have = {p['partNumber'] for p in uploader.uploaded_parts(upload)}
+    missing = [n for n in range(1, upload['partCount'] + 1) if n not in have]
+    etags = uploader.send_parts(upload, payload, missing, threads)
+    etags.update({p['partNumber']: p['etag'] for p in uploader.uploaded_parts(upload)})
+    key = uploader.complete(upload, etags)
+    resent = sum(min(part_size, size - (n - 1) * part_size) for n in missing)
+    report(f'resume x{threads}', size, time.perf_counter() - start, resent)
+    print(f"   {'':<22} a single PUT would send all {size_mib} MiB again")
+    check(app_module.s3_client, key, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single PUT against parallel multipart upload throughput')
+    parser.add_argument('--sizes', default='100', help='File sizes in MiB, comma separated (e.g. 100,1024)')
+    parser.add_argument('--parallel', default='1,4,8', help='Parts in flight at once, comma separated')
+    parser.add_argument('--part-size', type=int, default=8, help='Part size in MiB (MULTIPART_PART_SIZE)')
+    parser.add_argument('--link', type=float, default=0, help='MiB/s per connection, 0 for no cap')
+    parser.add_argument('--port', type=int, default=5056, help='Port of the moto S3 server')
+    args = parser.parse_args()
+
+    server = start_s3_stand_in(args.port)
+    try:
+        configure_env(args.port, args.part_size * MiB)
+        sys.path.insert(0, ROOT)
+        import app as app_module
+        from multipart_upload import part_size_for
+
+        app_module.s3_client.create_bucket(Bucket=BUCKET)
+        client = app_module.app.test_client()
+        uploader = Uploader(client, login(client), args.link * MiB)
+        parallel = [int(p) for p in args.parallel.split(',')]
+        for size_mib in (int(s) for s in args.sizes.split(',')):
+            bench_size(app_module, uploader, size_mib, parallel, part_size_for(size_mib * MiB, args.part_size * MiB))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Presigned URL benchmark (see presign_cache.py), against a local S3 stand-in.
+
+Starts a moto S3 server, uploads --images objects and drives the Flask app
+in-process with its test client:
+
+1. Signing throughput: generate_presigned_url on every call against
+   PresignedURLCache hits.
+2. Gallery page loads: a page that shows every image, loaded twice (first
+   and repeat visit) by a simulated browser with an HTTP cache keyed by URL.
+   - per-image, no cache: one /api/read-url call per image, fresh signature
+     each time (previous behaviour)
+   - per-image, cache: one /api/read-url call per image, reused URLs
+   - batch, cache: a single /api/read-urls call for the whole page
+   Reports requests to the app, requests to S3 and bytes from S3 per visit.
+
+Requires: pip install "moto[server]" boto3 flask pyjwt python-dotenv requests
+
+Usage:
+    python benchmarks/bench_presigned_urls.py --images 50 --sign-calls 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = 'bench-profile-images'
+
+
+def start_s3_stand_in(port):
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server
+
+
+def configure_env(port):
+    # Must be set before app.py is imported
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'BUCKET_NAME': BUCKET,
+        'SECRET_KEY': 'bench-secret-key-of-at-least-32-bytes',
+        'S3_ENDPOINT_URL': f'http://127.0.0.1:{port}',
+        'PROFILE_STORE_URL': 'memory://',
+    })
+
+
+def login(client):
+    response = client.post('/login', json={'username': 'admin', 'password': 'password123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def bench_signing(app_module, calls):
+    from presign_cache import PresignedURLCache
+    keys = [f'user-profile-images/admin/photo{i}.png' for i in range(100)]
+
+    start = time.perf_counter()
+    for i in range(calls):
+        app_module.s3_client.generate_presigned_url(
+            ClientMethod='get_object', Params={'Bucket': BUCKET, 'Key': keys[i % len(keys)]}, ExpiresIn=3600
+        )
+    fresh = calls / (time.perf_counter() - start)
+
+    cache = PresignedURLCache(app_module.s3_client, BUCKET)
+    for key in keys:
+        cache.url('get_object', key, 3600)
+    start = time.perf_counter()
+    for i in range(calls):
+        cache.url('get_object', keys[i % len(keys)], 3600)
+    cached = calls / (time.perf_counter() - start)
+
+    print(f"\nSigning {calls} GET URLs over {len(keys)} keys")
+    print(f"   generate_presigned_url  {fresh:10.0f} URLs/s")
+    print(f"   PresignedURLCache hit   {cached:10.0f} URLs/s   ({cached / fresh:.0f}x)")
+
+
+def load_page(client, headers, keys, batch, browser_cache, s3):
+    """One gallery page load; returns (app requests, S3 requests, bytes from S3)"""
+    app_requests = s3_requests = s3_bytes = 0
+    if batch:
+        response = client.post('/api/read-urls', json={'keys': keys}, headers=headers)
+        app_requests += 1
+        urls = [response.get_json()['urls'][key]['readUrl'] for key in keys]
+    else:
+        urls = []
+        for key in keys:
+            response = client.get('/api/read-url', query_string={'key': key}, headers=headers)
+            app_requests += 1
+            urls.append(response.get_json()['readUrl'])
+
+    for url in urls:
+        if url in browser_cache:
+            continue
+        response = s3.get(url, timeout=30)
+        response.raise_for_status()
+        browser_cache[url] = response.content
+        s3_requests += 1
+        s3_bytes += len(response.content)
+    return app_requests, s3_requests, s3_bytes
+
+
+def bench_pages(app_module, keys):
+    from presign_cache import PresignedURLCache
+    client = app_module.app.test_client()
+    headers = login(client)
+    s3 = requests.Session()
+    cached_urls = app_module.read_urls
+    print(f"\nGallery page with {len(keys)} images, first and repeat visit")
+
+    for name, batch, use_cache in (('per-image, no cache', False, False),
+                                   ('per-image, cache', False, True),
+                                   ('batch, cache', True, True)):
+        # max_entries=0 drops every URL right after signing: the previous behaviour
+        app_module.read_urls = cached_urls if use_cache else PresignedURLCache(
+            app_module.s3_client, BUCKET, max_entries=0)
+        browser_cache = {}
+        for visit in ('first', 'repeat'):
+            start = time.perf_counter()
+            app_requests, s3_requests, s3_bytes = load_page(client, headers, keys, batch, browser_cache, s3)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"   {name:<20} {visit:<6}  app requests {app_requests:>4}   S3 requests {s3_requests:>4}   "
+                  f"from S3 {s3_bytes / 1024:8.1f} KiB   {elapsed:8.1f} ms")
+            # Signatures have one-second resolution: without the sleep a fresh
+            # signature on the repeat visit could still match the first one
+            time.sleep(1.1)
+    app_module.read_urls = cached_urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Presigned URL signing throughput and page-load requests')
+    parser.add_argument('--images', type=int, default=50, help='Images on the gallery page')
+    parser.add_argument('--size', type=int, default=50 * 1024, help='Bytes per image')
+    parser.add_argument('--sign-calls', type=int, default=20000, help='URLs signed per throughput run')
+    parser.add_argument('--port', type=int, default=5055, help='Port of the moto S3 server')
+    args = parser.parse_args()
+
+    server = start_s3_stand_in(args.port)
+    try:
+        configure_env(args.port)
+        sys.path.insert(0, ROOT)
+        import app as app_module
+
+        app_module.s3_client.create_bucket(Bucket=BUCKET)
+        keys = [f'user-profile-images/admin/photo{i}.png' for i in range(args.images)]
+        payload = os.urandom(args.size)
+        for key in keys:
+            app_module.s3_client.put_object(Bucket=BUCKET, Key=key, Body=payload, ContentType='image/png')
+
+        bench_signing(app_module, args.sign_calls)
+        bench_pages(app_module, keys)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write benchmark of the profile store (see profile_store.py).
+
+Compares the legacy user_profiles.json read-modify-write that save_profile()
+and get_me() used to do against SQLiteProfileStore, with and without the
+CachedProfileStore read cache. No AWS or Flask needed.
+
+Each worker thread mixes /api/me-style reads over --users profiles with
+/api/save-profile-style writes to a few profiles that only that thread
+writes. Each write stores the thread's running count for that profile, so
+after the run any profile with a lower count lost an update to another
+user's save.
+
+Usage:
+    python benchmarks/bench_profile_store.py --users 10000 --threads 1,8,32 --writes 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profile_store import CachedProfileStore, SQLiteProfileStore  # noqa: E402
+
+
+class LegacyJSONStore:
+    """The previous behaviour: load, mutate and rewrite the whole file on every call."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self, username):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f).get(username)
+
+    def update(self, username, changes):
+        profiles = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                profiles = json.load(f)
+        profiles[username] = dict(profiles.get(username) or {}, **changes)
+        with open(self.path, 'w') as f:
+            json.dump(profiles, f, indent=2)
+        return profiles[username]
+
+
+def seed(store, users):
+    if isinstance(store, LegacyJSONStore):
+        with open(store.path, 'w') as f:
+            json.dump({f'user{i}': {'fileKey': f'user-profile-images/user{i}/photo.png', 'n': 0}
+                       for i in range(users)}, f, indent=2)
+        return
+    for i in range(users):
+        store.update(f'user{i}', {'fileKey': f'user-profile-images/user{i}/photo.png', 'n': 0})
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(name, store, users, threads, duration, write_ratio):
+    # Thread i writes users i*5 .. i*5+4; nobody else writes them
+    own = {i: [f'user{(i * 5 + j) % users}' for j in range(5)] for i in range(threads)}
+    expected = {}
+    lock = threading.Lock()
+    latencies = {'read': [], 'write': []}
+    errors = []
+    end = time.monotonic() + duration
+
+    def worker(number):
+        rnd = random.Random(number)
+        counts = {username: 0 for username in own[number]}
+        while time.monotonic() < end:
+            start = time.perf_counter()
+            try:
+                if rnd.random() < write_ratio:
+                    username = rnd.choice(own[number])
+                    store.update(username, {'n': counts[username] + 1})
+                    counts[username] += 1
+                    kind = 'write'
+                else:
+                    store.get(f'user{rnd.randrange(users)}')
+                    kind = 'read'
+            except Exception as e:  # the legacy store can read a half-written file
+                errors.append(e)
+                continue
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+        with lock:
+            expected.update(counts)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for i in range(threads):
+            executor.submit(worker, i)
+
+    backend = store.store if isinstance(store, CachedProfileStore) else store
+    lost = sum(count != (backend.get(username) or {}).get('n', 0) for username, count in expected.items())
+    ops = len(latencies['read']) + len(latencies['write'])
+    read_p50 = statistics.median(latencies['read']) if latencies['read'] else 0
+    write_p50 = statistics.median(latencies['write']) if latencies['write'] else 0
+    print(f"   {name:<16} {ops / duration:10.0f} ops/s   read p50 {read_p50:7.3f} ms   "
+          f"p95 {percentile(latencies['read'], 0.95) if latencies['read'] else 0:7.3f} ms   "
+          f"write p50 {write_p50:7.3f} ms   profiles with lost updates {lost:>4}   errors {len(errors)}")
+    return lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile store read/write throughput and lost updates')
+    parser.add_argument('--users', type=int, default=10000, help='Profiles in the store')
+    parser.add_argument('--threads', default='1,8,32', help='Concurrent workers to test, comma separated')
+    parser.add_argument('--writes', type=float, default=0.1, help='Fraction of operations that are writes')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per measurement')
+    parser.add_argument('--skip-legacy', action='store_true', help='Do not run the JSON file store')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='profile_bench_')
+    stores = {}
+    if not args.skip_legacy:
+        stores['legacy json'] = LegacyJSONStore(os.path.join(directory, 'user_profiles.json'))
+    stores['sqlite'] = SQLiteProfileStore(os.path.join(directory, 'profiles.db'))
+    stores['sqlite + cache'] = CachedProfileStore(stores['sqlite'], max_entries=args.users)
+
+    print(f"Seeding {args.users} profiles...")
+    for name, store in stores.items():
+        if name != 'sqlite + cache':
+            seed(store, args.users)
+
+    for threads in (int(t) for t in args.threads.split(',')):
+        print(f"\n{threads} threads, {args.writes:.0%} writes")
+        for name, store in stores.items():
+            run(name, store, args.users, threads, args.duration, args.writes)
+
+
+if __name__ == '__main__':
+    main()
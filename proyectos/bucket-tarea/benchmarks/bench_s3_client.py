@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+S3 client configuration benchmark (see s3_access.py), against a local S3 stand-in.
+
+Starts a moto S3 server and, from --threads threads sharing one client,
+runs HEAD and small GET requests, as the Flask request threads, the image
+pipeline and the reconciler do. Two clients are compared:
+
+    - default: boto3.client('s3') with botocore's defaults (10 connections)
+    - tuned:   s3_access.create_client() (S3_MAX_POOL_CONNECTIONS, 50 by default)
+
+For each one it reports requests/s, p50/p99 latency, and how many TCP
+connections were opened and thrown away because the pool was full.
+Each new connection is a handshake (TCP, and TLS against AWS) that the
+request has to wait for.
+
+It also checks that presigning makes no network request, and times the CORS
+setup when the policy is missing and when it is already in place.
+
+For the whole app under load, see locustfile.py.
+
+Requires: pip install "moto[server]" boto3 flask pyjwt python-dotenv
+
+Usage:
+    python benchmarks/bench_s3_client.py --threads 8,32,64 --requests 4000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = 'bench-s3-client'
+OBJECTS = 200
+
+
+class ConnectionCounter(logging.Handler):
+    """Counts the connections urllib3 opens and the ones it discards"""
+
+    def __init__(self):
+        super().__init__()
+        self.opened = 0
+        self.discarded = 0
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        message = record.getMessage()
+        with self._lock:
+            if message.startswith('Starting new'):
+                self.opened += 1
+            elif message.startswith('Connection pool is full'):
+                self.discarded += 1
+
+    def reset(self):
+        with self._lock:
+            self.opened = self.discarded = 0
+
+
+def start_s3_stand_in(port):
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(s3_client, threads, requests):
+    """requests/s and latencies (ms) of HEAD/GET calls spread over `threads` threads"""
+    latencies = []
+    lock = threading.Lock()
+
+    def call(i):
+        key = f'object-{i % OBJECTS:04d}'
+        start = time.perf_counter()
+        if i % 2:
+            s3_client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+        else:
+            s3_client.head_object(Bucket=BUCKET, Key=key)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(requests)))
+    return requests / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Default boto3 client against the shared, tuned one')
+    parser.add_argument('--threads', default='8,32,64', help='Comma separated thread counts')
+    parser.add_argument('--requests', type=int, default=4000, help='Requests per client and thread count')
+    parser.add_argument('--presigns', type=int, default=10000, help='URLs signed in the presign check')
+    parser.add_argument('--port', type=int, default=5063, help='Port of the moto S3 server')
+    args = parser.parse_args()
+
+    server = start_s3_stand_in(args.port)
+    try:
+        endpoint = f'http://127.0.0.1:{args.port}'
+        os.environ.update({
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing',
+            'AWS_DEFAULT_REGION': 'us-east-1',
+            'S3_ENDPOINT_URL': endpoint,
+        })
+        sys.path.insert(0, ROOT)
+        import boto3
+        from s3_access import S3Config, create_client, ensure_cors
+
+        counter = ConnectionCounter()
+        urllib3_log = logging.getLogger('urllib3.connectionpool')
+        urllib3_log.setLevel(logging.DEBUG)
+        urllib3_log.addHandler(counter)
+        urllib3_log.propagate = False
+
+        config = S3Config.from_env()
+        clients = {
+            'default': boto3.client('s3', endpoint_url=endpoint),
+            'tuned': create_client(config),
+        }
+        setup = clients['tuned']
+        setup.create_bucket(Bucket=BUCKET)
+        for i in range(OBJECTS):
+            setup.put_object(Bucket=BUCKET, Key=f'object-{i:04d}', Body=os.urandom(1024))
+        print(f"{OBJECTS} objects of 1 KiB, {args.requests} HEAD/GET requests per run, "
+              f"tuned pool of {config.max_pool_connections} connections")
+
+        for threads in [int(t) for t in args.threads.split(',')]:
+            print(f"\n{threads} threads")
+            for name, s3_client in clients.items():
+                run(s3_client, threads, threads)  # warm up the pool
+                counter.reset()
+                rate, latencies = run(s3_client, threads, args.requests)
+                print(f"   {name:<8} {rate:8.0f} req/s   p50 {statistics.median(latencies):6.2f} ms   "
+                      f"p99 {percentile(latencies, 0.99):6.2f} ms   "
+                      f"connections opened {counter.opened:>5}, discarded {counter.discarded:>5}")
+
+        counter.reset()
+        start = time.perf_counter()
+        for i in range(args.presigns):
+            clients['tuned'].generate_presigned_url(
+                'get_object', Params={'Bucket': BUCKET, 'Key': f'object-{i % OBJECTS:04d}'}, ExpiresIn=3600)
+        elapsed = time.perf_counter() - start
+        print(f"\nPresign: {args.presigns / elapsed:.0f} URLs/s, {counter.opened} connections opened")
+
+        rules = [{'AllowedMethods': ['GET', 'PUT'], 'AllowedOrigins': ['http://127.0.0.1:5000'],
+                  'AllowedHeaders': ['*'], 'ExposeHeaders': ['ETag'], 'MaxAgeSeconds': 3000}]
+        for label in ('missing policy', 'policy in place'):
+            start = time.perf_counter()
+            written = ensure_cors(setup, BUCKET, rules)
+            print(f"CORS setup, {label:<16} {(time.perf_counter() - start) * 1000:6.1f} ms   "
+                  f"{'written' if written else 'unchanged'}")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Upload listing benchmark (see upload_index.py), against a local S3 stand-in.
+
+Starts a moto S3 server holding --objects objects: --heavy of them belong
+to one user (user0) and the rest are spread over --users other users. Then:
+
+1. Initial reconcile: builds the index from an empty database.
+2. Listing a user's files, for the heavy user and for a typical one:
+   - S3: list_objects_v2 per page, as a naive /api/uploads would. Page N
+     needs N calls, since S3 continuation tokens only go forward.
+   - index: GET /api/uploads through the Flask test client, chained with
+     nextCursor.
+   Reports first-page latency, the time to reach page --deep-page, and a
+   full listing in pages of 1000.
+3. Drift: deletes and adds objects behind the app's back, reconciles, and
+   checks that the index matches the bucket again.
+
+Seeding goes straight to moto's in-process backend. 100k PUTs over HTTP
+would take minutes and are not what is measured.
+
+Requires: pip install "moto[server]" boto3 flask pyjwt python-dotenv
+
+Usage:
+    python benchmarks/bench_upload_listing.py --objects 100000 --heavy 20000
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUCKET = 'bench-profile-images'
+SECRET = 'bench-secret-key-of-at-least-32-bytes'
+PREFIX = 'user-profile-images/'
+
+
+def start_s3_stand_in(port):
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server
+
+
+def configure_env(port, directory):
+    # Must be set before app.py is imported
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'BUCKET_NAME': BUCKET,
+        'SECRET_KEY': SECRET,
+        'S3_ENDPOINT_URL': f'http://127.0.0.1:{port}',
+        'PROFILE_STORE_URL': 'memory://',
+        'USER_STORE_URL': 'memory://',
+        'UPLOAD_INDEX_PATH': os.path.join(directory, 'uploads.db'),
+        'UPLOAD_INDEX_RECONCILE_SECONDS': '0',
+    })
+
+
+def seed(objects, heavy, users):
+    """Objects straight into moto's backend; returns the keys per user"""
+    from moto.core import DEFAULT_ACCOUNT_ID
+    from moto.s3.models import s3_backends
+    backend = s3_backends[DEFAULT_ACCOUNT_ID]['aws']
+    rnd = random.Random(1)
+    keys = {}
+    for i in range(objects):
+        user = 'user0' if i < heavy else f'user{1 + i % users}'
+        key = f'{PREFIX}{user}/photo-{i:07d}.jpg'
+        backend.put_object(BUCKET, key, os.urandom(rnd.randrange(64, 512)))
+        keys.setdefault(user, []).append(key)
+    return backend, keys
+
+
+def timed(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+def s3_pages(s3_client, prefix, page_size, pages=None):
+    """Walks list_objects_v2 pages; returns (calls, objects)"""
+    calls = objects = 0
+    params = {'Bucket': BUCKET, 'Prefix': prefix, 'MaxKeys': page_size}
+    while True:
+        response = s3_client.list_objects_v2(**params)
+        calls += 1
+        objects += response.get('KeyCount', 0)
+        if not response.get('IsTruncated') or (pages and calls >= pages):
+            return calls, objects
+        params['ContinuationToken'] = response['NextContinuationToken']
+
+
+def index_pages(client, headers, page_size, pages=None):
+    """Walks /api/uploads pages; returns (calls, objects)"""
+    calls = objects = 0
+    query = {'limit': page_size}
+    while True:
+        data = client.get('/api/uploads', query_string=query, headers=headers).get_json()
+        calls += 1
+        objects += len(data['items'])
+        if not data['nextCursor'] or (pages and calls >= pages):
+            return calls, objects
+        query['cursor'] = data['nextCursor']
+
+
+def bench_user(app_module, client, jwt, user, count, args):
+    headers = {'Authorization': 'Bearer ' + jwt.encode(
+        {'user': user, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)}, SECRET, algorithm='HS256')}
+    prefix = f'{PREFIX}{user}/'
+    s3 = app_module.s3_client
+    deep = min(args.deep_page, -(-count // 50))
+    print(f"\n{user}: {count} files")
+
+    first_s3 = timed(lambda: s3_pages(s3, prefix, 50, pages=1), args.repeat)
+    first_index = timed(lambda: index_pages(client, headers, 50, pages=1), args.repeat)
+    print(f"   first page of 50     S3 {first_s3:9.1f} ms              index {first_index:9.2f} ms")
+
+    start = time.perf_counter()
+    calls, _ = s3_pages(s3, prefix, 50, pages=deep)
+    deep_s3 = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index_pages(client, headers, 50, pages=deep)
+    deep_index = (time.perf_counter() - start) * 1000
+    print(f"   reach page {deep:<4}       S3 {deep_s3:9.1f} ms ({calls:>4} calls)  index {deep_index:9.2f} ms "
+          f"({deep_index / deep:.2f} ms/page)")
+
+    start = time.perf_counter()
+    calls, listed_s3 = s3_pages(s3, prefix, 1000)
+    full_s3 = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    pages, listed_index = index_pages(client, headers, 1000)
+    full_index = (time.perf_counter() - start) * 1000
+    print(f"   full listing         S3 {full_s3:9.1f} ms ({calls:>4} calls)  index {full_index:9.2f} ms "
+          f"({pages} pages)   objects {listed_s3} / {listed_index}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing a user's files from S3 against the local upload index")
+    parser.add_argument('--objects', type=int, default=100000, help='Objects in the bucket')
+    parser.add_argument('--heavy', type=int, default=20000, help='Objects of the heavy user (user0)')
+    parser.add_argument('--users', type=int, default=400, help='Other users sharing the rest')
+    parser.add_argument('--deep-page', type=int, default=100, help='Page number reached by chaining pages')
+    parser.add_argument('--drift', type=int, default=500, help='Objects deleted and added behind the app')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions of the first-page fetch')
+    parser.add_argument('--port', type=int, default=5062, help='Port of the moto S3 server')
+    args = parser.parse_args()
+
+    server = start_s3_stand_in(args.port)
+    try:
+        configure_env(args.port, tempfile.mkdtemp(prefix='listing_bench_'))
+        sys.path.insert(0, ROOT)
+        import jwt
+        import app as app_module
+
+        app_module.s3_client.create_bucket(Bucket=BUCKET)
+        start = time.perf_counter()
+        backend, keys = seed(args.objects, args.heavy, args.users)
+        print(f"Seeded {args.objects} objects for {len(keys)} users in {time.perf_counter() - start:.1f} s")
+        app_module.users.import_missing({user: {'passwordHash': '', 'active': True} for user in keys})
+
+        start = time.perf_counter()
+        result = app_module.uploads.reconcile(app_module.s3_client, BUCKET, PREFIX)
+        print(f"Initial reconcile: {time.perf_counter() - start:.1f} s   {result}")
+
+        client = app_module.app.test_client()
+        for user in ('user0', 'user1'):
+            bench_user(app_module, client, jwt, user, len(keys[user]), args)
+
+        # Drift: objects removed and added without the app knowing
+        rnd = random.Random(2)
+        removed = rnd.sample(keys['user0'], args.drift)
+        for i in range(0, len(removed), 1000):
+            app_module.s3_client.delete_objects(Bucket=BUCKET, Delete={
+                'Objects': [{'Key': key} for key in removed[i:i + 1000]], 'Quiet': True})
+        for i in range(args.drift):
+            backend.put_object(BUCKET, f'{PREFIX}user0/unreported-{i:05d}.jpg', b'new')
+        start = time.perf_counter()
+        result = app_module.uploads.reconcile(app_module.s3_client, BUCKET, PREFIX)
+        elapsed = time.perf_counter() - start
+        in_s3 = s3_pages(app_module.s3_client, f'{PREFIX}user0/', 1000)[1]
+        in_index = index_pages(client, {'Authorization': 'Bearer ' + jwt.encode(
+            {'user': 'user0', 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)},
+            SECRET, algorithm='HS256')}, 1000)[1]
+        print(f"\nDrift of {args.drift} deleted + {args.drift} unreported objects, reconcile {elapsed:.1f} s   {result}")
+        print(f"   user0 after reconcile: {in_s3} objects in S3, {in_index} in the index")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Locust load test of the app's API routes.
+
+Each simulated user logs in as one of the accounts in LOAD_USERS (the demo
+accounts by default) and then uses the routes the page calls: /api/me, read
+URLs for one photo and for a gallery, the upload listing and upload URLs. None
+of them moves file data. They measure the app itself: authentication, the
+stores and presigning, plus the S3 calls made through the shared client (see
+s3_access.py).
+
+To compare S3 client settings, start the app once per configuration, e.g.
+S3_MAX_POOL_CONNECTIONS=10 and then 50, and run the same load against it.
+
+Requires: pip install locust
+
+Usage:
+    python app.py
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:5000 \\
+        --headless --users 50 --spawn-rate 10 --run-time 2m
+"""
+
+import itertools
+import os
+
+from locust import HttpUser, between, task
+
+# username:password pairs, comma separated
+ACCOUNTS = [
+    tuple(pair.split(':', 1))
+    for pair in os.getenv('LOAD_USERS', 'admin:password123,user:userpass').split(',')
+]
+GALLERY_SIZE = 20
+
+_accounts = itertools.cycle(ACCOUNTS)
+
+
+class ProfileUser(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        self.username, password = next(_accounts)
+        response = self.client.post('/login', json={'username': self.username, 'password': password})
+        response.raise_for_status()
+        self.client.headers['Authorization'] = f"Bearer {response.json()['token']}"
+        self.key = f'user-profile-images/{self.username}/photo.png'
+
+    @task(5)
+    def me(self):
+        self.client.get('/api/me')
+
+    @task(5)
+    def read_url(self):
+        self.client.get('/api/read-url', params={'key': self.key})
+
+    @task(2)
+    def read_urls(self):
+        keys = [f'user-profile-images/{self.username}/photo-{i}.png' for i in range(GALLERY_SIZE)]
+        self.client.post('/api/read-urls', json={'keys': keys})
+
+    @task(2)
+    def uploads(self):
+        self.client.get('/api/uploads', params={'limit': 50})
+
+    @task(1)
+    def upload_url(self):
+        self.client.post('/api/upload-url', json={'filename': 'photo.png', 'fileType': 'image/png'})
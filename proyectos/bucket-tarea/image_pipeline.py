@@ -0,0 +1,291 @@
+"""
+Background processing of uploaded profile photos.
+
+The original is kept as uploaded. A pool of worker processes makes smaller
+copies of it without metadata (EXIF, GPS, ICC, XMP), in WebP and, when
+Pillow supports it, AVIF:
+    - avatar-128, avatar-256: square crops for the 100 px profile picture
+      (1x and 2x screens)
+    - large: longest side at most 1024 px, for the full-size modal
+
+Variants are stored next to the original under
+user-profile-images/<user>/.variants/<digest>/, where digest is the SHA-256
+of the original. Same content means same keys, so a variant never changes
+once written and its read URLs can be cached. manifest.json is written
+last and marks a finished set: the same photo uploaded again (or notified
+twice, by the client and by a bucket event) is processed only once.
+
+ImagePipeline.submit() queues a photo. Download and upload run in a small
+thread pool and the decoding and encoding in a process pool, so a slow
+encode never holds the GIL of the web workers. When a photo is ready, its
+manifest is stored in the user's profile if it is still their photo.
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context
+
+try:
+    from PIL import Image, ImageCms, ImageOps, features
+except ImportError:  # the app still runs; photos are kept as uploaded
+    Image = None
+
+# (name, size, square): square variants are center crops of size x size
+VARIANTS = (
+    ('avatar-128', 128, True),
+    ('avatar-256', 256, True),
+    ('large', 1024, False),
+)
+QUALITY = {'WEBP': 80, 'AVIF': 60}
+MAX_PIXELS = 50_000_000
+MAX_SOURCE_BYTES = 50 * 1024 * 1024
+VARIANTS_DIR = '.variants'
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def output_formats():
+    """[(extension, Pillow format, content type)] this Pillow build can write"""
+    formats = [('webp', 'WEBP', 'image/webp')]
+    if features.check('avif'):
+        formats.append(('avif', 'AVIF', 'image/avif'))
+    return formats
+
+
+def make_variants(data):
+    """
+    Decode a photo and encode its variants. Runs in a worker process.
+
+    Returns:
+        dict with format, width and height of the original, processingMs
+        and variants [{name, width, height, format, contentType, data}].
+
+    Raises:
+        InvalidImage: if the data is not an image Pillow can read, or is too large.
+    """
+    if Image is None:
+        raise RuntimeError('Processing photos requires the Pillow package')
+    start = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_PIXELS:
+            raise InvalidImage(f'Image too large: {image.width}x{image.height}')
+        source_format = image.format
+        # JPEG can be decoded at 1/2, 1/4 or 1/8 scale: much faster than the
+        # full image when even the largest variant is far smaller
+        if image.format == 'JPEG':
+            largest = max(size for _, size, _ in VARIANTS)
+            image.draft('RGB', (largest, largest))
+        # Applies the EXIF rotation to the pixels; the tag itself is not copied
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    except InvalidImage:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(f'Invalid image: {e}')
+    width, height = image.size
+    icc = image.info.get('icc_profile')
+    if icc:
+        # The profile is dropped below: convert the colors to sRGB first, which
+        # is what browsers assume for images without one
+        try:
+            image = ImageCms.profileToProfile(
+                image, ImageCms.ImageCmsProfile(io.BytesIO(icc)), ImageCms.createProfile('sRGB'),
+                outputMode=image.mode
+            )
+        except (ImageCms.PyCMSError, OSError):
+            pass
+    # Nothing of the original's metadata goes into the variants
+    image.info = {}
+
+    variants = []
+    for name, size, square in VARIANTS:
+        if square:
+            resized = ImageOps.fit(image, (min(size, width, height),) * 2, Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, pillow_format, content_type in output_formats():
+            output = io.BytesIO()
+            resized.save(output, pillow_format, quality=QUALITY[pillow_format])
+            variants.append({
+                'name': name,
+                'width': resized.width,
+                'height': resized.height,
+                'format': extension,
+                'contentType': content_type,
+                'data': output.getvalue(),
+            })
+    return {
+        'format': source_format,
+        'width': width,
+        'height': height,
+        'processingMs': round((time.perf_counter() - start) * 1000, 1),
+        'variants': variants,
+    }
+
+
+def variants_prefix(key, digest):
+    """user-profile-images/<user>/photo.png -> user-profile-images/<user>/.variants/<digest>/"""
+    return f"{key.rsplit('/', 1)[0]}/{VARIANTS_DIR}/{digest}/"
+
+
+def is_variant(key):
+    return f'/{VARIANTS_DIR}/' in key
+
+
+class ImagePipeline:
+
+    def __init__(self, s3_client, bucket, profiles, processes=2, threads=4):
+        """
+        Args:
+            s3_client: boto3 S3 client.
+            bucket: bucket name.
+            profiles: profile store; ready photos are saved as profile['photo'].
+            processes: worker processes that decode and encode images.
+            threads: photos downloaded and uploaded at once.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.profiles = profiles
+        self.process_count = processes
+        self.thread_count = threads
+        self._lock = threading.Lock()
+        self._processes = None
+        self._threads = None
+        self._in_flight = {}  # variants prefix -> Future of the manifest being made
+        self.processed = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads is None:
+                # spawn: forking a process that already runs threads can deadlock
+                self._processes = ProcessPoolExecutor(self.process_count, mp_context=get_context('spawn'))
+                self._threads = ThreadPoolExecutor(self.thread_count, thread_name_prefix='image-pipeline')
+        return self._threads
+
+    def warm_up(self):
+        """Start the worker processes now; otherwise the first photos pay for it"""
+        self._start()
+        wait([self._processes.submit(time.sleep, 0) for _ in range(self.process_count)])
+
+    def submit(self, username, key):
+        """Queue the photo `key` of `username`; returns a Future with its manifest"""
+        return self._start().submit(self._run, username, key)
+
+    def shutdown(self):
+        """Wait for the queued photos, then stop the threads and worker processes"""
+        with self._lock:
+            threads, processes = self._threads, self._processes
+        if threads is None:
+            return
+        # Not under the lock: the queued jobs need it, and the process pool, to finish
+        threads.shutdown()
+        processes.shutdown()
+        with self._lock:
+            if self._threads is threads:
+                self._threads = self._processes = None
+
+    def _run(self, username, key):
+        try:
+            manifest = self.variants_of(key)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"❌ Photo {key} failed: {e}")
+            self._record(username, key, {'source': key, 'status': 'failed', 'error': str(e)})
+            raise
+        self._record(username, key, dict(manifest, source=key, status='ready'))
+        return manifest
+
+    def variants_of(self, key):
+        """Manifest of the variants of `key`, made now unless a finished set already exists"""
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        if response['ContentLength'] > MAX_SOURCE_BYTES:
+            response['Body'].close()
+            raise InvalidImage(f"Image too large: {response['ContentLength']} bytes")
+        data = response['Body'].read()
+        digest = hashlib.sha256(data).hexdigest()
+        prefix = variants_prefix(key, digest)
+
+        with self._lock:
+            future = self._in_flight.get(prefix)
+            owner = future is None
+            if owner:
+                future = self._in_flight[prefix] = Future()
+        if not owner:
+            # The same photo is already being processed (client and bucket event)
+            return future.result()
+        try:
+            manifest = self._existing_manifest(prefix)
+            if manifest is None:
+                manifest = self._make(key, data, prefix)
+            else:
+                with self._lock:
+                    self.reused += 1
+            future.set_result(manifest)
+            return manifest
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[prefix]
+
+    def _existing_manifest(self, prefix):
+        try:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=prefix + 'manifest.json')['Body']
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(body.read())
+
+    def _make(self, key, data, prefix):
+        self._start()
+        result = self._processes.submit(make_variants, data).result()
+        variants = []
+        for variant in result['variants']:
+            content = variant.pop('data')
+            variant['key'] = f"{prefix}{variant['name']}.{variant['format']}"
+            variant['bytes'] = len(content)
+            self.s3_client.put_object(
+                Bucket=self.bucket, Key=variant['key'], Body=content,
+                ContentType=variant['contentType'],
+                # The key changes with the content, so browsers can keep it forever
+                CacheControl='public, max-age=31536000, immutable'
+            )
+            variants.append(variant)
+        manifest = {
+            'originalBytes': len(data),
+            'format': result['format'],
+            'width': result['width'],
+            'height': result['height'],
+            'processingMs': result['processingMs'],
+            'variants': variants,
+        }
+        # Written last: its presence means every variant is in place
+        self.s3_client.put_object(
+            Bucket=self.bucket, Key=prefix + 'manifest.json',
+            Body=json.dumps(manifest).encode(), ContentType='application/json'
+        )
+        with self._lock:
+            self.processed += 1
+        avatar = min(v['bytes'] for v in variants if v['name'] == 'avatar-256')
+        large = min(v['bytes'] for v in variants if v['name'] == 'large')
+        print(f"🖼️  {key}: {result['processingMs']:.0f} ms, original {len(data) / 1024:.0f} KiB, "
+              f"avatar {avatar / 1024:.1f} KiB, large {large / 1024:.1f} KiB "
+              f"({100 - 100 * large / len(data):.1f}% saved)")
+        return manifest
+
+    def _record(self, username, key, photo):
+        # The user may have picked another photo meanwhile: that one wins
+        profile = self.profiles.get(username) or {}
+        if profile.get('fileKey') == key:
+            self.profiles.update(username, {'photo': photo})
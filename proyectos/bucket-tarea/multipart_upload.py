@@ -0,0 +1,107 @@
+"""
+Multipart uploads through presigned URLs.
+
+A single presigned PUT sends the whole file in one request: it cannot run
+in parallel, and a dropped connection at 90% starts again from zero. With
+S3 multipart uploads the browser sends the file in parts. Each part has its
+own presigned URL, several parts go up at once, and after a failure only the
+parts S3 does not have yet are sent again.
+
+Flow (see the /api/multipart/* routes in app.py):
+    1. create()     -> uploadId, part size and part count for the file size
+    2. part_urls()  -> presigned upload_part URLs for many parts in one call
+    3. the browser PUTs each part and keeps the ETag of the response
+    4. complete()   -> S3 joins the parts into the final object
+       abort()      -> S3 drops the parts already uploaded
+    list_parts() tells a resuming client which parts S3 already has.
+"""
+
+import math
+
+MiB = 1024 * 1024
+MIN_PART_SIZE = 5 * MiB   # S3 minimum for every part but the last
+MAX_PARTS = 10000         # S3 maximum parts per upload
+MAX_URLS_PER_CALL = 1000
+
+
+def part_size_for(size, preferred=8 * MiB):
+    """Part size for a file of `size` bytes: `preferred`, grown in whole MiB to stay within MAX_PARTS"""
+    part_size = max(preferred, MIN_PART_SIZE)
+    if size > part_size * MAX_PARTS:
+        part_size = math.ceil(size / MAX_PARTS / MiB) * MiB
+    return part_size
+
+
+class MultipartUploads:
+
+    def __init__(self, s3_client, bucket, part_size=8 * MiB, url_expires=3600):
+        """
+        Args:
+            s3_client: boto3 S3 client.
+            bucket: bucket name.
+            part_size: preferred part size in bytes (at least 5 MiB).
+            url_expires: seconds a presigned part URL is valid.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.part_size = part_size
+        self.url_expires = url_expires
+
+    def create(self, key, content_type, size):
+        """Start an upload of `size` bytes; returns uploadId, partSize and partCount"""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        upload_id = self.s3_client.create_multipart_upload(**params)['UploadId']
+        part_size = part_size_for(size, self.part_size)
+        return {
+            'uploadId': upload_id,
+            'partSize': part_size,
+            'partCount': max(1, math.ceil(size / part_size)),
+        }
+
+    def part_urls(self, key, upload_id, part_numbers):
+        """Presigned upload_part URLs, {part number: url}. Signing is local, no S3 call"""
+        if len(part_numbers) > MAX_URLS_PER_CALL:
+            raise ValueError(f'At most {MAX_URLS_PER_CALL} parts per call')
+        if not all(isinstance(n, int) and 1 <= n <= MAX_PARTS for n in part_numbers):
+            raise ValueError(f'Part numbers go from 1 to {MAX_PARTS}')
+        return {
+            n: self.s3_client.generate_presigned_url(
+                ClientMethod='upload_part',
+                Params={'Bucket': self.bucket, 'Key': key, 'UploadId': upload_id, 'PartNumber': n},
+                ExpiresIn=self.url_expires
+            )
+            for n in part_numbers
+        }
+
+    def list_parts(self, key, upload_id):
+        """Parts S3 already has, [{partNumber, etag, size}], in part order"""
+        parts = []
+        marker = 0
+        while True:
+            response = self.s3_client.list_parts(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumberMarker=marker
+            )
+            parts.extend(
+                {'partNumber': p['PartNumber'], 'etag': p['ETag'], 'size': p['Size']}
+                for p in response.get('Parts', [])
+            )
+            if not response.get('IsTruncated'):
+                return parts
+            marker = response['NextPartNumberMarker']
+
+    def complete(self, key, upload_id, parts):
+        """Join the parts, [{partNumber, etag}], into the final object; returns its ETag"""
+        response = self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': sorted(
+                ({'PartNumber': int(p['partNumber']), 'ETag': p['etag']} for p in parts),
+                key=lambda p: p['PartNumber']
+            )}
+        )
+        return response.get('ETag')
+
+    def abort(self, key, upload_id):
+        """Cancel the upload and free the storage of its parts"""
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
@@ -0,0 +1,75 @@
+"""
+Cache of presigned S3 URLs.
+
+Signing is local (no network call), but every fresh signature yields a
+different URL. The browser cannot reuse an image it already downloaded, and
+each image on a page costs one round trip to the Flask app. Reusing the same
+URL until shortly before it expires fixes both: the app answers from memory
+and the browser's HTTP cache sees a stable URL.
+
+URLs are cached per (method, key, extra params) and reused until `margin`
+seconds before they expire, so a client always gets at least `margin`
+seconds of validity.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PresignedURLCache:
+
+    def __init__(self, s3_client, bucket, max_entries=10000, margin=300):
+        """
+        Args:
+            s3_client: boto3 S3 client used to sign.
+            bucket: bucket name.
+            max_entries: URLs kept in memory; the least recently used go first.
+            margin: seconds before expiry at which a cached URL stops being handed out.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.max_entries = max_entries
+        self.margin = margin
+        self._cache = OrderedDict()  # (method, key, params) -> (url, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def url(self, method, key, expires_in, **params):
+        """
+        Presigned URL for `method` ('get_object', 'put_object', ...) on `key`.
+
+        Returns:
+            (url, expires_at) with expires_at as a Unix timestamp.
+        """
+        if expires_in <= self.margin:
+            raise ValueError('expires_in must be larger than the reuse margin')
+        cache_key = (method, key, tuple(sorted(params.items())))
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None and entry[1] - self.margin > now:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        expires_at = int(now) + expires_in
+        url = self.s3_client.generate_presigned_url(
+            ClientMethod=method,
+            Params=dict(params, Bucket=self.bucket, Key=key),
+            ExpiresIn=expires_in
+        )
+        with self._lock:
+            self._cache[cache_key] = (url, expires_at)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return url, expires_at
+
+    def invalidate(self, key):
+        """Forget every URL of `key`, e.g. after the object was replaced or deleted"""
+        with self._lock:
+            for cache_key in [k for k in self._cache if k[1] == key]:
+                del self._cache[cache_key]
@@ -0,0 +1,219 @@
+"""
+Profile store: maps a username to its profile record (a small JSON object,
+e.g. {"fileKey": "user-profile-images/admin/me.png"}).
+
+Backends:
+    - SQLiteProfileStore: one row per user in a SQLite database in WAL mode.
+      Readers never block the writer, and each update only touches its own
+      row instead of rewriting every profile.
+    - MemoryProfileStore: dict guarded by a lock; for tests and demos.
+
+CachedProfileStore wraps any backend with a bounded in-memory read cache.
+Writes go through to the backend and drop the cached entry. Entries also
+expire after `ttl` seconds, so other worker processes see changes.
+
+open_profile_store() picks the backend from a URL (sqlite:///path or
+memory://). migrate_json() imports the legacy user_profiles.json once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+class MemoryProfileStore:
+    """Profiles kept in a dict; lost when the process exits."""
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        with self._lock:
+            profile = self._profiles.get(username)
+            return dict(profile) if profile is not None else None
+
+    def update(self, username, changes):
+        """Merge `changes` into the user's profile atomically and return the result"""
+        with self._lock:
+            profile = dict(self._profiles.get(username) or {}, **changes)
+            self._profiles[username] = profile
+            return dict(profile)
+
+    def import_missing(self, profiles):
+        """Insert profiles for users that do not have one yet; returns how many were added"""
+        with self._lock:
+            added = 0
+            for username, profile in profiles.items():
+                if username not in self._profiles:
+                    self._profiles[username] = dict(profile)
+                    added += 1
+            return added
+
+
+class SQLiteProfileStore:
+    """Profiles in a SQLite database (WAL), one connection per thread."""
+
+    table = 'profiles'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            " username TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, username):
+        row = self._connection().execute(
+            f"SELECT data FROM {self.table} WHERE username = ?", (username,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, username, changes):
+        """Merge `changes` into the user's profile atomically and return the result"""
+        connection = self._connection()
+        # BEGIN IMMEDIATE takes the write lock before reading, so two
+        # concurrent updates of the same user cannot overwrite each other
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(f"SELECT data FROM {self.table} WHERE username = ?", (username,)).fetchone()
+            profile = dict(json.loads(row[0]) if row else {}, **changes)
+            connection.execute(
+                f"INSERT INTO {self.table} (username, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (username, json.dumps(profile), time.time())
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return profile
+
+    def import_missing(self, profiles):
+        """Insert profiles for users that do not have one yet; returns how many were added"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (username, data, updated_at) VALUES (?, ?, ?)",
+                [(username, json.dumps(profile), time.time()) for username, profile in profiles.items()]
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+
+class CachedProfileStore:
+    """Bounded LRU read cache in front of another profile store."""
+
+    def __init__(self, store, max_entries=10000, ttl=5.0):
+        """
+        Args:
+            store: backend with get/update/import_missing.
+            max_entries: profiles kept in memory; the least recently used go first.
+            ttl: seconds a cached profile is trusted. Writes from this process
+                are seen immediately; writes from other processes
+                are seen after at most `ttl` seconds.
+        """
+        self.store = store
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache = OrderedDict()  # username -> (expires_at, profile)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, username, profile, writes=None):
+        with self._lock:
+            # A write landed while this read went to the backend: its value may be stale
+            if writes is not None and writes != self._writes:
+                return
+            self._cache[username] = (time.monotonic() + self.ttl, profile)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, username):
+        with self._lock:
+            entry = self._cache.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(username)
+                self.hits += 1
+                return dict(entry[1]) if entry[1] is not None else None
+            self.misses += 1
+            writes = self._writes
+        profile = self.store.get(username)
+        # Users without a profile are cached too: /api/me asks for them on every page load
+        self._remember(username, profile, writes)
+        return dict(profile) if profile is not None else None
+
+    def update(self, username, changes):
+        profile = self.store.update(username, changes)
+        # Drop the entry instead of caching `profile`: a concurrent update of
+        # the same user may already have committed a newer value
+        with self._lock:
+            self._writes += 1
+            self._cache.pop(username, None)
+        return dict(profile)
+
+    def import_missing(self, profiles):
+        added = self.store.import_missing(profiles)
+        with self._lock:
+            self._cache.clear()
+        return added
+
+
+def open_profile_store(url):
+    """SQLiteProfileStore for sqlite:///path, MemoryProfileStore for memory://"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        # sqlite:///relative.db -> relative.db, sqlite:////abs/path.db -> /abs/path.db
+        return SQLiteProfileStore(url[len('sqlite:///'):])
+    if parsed.scheme == 'memory':
+        return MemoryProfileStore()
+    raise ValueError(f'Unsupported PROFILE_STORE_URL: {url}')
+
+
+def migrate_json(store, json_path):
+    """
+    One-time import of the legacy {username: fileKey} JSON file.
+
+    Users already in the store keep their profile. The file is renamed to
+    <name>.migrated afterwards so the import does not run again.
+    Returns the number of profiles imported, or None if there was no file.
+    """
+    # Several workers may start at once: the import is idempotent and only
+    # one of them gets to rename the file
+    try:
+        with open(json_path) as f:
+            legacy = json.load(f)
+    except FileNotFoundError:
+        return None
+    added = store.import_missing({username: {'fileKey': file_key} for username, file_key in legacy.items()})
+    try:
+        os.replace(json_path, json_path + '.migrated')
+    except FileNotFoundError:
+        pass
+    return added
@@ -0,0 +1,130 @@
+"""
+S3 access layer: one tuned boto3 client shared by the whole process.
+
+boto3 clients are thread-safe once created, but creating one is not (the
+default session is shared, unlocked state) and each client owns its own
+connection pool. So the app creates a single client at startup and hands
+it to every part that talks to S3: the request threads, the presigned URL
+cache, multipart uploads, the image pipeline threads and the upload index
+reconciler. create_client() builds it.
+
+botocore's defaults are tuned for a single-threaded script:
+    - max_pool_connections=10: with more threads than that, the extra
+      connections are opened, used once and discarded ("Connection pool is
+      full"), so every request pays a new TCP + TLS handshake.
+    - legacy retries (5 attempts, no client-side rate limiting) and a 60 s
+      connect/read timeout, so a stalled request holds a worker for a minute.
+S3Config makes all of them configurable and defaults to adaptive retries.
+
+Presigning never touches the network. The client is given its region and
+SigV4 with virtual-hosted URLs, so the browser goes straight to the bucket's
+regional endpoint instead of being redirected from the global one. The
+credentials are resolved once, when the client is built.
+
+The bucket CORS policy is deploy-time configuration. ensure_cors() reads it
+first and only writes it when it differs, and app.py runs it from the
+`flask s3-cors` command or in a background thread, never on the import path.
+"""
+
+import os
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+class S3Config:
+    """Connection settings of the shared client."""
+
+    def __init__(self, region=None, endpoint_url=None, max_pool_connections=50, retry_mode='adaptive',
+                 max_attempts=5, connect_timeout=5, read_timeout=30):
+        """
+        Args:
+            region: bucket region; signatures and URLs are made for it.
+            endpoint_url: S3-compatible endpoint (MinIO, moto server), None for AWS.
+            max_pool_connections: HTTP connections kept open; at least the
+                number of threads that call S3 at the same time.
+            retry_mode: 'adaptive' (client-side rate limiting after throttling),
+                'standard' or 'legacy'.
+            max_attempts: attempts per call, the first one included.
+            connect_timeout, read_timeout: seconds.
+        """
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
+        self.retry_mode = retry_mode
+        self.max_attempts = max_attempts
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Settings from AWS_REGION/AWS_DEFAULT_REGION, S3_ENDPOINT_URL and the S3_* tuning variables"""
+        return cls(
+            region=environ.get('AWS_REGION') or environ.get('AWS_DEFAULT_REGION') or None,
+            endpoint_url=environ.get('S3_ENDPOINT_URL') or None,
+            max_pool_connections=int(environ.get('S3_MAX_POOL_CONNECTIONS', '50')),
+            retry_mode=environ.get('S3_RETRY_MODE', 'adaptive'),
+            max_attempts=int(environ.get('S3_MAX_ATTEMPTS', '5')),
+            connect_timeout=float(environ.get('S3_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(environ.get('S3_READ_TIMEOUT', '30')),
+        )
+
+    def botocore_config(self):
+        return Config(
+            region_name=self.region,
+            signature_version='s3v4',
+            s3={'addressing_style': 'virtual' if self.endpoint_url is None else 'path'},
+            max_pool_connections=self.max_pool_connections,
+            retries={'mode': self.retry_mode, 'total_max_attempts': self.max_attempts},
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=True,
+        )
+
+
+def create_client(config=None, aws_access_key_id=None, aws_secret_access_key=None):
+    """
+    The process-wide S3 client. Call once at startup and share the result.
+
+    Args:
+        config: S3Config; S3Config.from_env() if None.
+        aws_access_key_id, aws_secret_access_key: explicit credentials; if
+            None, boto3's usual chain (environment, profile, instance role).
+    """
+    config = config or S3Config.from_env()
+    # Own session: boto3.client() goes through the default one, which is not thread-safe.
+    # Credentials are resolved here, so no signature waits on a credential provider
+    session = boto3.session.Session(
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        region_name=config.region
+    )
+    return session.client('s3', endpoint_url=config.endpoint_url, config=config.botocore_config())
+
+
+def ensure_cors(s3_client, bucket, rules):
+    """
+    Set the bucket's CORS rules unless they are already in place.
+
+    Returns:
+        True if the policy was written, False if it was already current.
+    """
+    try:
+        current = s3_client.get_bucket_cors(Bucket=bucket).get('CORSRules', [])
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchCORSConfiguration':
+            raise
+        current = []
+    if _normalized(current) == _normalized(rules):
+        return False
+    s3_client.put_bucket_cors(Bucket=bucket, CORSConfiguration={'CORSRules': rules})
+    return True
+
+
+def _normalized(rules):
+    """Comparable form of CORS rules: S3 may return lists in another order and drops empty ones"""
+    return sorted(
+        sorted((k, tuple(sorted(v)) if isinstance(v, list) else v) for k, v in rule.items() if v not in ([], None))
+        for rule in rules
+    )
@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const profileTrigger = document.getElementById('profile-trigger');
     const profileImg = document.getElementById('profile-img');
+    const profileAvif = document.getElementById('profile-avif');
     const fileInput = document.getElementById('file-input');
     const uploadStatus = document.getElementById('upload-status');
     const statusText = document.getElementById('status-text');
@@ -17,13 +18,19 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeModal = document.querySelector('.close-modal');
     const changePhotoBtn = document.getElementById('change-photo-btn');
 
+    const fileList = document.getElementById('file-list');
+    const filesEmpty = document.getElementById('files-empty');
+    const loadMoreBtn = document.getElementById('load-more-btn');
+
     // --- State ---
     let token = localStorage.getItem('jwt_token');
+    let filesCursor = null;
 
     // --- Init ---
     if (token) {
         showDashboard();
         loadSavedProfileImage();
+        loadFiles();
     } else {
         showLogin();
     }
@@ -32,31 +39,116 @@ document.addEventListener('DOMContentLoaded', () => {
     async function loadSavedProfileImage() {
         if (token) {
             try {
-                // 1. Get user info (including fileKey)
+                // 1. Get user info (including fileKey and the photo's variants)
                 const meRes = await fetch('/api/me', {
                     headers: { 'Authorization': `Bearer ${token}` }
                 });
 
-                if (!meRes.ok) return;
-                const { fileKey } = await meRes.json();
+                if (!meRes.ok) return null;
+                const { fileKey, photo } = await meRes.json();
 
-                if (fileKey) {
-                    // 2. Get Read URL
+                if (photo && photo.status === 'ready') {
+                    showVariants(photo.variants);
+                } else if (fileKey) {
+                    // 2. Get Read URL of the original
                     const res = await fetch(`/api/read-url?key=${encodeURIComponent(fileKey)}`, {
                         headers: { 'Authorization': `Bearer ${token}` }
                     });
 
                     if (res.ok) {
                         const { readUrl } = await res.json();
-                        profileImg.src = readUrl;
+                        showOriginal(readUrl);
                     }
                 }
+                return photo;
             } catch (err) {
                 console.error('Failed to load profile image:', err);
             }
         }
+        return null;
+    }
+
+    // Resized copies made by the server (see image_pipeline.py): square
+    // avatars for the 100px picture, "large" for the modal. Browsers
+    // that support AVIF take it from the <source>, the rest use WebP.
+    function showVariants(variants) {
+        const srcset = format => variants
+            .filter(v => v.format === format && v.name.startsWith('avatar-'))
+            .map(v => `${v.url} ${v.width}w`)
+            .join(', ');
+        const large = variants.find(v => v.format === 'webp' && v.name === 'large');
+
+        profileAvif.srcset = srcset('avif');
+        profileImg.sizes = '100px';
+        profileImg.srcset = srcset('webp');
+        profileImg.src = large.url;
+        profileImg.dataset.full = large.url;
+    }
+
+    function showOriginal(readUrl) {
+        profileAvif.removeAttribute('srcset');
+        profileImg.removeAttribute('srcset');
+        profileImg.src = readUrl;
+        profileImg.dataset.full = readUrl;
+    }
+
+    // The variants are made in the background after an upload
+    async function waitForVariants(attempts = 15) {
+        for (let i = 0; i < attempts; i++) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const photo = await loadSavedProfileImage();
+            if (!photo || photo.status !== 'processing') return;
+        }
+    }
+
+    // --- Uploaded Files ---
+    // Pages come from the server's upload index (see upload_index.py);
+    // nextCursor is null on the last page
+    async function loadFiles(more = false) {
+        if (!more) {
+            filesCursor = null;
+            fileList.innerHTML = '';
+        }
+        const query = new URLSearchParams({ limit: 50 });
+        if (filesCursor) query.set('cursor', filesCursor);
+
+        try {
+            const res = await fetch(`/api/uploads?${query}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!res.ok) return;
+            const { items, nextCursor } = await res.json();
+
+            for (const item of items) {
+                const li = document.createElement('li');
+                const name = document.createElement('span');
+                const meta = document.createElement('span');
+                name.textContent = item.name;
+                meta.className = 'file-meta';
+                meta.textContent = `${formatSize(item.size)} · ${new Date(item.uploadedAt * 1000).toLocaleString()}`;
+                li.append(name, meta);
+                fileList.appendChild(li);
+            }
+            filesCursor = nextCursor;
+            filesEmpty.classList.toggle('hidden', fileList.children.length > 0);
+            loadMoreBtn.classList.toggle('hidden', !nextCursor);
+        } catch (err) {
+            console.error('Failed to load files:', err);
+        }
+    }
+
+    function formatSize(bytes) {
+        const units = ['B', 'KB', 'MB', 'GB'];
+        let i = 0;
+        while (bytes >= 1024 && i < units.length - 1) {
+            bytes /= 1024;
+            i++;
+        }
+        return `${bytes.toFixed(i ? 1 : 0)} ${units[i]}`;
     }
 
+    loadMoreBtn.addEventListener('click', () => loadFiles(true));
+
     // --- Auth Functions ---
     loginForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -77,6 +169,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 localStorage.setItem('jwt_token', token);
                 showDashboard();
                 loadSavedProfileImage();
+                loadFiles();
             } else {
                 loginError.textContent = data.message || 'Login failed';
             }
@@ -109,7 +202,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Open Modal
     profileTrigger.addEventListener('click', () => {
-        modalImg.src = profileImg.src;
+        modalImg.src = profileImg.dataset.full || profileImg.src;
         imageModal.classList.remove('hidden');
     });
 
@@ -129,43 +222,180 @@ document.addEventListener('DOMContentLoaded', () => {
         fileInput.click();
     });
 
+    // --- Uploads ---
+
+    // Files from this size up are sent in parts (see multipart_upload.py)
+    const MULTIPART_THRESHOLD = 16 * 1024 * 1024;
+    const PARALLEL_PARTS = 4;
+    const PART_RETRIES = 3;
+    const URL_BATCH = 100;
+
+    async function api(path, options = {}) {
+        const res = await fetch(path, {
+            ...options,
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${token}`,
+                ...(options.headers || {})
+            }
+        });
+        const data = await res.json().catch(() => ({}));
+        if (!res.ok) {
+            const err = new Error(data.message || `${path} failed`);
+            err.status = res.status;
+            throw err;
+        }
+        return data;
+    }
+
+    async function uploadSingle(file) {
+        const { uploadUrl, fileKey } = await api('/api/upload-url', {
+            method: 'POST',
+            body: JSON.stringify({ filename: file.name, fileType: file.type })
+        });
+
+        const uploadRes = await fetch(uploadUrl, {
+            method: 'PUT',
+            headers: { 'Content-Type': file.type },
+            body: file
+        });
+
+        if (!uploadRes.ok) throw new Error('Failed to upload to S3');
+        return fileKey;
+    }
+
+    // Unfinished uploads are remembered per file, so choosing the same file
+    // again after a failure (or a page reload) only sends the missing parts
+    function resumeId(file) {
+        return `multipart:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    async function startOrResume(file) {
+        const saved = JSON.parse(localStorage.getItem(resumeId(file)) || 'null');
+        if (saved) {
+            try {
+                const query = new URLSearchParams({ fileKey: saved.fileKey, uploadId: saved.uploadId });
+                const { parts } = await api(`/api/multipart/parts?${query}`);
+                return { ...saved, done: parts };
+            } catch (err) {
+                // 404: the upload was completed, aborted or expired; start over
+                if (err.status !== 404) throw err;
+            }
+        }
+        const upload = await api('/api/multipart/create', {
+            method: 'POST',
+            body: JSON.stringify({ filename: file.name, fileType: file.type, size: file.size })
+        });
+        localStorage.setItem(resumeId(file), JSON.stringify(upload));
+        return { ...upload, done: [] };
+    }
+
+    async function uploadPart(url, blob) {
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const res = await fetch(url, { method: 'PUT', body: blob });
+                if (!res.ok) throw new Error(`S3 answered ${res.status}`);
+                // Needs ETag in the bucket's CORS ExposeHeaders (see apply_s3_cors)
+                return res.headers.get('ETag');
+            } catch (err) {
+                if (attempt >= PART_RETRIES) throw err;
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+            }
+        }
+    }
+
+    async function uploadMultipart(file) {
+        const upload = await startOrResume(file);
+        const { fileKey, uploadId, partSize, partCount } = upload;
+        const target = { fileKey, uploadId };
+
+        const etags = new Map();
+        // Only parts with the expected size count; a short one is sent again
+        for (const part of upload.done) {
+            const expected = Math.min(partSize, file.size - (part.partNumber - 1) * partSize);
+            if (part.size === expected) etags.set(part.partNumber, part.etag);
+        }
+        const pending = [];
+        for (let n = 1; n <= partCount; n++) {
+            if (!etags.has(n)) pending.push(n);
+        }
+
+        // Part URLs are signed in batches, each batch requested by the first worker that needs it
+        const batches = new Map();
+        function partUrl(index) {
+            const batch = Math.floor(index / URL_BATCH);
+            if (!batches.has(batch)) {
+                const partNumbers = pending.slice(batch * URL_BATCH, (batch + 1) * URL_BATCH);
+                batches.set(batch, api('/api/multipart/part-urls', {
+                    method: 'POST',
+                    body: JSON.stringify({ ...target, partNumbers })
+                }).then(data => data.urls));
+            }
+            return batches.get(batch).then(urls => urls[pending[index]]);
+        }
+
+        let uploaded = etags.size * partSize;
+        const showProgress = () => {
+            statusText.textContent = `Uploading ${file.name}... ${Math.min(100, Math.floor(100 * uploaded / file.size))}%`;
+        };
+        showProgress();
+
+        let next = 0;
+        async function worker() {
+            while (next < pending.length) {
+                const index = next++;
+                const n = pending[index];
+                const blob = file.slice((n - 1) * partSize, n * partSize);
+                etags.set(n, await uploadPart(await partUrl(index), blob));
+                uploaded += blob.size;
+                showProgress();
+            }
+        }
+
+        try {
+            await Promise.all(Array.from({ length: Math.min(PARALLEL_PARTS, pending.length) }, worker));
+        } catch (err) {
+            throw new Error(`${err.message}. Choose the same file again to resume the upload`);
+        }
+
+        const parts = [...etags].map(([partNumber, etag]) => ({ partNumber, etag }));
+        try {
+            await api('/api/multipart/complete', {
+                method: 'POST',
+                body: JSON.stringify({ ...target, parts })
+            });
+        } catch (err) {
+            // S3 rejected the parts: resuming would fail the same way, drop them
+            if (err.status === 400) {
+                await api('/api/multipart/abort', { method: 'POST', body: JSON.stringify(target) }).catch(() => {});
+                localStorage.removeItem(resumeId(file));
+            }
+            throw err;
+        }
+        localStorage.removeItem(resumeId(file));
+        return fileKey;
+    }
+
     // Handle File Selection & Upload
     fileInput.addEventListener('change', async (e) => {
         const file = e.target.files[0];
         if (!file) return;
+        // Lets the same file be chosen again to resume a failed upload
+        e.target.value = '';
 
         // Close modal if open
         imageModal.classList.add('hidden');
 
         // Show loading
         uploadStatus.classList.remove('hidden');
+        statusText.style.color = '';
         statusText.textContent = `Uploading ${file.name}...`;
 
         try {
-            // 1. Get Presigned URL
-            const urlRes = await fetch('/api/upload-url', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${token}`
-                },
-                body: JSON.stringify({
-                    filename: file.name,
-                    fileType: file.type
-                })
-            });
-
-            if (!urlRes.ok) throw new Error('Failed to get upload URL');
-            const { uploadUrl, fileKey } = await urlRes.json();
-
-            // 2. Upload to S3
-            const uploadRes = await fetch(uploadUrl, {
-                method: 'PUT',
-                headers: { 'Content-Type': file.type },
-                body: file
-            });
-
-            if (!uploadRes.ok) throw new Error('Failed to upload to S3');
+            // 1-2. Upload to S3: one PUT for small files, parallel parts for large ones
+            const fileKey = file.size >= MULTIPART_THRESHOLD
+                ? await uploadMultipart(file)
+                : await uploadSingle(file);
 
             statusText.textContent = 'Upload complete! Fetching image...';
 
@@ -189,10 +419,12 @@ document.addEventListener('DOMContentLoaded', () => {
 
             if (!saveRes.ok) throw new Error('Failed to save profile');
 
-            // 5. Update UI
-            profileImg.src = readUrl;
+            // 5. Update UI; the resized variants replace the original when ready
+            showOriginal(readUrl);
             statusText.textContent = 'Done';
             setTimeout(() => uploadStatus.classList.add('hidden'), 2000);
+            loadFiles();
+            waitForVariants();
 
         } catch (err) {
             console.error(err);
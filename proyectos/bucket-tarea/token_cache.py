@@ -0,0 +1,64 @@
+"""
+Cache of verified JWTs.
+
+A browser sends the same token on every request for up to 30 minutes,
+and each jwt.decode parses it and checks its HMAC signature again.
+VerifiedTokenCache remembers the decoded payload of a token that passed
+verification, keyed by the SHA-256 of the token, until the token's own
+`exp`. The token itself is never stored. Tokens that fail verification are
+not cached, so garbage cannot push valid entries out.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+
+    def __init__(self, max_entries=10000):
+        """
+        Args:
+            max_entries: tokens kept in memory; the least recently used go first.
+        """
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # sha256(token) -> (exp, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """Payload of a previously verified token, or None if unknown or expired"""
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._cache[digest]
+            self.misses += 1
+        return None
+
+    def put(self, token, payload):
+        """Remember a token that jwt.decode accepted; tokens without exp are not cached"""
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._cache[digest] = (exp, dict(payload))
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """Forget every token, e.g. after SECRET_KEY changes"""
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,200 @@
+"""
+Local index of the uploaded objects, for listing a user's files.
+
+Listing straight from S3 costs one list_objects_v2 round trip per page, and
+S3 can only page forward from the start. The index keeps key, size, etag and
+uploaded_at of each object in SQLite (WAL). The key is the primary key, so
+the rows of one folder (user-profile-images/<user>/) sit next to each other
+in the B-tree. A page is a range scan from the previous page's last key
+(keyset pagination), as fast for page 1000 as for page 1.
+
+The index is kept current in two ways:
+    - record() when the app learns that an upload finished (save-profile,
+      multipart complete, bucket events);
+    - reconcile() walks the bucket and fixes whatever was missed: uploads
+      nobody reported, objects deleted or replaced outside the app.
+      PeriodicReconciler runs it in a background thread.
+"""
+
+import base64
+import os
+import sqlite3
+import threading
+import time
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+def prefix_end(prefix):
+    """Smallest string greater than every string that starts with `prefix`"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Last key of the previous page; ValueError if the cursor is malformed"""
+    try:
+        return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+class SQLiteUploadIndex:
+    """Object metadata in a SQLite database (WAL), one connection per thread."""
+
+    def __init__(self, path, skip=None):
+        """
+        Args:
+            path: database file.
+            skip: optional predicate; keys for which it is true are never indexed
+                (e.g. the variants the image pipeline writes).
+        """
+        self.path = path
+        self.skip = skip or (lambda key: False)
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " key TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " etag TEXT NOT NULL,"
+            " uploaded_at REAL NOT NULL,"
+            " seen_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def record(self, key, size, etag, uploaded_at):
+        """Add or update one object, e.g. right after its upload finished"""
+        if self.skip(key):
+            return
+        self._connection().execute(
+            "INSERT INTO uploads (key, size, etag, uploaded_at, seen_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET size = excluded.size, etag = excluded.etag, "
+            "uploaded_at = excluded.uploaded_at, seen_at = excluded.seen_at",
+            (key, size, etag.strip('"'), uploaded_at, time.time())
+        )
+
+    def remove(self, key):
+        self._connection().execute("DELETE FROM uploads WHERE key = ?", (key,))
+
+    def page(self, prefix, limit=PAGE_SIZE, cursor=None):
+        """
+        One page of the objects under `prefix`, in key order.
+
+        Returns:
+            (items, next_cursor): items are dicts with key, size, etag and
+            uploadedAt; next_cursor is None on the last page.
+
+        Raises:
+            ValueError: if the cursor is malformed or belongs to another prefix.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if cursor:
+            after = decode_cursor(cursor)
+            if not after.startswith(prefix):
+                raise ValueError('Invalid cursor')
+            condition, start = 'key > ?', after
+        else:
+            condition, start = 'key >= ?', prefix
+        # One row more than asked tells whether there is a next page
+        rows = self._connection().execute(
+            f"SELECT key, size, etag, uploaded_at FROM uploads WHERE {condition} AND key < ? ORDER BY key LIMIT ?",
+            (start, prefix_end(prefix), limit + 1)
+        ).fetchall()
+        items = [{'key': k, 'size': s, 'etag': e, 'uploadedAt': u} for k, s, e, u in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]['key']) if len(rows) > limit else None
+        return items, next_cursor
+
+    def reconcile(self, s3_client, bucket, prefix):
+        """
+        Make the index under `prefix` match the bucket.
+
+        Returns:
+            dict with the number of objects seen, rows added or changed, and
+            rows removed because the object is gone.
+        """
+        started = time.time()
+        connection = self._connection()
+        seen = changed = 0
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for response in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+            rows = [
+                (o['Key'], o['Size'], o['ETag'].strip('"'), o['LastModified'].timestamp(), started)
+                for o in response.get('Contents', []) if not self.skip(o['Key'])
+            ]
+            seen += len(rows)
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                before = connection.total_changes
+                # Unchanged rows only get their seen_at bumped. Rows recorded after
+                # this run started are newer than the listing and are left alone
+                connection.executemany(
+                    "INSERT INTO uploads (key, size, etag, uploaded_at, seen_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET size = excluded.size, etag = excluded.etag, "
+                    "uploaded_at = excluded.uploaded_at, seen_at = excluded.seen_at "
+                    "WHERE uploads.seen_at < excluded.seen_at "
+                    "AND (uploads.etag != excluded.etag OR uploads.size != excluded.size)",
+                    rows
+                )
+                changed += connection.total_changes - before
+                connection.executemany(
+                    "UPDATE uploads SET seen_at = ? WHERE key = ? AND seen_at < ?",
+                    [(started, row[0], started) for row in rows]
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        # Not in the listing and not recorded since it started: deleted from the bucket
+        removed = connection.execute(
+            "DELETE FROM uploads WHERE key >= ? AND key < ? AND seen_at < ?",
+            (prefix, prefix_end(prefix), started)
+        ).rowcount
+        return {'seen': seen, 'changed': changed, 'removed': removed}
+
+
+class PeriodicReconciler:
+    """Runs index.reconcile() every `interval` seconds in a daemon thread."""
+
+    def __init__(self, index, s3_client, bucket, prefix, interval):
+        self.index = index
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_result = None
+
+    def start(self):
+        """Start the thread once; cheap to call on every request"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='upload-index-reconcile', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                start = time.perf_counter()
+                self.last_result = self.index.reconcile(self.s3_client, self.bucket, self.prefix)
+                print(f"🔄 Upload index reconciled in {time.perf_counter() - start:.1f} s: {self.last_result}")
+            except Exception as e:
+                print(f"❌ Upload index reconcile failed: {e}")
+            time.sleep(self.interval)
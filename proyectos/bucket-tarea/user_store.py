@@ -0,0 +1,62 @@
+"""
+User store: maps a username to its account record, e.g.
+{"passwordHash": "scrypt:...", "active": true}.
+
+Same backends and interface as profile_store.py (get/update/import_missing),
+so CachedProfileStore serves as the bounded read cache in front of it:
+    - SQLiteUserStore: a `users` table, by default in users.db.
+    - MemoryUserStore: dict guarded by a lock; for tests and demos.
+
+open_user_store() picks the backend from a URL (sqlite:///path or memory://).
+seed_users() adds the demo accounts that app.py used to hardcode.
+"""
+
+from urllib.parse import urlparse
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from profile_store import MemoryProfileStore, SQLiteProfileStore
+
+# Compared against when the user does not exist, so a login for an unknown
+# user takes as long as one with a wrong password
+_dummy_hash = None
+
+
+class MemoryUserStore(MemoryProfileStore):
+    """Users kept in a dict; lost when the process exits."""
+
+
+class SQLiteUserStore(SQLiteProfileStore):
+    """Users in a SQLite database (WAL), one connection per thread."""
+
+    table = 'users'
+
+
+def open_user_store(url):
+    """SQLiteUserStore for sqlite:///path, MemoryUserStore for memory://"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        return SQLiteUserStore(url[len('sqlite:///'):])
+    if parsed.scheme == 'memory':
+        return MemoryUserStore()
+    raise ValueError(f'Unsupported USER_STORE_URL: {url}')
+
+
+def seed_users(store, passwords):
+    """Create the accounts in {username: password} that do not exist yet; returns how many were added"""
+    # Hashing is slow on purpose: only for the users that are missing
+    missing = {username: password for username, password in passwords.items() if store.get(username) is None}
+    return store.import_missing({
+        username: {'passwordHash': generate_password_hash(password), 'active': True}
+        for username, password in missing.items()
+    })
+
+
+def verify_password(user, password):
+    """True if `user` (a record or None) is an active account with this password"""
+    global _dummy_hash
+    if user is None:
+        _dummy_hash = _dummy_hash or generate_password_hash('not-a-password')
+        check_password_hash(_dummy_hash, password)
+        return False
+    return check_password_hash(user['passwordHash'], password) and user.get('active', True)
@@ -0,0 +1,157 @@
+"""
+Entrega de archivos estáticos del frontend en modo producción.
+
+Al arrancar, Estaticos prepara una sola vez cada archivo del directorio:
+
+- Le agrega al nombre el hash de su contenido (estilo.css ->
+  estilo.3f2a9c1b0d.css) y lo anota en el manifiesto {original: con_hash}, que
+  también se escribe como manifest.json. Las referencias dentro de index.html,
+  factura.js y estilo.css se reescriben a los nombres con hash.
+- Genera variantes precomprimidas .gz y, si está instalado el paquete brotli,
+  .br, sólo cuando salen más chicas que el original.
+- Calcula el ETag de cada variante.
+
+Un archivo con hash nunca cambia de contenido, así que se sirve con
+Cache-Control immutable por un año y el navegador no vuelve a pedirlo.
+index.html y los nombres originales se sirven con no-cache y ETag: el
+navegador revalida y recibe 304 mientras no cambien.
+
+Las respuestas usan send_file con la ruta del archivo ya preparado; gunicorn
+entrega esos archivos con os.sendfile, sin copiarlos a la memoria del proceso.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él sólo hay variantes gzip
+    brotli = None
+
+# Archivos que se publican, en el orden en que se procesan: primero los que no
+# apuntan a otros, para que el hash de cada archivo incluya las referencias ya
+# reescritas de los que usa
+ORDEN = {'.png': 0, '.jpg': 0, '.jpeg': 0, '.gif': 0, '.svg': 0, '.ico': 0, '.woff2': 0,
+         '.xsl': 1, '.css': 2, '.js': 3, '.html': 4}
+SIN_HASH = ('.html',)
+CON_REFERENCIAS = ('.css', '.js', '.html')
+COMPRIMIBLES = ('.xsl', '.css', '.js', '.html', '.svg')
+# Debajo de este tamaño la compresión no ahorra ni un paquete
+MINIMO_COMPRESION = 256
+
+INMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDAR = 'no-cache'
+
+mimetypes.add_type('application/xslt+xml', '.xsl')
+
+
+def _escribir(ruta, contenido):
+    """Escribe de forma atómica: varios workers pueden preparar el mismo archivo"""
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+class Estaticos:
+    """Archivos del frontend con hash, precomprimidos y con ETag precalculado."""
+
+    def __init__(self, origen, destino):
+        """
+        Args:
+            origen: directorio con index.html, estilo.css, factura.js, etc.
+            destino: directorio donde se escriben los archivos preparados.
+        """
+        self.origen = origen
+        self.destino = destino
+        self.manifiesto = {}
+        self._archivos = {}  # nombre publicado -> {'mimetype', 'cache', 'variantes'}
+        self.construir()
+
+    def construir(self):
+        os.makedirs(self.destino, exist_ok=True)
+        nombres = [
+            nombre for nombre in os.listdir(self.origen)
+            if os.path.splitext(nombre)[1] in ORDEN and os.path.isfile(os.path.join(self.origen, nombre))
+        ]
+        for nombre in sorted(nombres, key=lambda n: (ORDEN[os.path.splitext(n)[1]], n)):
+            base, extension = os.path.splitext(nombre)
+            with open(os.path.join(self.origen, nombre), 'rb') as f:
+                contenido = f.read()
+            if extension in CON_REFERENCIAS:
+                contenido = self._reescribir(contenido)
+
+            if extension in SIN_HASH:
+                self._publicar(nombre, contenido, REVALIDAR)
+                continue
+            publicado = f'{base}.{hashlib.sha256(contenido).hexdigest()[:10]}{extension}'
+            self.manifiesto[nombre] = publicado
+            self._publicar(publicado, contenido, INMUTABLE)
+            # El nombre original sigue disponible para páginas que ya estaban en caché
+            self._archivos[nombre] = dict(self._archivos[publicado], cache=REVALIDAR)
+
+        _escribir(os.path.join(self.destino, 'manifest.json'),
+                  json.dumps(self.manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+
+    def _reescribir(self, contenido):
+        """Cambia "estilo.css", '/factura.xsl', url(x.png)... por los nombres con hash"""
+        if not self.manifiesto:
+            return contenido
+        patron = re.compile(
+            rb'(?<=["\'/(])(' + b'|'.join(re.escape(n.encode('utf-8')) for n in self.manifiesto) + rb')(?=["\')?#])'
+        )
+        return patron.sub(lambda m: self.manifiesto[m.group(1).decode('utf-8')].encode('utf-8'), contenido)
+
+    def _publicar(self, nombre, contenido, cache):
+        ruta = os.path.join(self.destino, nombre)
+        _escribir(ruta, contenido)
+        huella = hashlib.sha256(contenido).hexdigest()[:16]
+        variantes = {'identity': (ruta, huella)}
+
+        if os.path.splitext(nombre)[1] in COMPRIMIBLES and len(contenido) >= MINIMO_COMPRESION:
+            comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+            if len(comprimido) < len(contenido):
+                _escribir(ruta + '.gz', comprimido)
+                variantes['gzip'] = (ruta + '.gz', huella + '-gz')
+            if brotli is not None:
+                comprimido = brotli.compress(contenido, quality=11)
+                if len(comprimido) < len(contenido):
+                    _escribir(ruta + '.br', comprimido)
+                    variantes['br'] = (ruta + '.br', huella + '-br')
+
+        self._archivos[nombre] = {
+            'mimetype': mimetypes.guess_type(nombre)[0] or 'application/octet-stream',
+            'cache': cache,
+            'variantes': variantes,
+        }
+
+    def respuesta(self, nombre):
+        """Respuesta para el archivo de la solicitud actual, o None si no se publica"""
+        archivo = self._archivos.get(nombre)
+        if archivo is None:
+            return None
+        variantes = archivo['variantes']
+        codificacion = 'identity'
+        for candidata in ('br', 'gzip'):
+            if candidata in variantes and request.accept_encodings[candidata]:
+                codificacion = candidata
+                break
+        ruta, etag = variantes[codificacion]
+
+        if request.if_none_match.contains(etag):
+            respuesta = Response(status=304)
+        else:
+            respuesta = send_file(ruta, mimetype=archivo['mimetype'], etag=False, conditional=False, max_age=None)
+            if codificacion != 'identity':
+                respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = archivo['cache']
+        if len(variantes) > 1:
+            respuesta.vary.add('Accept-Encoding')
+        return respuesta
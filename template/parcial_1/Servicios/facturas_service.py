@@ -2,8 +2,7 @@ from flask import Flask, request, jsonify, Response
 from flask_mysqldb import MySQL
 from flask_cors import CORS
 import uuid
-import datetime
-import decimal
+from escritor_xml import EscritorXML, Plantilla
 
 app = Flask(__name__)
 CORS(app)
@@ -16,14 +15,10 @@ app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 
 mysql = MySQL(app)
 
-def value_to_str(value):
-    if isinstance(value, (datetime.datetime, datetime.date)):
-        return value.isoformat()
-    if isinstance(value, decimal.Decimal):
-        return str(value)
-    if value is None:
-        return ""
-    return str(value)
+PLANTILLA_ENCABEZADO = Plantilla('encabezado', ['id', 'folio', 'fecha'])
+PLANTILLA_CLIENTE = Plantilla('cliente', ['nombre', 'email'])
+PLANTILLA_ITEM = Plantilla('item', ['codigo', 'nombre', 'cantidad', 'precio_unitario', 'importe'])
+PLANTILLA_TOTALES = Plantilla('totales', ['subtotal', 'impuestos', 'total'])
 
 @app.route('/api/facturas', methods=['POST'])
 def create_factura():
@@ -57,34 +52,18 @@ def create_factura():
         items_detalle = cur.fetchall()
         cur.close()
 
-        xml_output = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_output += '<factura>\n'
-        xml_output += f'  <encabezado>\n'
-        xml_output += f'    <id>{factura_id}</id>\n'
-        xml_output += f'    <folio>{folio}</folio>\n'
-        xml_output += f'    <fecha>{value_to_str(pedido["fecha"])}</fecha>\n'
-        xml_output += '  </encabezado>\n'
-        xml_output += f'  <cliente>\n'
-        xml_output += f'    <nombre>{cliente["nombre"]}</nombre>\n'
-        xml_output += f'    <email>{cliente["email"]}</email>\n'
-        xml_output += '  </cliente>\n'
-        xml_output += '  <items>\n'
+        escritor = EscritorXML().abrir('factura')
+        escritor.registro(PLANTILLA_ENCABEZADO, (factura_id, folio, pedido['fecha']))
+        escritor.registro(PLANTILLA_CLIENTE, cliente)
+        escritor.abrir('items')
         for item in items_detalle:
             importe = item['precio_unitario'] * item['cantidad']
-            xml_output += '    <item>\n'
-            xml_output += f'      <codigo>{item["codigo"]}</codigo>\n'
-            xml_output += f'      <nombre>{item["nombre"]}</nombre>\n'
-            xml_output += f'      <cantidad>{item["cantidad"]}</cantidad>\n'
-            xml_output += f'      <precio_unitario>{value_to_str(item["precio_unitario"])}</precio_unitario>\n'
-            xml_output += f'      <importe>{value_to_str(importe)}</importe>\n'
-            xml_output += '    </item>\n'
-        xml_output += '  </items>\n'
-        xml_output += '  <totales>\n'
-        xml_output += f'    <subtotal>{value_to_str(pedido["subtotal"])}</subtotal>\n'
-        xml_output += f'    <impuestos>{value_to_str(pedido["impuestos"])}</impuestos>\n'
-        xml_output += f'    <total>{value_to_str(pedido["total"])}</total>\n'
-        xml_output += '  </totales>\n'
-        xml_output += '</factura>'
+            escritor.registro(PLANTILLA_ITEM, (
+                item['codigo'], item['nombre'], item['cantidad'], item['precio_unitario'], importe
+            ))
+        escritor.cerrar('items')
+        escritor.registro(PLANTILLA_TOTALES, pedido)
+        xml_output = escritor.cerrar('factura').valor()
 
         return Response(xml_output, mimetype='application/xml')
 
@@ -1,8 +1,7 @@
 from flask import Flask, Response, jsonify
 from flask_mysqldb import MySQL
 from flask_cors import CORS
-import decimal
-import datetime
+from escritor_xml import Plantilla, generar_documento
 
 app = Flask(__name__)
 CORS(app)
@@ -15,14 +14,7 @@ app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 
 mysql = MySQL(app)
 
-def value_to_str(value):
-    if isinstance(value, decimal.Decimal):
-        return str(value)
-    if isinstance(value, datetime.datetime):
-        return value.isoformat()
-    if value is None:
-        return ''
-    return str(value)
+PLANTILLA_PRODUCTO = Plantilla('product', ['id', 'codigo', 'nombre', 'descripcion', 'precio', 'stock', 'material', 'marca', 'kilates'])
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
@@ -32,18 +24,8 @@ def get_products():
         products = cur.fetchall()
         cur.close()
         
-        xml_output = '<?xml version="1.0" encoding="UTF-8"?>\n<products>\n'
-        
-        for product in products:
-            xml_output += '  <product>\n'
-            for key, val in product.items():
-                safe_value = value_to_str(val)
-                xml_output += f'    <{key}>{safe_value}</{key}>\n'
-            xml_output += '  </product>\n'
-            
-        xml_output += '</products>'
-        
-        return Response(xml_output, mimetype='application/xml')
+        # El catálogo se envía por fragmentos conforme se escribe
+        return Response(generar_documento('products', PLANTILLA_PRODUCTO, products), mimetype='application/xml')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,8 +1,11 @@
 # web_server.py (Flask Version, Port 8080 - IP Dinámica)
-from flask import Flask, send_from_directory
+from flask import Flask, abort, send_from_directory
 from flask_cors import CORS
 import os
+import threading
+import time
 import requests
+from estaticos import Estaticos
 
 app = Flask(__name__)
 CORS(app)
@@ -10,48 +13,69 @@ CORS(app)
 # Ahora apuntamos directamente a parcial1/
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
-def get_external_ip():
-    """Detecta automáticamente la IP externa del servidor"""
-    try:
-        # Intentar obtener IP desde el servicio de metadatos de Google Cloud
-        response = requests.get(
-            'http://metadata.google.internal/computeMetadata/v1/instance/network-interfaces/0/access-configs/0/external-ip',
-            headers={'Metadata-Flavor': 'Google'},
-            timeout=5
-        )
-        if response.status_code == 200:
-            return response.text.strip()
-    except:
-        pass
-    
-    # Fallback: usar servicio externo
-    try:
-        response = requests.get('https://ipinfo.io/ip', timeout=5)
-        if response.status_code == 200:
-            return response.text.strip()
-    except:
-        pass
-    
-    # Si todo falla, usar localhost
-    return 'localhost'
+# Modo producción (ver estaticos.py): nombres con hash, gzip/brotli y caché
+# inmutable. Sin él se sirve el directorio tal cual, como en desarrollo
+FRONTEND_PRODUCCION = os.getenv('FRONTEND_PRODUCCION', '0') == '1'
+estaticos = None
+if FRONTEND_PRODUCCION:
+    estaticos = Estaticos(base_dir, os.getenv('FRONTEND_DIST', os.path.join(base_dir, 'dist')))
 
-@app.route('/')
-def serve_index():
-    return send_from_directory(base_dir, 'index.html')
+# Detección de la IP externa en segundo plano. WEB_IP_EXTERNA la fija y omite
+# la detección; la última IP detectada se guarda en disco para mostrarla al
+# arrancar sin esperar a la red
+WEB_IP_EXTERNA = os.getenv('WEB_IP_EXTERNA', '')
+IP_LIMITE = float(os.getenv('WEB_IP_LIMITE', '3'))
+IP_CACHE = os.getenv('WEB_IP_CACHE', os.path.join(base_dir, '.ip_externa'))
+PORT = int(os.getenv('WEB_PUERTO', '8080'))
 
-@app.route('/<path:path>')
-def serve_static_files(path):
-    return send_from_directory(base_dir, path)
+# URLs de los microservicios; sin variable se arman con la IP externa
+SERVICIOS = [
+    ('Productos', 'PRODUCTS_URL', 5001, '/api/products'),
+    ('Pedidos', 'PEDIDOS_URL', 5002, '/api/pedidos'),
+    ('Facturas', 'FACTURAS_URL', 5003, '/api/facturas'),
+]
 
-if __name__ == '__main__':
-    # Detectar IP externa automáticamente
-    external_ip = get_external_ip()
-    PORT = 8080
-    
+def get_external_ip(limite=IP_LIMITE):
+    """Detecta la IP externa del servidor en a lo más `limite` segundos; None si no se pudo"""
+    fin = time.monotonic() + limite
+    fuentes = [
+        # Servicio de metadatos de Google Cloud; fuera de GCE falla de inmediato o por tiempo
+        ('http://metadata.google.internal/computeMetadata/v1/instance/network-interfaces/0/access-configs/0/external-ip',
+         {'Metadata-Flavor': 'Google'}, 1.0),
+        # Fallback: usar servicio externo
+        ('https://ipinfo.io/ip', {}, limite),
+    ]
+    for url, encabezados, espera in fuentes:
+        restante = fin - time.monotonic()
+        if restante <= 0:
+            break
+        try:
+            response = requests.get(url, headers=encabezados, timeout=min(espera, restante))
+            if response.status_code == 200 and response.text.strip():
+                return response.text.strip()
+        except requests.exceptions.RequestException:
+            pass
+    return None
+
+def leer_ip_guardada():
+    try:
+        with open(IP_CACHE) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def guardar_ip(ip):
+    try:
+        with open(IP_CACHE, 'w') as f:
+            f.write(ip)
+    except OSError as e:
+        print(f"No se pudo guardar la IP en {IP_CACHE}: {e}")
+
+def imprimir_urls(external_ip, origen):
     print("=" * 50)
     print("🚀 SERVIDOR WEB INICIADO")
     print("=" * 50)
-    print(f"IP Externa detectada: {external_ip}")
+    print(f"IP Externa ({origen}): {external_ip}")
     print(f"Puerto: {PORT}")
     print("")
     print("📱 URLs de acceso:")
@@ -59,9 +83,45 @@ if __name__ == '__main__':
     print(f"   Local:    http://localhost:{PORT}/")
     print("")
     print("🔗 URLs de microservicios:")
-    print(f"   Productos: http://{external_ip}:5001/api/products")
-    print(f"   Pedidos:   http://{external_ip}:5002/api/pedidos")
-    print(f"   Facturas:  http://{external_ip}:5003/api/facturas")
-    print("=" * 50)
-    
-    app.run(host='0.0.0.0', port=PORT, debug=True)
+    for nombre, variable, puerto, ruta in SERVICIOS:
+        base = os.getenv(variable) or f"http://{external_ip}:{puerto}"
+        print(f"   {nombre + ':':<10} {base}{ruta}")
+    print("=" * 50, flush=True)
+
+def detectar_ip(anterior):
+    """Corre en un hilo: detecta la IP y, si cambió, la guarda y vuelve a imprimir las URLs"""
+    ip = get_external_ip()
+    if ip is None:
+        print(f"⚠️  No se detectó la IP externa en {IP_LIMITE:.0f} s; se sigue usando {anterior}", flush=True)
+        return
+    if ip != leer_ip_guardada():
+        guardar_ip(ip)
+    if ip != anterior:
+        imprimir_urls(ip, 'detectada')
+
+@app.route('/')
+def serve_index():
+    if estaticos is not None:
+        return estaticos.respuesta('index.html')
+    return send_from_directory(base_dir, 'index.html')
+
+@app.route('/<path:path>')
+def serve_static_files(path):
+    if estaticos is not None:
+        return estaticos.respuesta(path) or abort(404)
+    return send_from_directory(base_dir, path)
+
+if __name__ == '__main__':
+    debug = not FRONTEND_PRODUCCION
+    # Con el recargador de Flask el módulo corre dos veces; sólo el proceso
+    # que atiende solicitudes imprime y detecta la IP
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if WEB_IP_EXTERNA:
+            imprimir_urls(WEB_IP_EXTERNA, 'configurada')
+        else:
+            # Se arranca de inmediato con la última IP conocida
+            guardada = leer_ip_guardada()
+            imprimir_urls(guardada or 'localhost', 'guardada' if guardada else 'pendiente')
+            threading.Thread(target=detectar_ip, args=(guardada or 'localhost',), name='ip-externa', daemon=True).start()
+
+    app.run(host='0.0.0.0', port=PORT, debug=debug)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío de las funciones Lambda.
+
+Cada medición corre en un proceso nuevo de Python, como un contenedor de
+Lambda recién creado, y toma:
+
+    - import:    tiempo de cargar main.py (la fase de init de Lambda)
+    - 1a inv.:   latencia de la primera llamada a lambda_handler
+    - 2a inv.:   latencia de la siguiente llamada, ya en caliente
+    - memoria:   memoria máxima del proceso (RSS)
+
+Como referencia mide también `import boto3` y la creación de un cliente,
+que es lo que cada arranque pagaba antes y lo que ahora se paga sólo la
+primera vez que una invocación necesita AWS (obtener_cliente). No hace
+llamadas a AWS: crear un cliente de boto3 no usa la red.
+
+Requisitos: pip install boto3 (sólo para la referencia)
+
+Uso:
+    python bench_cold_start.py --repeticiones 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+EVENTOS = {
+    'consulta_saldo': {
+        'version': '2.0',
+        'rawPath': '/saldo',
+        'queryStringParameters': {'user_id': '12345'},
+        'requestContext': {'requestId': 'bench-request'}
+    },
+    'historial_movimientos': {'account_id': '12345', 'limit': 10},
+}
+
+# Se ejecuta en el proceso hijo; imprime un JSON con las mediciones
+MEDICION_LAMBDA = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+main.lambda_handler(EVENTO, None)
+primera = time.perf_counter()
+main.lambda_handler(EVENTO, None)
+segunda = time.perf_counter()
+print(json.dumps({
+    'import': (importado - inicio) * 1000,
+    'primera': (primera - importado) * 1000,
+    'segunda': (segunda - primera) * 1000,
+    'memoria': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'boto3': 'boto3' in sys.modules,
+}))
+"""
+
+MEDICION_BOTO3 = """
+import json, resource, time
+inicio = time.perf_counter()
+import boto3
+importado = time.perf_counter()
+boto3.client('secretsmanager', region_name='us-east-1')
+creado = time.perf_counter()
+print(json.dumps({
+    'import': (importado - inicio) * 1000,
+    'cliente': (creado - importado) * 1000,
+    'memoria': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def medir(codigo, directorio):
+    """Corre `codigo` en un intérprete nuevo dentro de `directorio` y devuelve su JSON"""
+    resultado = subprocess.run(
+        [sys.executable, '-c', codigo], cwd=directorio,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def medianas(mediciones):
+    return {clave: statistics.median(m[clave] for m in mediciones)
+            for clave, valor in mediciones[0].items() if not isinstance(valor, bool)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arranque en frío de las funciones Lambda')
+    parser.add_argument('--repeticiones', type=int, default=10, help='Procesos nuevos por medición')
+    args = parser.parse_args()
+
+    print(f"Medianas de {args.repeticiones} procesos nuevos\n")
+    for nombre, evento in EVENTOS.items():
+        codigo = f"EVENTO = {evento!r}\n" + MEDICION_LAMBDA
+        mediciones = [medir(codigo, os.path.join(DIRECTORIO, nombre)) for _ in range(args.repeticiones)]
+        m = medianas(mediciones)
+        print(f"{nombre:<22} import {m['import']:7.1f} ms   1a inv. {m['primera']:6.2f} ms   "
+              f"2a inv. {m['segunda']:6.2f} ms   memoria {m['memoria']:5.1f} MiB   "
+              f"boto3 cargado: {'sí' if mediciones[0]['boto3'] else 'no'}")
+
+    try:
+        mediciones = [medir(MEDICION_BOTO3, DIRECTORIO) for _ in range(args.repeticiones)]
+    except subprocess.CalledProcessError:
+        print("\nboto3 no está instalado: se omite la referencia")
+        return
+    m = medianas(mediciones)
+    print(f"\nReferencia: import boto3 {m['import']:7.1f} ms   primer cliente {m['cliente']:6.1f} ms   "
+          f"memoria {m['memoria']:5.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
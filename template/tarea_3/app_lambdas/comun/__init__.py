@@ -0,0 +1 @@
+# Módulos compartidos por las funciones Lambda de banca móvil
@@ -0,0 +1,190 @@
+"""
+Conexión a la base de datos compartida por las funciones Lambda.
+
+Sin reutilizar nada, cada invocación pagaría leer el secreto de Secrets
+Manager, abrir la conexión a la base de datos (TCP, autenticación, a través
+de la VPN) y la consulta: cientos de milisegundos. Aquí todo se guarda a
+nivel de módulo y se reutiliza en las invocaciones siguientes del mismo
+contenedor:
+
+    - los clientes de boto3, creados la primera vez que se usan;
+    - el secreto, durante SECRETO_TTL segundos (300 por defecto), para que
+      una rotación de la contraseña se note sin volver a desplegar; si MySQL
+      rechaza la conexión se vuelve a leer una vez;
+    - la conexión (ConexionReutilizable), comprobada con SELECT 1 si lleva
+      más de VERIFICAR_CONEXION_S segundos (30) sin usarse, y reabierta si
+      se cayó.
+
+DB_URL elige la base:
+    - sqlite:///ruta.db: base local para pruebas.
+    - mysql://host:puerto/base: MySQL/MariaDB con pymysql, con usuario y
+      contraseña del secreto DB_SECRETS_ARN.
+
+Cada función importa este paquete desde app_lambdas/comun; al desplegar, el
+stack de CDK lo copia junto al código de la función.
+
+Lambda atiende una invocación a la vez por contenedor, así que no hay locks.
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class CacheTTL:
+    """Valores que caducan a los `ttl` segundos; con más de `max_entradas`, sale el menos usado."""
+
+    def __init__(self, ttl: float, max_entradas: int = 1000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._valores: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        entrada = self._valores.get(clave)
+        if entrada is not None:
+            if entrada[0] > time.monotonic():
+                self._valores.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[1]
+            del self._valores[clave]
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._valores[clave] = (time.monotonic() + self.ttl, valor)
+        self._valores.move_to_end(clave)
+        while len(self._valores) > self.max_entradas:
+            self._valores.popitem(last=False)
+
+    def invalidar(self, clave: Optional[str] = None) -> None:
+        """Olvida `clave`, o todo si es None"""
+        if clave is None:
+            self._valores.clear()
+        else:
+            self._valores.pop(clave, None)
+
+
+class ConexionReutilizable:
+    """Una conexión DB-API que sobrevive entre invocaciones y se reabre si se cae."""
+
+    def __init__(self, abrir: Callable[[], Tuple[Any, Any]], verificar_cada: float = 30):
+        """
+        Args:
+            abrir: función que devuelve (módulo DB-API, conexión nueva).
+            verificar_cada: segundos sin usarse tras los que se comprueba la
+                conexión con SELECT 1 antes de la consulta.
+        """
+        self.abrir = abrir
+        self.verificar_cada = verificar_cada
+        self._modulo = None
+        self._conexion = None
+        self._ultimo_uso = 0.0
+        self.aperturas = 0
+
+    def _conectar(self) -> None:
+        self._modulo, self._conexion = self.abrir()
+        self.aperturas += 1
+
+    def _errores(self) -> Tuple[type, ...]:
+        return (self._modulo.OperationalError, self._modulo.InterfaceError)
+
+    def _sql(self, sql: str) -> str:
+        # Las consultas se escriben con %s; sqlite3 usa ?
+        return sql.replace('%s', '?') if self._modulo.paramstyle == 'qmark' else sql
+
+    def _ejecutar(self, sql: str, parametros: tuple) -> list:
+        cursor = self._conexion.cursor()
+        try:
+            cursor.execute(self._sql(sql), parametros)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def cerrar(self) -> None:
+        if self._conexion is not None:
+            try:
+                self._conexion.close()
+            except Exception:
+                pass
+        self._modulo = self._conexion = None
+
+    def consultar(self, sql: str, parametros: tuple = ()) -> list:
+        """Filas de `sql`; reintenta una vez con una conexión nueva si la actual falló"""
+        if self._conexion is None:
+            self._conectar()
+        elif time.monotonic() - self._ultimo_uso > self.verificar_cada:
+            try:
+                self._ejecutar('SELECT 1', ())
+            except self._errores():
+                self.cerrar()
+                self._conectar()
+        try:
+            filas = self._ejecutar(sql, parametros)
+        except self._errores():
+            # La conexión se cayó entre la verificación y la consulta
+            self.cerrar()
+            self._conectar()
+            filas = self._ejecutar(sql, parametros)
+        self._ultimo_uso = time.monotonic()
+        return filas
+
+
+_clientes: Dict[str, Any] = {}
+secretos = CacheTTL(ttl=float(os.getenv('SECRETO_TTL', '300')), max_entradas=16)
+VERIFICAR_CONEXION_S = float(os.getenv('VERIFICAR_CONEXION_S', '30'))
+
+
+def obtener_cliente(servicio: str) -> Any:
+    """Cliente de boto3 para `servicio`, creado una sola vez por contenedor"""
+    cliente = _clientes.get(servicio)
+    if cliente is None:
+        import boto3
+        cliente = _clientes[servicio] = boto3.client(servicio)
+    return cliente
+
+
+def obtener_secreto(secret_id: str) -> Dict[str, Any]:
+    """Secreto JSON de Secrets Manager, reutilizado durante SECRETO_TTL segundos"""
+    secreto = secretos.obtener(secret_id)
+    if secreto is None:
+        respuesta = obtener_cliente('secretsmanager').get_secret_value(SecretId=secret_id)
+        secreto = json.loads(respuesta['SecretString'])
+        secretos.guardar(secret_id, secreto)
+    return secreto
+
+
+def abrir_conexion() -> Tuple[Any, Any]:
+    """(módulo DB-API, conexión) según DB_URL"""
+    url = os.getenv('DB_URL', '')
+    partes = urlparse(url)
+    if partes.scheme == 'sqlite':
+        import sqlite3
+        return sqlite3, sqlite3.connect(url[len('sqlite:///'):], isolation_level=None)
+    if partes.scheme == 'mysql':
+        import pymysql
+        secret_id = os.environ['DB_SECRETS_ARN']
+        for intento in range(2):
+            secreto = obtener_secreto(secret_id)
+            try:
+                return pymysql, pymysql.connect(
+                    host=partes.hostname,
+                    port=partes.port or 3306,
+                    user=secreto['username'],
+                    password=secreto['password'],
+                    database=partes.path.lstrip('/') or None,
+                    connect_timeout=5,
+                    autocommit=True  # cada consulta ve los datos actuales, no una foto de la transacción
+                )
+            except pymysql.err.OperationalError:
+                # Puede que la contraseña haya rotado: se vuelve a leer el secreto una vez
+                if intento:
+                    raise
+                secretos.invalidar(secret_id)
+    raise ValueError(f'DB_URL no soportada: {url!r}')
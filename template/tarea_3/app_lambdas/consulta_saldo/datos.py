@@ -0,0 +1,68 @@
+"""
+Acceso a datos de la consulta de saldo.
+
+El secreto, los clientes de boto3 y la conexión se reutilizan entre
+invocaciones del mismo contenedor (ver comun/base_datos.py). Además se
+guarda el saldo de cada usuario durante SALDO_CACHE_TTL segundos (5); con 0
+se consulta siempre la base.
+
+DB_URL elige la base:
+    - sqlite:///ruta.db: base local para pruebas (ver test_handler.py).
+    - mysql://host:puerto/base: MySQL/MariaDB con pymysql, con usuario y
+      contraseña del secreto DB_SECRETS_ARN.
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Permite importar el paquete compartido 'comun' fuera de Lambda; al desplegar
+# se copia junto a esta función
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.base_datos import VERIFICAR_CONEXION_S, CacheTTL, ConexionReutilizable, abrir_conexion
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cuentas (
+    user_id VARCHAR(64) PRIMARY KEY,
+    saldo DECIMAL(15, 2) NOT NULL,
+    moneda CHAR(3) NOT NULL,
+    tipo_cuenta VARCHAR(16) NOT NULL,
+    estado VARCHAR(16) NOT NULL,
+    actualizado VARCHAR(32) NOT NULL
+)
+"""
+
+CONSULTA_SALDO = (
+    "SELECT saldo, moneda, tipo_cuenta, estado, actualizado FROM cuentas WHERE user_id = %s"
+)
+
+
+saldos = CacheTTL(
+    ttl=float(os.getenv('SALDO_CACHE_TTL', '5')),
+    max_entradas=int(os.getenv('SALDO_CACHE_MAX', '1000'))
+)
+conexion = ConexionReutilizable(abrir_conexion, verificar_cada=VERIFICAR_CONEXION_S)
+
+
+def consultar_saldo(user_id: str) -> Optional[Dict[str, Any]]:
+    """Saldo de la cuenta de `user_id` en el formato de la respuesta, o None si no existe"""
+    saldo = saldos.obtener(user_id)
+    if saldo is not None:
+        return saldo
+    filas = conexion.consultar(CONSULTA_SALDO, (user_id,))
+    if not filas:
+        return None
+    balance, moneda, tipo_cuenta, estado, actualizado = filas[0]
+    if isinstance(actualizado, datetime):
+        actualizado = actualizado.isoformat() + 'Z'
+    saldo = {
+        'userId': user_id,
+        'balance': float(balance),
+        'currency': moneda,
+        'accountType': tipo_cuenta,
+        'lastUpdated': actualizado,
+        'status': estado
+    }
+    saldos.guardar(user_id, saldo)
+    return saldo
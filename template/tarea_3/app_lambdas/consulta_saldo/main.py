@@ -1,9 +1,8 @@
 import json
 import logging
-import boto3
-import os
 from typing import Dict, Any
-from datetime import datetime
+
+from datos import consultar_saldo
 
 # Configurar logging
 logger = logging.getLogger()
@@ -48,27 +47,26 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
-        # TODO: Implementar llamada real al servicio interno on-premise
-        # Ejemplo de implementación:
-        # - Obtener credenciales de Secrets Manager
-        # - Establecer conexión VPN a base de datos on-premise
-        # - Ejecutar consulta SQL: SELECT balance FROM accounts WHERE user_id = %s
-        # - Procesar resultado y retornar
-        
-        logger.info(f"Simulando consulta de saldo para user_id: {user_id}")
+        # Conexión, secreto y saldo se reutilizan entre invocaciones (ver datos.py)
+        balance_data = consultar_saldo(user_id)
         
-        # Simular llamada al servicio interno on-premise
-        # En producción, aquí iría la lógica real de conexión a la base de datos
-        mock_balance_data = {
-            'userId': user_id,
-            'balance': 5450.75,
-            'currency': 'USD',
-            'accountType': 'CHECKING',
-            'lastUpdated': datetime.utcnow().isoformat() + 'Z',
-            'status': 'ACTIVE'
-        }
+        if balance_data is None:
+            logger.info(f"No existe cuenta para user_id: {user_id}")
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+                },
+                'body': json.dumps({
+                    'error': 'Cuenta no encontrada',
+                    'message': f'No existe una cuenta para el user_id {user_id}'
+                })
+            }
         
-        logger.info(f"Saldo obtenido: {mock_balance_data}")
+        logger.info(f"Saldo obtenido: {balance_data}")
         
         # Retornar respuesta en formato API Gateway v2
         return {
@@ -79,7 +77,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Headers': 'Content-Type',
                 'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
             },
-            'body': json.dumps(mock_balance_data, indent=2)
+            'body': json.dumps(balance_data, indent=2)
         }
         
     except KeyError as e:
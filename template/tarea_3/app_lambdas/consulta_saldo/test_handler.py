@@ -4,15 +4,44 @@ Script de prueba para la función Lambda de consulta de saldo.
 
 Este script simula diferentes escenarios de llamadas a la función Lambda
 para verificar su comportamiento con diferentes tipos de eventos.
+
+Usa una base SQLite local en lugar de la base on-premise (DB_URL), con
+CUENTAS_PRUEBA cuentas, y mide la latencia p50/p99 del handler con y sin
+reutilizar la conexión y la caché de saldos (ver datos.py).
 """
 
 import json
+import sqlite3
+import statistics
 import sys
 import os
+import tempfile
+import time
 
 # Agregar el directorio actual al path para importar main
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+CUENTAS_PRUEBA = 1000
+INVOCACIONES = 5000
+
+def crear_base_local(ruta, cuentas):
+    """Base SQLite con el esquema de datos.py, la cuenta 12345 y `cuentas` cuentas más"""
+    from datos import ESQUEMA
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(ESQUEMA)
+    filas = [('12345', 5450.75, 'USD', 'CHECKING', 'ACTIVE', '2024-03-12T19:03:58Z')]
+    filas += [(f'user{i}', round(100 + i * 1.5, 2), 'USD', 'SAVINGS', 'ACTIVE', '2024-03-12T19:03:58Z')
+              for i in range(cuentas)]
+    conexion.executemany("INSERT OR REPLACE INTO cuentas VALUES (?, ?, ?, ?, ?, ?)", filas)
+    conexion.commit()
+    conexion.close()
+
+if not os.getenv('DB_URL'):
+    ruta_base = os.path.join(tempfile.mkdtemp(prefix='consulta_saldo_'), 'bancos.db')
+    crear_base_local(ruta_base, CUENTAS_PRUEBA)
+    os.environ['DB_URL'] = 'sqlite:///' + ruta_base
+
+import datos
 from main import lambda_handler
 
 def test_successful_request():
@@ -101,6 +130,68 @@ def test_invalid_event():
     print(f"Body: {result['body']}")
     print("✅ Prueba de evento inválido completada\n")
 
+def test_account_not_found():
+    """Prueba una solicitud para un user_id sin cuenta"""
+    print("🧪 Probando solicitud de una cuenta inexistente...")
+    
+    event = {
+        "version": "2.0",
+        "routeKey": "GET /saldo",
+        "rawPath": "/saldo",
+        "rawQueryString": "user_id=no-existe",
+        "queryStringParameters": {
+            "user_id": "no-existe"
+        },
+        "requestContext": {
+            "requestId": "test-request-404"
+        }
+    }
+    
+    result = lambda_handler(event, None)
+    
+    print(f"Status Code: {result['statusCode']}")
+    print(f"Body: {result['body']}")
+    assert result['statusCode'] == 404
+    print("✅ Prueba de cuenta inexistente completada\n")
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def test_latency():
+    """Mide p50/p99 del handler con y sin reutilizar conexión y caché de saldos"""
+    print(f"🧪 Midiendo latencia: {INVOCACIONES} invocaciones sobre {CUENTAS_PRUEBA} cuentas...")
+    
+    eventos = [
+        {"queryStringParameters": {"user_id": f"user{i % CUENTAS_PRUEBA}"},
+         "requestContext": {"requestId": f"test-latencia-{i}"}}
+        for i in range(INVOCACIONES)
+    ]
+    escenarios = [
+        ("sin reutilizar nada", True, True),
+        ("conexión reutilizada", False, True),
+        ("conexión + caché de saldos", False, False),
+    ]
+    
+    for nombre, nueva_conexion, sin_cache in escenarios:
+        datos.conexion.cerrar()
+        datos.saldos.invalidar()
+        aperturas = datos.conexion.aperturas
+        latencias = []
+        for event in eventos:
+            if nueva_conexion:
+                datos.conexion.cerrar()
+            if sin_cache:
+                datos.saldos.invalidar()
+            inicio = time.perf_counter()
+            result = lambda_handler(event, None)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            assert result['statusCode'] == 200, result
+        print(f"   {nombre:<28} p50 {statistics.median(latencias):7.3f} ms   "
+              f"p99 {percentil(latencias, 0.99):7.3f} ms   "
+              f"conexiones abiertas {datos.conexion.aperturas - aperturas}")
+    print("✅ Medición de latencia completada\n")
+
 def main():
     """Ejecutar todas las pruebas"""
     print("🚀 Iniciando pruebas de la función Lambda de consulta de saldo\n")
@@ -110,6 +201,8 @@ def main():
         test_missing_user_id()
         test_empty_user_id()
         test_invalid_event()
+        test_account_not_found()
+        test_latency()
         
         print("🎉 Todas las pruebas completadas exitosamente!")
         
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de paginación del historial de movimientos.
+
+Crea una base SQLite local con una cuenta de --movimientos movimientos
+(1M por defecto) y --otras cuentas pequeñas alrededor, y mide con
+lambda_handler, página a página con next_token:
+
+    - la latencia de la página 1, 10, 100, 1000... hasta --profundidad;
+    - la misma página pedida con LIMIT/OFFSET, que es lo que costaría
+      paginar por número de página: crece con la profundidad;
+    - una página filtrada por un rango de fechas en medio del historial.
+
+Uso:
+    python bench_historial.py --movimientos 1000000 --profundidad 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+CUENTA = 'ACC-GRANDE'
+INICIO = datetime(2015, 1, 1)
+
+
+def crear_base(ruta, movimientos, otras):
+    from datos import ESQUEMA
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(ESQUEMA)
+    rnd = random.Random(1)
+    tipos = ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER', 'PAYMENT')
+
+    def filas(cuenta, cantidad):
+        saldo = 0.0
+        for i in range(cantidad):
+            monto = round(rnd.uniform(-500, 500), 2)
+            saldo = round(saldo + monto, 2)
+            instante = INICIO + timedelta(minutes=5 * i)
+            yield (cuenta, instante.strftime('%Y-%m-%dT%H:%M:%SZ'), f'TXN{i:09d}',
+                   tipos[i % len(tipos)], monto, 'Movimiento de prueba', saldo)
+
+    cuentas = [(CUENTA, movimientos)] + [(f'ACC-{i:05d}', 1000) for i in range(otras)]
+    for cuenta, cantidad in cuentas:
+        conexion.execute("BEGIN")
+        conexion.executemany("INSERT INTO movimientos VALUES (?, ?, ?, ?, ?, ?, ?)", filas(cuenta, cantidad))
+        conexion.execute("COMMIT")
+    conexion.close()
+
+
+def medir(funcion, repeticiones):
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Páginas del historial con next_token frente a OFFSET')
+    parser.add_argument('--movimientos', type=int, default=1000000, help='Movimientos de la cuenta grande')
+    parser.add_argument('--otras', type=int, default=100, help='Otras cuentas, de 1000 movimientos cada una')
+    parser.add_argument('--limite', type=int, default=50, help='Movimientos por página')
+    parser.add_argument('--profundidad', type=int, default=10000, help='Última página medida')
+    parser.add_argument('--repeticiones', type=int, default=50, help='Repeticiones de cada medición')
+    args = parser.parse_args()
+
+    ruta = os.path.join(tempfile.mkdtemp(prefix='historial_'), 'movimientos.db')
+    inicio = time.perf_counter()
+    crear_base(ruta, args.movimientos, args.otras)
+    print(f"Base con {args.movimientos} movimientos en {CUENTA} y {args.otras} cuentas más: "
+          f"{time.perf_counter() - inicio:.1f} s")
+
+    os.environ['DB_URL'] = 'sqlite:///' + ruta
+    import datos
+    from main import lambda_handler
+
+    def pagina(token=None, **filtros):
+        evento = dict(filtros, account_id=CUENTA, limit=args.limite, next_token=token)
+        respuesta = lambda_handler(evento, None)
+        assert respuesta['statusCode'] == 200, respuesta
+        return json.loads(respuesta['body'])
+
+    offset_sql = (f"SELECT {', '.join(datos.COLUMNAS)} FROM movimientos WHERE account_id = %s "
+                  "ORDER BY timestamp DESC, transaction_id DESC LIMIT %s OFFSET %s")
+
+    print(f"\nPágina de {args.limite}        next_token        OFFSET")
+    token, numero, objetivo = None, 1, 1
+    while objetivo <= args.profundidad:
+        # Recorre las páginas con next_token hasta la página objetivo
+        while numero < objetivo:
+            token = pagina(token)['next_token']
+            numero += 1
+        con_token = medir(lambda: pagina(token), args.repeticiones)
+        con_offset = medir(lambda: datos.consultar(
+            offset_sql, (CUENTA, args.limite, (objetivo - 1) * args.limite)), max(3, args.repeticiones // 10))
+        print(f"   {objetivo:>6}              {con_token:7.3f} ms      {con_offset:9.3f} ms")
+        objetivo *= 10
+
+    mitad = INICIO + timedelta(minutes=5 * args.movimientos // 2)
+    filtros = {'start_date': mitad.strftime('%Y-%m-%d'),
+               'end_date': (mitad + timedelta(days=30)).strftime('%Y-%m-%d')}
+    primera = pagina(**filtros)
+    segunda_token = primera['next_token']
+    print(f"\nRango {filtros['start_date']} a {filtros['end_date']}: "
+          f"primera página {medir(lambda: pagina(**filtros), args.repeticiones):.3f} ms, "
+          f"segunda {medir(lambda: pagina(segunda_token, **filtros), args.repeticiones):.3f} ms, "
+          f"{primera['total_count']} movimientos, el más reciente {primera['transactions'][0]['timestamp']}")
+
+    plan = sqlite3.connect(ruta).execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM movimientos WHERE account_id = ? "
+        "AND (timestamp, transaction_id) < (?, ?) ORDER BY timestamp DESC, transaction_id DESC LIMIT 51",
+        (CUENTA, '2020', 'TXN')
+    ).fetchall()
+    print(f"Plan de la consulta con token: {plan[0][-1]}")
+
+
+if __name__ == '__main__':
+    main()
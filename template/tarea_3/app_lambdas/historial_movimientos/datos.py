@@ -0,0 +1,150 @@
+"""
+Acceso a datos del historial de movimientos.
+
+Los movimientos viven en la tabla `movimientos` con clave primaria
+(account_id, timestamp, transaction_id), que es también su índice: los
+movimientos de una cuenta quedan juntos y ordenados por fecha (en InnoDB es
+el orden físico de la tabla). Es el mismo diseño que en DynamoDB, con
+account_id como clave de partición y timestamp#transaction_id como clave de
+ordenación.
+
+Cada página es un recorrido de rango sobre esa clave, del más reciente al
+más antiguo:
+    - el filtro de fechas (start_date, end_date) va en el WHERE, no se
+      filtra en Python;
+    - la página siguiente empieza justo después del último movimiento de la
+      anterior (keyset pagination), que viaja en un token opaco. No se usa
+      OFFSET, así que la página 1000 cuesta lo mismo que la primera;
+    - se piden limit + 1 filas para saber si hay más.
+
+DB_URL elige la base, igual que en consulta_saldo: sqlite:///ruta.db para
+pruebas locales o mysql://host:puerto/base con las credenciales del secreto
+DB_SECRETS_ARN. La conexión y el secreto se reutilizan entre invocaciones del
+mismo contenedor (ver comun/base_datos.py).
+"""
+
+import base64
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Permite importar el paquete compartido 'comun' fuera de Lambda; al desplegar
+# se copia junto a esta función
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun.base_datos import VERIFICAR_CONEXION_S, ConexionReutilizable, abrir_conexion
+
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAX = int(os.getenv('HISTORIAL_PAGINA_MAX', '200'))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS movimientos (
+    account_id VARCHAR(64) NOT NULL,
+    timestamp CHAR(20) NOT NULL,
+    transaction_id VARCHAR(64) NOT NULL,
+    type VARCHAR(16) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    description VARCHAR(255) NOT NULL,
+    balance_after DECIMAL(15, 2) NOT NULL,
+    PRIMARY KEY (account_id, timestamp, transaction_id)
+)
+"""
+
+COLUMNAS = ('transaction_id', 'account_id', 'type', 'amount', 'description', 'timestamp', 'balance_after')
+
+conexion = ConexionReutilizable(abrir_conexion, verificar_cada=VERIFICAR_CONEXION_S)
+
+
+def consultar(sql: str, parametros: tuple) -> List[tuple]:
+    """Filas de `sql` (escrita con %s) en la conexión del contenedor"""
+    return conexion.consultar(sql, parametros)
+
+
+def codificar_token(account_id: str, timestamp: str, transaction_id: str) -> str:
+    datos = json.dumps([account_id, timestamp, transaction_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_token(token: str, account_id: str) -> Tuple[str, str]:
+    """(timestamp, transaction_id) del último movimiento de la página anterior"""
+    try:
+        cuenta, timestamp, transaction_id = json.loads(
+            base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        )
+    except (ValueError, TypeError):
+        raise ValueError('next_token inválido')
+    if cuenta != account_id or not isinstance(timestamp, str) or not isinstance(transaction_id, str):
+        raise ValueError('next_token inválido')
+    return timestamp, transaction_id
+
+
+def _instante(valor: str, nombre: str) -> datetime:
+    """`valor` en UTC sin zona, como la columna timestamp; sin zona se toma como UTC"""
+    try:
+        instante = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        raise ValueError(f'{nombre} debe ser una fecha ISO 8601 (AAAA-MM-DD o AAAA-MM-DDTHH:MM:SSZ)')
+    if instante.tzinfo is not None:
+        instante = instante.astimezone(timezone.utc).replace(tzinfo=None)
+    return instante
+
+
+def rango_fechas(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Límites [desde, hasta) en el formato de la columna timestamp.
+
+    Una fecha sin hora en end_date incluye el día completo.
+    """
+    formato = '%Y-%m-%dT%H:%M:%SZ'
+    desde = hasta = None
+    if start_date:
+        desde = _instante(start_date, 'start_date').strftime(formato)
+    if end_date:
+        fin = _instante(end_date, 'end_date')
+        fin += timedelta(days=1) if len(end_date) == 10 else timedelta(seconds=1)
+        hasta = fin.strftime(formato)
+    if desde and hasta and desde >= hasta:
+        raise ValueError('start_date debe ser anterior a end_date')
+    return desde, hasta
+
+
+def pagina_movimientos(account_id: str, limite: int = TAMANO_PAGINA, token: Optional[str] = None,
+                       start_date: Optional[str] = None, end_date: Optional[str] = None
+                       ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Una página del historial de `account_id`, del movimiento más reciente al más antiguo.
+
+    Returns:
+        (movimientos, next_token); next_token es None en la última página.
+
+    Raises:
+        ValueError: si el token o las fechas no son válidos.
+    """
+    limite = max(1, min(limite, TAMANO_PAGINA_MAX))
+    condiciones = ['account_id = %s']
+    parametros: List[Any] = [account_id]
+    desde, hasta = rango_fechas(start_date, end_date)
+    if desde:
+        condiciones.append('timestamp >= %s')
+        parametros.append(desde)
+    if hasta:
+        condiciones.append('timestamp < %s')
+        parametros.append(hasta)
+    if token:
+        condiciones.append('(timestamp, transaction_id) < (%s, %s)')
+        parametros.extend(decodificar_token(token, account_id))
+    filas = consultar(
+        f"SELECT {', '.join(COLUMNAS)} FROM movimientos WHERE {' AND '.join(condiciones)} "
+        "ORDER BY timestamp DESC, transaction_id DESC LIMIT %s",
+        tuple(parametros) + (limite + 1,)
+    )
+    movimientos = [
+        dict(zip(COLUMNAS, fila), amount=float(fila[3]), balance_after=float(fila[6]))
+        for fila in filas[:limite]
+    ]
+    siguiente = None
+    if len(filas) > limite:
+        ultimo = movimientos[-1]
+        siguiente = codificar_token(account_id, ultimo['timestamp'], ultimo['transaction_id'])
+    return movimientos, siguiente
@@ -1,15 +1,16 @@
 import json
-import boto3
-import os
 from typing import Dict, Any
-from datetime import datetime, timedelta
+
+from datos import TAMANO_PAGINA, TAMANO_PAGINA_MAX, pagina_movimientos
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Función Lambda para consultar el historial de movimientos de una cuenta bancaria.
     
     Args:
-        event: Evento de entrada que contiene el ID de la cuenta y filtros opcionales
+        event: Evento de entrada que contiene el ID de la cuenta y filtros opcionales:
+            start_date/end_date (ISO 8601), limit (máximo TAMANO_PAGINA_MAX) y
+            next_token (el de la página anterior)
         context: Contexto de ejecución de Lambda
     
     Returns:
@@ -20,7 +21,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         account_id = event.get('account_id')
         start_date = event.get('start_date')
         end_date = event.get('end_date')
-        limit = event.get('limit', 50)
+        limit = event.get('limit', TAMANO_PAGINA)
+        next_token = event.get('next_token')
         
         if not account_id:
             return {
@@ -30,51 +32,33 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
-        # TODO: Implementar lógica de consulta a base de datos
-        # Por ahora retornamos movimientos de ejemplo
-        mock_transactions = [
-            {
-                'transaction_id': 'TXN001',
-                'account_id': account_id,
-                'type': 'DEPOSIT',
-                'amount': 5000.00,
-                'description': 'Depósito inicial',
-                'timestamp': '2024-01-15T09:00:00Z',
-                'balance_after': 5000.00
-            },
-            {
-                'transaction_id': 'TXN002',
-                'account_id': account_id,
-                'type': 'WITHDRAWAL',
-                'amount': -150.25,
-                'description': 'Retiro en cajero',
-                'timestamp': '2024-01-15T14:30:00Z',
-                'balance_after': 4849.75
-            },
-            {
-                'transaction_id': 'TXN003',
-                'account_id': account_id,
-                'type': 'TRANSFER',
-                'amount': -500.00,
-                'description': 'Transferencia a cuenta 12345',
-                'timestamp': '2024-01-16T10:15:00Z',
-                'balance_after': 4349.75
+        if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': f'limit debe ser un entero entre 1 y {TAMANO_PAGINA_MAX}'
+                })
             }
-        ]
-        
-        # Aplicar filtros si se proporcionan
-        if start_date or end_date:
-            # TODO: Implementar filtrado por fecha
-            pass
         
-        # Limitar resultados
-        mock_transactions = mock_transactions[:limit]
+        # El filtro de fechas y la paginación se resuelven en la base (ver datos.py)
+        try:
+            transactions, next_token = pagina_movimientos(
+                account_id, limit, next_token, start_date, end_date
+            )
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': str(e)
+                })
+            }
         
         response_data = {
             'account_id': account_id,
-            'transactions': mock_transactions,
-            'total_count': len(mock_transactions),
-            'has_more': False
+            'transactions': transactions,
+            'total_count': len(transactions),
+            'has_more': next_token is not None,
+            'next_token': next_token
         }
         
         return {
@@ -24,6 +24,7 @@ from aws_cdk import (
     aws_iam as iam,
     aws_logs as logs,
     aws_secretsmanager as secretsmanager,
+    BundlingOptions,
     Duration,
     RemovalPolicy,
     CfnOutput,
@@ -39,6 +40,10 @@ class BancaMovilStack(Stack):
         # Configuración del proyecto
         self.project_name = "banca-movil"
         self.environment = "mvp"
+
+        # Base de datos on-premise que leen las Lambdas (usuario y contraseña en
+        # db_secrets); se cambia con: cdk deploy --context db_url=mysql://host:puerto/base
+        self.db_url = self.node.try_get_context("db_url") or "mysql://192.168.1.10:3306/banca_movil"
         
         # Crear VPC para la arquitectura híbrida
         self.vpc = self._create_vpc()
@@ -207,11 +212,32 @@ class BancaMovilStack(Stack):
         
         return lambda_role
 
+    def _lambda_code(self, funcion: str) -> _lambda.Code:
+        """
+        Código de app_lambdas/<funcion> con el paquete compartido app_lambdas/comun
+        y las dependencias de su requirements.txt (pymysql)
+        """
+        
+        # Code.from_asset sólo empaqueta un directorio: el bundling arma el
+        # paquete en la imagen de build de Lambda (requiere Docker al sintetizar)
+        return _lambda.Code.from_asset(
+            "app_lambdas",
+            exclude=["**/__pycache__"],
+            bundling=BundlingOptions(
+                image=_lambda.Runtime.PYTHON_3_9.bundling_image,
+                command=[
+                    "bash", "-c",
+                    f"pip install --no-cache-dir -r {funcion}/requirements.txt -t /asset-output "
+                    f"&& cp -au {funcion}/. comun /asset-output"
+                ]
+            )
+        )
+
     def _create_consulta_saldo_lambda(self) -> _lambda.Function:
         """Crear función Lambda para consulta de saldo"""
         
-        # Leer el código de la función Lambda
-        lambda_code = _lambda.Code.from_asset("app_lambdas/consulta_saldo")
+        # Código de la función Lambda con sus dependencias
+        lambda_code = self._lambda_code("consulta_saldo")
         
         consulta_saldo_lambda = _lambda.Function(
             self,
@@ -227,6 +253,7 @@ class BancaMovilStack(Stack):
             timeout=Duration.seconds(30),
             memory_size=256,
             environment={
+                "DB_URL": self.db_url,
                 "DB_SECRETS_ARN": self.db_secrets.secret_arn,
                 "ENVIRONMENT": self.environment,
                 "POWERTOOLS_SERVICE_NAME": "consulta-saldo"
@@ -243,8 +270,8 @@ class BancaMovilStack(Stack):
     def _create_historial_movimientos_lambda(self) -> _lambda.Function:
         """Crear función Lambda para historial de movimientos"""
         
-        # Leer el código de la función Lambda
-        lambda_code = _lambda.Code.from_asset("app_lambdas/historial_movimientos")
+        # Código de la función Lambda con sus dependencias
+        lambda_code = self._lambda_code("historial_movimientos")
         
         historial_movimientos_lambda = _lambda.Function(
             self,
@@ -260,6 +287,7 @@ class BancaMovilStack(Stack):
             timeout=Duration.seconds(30),
             memory_size=256,
             environment={
+                "DB_URL": self.db_url,
                 "DB_SECRETS_ARN": self.db_secrets.secret_arn,
                 "ENVIRONMENT": self.environment,
                 "POWERTOOLS_SERVICE_NAME": "historial-movimientos"